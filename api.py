@@ -1,16 +1,40 @@
-from fastapi import FastAPI, HTTPException, Query, Request, Response
+from fastapi import Depends, FastAPI, HTTPException, Query, Request, Response
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import FileResponse
+from fastapi.responses import FileResponse, StreamingResponse
 from pydantic import BaseModel
 from fastapi.middleware.cors import CORSMiddleware
 from dotenv import load_dotenv
 import os
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Sequence, Tuple
 import logging
-import ssl
-import warnings
 import traceback
 import re
+import asyncio
+import json
+import zlib
+import io
+import tempfile
+import hashlib
+from datetime import datetime
+from email.utils import formatdate, parsedate_to_datetime
+
+from data_access import SupabaseREST, eq, in_, page_key
+from snapshot_cache import Snapshot, SnapshotCache
+from snapshot_store import open_store
+import read_replica
+import metrics
+import columnar
+import credentials
+import sessions
+import json_response
+import ninebox_engine
+import table_query
+from facets import FACETS, FacetRegistry
+from identity_index import IdentityIndex, FONTE_ATIVOS, FONTE_AVALIACOES, normalize_name
+import import_relacao_ativos
+import exportacao
+import discrepancias
+from competencias import CompetenciasIndex
 
 # Configurar logging
 logging.basicConfig(level=logging.INFO)
@@ -24,40 +48,19 @@ is_local_env = os.getenv("RENDER") is None  # Render define essa variável em pr
 
 # ===== SOLUÇÃO PARA PROXY CORPORATIVO EM AMBIENTE LOCAL =====
 if is_local_env:
-    logger.warning("⚠️ Ambiente LOCAL detectado - Aplicando patch SSL para proxy corporativo")
-    
-    # Importar httpcore ANTES de supabase
-    import httpcore._backends.sync
-    
-    # Salvar função original
-    _original_start_tls = httpcore._backends.sync.SyncStream.start_tls
-    
-    # Criar função patcheada que não verifica SSL
-    def _patched_start_tls(self, *args, **kwargs):
-        # Forçar SSL context sem verificação (apenas em ambiente local!)
-        kwargs['ssl_context'] = ssl._create_unverified_context()
-        return _original_start_tls(self, *args, **kwargs)
-    
-    # Aplicar o patch
-    httpcore._backends.sync.SyncStream.start_tls = _patched_start_tls
-    
-    # Suprimir warnings de SSL
-    warnings.filterwarnings('ignore', message='Unverified HTTPS request')
-    try:
-        import urllib3
-        urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
-    except:
-        pass
-    
-    logger.info("✅ Patch SSL aplicado com sucesso (ambiente local)")
+    # O cliente HTTP do Supabase é criado com verify=False (apenas em ambiente local!)
+    logger.warning("⚠️ Ambiente LOCAL detectado - Verificação SSL desativada para proxy corporativo")
 else:
     logger.info("🚀 Ambiente de PRODUÇÃO detectado - SSL verificação ativada")
 
-# Agora importar supabase (após patch se necessário)
-from supabase import create_client, Client
-
 # Inicializar FastAPI
-app = FastAPI(title="NineBox API", version="1.0.0")
+# Todas as rotas /api/* exigem um token de sessão assinado (sessions.py), exceto login e health
+app = FastAPI(
+    title="NineBox API",
+    version="1.0.0",
+    default_response_class=json_response.FastJSONResponse,
+    dependencies=[Depends(sessions.require_session)],
+)
 
 # Configurar CORS - Em produção, especifique os domínios permitidos
 # Observação importante: quando allow_credentials=True, NÃO podemos usar "*" em allow_origins.
@@ -137,6 +140,9 @@ async def ensure_cors_headers(request: Request, call_next):
     resp.headers["Access-Control-Allow-Credentials"] = "true" if _allow_credentials else "false"
     return resp
 
+# Latência por rota (/api/metrics); registrado por último para envolver os demais middlewares
+app.add_middleware(metrics.MetricsMiddleware)
+
 # Inicializar cliente Supabase
 SUPABASE_URL = os.getenv("SUPABASE_URL")
 SUPABASE_KEY = os.getenv("SUPABASE_KEY")
@@ -145,8 +151,10 @@ if not SUPABASE_URL or not SUPABASE_KEY:
     raise ValueError("SUPABASE_URL e SUPABASE_KEY devem estar definidos no arquivo .env")
 
 try:
-    # Criar cliente Supabase
-    supabase: Client = create_client(SUPABASE_URL, SUPABASE_KEY)
+    # Cliente assíncrono compartilhado (pool de conexões, timeout e limite de concorrência)
+    db: SupabaseREST | None = SupabaseREST(
+        SUPABASE_URL, SUPABASE_KEY, verify=not is_local_env, observer=metrics.record_upstream
+    )
     
     if is_local_env:
         logger.info("✅ Cliente Supabase inicializado (LOCAL - SSL bypass ativado)")
@@ -155,7 +163,28 @@ try:
         
 except Exception as e:
     logger.error(f"❌ Erro ao inicializar Supabase: {e}")
-    supabase = None
+    db = None
+
+
+@app.on_event("shutdown")
+async def close_supabase_client():
+    if db is not None:
+        await db.aclose()
+
+
+_loop_monitor: Dict[str, Any] = {"task": None}
+
+
+@app.on_event("startup")
+async def start_loop_monitor():
+    _loop_monitor["task"] = asyncio.ensure_future(metrics.monitor_event_loop())
+
+
+@app.on_event("shutdown")
+async def stop_loop_monitor():
+    task = _loop_monitor["task"]
+    if task is not None:
+        task.cancel()
 
 
 # ===== Utilitários =====
@@ -165,30 +194,350 @@ class LoginRequest(BaseModel):
 
 
 def validate_supabase():
-    if supabase is None:
+    if db is None:
         raise HTTPException(status_code=500, detail="Supabase não inicializado.")
 
 
-def validate_user_credentials(nome: str, senha: str) -> bool:
-    """Valida usuário na tabela 'usuarios' por igualdade exata de nome e senha."""
+async def _load_credentials() -> List[Dict[str, Any]]:
+    validate_supabase()
+    return await db.fetch_all("usuarios", "nome,senha", key=page_key("usuarios"))
+
+
+# Credenciais em memória (hash com sal) e limite de falhas de login; ver credentials.py
+credential_index = credentials.CredentialIndex(_load_credentials)
+login_throttle = credentials.LoginThrottle()
+
+
+async def validate_user_credentials(nome: str, senha: str) -> bool:
+    """Valida usuário por igualdade exata de nome e senha, no índice em memória de 'usuarios'."""
     try:
-        validate_supabase()
-        resp = (
-            supabase
-            .table("usuarios")
-            .select("nome, senha")
-            .eq("nome", nome)
-            .eq("senha", senha)
-            .limit(1)
-            .execute()
-        )
-        ok = bool(resp.data and len(resp.data) > 0)
+        ok = await credential_index.verify(nome, senha)
         logger.info(f"Login tentativa para '{nome}': {'SUCESSO' if ok else 'FALHA'}")
         return ok
     except Exception as e:
         logger.error(f"Erro ao validar credenciais: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Erro ao validar credenciais: {str(e)}")
 
+
+# ===== Cache de snapshots das tabelas =====
+async def _load_table(table: str) -> List[Dict[str, Any]]:
+    """Busca todas as linhas de uma tabela (páginas de 1000 registros buscadas em paralelo, ordenadas pela chave)."""
+    validate_supabase()
+    return await db.fetch_all(table, key=page_key(table))
+
+
+# Snapshots persistidos em disco (SNAPSHOT_STORE_PATH) para responder logo após um cold start
+table_cache = SnapshotCache(_load_table, store=open_store())
+
+# Respostas JSON já serializadas e comprimidas, por rota + ETag (RESPONSE_CACHE_MAX_BYTES)
+response_cache = json_response.ResponseCache()
+
+
+@app.on_event("startup")
+async def restore_snapshots():
+    try:
+        await table_cache.restore()
+    except Exception as e:
+        logger.warning(f"Não foi possível restaurar snapshots do disco: {e}")
+
+
+def _not_modified_response(request: Request, response: Response, snap: Snapshot) -> Response | None:
+    """
+    _conditional_response com o hash de conteúdo do snapshot (calculado ao carregá-lo) e o
+    instante em que esse conteúdo apareceu (Last-Modified).
+    """
+    return _conditional_response(request, response, snap.content_hash, table_cache.changed_at(snap))
+
+
+def _conditional_response(request: Request, response: Response, content_hash: str, changed_at: float) -> Response | None:
+    """
+    Define ETag e Last-Modified. O ETag é W/"<content_hash>-<tag>", onde tag é o blake2b
+    (6 bytes) da query string e das áreas restritas escondidas da sessão: muda com o
+    conteúdo, com os parâmetros e com o conjunto de áreas visíveis. Retorna 304 se o
+    cliente já tiver esta versão (If-None-Match, ou If-Modified-Since sem ele), a resposta
+    pronta do response_cache (chave: rota + ETag) se já foi servida, ou None.
+    """
+    # Sessões com áreas restritas diferentes recebem respostas (e ETags) diferentes
+    scope = ",".join(sessions.hidden_areas(getattr(request.state, "session", None)))
+    query_tag = hashlib.blake2b(f"{request.url.query}|{scope}".encode(), digest_size=6).hexdigest()
+    etag = f'W/"{content_hash}-{query_tag}"'
+    headers = {
+        "ETag": etag,
+        "Last-Modified": formatdate(changed_at, usegmt=True),
+        # O navegador guarda a resposta, mas sempre revalida com If-None-Match
+        "Cache-Control": "no-cache",
+    }
+    response.headers.update(headers)
+
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        tags = [t.strip() for t in if_none_match.split(",")]
+        # Comparação fraca: ignora o prefixo W/
+        matched = "*" in tags or any(t.removeprefix("W/") == etag.removeprefix("W/") for t in tags)
+    else:
+        if_modified_since = request.headers.get("if-modified-since")
+        try:
+            since = parsedate_to_datetime(if_modified_since).timestamp() if if_modified_since else None
+        except (TypeError, ValueError):
+            since = None
+        matched = since is not None and int(changed_at) <= since
+    if matched:
+        return Response(status_code=304, headers=headers)
+    return json_response.cached_response(
+        response_cache, (request.url.path, etag), request.headers.get("accept-encoding"), headers
+    )
+
+
+def _json_response(request: Request, response: Response, content: Any, formato: str = "linhas") -> Response:
+    """
+    Resposta JSON serializada com orjson (quando instalado) e comprimida conforme o
+    Accept-Encoding, com os cabeçalhos já definidos em response (ETag etc.). Páginas com
+    ETag (vindas de um snapshot) ficam guardadas no response_cache.
+
+    Nas listagens, formato=colunas troca "data" (lista de objetos) por "columns", "values"
+    (uma lista por coluna) e "dictionaries" (textos repetidos); formato=arrow devolve a
+    página em Arrow IPC, com count/next_cursor nos metadados do schema.
+    """
+    if formato not in columnar.FORMATOS_RESPOSTA:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Formato inválido: {formato}. Disponíveis: {', '.join(columnar.FORMATOS_RESPOSTA)}",
+        )
+    headers = {k: v for k, v in response.headers.items() if k not in ("content-length", "content-type")}
+    etag = response.headers.get("etag")
+    key = (request.url.path, etag) if etag else None
+    accept_encoding = request.headers.get("accept-encoding")
+    if formato == "linhas" or "data" not in content:
+        return json_response.json_response(content, accept_encoding, headers=headers, cache=response_cache, key=key)
+
+    rows = content["data"]
+    extra = {k: v for k, v in content.items() if k != "data"}
+    if formato == "colunas":
+        return json_response.json_response(
+            {**columnar.to_columns(rows), **extra}, accept_encoding, headers=headers, cache=response_cache, key=key
+        )
+    try:
+        body = columnar.to_arrow(rows, {k: json.dumps(v) for k, v in extra.items()})
+    except ImportError:
+        raise HTTPException(status_code=501, detail="Formato arrow indisponível: pacote pyarrow não instalado")
+    return json_response.encoded_response(
+        body, columnar.ARROW_MEDIA_TYPE, accept_encoding, headers=headers, cache=response_cache, key=key
+    )
+
+# ===== Áreas restritas (filtro GP) =====
+# (tabela, códigos escondidos) -> (versão do snapshot, máscara das posições escondidas, linhas visíveis)
+_areas_visiveis: Dict[Tuple[str, Tuple[str, ...]], Tuple[Any, bytearray | None, Any]] = {}
+
+
+def _area_filter(request: Request) -> sessions.AreaFilter | None:
+    """Filtro das áreas restritas que o token da requisição não libera (None se libera todas)."""
+    codes = sessions.hidden_areas(getattr(request.state, "session", None))
+    return sessions.AreaFilter(codes) if codes else None
+
+
+def _areas_snapshot(area: sessions.AreaFilter, table: str, snap: Snapshot) -> Tuple[bytearray | None, Any]:
+    """(máscara das posições escondidas, linhas visíveis) do snapshot, por versão."""
+    key = (table, area.codes)
+    version = (id(snap), snap.version)
+    cached = _areas_visiveis.get(key)
+    if cached is None or cached[0] != version:
+        columns = {c: columnar.column_values(snap.rows, c) for c in sessions.AREA_COLUMNS[table]}
+        mask = area.mask(table, columns)
+        rows = snap.rows
+        if mask is not None:
+            positions = [i for i, hidden in enumerate(mask) if not hidden]
+            rows = snap.rows.take(positions) if isinstance(snap.rows, columnar.ColumnarTable) else [snap.rows[i] for i in positions]
+        cached = (version, mask, rows)
+        _areas_visiveis[key] = cached
+    return cached[1], cached[2]
+
+
+def _visible_rows(request: Request, table: str, snap: Snapshot) -> Sequence[Dict[str, Any]]:
+    """Linhas do snapshot sem as áreas restritas que a sessão não liberou."""
+    area = _area_filter(request)
+    if area is None or table not in sessions.AREA_COLUMNS:
+        return snap.rows
+    return _areas_snapshot(area, table, snap)[1]
+
+
+def _hidden_mask(request: Request, table: str, snap: Snapshot) -> bytearray | None:
+    """Máscara (1 = escondida) das posições do snapshot, ou None se nada é escondido."""
+    area = _area_filter(request)
+    if area is None or table not in sessions.AREA_COLUMNS:
+        return None
+    return _areas_snapshot(area, table, snap)[0]
+
+
+def _without_hidden(request: Request, table: str, rows: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Retira de uma página já montada as linhas das áreas escondidas."""
+    area = _area_filter(request)
+    if area is None or table not in sessions.AREA_COLUMNS:
+        return rows
+    return [r for r in rows if not area.hides_row(r, table)]
+
+
+async def _list_query(
+    request: Request,
+    response: Response,
+    table: str,
+    offset: int,
+    limit: int,
+    fields: str | None,
+    filtros: Dict[str, List[str] | None],
+) -> List[Dict[str, Any]] | Response:
+    """
+    Página de uma tabela com projeção (fields=) e filtros da lista branca de table_query.
+    Sem projeção/filtros, ou com o snapshot já em memória, responde a partir do snapshot
+    (com ETag/304); caso contrário a consulta vai direto ao PostgREST com select/filtros.
+    """
+    try:
+        columns = table_query.parse_fields(table, fields)
+        filters = table_query.parse_filters(table, filtros)
+    except table_query.QueryError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    # Com áreas escondidas a página sai sempre do snapshot, onde as linhas são filtradas
+    restricted = table in sessions.AREA_COLUMNS and _area_filter(request) is not None
+    if (not columns and not filters) or restricted or table_cache.peek(table) is not None:
+        snap = await table_cache.get(table)
+        not_modified = _not_modified_response(request, response, snap)
+        if not_modified is not None:
+            return not_modified
+        rows = table_query.filter_rows(_visible_rows(request, table, snap), filters)
+        return table_query.project_rows(rows[offset:offset + limit], columns)
+
+    validate_supabase()
+    return await db.select(
+        table,
+        table_query.postgrest_select(columns),
+        filters=table_query.postgrest_filters(filters),
+        limit=limit,
+        offset=offset,
+    )
+
+
+async def _cursor_query(
+    request: Request,
+    response: Response,
+    table: str,
+    cursor: str,
+    limit: int,
+    fields: str | None = None,
+    filtros: Dict[str, List[str] | None] | None = None,
+) -> Tuple[List[Dict[str, Any]], Any] | Response:
+    """
+    Página por cursor (id > cursor, em ordem de id) sobre o snapshot da tabela.
+    Retorna (linhas, next_cursor) ou a resposta 304.
+    """
+    snap = await table_cache.get(table)
+    not_modified = _not_modified_response(request, response, snap)
+    if not_modified is not None:
+        return not_modified
+    try:
+        columns = table_query.parse_fields(table, fields)
+        filters = table_query.parse_filters(table, filtros or {})
+        keys, ordered = table_query.keyset_index(table, (id(snap), snap.version), snap.rows)
+        after = table_query.parse_cursor(cursor, keys)
+    except table_query.QueryError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    rows, next_cursor = table_query.keyset_page(keys, ordered, after, limit, filters)
+    # Linhas escondidas saem da página; next_cursor continua valendo
+    rows = _without_hidden(request, table, list(rows))
+    return table_query.project_rows(rows, columns), next_cursor
+
+
+# ===== Réplica local (SQLite) das tabelas de referência =====
+# Desativada sem REPLICA_PATH; aberta no startup (importar o módulo não cria o arquivo)
+replica: read_replica.ReadReplica | None = None
+REPLICA_SYNC_INTERVAL = float(os.getenv("REPLICA_SYNC_INTERVAL", "300"))
+
+
+async def _sync_replica(table: str) -> bool:
+    """Espelha o snapshot atual da tabela na réplica (só reescreve se o conteúdo mudou)."""
+    snap = await table_cache.get(table)
+    return await asyncio.to_thread(replica.sync, table, snap.rows, snap.content_hash, table_cache.changed_at(snap))
+
+
+async def _replica_sync_loop():
+    while True:
+        for table in read_replica.REPLICA_TABLES:
+            try:
+                await _sync_replica(table)
+            except Exception as e:
+                logger.warning(f"Falha ao sincronizar réplica local de {table}: {e}")
+        await asyncio.sleep(REPLICA_SYNC_INTERVAL)
+
+
+_replica_task: Dict[str, Any] = {"task": None}
+
+
+@app.on_event("startup")
+async def start_replica_sync():
+    global replica
+    if replica is None:
+        replica = await asyncio.to_thread(read_replica.open_replica)
+    if replica is not None:
+        _replica_task["task"] = asyncio.ensure_future(_replica_sync_loop())
+
+
+@app.on_event("shutdown")
+async def stop_replica_sync():
+    task = _replica_task["task"]
+    if task is not None:
+        task.cancel()
+
+
+async def _replica_page(
+    request: Request,
+    response: Response,
+    table: str,
+    keys: Dict[str, List[str] | None],
+    filters: List[Tuple[str, List[str]]],
+    ordem: str | None,
+    limit: int,
+    offset: int,
+) -> List[Dict[str, Any]] | Response:
+    """
+    Página de uma tabela de referência filtrada por nome/CPF/gestor/login (colunas
+    normalizadas e indexadas), filtros de igualdade e ordenação, consultada na réplica
+    local. Sem réplica, a mesma consulta é feita sobre o snapshot em memória.
+    """
+    meta = None
+    if replica is not None:
+        try:
+            if replica.meta(table) is None:
+                await _sync_replica(table)
+            meta = replica.meta(table)
+        except Exception as e:
+            logger.warning(f"Réplica local indisponível para {table}, usando snapshot: {e}")
+    try:
+        if meta is not None:
+            not_modified = _conditional_response(request, response, meta["content_hash"], meta["changed_at"])
+            if not_modified is not None:
+                return not_modified
+            rows = await asyncio.to_thread(replica.query, table, keys, filters, ordem, limit, offset)
+            return _without_hidden(request, table, rows)
+        snap = await table_cache.get(table)
+        not_modified = _not_modified_response(request, response, snap)
+        if not_modified is not None:
+            return not_modified
+        return read_replica.query_rows(table, _visible_rows(request, table, snap), keys, filters, ordem, limit, offset)
+    except read_replica.ReplicaError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+# Índice nome/CPF/CHAPA/login dos colaboradores, sincronizado com os snapshots
+identity_index = IdentityIndex()
+
+
+async def _get_identity_index() -> IdentityIndex:
+    ativos, avaliacoes = await asyncio.gather(
+        table_cache.get("relacao_ativos"), table_cache.get("nota_final_colaborador")
+    )
+    identity_index.refresh(FONTE_ATIVOS, ativos.rows, version=(id(ativos), ativos.version))
+    identity_index.refresh(FONTE_AVALIACOES, avaliacoes.rows, version=(id(avaliacoes), avaliacoes.version))
+    return identity_index
+
 # ===== Servir arquivos estáticos =====
 # Montar diretório de imagens se existir
 if os.path.exists("image"):
@@ -255,7 +604,8 @@ async def health_check():
     """Verificar saúde da API e conexão com Supabase"""
     try:
         # Tentar uma consulta simples para verificar conexão
-        response = supabase.table("nota_final_colaborador").select("*").limit(1).execute()
+        validate_supabase()
+        await db.select("nota_final_colaborador", "*", limit=1, timeout=10)
         return {
             "status": "healthy",
             "supabase": "connected",
@@ -294,17 +644,65 @@ async def cors_debug(request: Request):
         return {"error": str(e)}
 
 
+@app.get("/api/cache/stats")
+async def cache_stats():
+    """Contadores do cache de snapshots (hits, misses, cargas, descartes) e tabelas em memória."""
+    info = table_cache.info()
+    info["responses"] = response_cache.info()
+    info["login"] = {**credential_index.info(), **login_throttle.info()}
+    if replica is not None:
+        info["replica"] = replica.info()
+    return info
+
+
+@app.get("/api/metrics")
+async def get_metrics():
+    """Métricas no formato texto do Prometheus: latência por rota, chamadas ao Supabase, cache e event loop."""
+    return Response(
+        content=metrics.render(table_cache.info()),
+        media_type="text/plain; version=0.0.4; charset=utf-8",
+    )
+
+
+@app.post("/api/cache/invalidate")
+async def cache_invalidate(tabela: str | None = Query(None, description="Tabela a invalidar (todas se omitido)")):
+    """Descarta snapshots em cache para forçar nova leitura do Supabase na próxima requisição."""
+    table_cache.invalidate(tabela)
+    if tabela in (None, "usuarios"):
+        credential_index.invalidate()
+    return {"success": True, "tabela": tabela}
+
+
 @app.post("/api/login")
-async def post_login(payload: LoginRequest):
-    """Valida credenciais contra a tabela 'usuarios'. Retorna sempre 200 com authenticated=True/False."""
+async def post_login(payload: LoginRequest, request: Request, response: Response):
+    """
+    Valida credenciais contra a tabela 'usuarios'. Retorna sempre 200 com authenticated=True/False;
+    após falhas demais do usuário ou do IP, reason=throttled com Retry-After. Com sucesso,
+    devolve o token de sessão (Authorization: Bearer) exigido pelas demais rotas /api/*.
+    """
     try:
         nome = (payload.nome or "").strip()
         senha = (payload.senha or "").strip()
         if not nome or not senha:
             return {"authenticated": False, "reason": "missing-fields"}
 
-        authenticated = validate_user_credentials(nome, senha)
-        return {"authenticated": authenticated}
+        ip = credentials.client_ip(request.headers, request.client.host if request.client else None)
+        retry_after = login_throttle.retry_after(nome, ip)
+        if retry_after:
+            logger.warning(f"Login bloqueado para '{nome}' ({ip}): tente em {retry_after}s")
+            response.headers["Retry-After"] = str(retry_after)
+            return {"authenticated": False, "reason": "throttled", "retry_after": retry_after}
+
+        authenticated = await validate_user_credentials(nome, senha)
+        if not authenticated:
+            login_throttle.failure(nome, ip)
+            return {"authenticated": False}
+        login_throttle.success(nome)
+        return {
+            "authenticated": True,
+            "token": sessions.issue(nome),
+            "expires_in": sessions.SESSION_TTL,
+        }
     except HTTPException:
         # propagar erros controlados
         raise
@@ -315,52 +713,108 @@ async def post_login(payload: LoginRequest):
 
 @app.get("/api/usuarios")
 async def get_usuarios(
+    request: Request,
+    response: Response,
     nome: str | None = Query(None, description="Filtro exato por nome"),
     limit: int = Query(1000, ge=1, le=10000),
     offset: int = Query(0, ge=0),
 ):
-    """Lista usuarios (nome, senha). Em produção, evite retornar senha; aqui é para ambiente controlado."""
+    """Lista os nomes dos usuarios. A senha nunca é devolvida (o login é validado por /api/login)."""
     try:
         validate_supabase()
         logger.info("Buscando usuarios no Supabase...")
-        q = supabase.table("usuarios").select("nome, senha")
         if nome:
-            q = q.eq("nome", nome)
+            data = await db.select("usuarios", "nome", filters={"nome": eq(nome)})
         else:
-            start = offset
-            end = offset + limit - 1
-            q = q.range(start, end)
-        resp = q.execute()
-        data = resp.data or []
-        return {"data": data, "count": len(data)}
+            data = await db.select("usuarios", "nome", limit=limit, offset=offset)
+        return _json_response(request, response, {"data": data, "count": len(data)})
     except Exception as e:
         logger.error(f"Erro ao buscar usuarios: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Erro ao buscar usuarios: {str(e)}")
 
 @app.get("/api/avaliacoes")
-async def get_avaliacoes(limit: int = Query(1000, ge=1, le=10000), offset: int = Query(0, ge=0)):
+async def get_avaliacoes(
+    request: Request,
+    response: Response,
+    limit: int = Query(1000, ge=1, le=10000),
+    offset: int = Query(0, ge=0),
+    formato: str = Query("linhas", description="linhas (objetos), colunas (listas por coluna, com dicionário de textos) ou arrow"),
+    fields: str | None = Query(None, description="Colunas separadas por vírgula"),
+    area: List[str] | None = Query(None),
+    formulario: List[str] | None = Query(None),
+):
     """
     Obter todas as avaliações (nota_final_colaborador)
     Equivalente ao arquivo_consolidado.csv
     """
     try:
         logger.info("Buscando avaliações no Supabase...")
-        start = offset
-        end = offset + limit - 1
-        response = supabase.table("nota_final_colaborador").select("*").range(start, end).execute()
+        data = await _list_query(request, response, "nota_final_colaborador", offset, limit, fields, {"area": area, "formulario": formulario})
+        if isinstance(data, Response):
+            return data
         
-        if not response.data:
-            return {"data": [], "count": 0}
+        if not data:
+            return _json_response(request, response, {"data": [], "count": 0}, formato)
         
-        logger.info(f"Avaliações encontradas nesta página: {len(response.data)} (offset={offset}, limit={limit})")
-        return {
-            "data": response.data,
-            "count": len(response.data)
-        }
+        logger.info(f"Avaliações encontradas nesta página: {len(data)} (offset={offset}, limit={limit})")
+        return _json_response(request, response, {"data": data, "count": len(data)}, formato)
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Erro ao buscar avaliações: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Erro ao buscar avaliações: {str(e)}")
 
+# Colunas do NineBox calculadas por versão do snapshot de nota_final_colaborador
+_ninebox_columns: Dict[str, Any] = {"version": None, "columns": None}
+
+
+def _get_ninebox_columns(snap: Snapshot) -> ninebox_engine.NineBoxColumns:
+    if _ninebox_columns["version"] != (id(snap), snap.version):
+        _ninebox_columns["columns"] = ninebox_engine.build_columns(snap.rows)
+        _ninebox_columns["version"] = (id(snap), snap.version)
+    return _ninebox_columns["columns"]
+
+
+@app.get("/api/ninebox")
+async def get_ninebox(
+    request: Request,
+    response: Response,
+    area: str | None = Query(None),
+    formulario: str | None = Query(None),
+    nome: str | None = Query(None, description="Parte do nome do avaliado"),
+    avaliador: str | None = Query(None),
+    fator_desempenho: float = Query(0.0),
+    fator_potencial: float = Query(0.0),
+    limite: int | None = Query(None, ge=0, description="Máximo de pessoas listadas por quadrante (contagens não são afetadas)"),
+):
+    """
+    NineBox calculado no servidor: quadrante (considerando notas calibradas), ranking
+    e contagem por quadrante para os filtros informados.
+    """
+    try:
+        snap = await table_cache.get("nota_final_colaborador")
+        not_modified = _not_modified_response(request, response, snap)
+        if not_modified is not None:
+            return not_modified
+        cols = _get_ninebox_columns(snap)
+        indices = ninebox_engine.filtrar_indices(
+            cols, area=area, formulario=formulario, nome=nome, avaliador=avaliador
+        )
+        hidden = _hidden_mask(request, "nota_final_colaborador", snap)
+        if hidden is not None:
+            indices = [i for i in indices if not hidden[i]]
+        result = ninebox_engine.compute_ninebox(
+            cols, indices,
+            fator_desempenho=fator_desempenho,
+            fator_potencial=fator_potencial,
+            limite=limite,
+        )
+        logger.info(f"NineBox calculado: {result['total']} pessoas")
+        return _json_response(request, response, result)
+    except Exception as e:
+        logger.error(f"Erro ao calcular NineBox: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Erro ao calcular NineBox: {str(e)}")
+
 class CalibracaoPayload(BaseModel):
     nota_calibrada_desempenho: float | None = None
     nota_calibrada_potencial: float | None = None
@@ -373,20 +827,92 @@ def _classificacao_por_nota(nota: float | None) -> str | None:
     - 3,3 a 4 => 'Supera a expectativa'
     Retorna None se nota inválida.
     """
+    return ninebox_engine.classificar_nota(nota)
+
+def _dados_calibracao(payload: CalibracaoPayload, comentarios: str) -> Dict[str, Any]:
+    """Colunas a gravar em nota_final_colaborador para uma calibração."""
+    # Colunas são do tipo text para notas calibradas nesta base
+    d: Dict[str, Any] = {}
+    if payload.nota_calibrada_desempenho is not None:
+        # Armazenar com 2 casas decimais como texto
+        d["nota_calibrada_desempenho"] = f"{float(payload.nota_calibrada_desempenho):.2f}"
+        d["classificação_calibrada_desempenho"] = _classificacao_por_nota(payload.nota_calibrada_desempenho)
+    if payload.nota_calibrada_potencial is not None:
+        d["nota_calibrada_potencial"] = f"{float(payload.nota_calibrada_potencial):.2f}"
+        d["classificação_calibrada_potencial"] = _classificacao_por_nota(payload.nota_calibrada_potencial)
+
+    # Sempre incluir comentários (obrigatório)
+    d["comentarios"] = comentarios
+    return d
+
+# Máximo de itens por chamada de calibração em lote
+CALIBRACAO_LOTE_MAX = int(os.getenv("CALIBRACAO_LOTE_MAX", "1000"))
+
+class CalibracaoItem(CalibracaoPayload):
+    id: int
+
+class CalibracaoLoteRequest(BaseModel):
+    itens: List[CalibracaoItem]
+
+@app.patch("/api/avaliacoes/calibracao:batch")
+async def patch_calibracao_lote(payload: CalibracaoLoteRequest):
+    """Grava várias calibrações de uma vez (ex.: sessão de comitê).
+    Valida todos os ids com uma única consulta e grava tudo em um único upsert.
+    Retorna o resultado de cada item na ordem recebida.
+    """
     try:
-        if nota is None:
-            return None
-        # Garantir intervalo válido
-        n = float(nota)
-        if n < 0:
-            n = 0.0
-        if n <= 2.49:
-            return 'Atende parcialmente'
-        if n <= 3.29:
-            return 'Atende dentro da expectativa'
-        return 'Supera a expectativa'
-    except Exception:
-        return None
+        validate_supabase()
+        if not payload.itens:
+            return {"success": True, "data": [], "count": 0, "updated": 0}
+        if len(payload.itens) > CALIBRACAO_LOTE_MAX:
+            raise HTTPException(status_code=400, detail=f"Máximo de {CALIBRACAO_LOTE_MAX} itens por lote")
+
+        ids = sorted({item.id for item in payload.itens})
+        existentes = await db.select("nota_final_colaborador", filters={"id": in_(ids)})
+        # Linhas completas: o upsert regrava a linha inteira com as colunas de calibração alteradas
+        linhas: Dict[int, Dict[str, Any]] = {int(r["id"]): dict(r) for r in existentes}
+
+        resultados: List[Dict[str, Any]] = []
+        alterados: Dict[int, Dict[str, Any]] = {}
+        for item in payload.itens:
+            if item.id not in linhas:
+                resultados.append({"id": item.id, "success": False, "status": 404, "reason": "Avaliação não encontrada"})
+                continue
+            comentarios = (item.comentarios or "").strip()
+            if not comentarios:
+                resultados.append({"id": item.id, "success": False, "status": 400, "reason": "Campo 'comentarios' é obrigatório"})
+                continue
+            d = _dados_calibracao(item, comentarios)
+            if not d.get("nota_calibrada_desempenho") and not d.get("nota_calibrada_potencial"):
+                resultados.append({"id": item.id, "success": False, "status": 400, "reason": "no-fields"})
+                continue
+            # Ids repetidos no lote: as alterações são acumuladas na mesma linha (a última prevalece)
+            linha = alterados.setdefault(item.id, linhas[item.id])
+            linha.update(d)
+            resultados.append({"id": item.id, "success": True, "status": 200, "data": d})
+
+        if alterados:
+            await db.insert(
+                "nota_final_colaborador",
+                list(alterados.values()),
+                upsert=True,
+                on_conflict="id",
+                returning=False,
+            )
+            table_cache.invalidate("nota_final_colaborador")
+
+        logger.info(f"Calibração em lote: {len(alterados)} avaliações atualizadas de {len(payload.itens)} itens")
+        return {
+            "success": all(r["success"] for r in resultados),
+            "data": resultados,
+            "count": len(resultados),
+            "updated": len(alterados),
+        }
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Erro ao atualizar calibração em lote: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Erro ao atualizar calibração em lote: {str(e)}")
 
 @app.patch("/api/avaliacoes/{avaliacao_id}/calibracao")
 async def patch_calibracao(avaliacao_id: int, payload: CalibracaoPayload):
@@ -397,15 +923,8 @@ async def patch_calibracao(avaliacao_id: int, payload: CalibracaoPayload):
         validate_supabase()
 
         # Buscar existência do registro
-        existing = (
-            supabase
-            .table("nota_final_colaborador")
-            .select("id")
-            .eq("id", avaliacao_id)
-            .limit(1)
-            .execute()
-        )
-        if not existing.data:
+        existing = await db.select("nota_final_colaborador", "id", filters={"id": eq(avaliacao_id)}, limit=1)
+        if not existing:
             raise HTTPException(status_code=404, detail="Avaliação não encontrada")
 
         # Validar justificativa obrigatória
@@ -413,30 +932,13 @@ async def patch_calibracao(avaliacao_id: int, payload: CalibracaoPayload):
         if not comentarios:
             raise HTTPException(status_code=400, detail="Campo 'comentarios' é obrigatório para salvar a calibração.")
 
-        # Preparar dados para update (colunas são do tipo text para notas calibradas nesta base)
-        d: Dict[str, Any] = {}
-        if payload.nota_calibrada_desempenho is not None:
-            # Armazenar com 2 casas decimais como texto
-            d["nota_calibrada_desempenho"] = f"{float(payload.nota_calibrada_desempenho):.2f}"
-            d["classificação_calibrada_desempenho"] = _classificacao_por_nota(payload.nota_calibrada_desempenho)
-        if payload.nota_calibrada_potencial is not None:
-            d["nota_calibrada_potencial"] = f"{float(payload.nota_calibrada_potencial):.2f}"
-            d["classificação_calibrada_potencial"] = _classificacao_por_nota(payload.nota_calibrada_potencial)
-
-        # Sempre incluir comentários (obrigatório)
-        d["comentarios"] = comentarios
-
+        d = _dados_calibracao(payload, comentarios)
         if not d.get("nota_calibrada_desempenho") and not d.get("nota_calibrada_potencial"):
             return {"success": False, "reason": "no-fields"}
 
-        resp = (
-            supabase
-            .table("nota_final_colaborador")
-            .update(d)
-            .eq("id", avaliacao_id)
-            .execute()
-        )
-        return {"success": True, "data": resp.data}
+        updated = await db.update("nota_final_colaborador", d, filters={"id": eq(avaliacao_id)})
+        table_cache.invalidate("nota_final_colaborador")
+        return {"success": True, "data": updated}
     except HTTPException:
         raise
     except Exception as e:
@@ -444,227 +946,325 @@ async def patch_calibracao(avaliacao_id: int, payload: CalibracaoPayload):
         raise HTTPException(status_code=500, detail=f"Erro ao atualizar calibração: {str(e)}")
 
 @app.get("/api/funcionarios")
-async def get_funcionarios(limit: int = Query(1000, ge=1, le=10000), offset: int = Query(0, ge=0)):
+async def get_funcionarios(
+    request: Request,
+    response: Response,
+    limit: int = Query(1000, ge=1, le=10000),
+    offset: int = Query(0, ge=0),
+    formato: str = Query("linhas", description="linhas (objetos), colunas (listas por coluna, com dicionário de textos) ou arrow"),
+    fields: str | None = Query(None, description="Colunas separadas por vírgula"),
+    diretoria: List[str] | None = Query(None),
+    gerencia: List[str] | None = Query(None),
+):
     """
     Obter todos os funcionários ativos (relacao_ativos)
     Equivalente ao 2025_09_30_relação_ativos.csv
     """
     try:
         logger.info("Buscando funcionários ativos no Supabase...")
-        start = offset
-        end = offset + limit - 1
-        response = supabase.table("relacao_ativos").select("*").range(start, end).execute()
+        data = await _list_query(request, response, "relacao_ativos", offset, limit, fields, {"diretoria": diretoria, "gerencia": gerencia})
+        if isinstance(data, Response):
+            return data
         
-        if not response.data:
-            return {"data": [], "count": 0}
+        if not data:
+            return _json_response(request, response, {"data": [], "count": 0}, formato)
         
-        logger.info(f"Funcionários encontrados nesta página: {len(response.data)} (offset={offset}, limit={limit})")
-        return {
-            "data": response.data,
-            "count": len(response.data)
-        }
+        logger.info(f"Funcionários encontrados nesta página: {len(data)} (offset={offset}, limit={limit})")
+        return _json_response(request, response, {"data": data, "count": len(data)}, formato)
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Erro ao buscar funcionários: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Erro ao buscar funcionários: {str(e)}")
 
 @app.get("/api/notas-avaliacao")
-async def get_notas_avaliacao(limit: int = Query(1000, ge=1, le=10000), offset: int = Query(0, ge=0)):
+async def get_notas_avaliacao(
+    request: Request,
+    response: Response,
+    limit: int = Query(1000, ge=1, le=10000),
+    offset: int = Query(0, ge=0),
+    formato: str = Query("linhas", description="linhas (objetos), colunas (listas por coluna, com dicionário de textos) ou arrow"),
+    fields: str | None = Query(None, description="Colunas separadas por vírgula"),
+):
     """
     Obter notas por avaliação (nota_por_avaliacao)
     Equivalente ao nota-final-por-avaliacao-csv.csv
     """
     try:
         logger.info("Buscando notas por avaliação no Supabase...")
-        start = offset
-        end = offset + limit - 1
-        response = supabase.table("nota_por_avaliacao").select("*").range(start, end).execute()
+        data = await _list_query(request, response, "nota_por_avaliacao", offset, limit, fields, {})
+        if isinstance(data, Response):
+            return data
         
-        if not response.data:
-            return {"data": [], "count": 0}
+        if not data:
+            return _json_response(request, response, {"data": [], "count": 0}, formato)
         
-        logger.info(f"Notas por avaliação nesta página: {len(response.data)} (offset={offset}, limit={limit})")
-        return {
-            "data": response.data,
-            "count": len(response.data)
-        }
+        logger.info(f"Notas por avaliação nesta página: {len(data)} (offset={offset}, limit={limit})")
+        return _json_response(request, response, {"data": data, "count": len(data)}, formato)
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Erro ao buscar notas por avaliação: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Erro ao buscar notas por avaliação: {str(e)}")
 
 @app.get("/api/movimentacoes")
-async def get_movimentacoes(limit: int = Query(1000, ge=1, le=10000), offset: int = Query(0, ge=0)):
+async def get_movimentacoes(
+    request: Request,
+    response: Response,
+    limit: int = Query(1000, ge=1, le=10000),
+    offset: int = Query(0, ge=0),
+    formato: str = Query("linhas", description="linhas (objetos), colunas (listas por coluna, com dicionário de textos) ou arrow"),
+    fields: str | None = Query(None, description="Colunas separadas por vírgula"),
+    cursor: str | None = Query(None, description="Paginação por cursor: vazio na primeira página, depois o next_cursor recebido"),
+):
     """
     Obter histórico de movimentações (movimentacao_salario)
     Equivalente ao Historico de movimentações.csv
     """
     try:
         logger.info("Buscando histórico de movimentações no Supabase...")
-        start = offset
-        end = offset + limit - 1
-        response = supabase.table("movimentacao_salario").select("*").range(start, end).execute()
+        if cursor is not None:
+            page = await _cursor_query(request, response, "movimentacao_salario", cursor, limit, fields)
+            if isinstance(page, Response):
+                return page
+            data, next_cursor = page
+            logger.info(f"Movimentações nesta página: {len(data)} (cursor={cursor!r}, limit={limit})")
+            return _json_response(request, response, {"data": data, "count": len(data), "next_cursor": next_cursor}, formato)
+        data = await _list_query(request, response, "movimentacao_salario", offset, limit, fields, {})
+        if isinstance(data, Response):
+            return data
         
-        if not response.data:
-            return {"data": [], "count": 0}
+        if not data:
+            return _json_response(request, response, {"data": [], "count": 0}, formato)
         
-        logger.info(f"Movimentações encontradas nesta página: {len(response.data)} (offset={offset}, limit={limit})")
-        return {
-            "data": response.data,
-            "count": len(response.data)
-        }
+        logger.info(f"Movimentações encontradas nesta página: {len(data)} (offset={offset}, limit={limit})")
+        return _json_response(request, response, {"data": data, "count": len(data)}, formato)
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Erro ao buscar movimentações: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Erro ao buscar movimentações: {str(e)}")
 
 @app.get("/api/areas-responsaveis")
-async def get_areas_responsaveis(limit: int = Query(1000, ge=1, le=10000), offset: int = Query(0, ge=0)):
+async def get_areas_responsaveis(
+    request: Request,
+    response: Response,
+    limit: int = Query(1000, ge=1, le=10000),
+    offset: int = Query(0, ge=0),
+    formato: str = Query("linhas", description="linhas (objetos), colunas (listas por coluna, com dicionário de textos) ou arrow"),
+    nome: str | None = Query(None, description="Nome (sem diferenciar acentos/maiúsculas)"),
+    login: str | None = Query(None),
+    ordem: str | None = Query(None, description="Coluna para ordenação (prefixo - para decrescente)"),
+):
     """
     Obter colaboradores e áreas responsáveis
     """
     try:
         logger.info("Buscando áreas responsáveis no Supabase...")
-        start = offset
-        end = offset + limit - 1
-        response = supabase.table("colaborador_area_responsavel").select("*").range(start, end).execute()
+        keys = {"nome": [nome], "login": [login]}
+        data = await _replica_page(request, response, "colaborador_area_responsavel", keys, [], ordem, limit, offset)
+        if isinstance(data, Response):
+            return data
         
-        if not response.data:
-            return {"data": [], "count": 0}
+        if not data:
+            return _json_response(request, response, {"data": [], "count": 0}, formato)
         
-        logger.info(f"Áreas responsáveis nesta página: {len(response.data)} (offset={offset}, limit={limit})")
-        return {
-            "data": response.data,
-            "count": len(response.data)
-        }
+        logger.info(f"Áreas responsáveis nesta página: {len(data)} (offset={offset}, limit={limit})")
+        return _json_response(request, response, {"data": data, "count": len(data)}, formato)
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Erro ao buscar áreas responsáveis: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Erro ao buscar áreas responsáveis: {str(e)}")
 
 @app.get("/api/idiomas")
-async def get_idiomas(limit: int = Query(1000, ge=1, le=10000), offset: int = Query(0, ge=0)):
+async def get_idiomas(
+    request: Request,
+    response: Response,
+    limit: int = Query(1000, ge=1, le=10000),
+    offset: int = Query(0, ge=0),
+    formato: str = Query("linhas", description="linhas (objetos), colunas (listas por coluna, com dicionário de textos) ou arrow"),
+    nome: str | None = Query(None, description="Nome (sem diferenciar acentos/maiúsculas)"),
+    login: str | None = Query(None),
+    ordem: str | None = Query(None, description="Coluna para ordenação (prefixo - para decrescente)"),
+):
     """
     Obter idiomas dos colaboradores
     """
     try:
         logger.info("Buscando idiomas no Supabase...")
-        start = offset
-        end = offset + limit - 1
-        response = supabase.table("idiomas").select("*").range(start, end).execute()
+        keys = {"nome": [nome], "login": [login]}
+        data = await _replica_page(request, response, "idiomas", keys, [], ordem, limit, offset)
+        if isinstance(data, Response):
+            return data
         
-        if not response.data:
-            return {"data": [], "count": 0}
+        if not data:
+            return _json_response(request, response, {"data": [], "count": 0}, formato)
         
-        logger.info(f"Registros de idiomas nesta página: {len(response.data)} (offset={offset}, limit={limit})")
-        return {
-            "data": response.data,
-            "count": len(response.data)
-        }
+        logger.info(f"Registros de idiomas nesta página: {len(data)} (offset={offset}, limit={limit})")
+        return _json_response(request, response, {"data": data, "count": len(data)}, formato)
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Erro ao buscar idiomas: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Erro ao buscar idiomas: {str(e)}")
 
 @app.get("/api/interesse-mudanca")
-async def get_interesse_mudanca(limit: int = Query(1000, ge=1, le=10000), offset: int = Query(0, ge=0)):
+async def get_interesse_mudanca(
+    request: Request,
+    response: Response,
+    limit: int = Query(1000, ge=1, le=10000),
+    offset: int = Query(0, ge=0),
+    formato: str = Query("linhas", description="linhas (objetos), colunas (listas por coluna, com dicionário de textos) ou arrow"),
+    nome: str | None = Query(None, description="Nome (sem diferenciar acentos/maiúsculas)"),
+    cpf: str | None = Query(None),
+    login: str | None = Query(None),
+    ordem: str | None = Query(None, description="Coluna para ordenação (prefixo - para decrescente)"),
+):
     """
     Obter interesse de mudança de área
     """
     try:
         logger.info("Buscando interesse de mudança no Supabase...")
-        start = offset
-        end = offset + limit - 1
-        response = supabase.table("interesse_mudanca_area").select("*").range(start, end).execute()
+        keys = {"nome": [nome], "cpf": [cpf], "login": [login]}
+        data = await _replica_page(request, response, "interesse_mudanca_area", keys, [], ordem, limit, offset)
+        if isinstance(data, Response):
+            return data
         
-        if not response.data:
-            return {"data": [], "count": 0}
+        if not data:
+            return _json_response(request, response, {"data": [], "count": 0}, formato)
         
-        logger.info(f"Registros de interesse nesta página: {len(response.data)} (offset={offset}, limit={limit})")
-        return {
-            "data": response.data,
-            "count": len(response.data)
-        }
+        logger.info(f"Registros de interesse nesta página: {len(data)} (offset={offset}, limit={limit})")
+        return _json_response(request, response, {"data": data, "count": len(data)}, formato)
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Erro ao buscar interesse de mudança: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Erro ao buscar interesse de mudança: {str(e)}")
 
 @app.get("/api/experiencias-profissionais")
-async def get_experiencias_profissionais(limit: int = Query(1000, ge=1, le=10000), offset: int = Query(0, ge=0)):
+async def get_experiencias_profissionais(
+    request: Request,
+    response: Response,
+    limit: int = Query(1000, ge=1, le=10000),
+    offset: int = Query(0, ge=0),
+    formato: str = Query("linhas", description="linhas (objetos), colunas (listas por coluna, com dicionário de textos) ou arrow"),
+):
     """
     Obter experiências profissionais (experiencias_profissionais)
     Campos principais: USER_LOGIN, Nome, Email, Localidade, Data_Inicio, Data_Fim, Area_Conhecimento, Descricao, Meses_Experiencia
     """
     try:
         logger.info("Buscando experiencias_profissionais no Supabase...")
-        start = offset
-        end = offset + limit - 1
-        response = supabase.table("experiencias_profissionais").select("*").range(start, end).execute()
-
-        data = response.data or []
+        snap = await table_cache.get("experiencias_profissionais")
+        not_modified = _not_modified_response(request, response, snap)
+        if not_modified is not None:
+            return not_modified
+        data = snap.rows[offset:offset + limit]
         logger.info(f"Experiências nesta página: {len(data)} (offset={offset}, limit={limit})")
-        return {"data": data, "count": len(data)}
+        return _json_response(request, response, {"data": data, "count": len(data)}, formato)
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Erro ao buscar experiencias_profissionais: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Erro ao buscar experiencias_profissionais: {str(e)}")
 
 @app.get("/api/notas-por-competencia")
-async def get_notas_por_competencia(limit: int = Query(1000, ge=1, le=10000), offset: int = Query(0, ge=0)):
+async def get_notas_por_competencia(
+    request: Request,
+    response: Response,
+    limit: int = Query(1000, ge=1, le=10000),
+    offset: int = Query(0, ge=0),
+    formato: str = Query("linhas", description="linhas (objetos), colunas (listas por coluna, com dicionário de textos) ou arrow"),
+    cursor: str | None = Query(None, description="Paginação por cursor: vazio na primeira página, depois o next_cursor recebido"),
+):
     """
     Obter notas das avaliações por competência (notas_por_competencia)
     Campos típicos: Área, Formulário, NOME, Avaliador, Tipo de Avaliador, Competência, Fator de Avaliação, Nota, Comentário
     """
     try:
         logger.info("Buscando notas_por_competencia no Supabase...")
-        start = offset
-        end = offset + limit - 1
-        response = supabase.table("notas_por_competencia").select("*").range(start, end).execute()
-
-        data = response.data or []
+        if cursor is not None:
+            page = await _cursor_query(request, response, "notas_por_competencia", cursor, limit)
+            if isinstance(page, Response):
+                return page
+            data, next_cursor = page
+            logger.info(f"Notas por competência nesta página: {len(data)} (cursor={cursor!r}, limit={limit})")
+            return _json_response(request, response, {"data": data, "count": len(data), "next_cursor": next_cursor}, formato)
+        snap = await table_cache.get("notas_por_competencia")
+        not_modified = _not_modified_response(request, response, snap)
+        if not_modified is not None:
+            return not_modified
+        data = _visible_rows(request, "notas_por_competencia", snap)[offset:offset + limit]
         logger.info(f"Notas por competência nesta página: {len(data)} (offset={offset}, limit={limit})")
-        return {"data": data, "count": len(data)}
+        return _json_response(request, response, {"data": data, "count": len(data)}, formato)
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Erro ao buscar notas_por_competencia: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Erro ao buscar notas_por_competencia: {str(e)}")
 
 @app.get("/api/nota-avd-2024")
-async def get_nota_avd_2024(limit: int = Query(1000, ge=1, le=10000), offset: int = Query(0, ge=0)):
+async def get_nota_avd_2024(
+    request: Request,
+    response: Response,
+    limit: int = Query(1000, ge=1, le=10000),
+    offset: int = Query(0, ge=0),
+    formato: str = Query("linhas", description="linhas (objetos), colunas (listas por coluna, com dicionário de textos) ou arrow"),
+    nome: str | None = Query(None, description="Nome (sem diferenciar acentos/maiúsculas)"),
+    gestor: str | None = Query(None, description="Avaliador (sem diferenciar acentos/maiúsculas)"),
+    ordem: str | None = Query(None, description="Coluna para ordenação (prefixo - para decrescente)"),
+):
     """
     Obter notas AVD de 2024
     """
     try:
         logger.info("Buscando notas AVD 2024 no Supabase...")
-        start = offset
-        end = offset + limit - 1
-        response = supabase.table("nota_avd_2024").select("*").range(start, end).execute()
+        keys = {"nome": [nome], "gestor": [gestor]}
+        data = await _replica_page(request, response, "nota_avd_2024", keys, [], ordem, limit, offset)
+        if isinstance(data, Response):
+            return data
         
-        if not response.data:
-            return {"data": [], "count": 0}
+        if not data:
+            return _json_response(request, response, {"data": [], "count": 0}, formato)
         
-        logger.info(f"Notas AVD 2024 nesta página: {len(response.data)} (offset={offset}, limit={limit})")
-        return {
-            "data": response.data,
-            "count": len(response.data)
-        }
+        logger.info(f"Notas AVD 2024 nesta página: {len(data)} (offset={offset}, limit={limit})")
+        return _json_response(request, response, {"data": data, "count": len(data)}, formato)
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Erro ao buscar notas AVD 2024: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Erro ao buscar notas AVD 2024: {str(e)}")
 
 @app.get("/api/mesa-calibracao")
-async def get_mesa_calibracao(limit: int = Query(1000, ge=1, le=10000), offset: int = Query(0, ge=0)):
+async def get_mesa_calibracao(
+    request: Request,
+    response: Response,
+    limit: int = Query(1000, ge=1, le=10000),
+    offset: int = Query(0, ge=0),
+    formato: str = Query("linhas", description="linhas (objetos), colunas (listas por coluna, com dicionário de textos) ou arrow"),
+    nome: str | None = Query(None, description="Nome (sem diferenciar acentos/maiúsculas)"),
+    gestor: str | None = Query(None, description="Líder (sem diferenciar acentos/maiúsculas)"),
+    ordem: str | None = Query(None, description="Coluna para ordenação (prefixo - para decrescente)"),
+):
     """
     Obter dados da mesa de calibração
     Campos: NOME, CARGO, Líder, Localidade, DIRETORIA, Calibração?, Mesa, BP, Apoio GP, GP, Pai, Avô
     """
     try:
         logger.info("Buscando mesa de calibração no Supabase...")
-        start = offset
-        end = offset + limit - 1
-        response = supabase.table("mesa_calibracao").select("*").range(start, end).execute()
+        keys = {"nome": [nome], "gestor": [gestor]}
+        data = await _replica_page(request, response, "mesa_calibracao", keys, [], ordem, limit, offset)
+        if isinstance(data, Response):
+            return data
         
-        if not response.data:
-            return {"data": [], "count": 0}
+        if not data:
+            return _json_response(request, response, {"data": [], "count": 0}, formato)
         
-        logger.info(f"Registros de mesa de calibração nesta página: {len(response.data)} (offset={offset}, limit={limit})")
-        return {
-            "data": response.data,
-            "count": len(response.data)
-        }
+        logger.info(f"Registros de mesa de calibração nesta página: {len(data)} (offset={offset}, limit={limit})")
+        return _json_response(request, response, {"data": data, "count": len(data)}, formato)
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Erro ao buscar mesa de calibração: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Erro ao buscar mesa de calibração: {str(e)}")
@@ -678,41 +1278,28 @@ async def get_desenvolvimento_por_nome(nome: str):
     try:
         validate_supabase()
         # Primeiro por nome do colaborador
-        resp = (
-            supabase
-            .table("desenvolvimento_colaborador")
-            .select("*")
-            .eq("colaborador", nome)
-            .order("atualizado_em", desc=True)
-            .limit(1)
-            .execute()
+        data = await db.select(
+            "desenvolvimento_colaborador",
+            filters={"colaborador": eq(nome)},
+            order="atualizado_em.desc",
+            limit=1,
         )
-        data = resp.data or []
 
         if not data:
-            # Tentar localizar por CPF, se conseguirmos inferir do nome via relacao_ativos
+            # Tentar localizar por CPF, se conseguirmos inferir do nome via índice de colaboradores
             try:
-                emp = (
-                    supabase
-                    .table("relacao_ativos")
-                    .select("cpf, nome")
-                    .ilike("nome", nome)
-                    .limit(1)
-                    .execute()
-                )
-                if emp.data and emp.data[0].get("cpf"):
-                    cpf = str(emp.data[0]["cpf"]) or ""
+                index = await _get_identity_index()
+                # Só chaves exatas: um nome parecido não pode trazer o registro de outra pessoa
+                emp, _ = index.resolve(nome=nome, fuzzy=False)
+                if emp and (emp.get("cpf") or emp.get("CPF")):
+                    cpf = str(emp.get("cpf") or emp.get("CPF")) or ""
                     if cpf:
-                        resp2 = (
-                            supabase
-                            .table("desenvolvimento_colaborador")
-                            .select("*")
-                            .eq("cpf", cpf)
-                            .order("atualizado_em", desc=True)
-                            .limit(1)
-                            .execute()
+                        data = await db.select(
+                            "desenvolvimento_colaborador",
+                            filters={"cpf": eq(cpf)},
+                            order="atualizado_em.desc",
+                            limit=1,
                         )
-                        data = resp2.data or []
             except Exception:
                 pass
 
@@ -766,57 +1353,48 @@ async def upsert_desenvolvimento(payload: DesenvolvimentoPayload):
                 data[key] = None
 
         # Tentar localizar registro existente por colaborador
-        existing = (
-            supabase
-            .table("desenvolvimento_colaborador")
-            .select("id")
-            .eq("colaborador", data.get("colaborador"))
-            .limit(1)
-            .execute()
+        existing = await db.select(
+            "desenvolvimento_colaborador", "id", filters={"colaborador": eq(data.get("colaborador"))}, limit=1
         )
-        row = (existing.data or [None])[0]
+        row = (existing or [None])[0]
 
         # Se não encontrou e houver CPF, procurar por CPF
         if not row and data.get("cpf"):
-            existing2 = (
-                supabase
-                .table("desenvolvimento_colaborador")
-                .select("id")
-                .eq("cpf", str(data.get("cpf")))
-                .limit(1)
-                .execute()
+            existing2 = await db.select(
+                "desenvolvimento_colaborador", "id", filters={"cpf": eq(str(data.get("cpf")))}, limit=1
             )
-            row = (existing2.data or [None])[0]
+            row = (existing2 or [None])[0]
 
         if row and row.get("id"):
             # Update
             data["atualizado_em"] = None  # deixar o default/trigger do banco cuidar
-            resp = (
-                supabase
-                .table("desenvolvimento_colaborador")
-                .update(data)
-                .eq("id", row["id"])
-                .execute()
-            )
-            return {"success": True, "action": "updated", "data": resp.data}
+            updated = await db.update("desenvolvimento_colaborador", data, filters={"id": eq(row["id"])})
+            table_cache.invalidate("desenvolvimento_colaborador")
+            return {"success": True, "action": "updated", "data": updated}
         else:
             # Insert
-            resp = (
-                supabase
-                .table("desenvolvimento_colaborador")
-                .insert(data)
-                .execute()
-            )
-            return {"success": True, "action": "inserted", "data": resp.data}
+            inserted = await db.insert("desenvolvimento_colaborador", data)
+            table_cache.invalidate("desenvolvimento_colaborador")
+            return {"success": True, "action": "inserted", "data": inserted}
     except Exception as e:
         logger.error(f"Erro ao salvar desenvolvimento: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Erro ao salvar desenvolvimento: {str(e)}")
 
 @app.get("/api/pessoas-avaliadas")
 async def get_pessoas_avaliadas(
+    request: Request,
+    response: Response,
     gestor: str | None = Query(None, description="Filtro por gestor"),
     limit: int = Query(1000, ge=1, le=10000), 
-    offset: int = Query(0, ge=0)
+    offset: int = Query(0, ge=0),
+    formato: str = Query("linhas", description="linhas (objetos), colunas (listas por coluna, com dicionário de textos) ou arrow"),
+    fields: str | None = Query(None, description="Colunas separadas por vírgula"),
+    area: List[str] | None = Query(None),
+    formulario: List[str] | None = Query(None),
+    cursor: str | None = Query(None, description="Paginação por cursor: vazio na primeira página, depois o next_cursor recebido"),
+    nome: str | None = Query(None, description="Nome (sem diferenciar acentos/maiúsculas)"),
+    login: str | None = Query(None),
+    ordem: str | None = Query(None, description="Coluna para ordenação (prefixo - para decrescente)"),
 ):
     """
     Obter pessoas avaliadas e seus gestores
@@ -824,104 +1402,491 @@ async def get_pessoas_avaliadas(
     """
     try:
         logger.info("Buscando pessoas avaliadas no Supabase...")
-        start = offset
-        end = offset + limit - 1
-        
-        # Construir query - nome da tabela com underscore
-        query = supabase.table("pessoas_avaliadas").select("*")
         
-        # Aplicar filtro de gestor se fornecido - campo GESTOR em maiúscula
+        # Filtro de gestor (campo GESTOR em maiúscula), área e formulário; já paginado
         if gestor:
-            query = query.eq("GESTOR", gestor)
             logger.info(f"Filtrando por gestor: {gestor}")
+        filtros = {"gestor": [gestor] if gestor else None, "area": area, "formulario": formulario}
+        if cursor is not None:
+            page = await _cursor_query(request, response, "pessoas_avaliadas", cursor, limit, fields, filtros)
+            if isinstance(page, Response):
+                return page
+            data, next_cursor = page
+            logger.info(f"Pessoas avaliadas nesta página: {len(data)} (cursor={cursor!r}, limit={limit})")
+            return _json_response(request, response, {"data": data, "count": len(data), "next_cursor": next_cursor}, formato)
+        # Gestor, nome e login pelas colunas indexadas da réplica local; área/formulário por igualdade
+        try:
+            columns = table_query.parse_fields("pessoas_avaliadas", fields)
+            filters = table_query.parse_filters("pessoas_avaliadas", {"area": area, "formulario": formulario})
+        except table_query.QueryError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        keys = {"gestor": [gestor], "nome": [nome], "login": [login]}
+        data = await _replica_page(request, response, "pessoas_avaliadas", keys, filters, ordem, limit, offset)
+        if isinstance(data, Response):
+            return data
+        data = table_query.project_rows(data, columns)
         
-        # Aplicar paginação
-        response = query.range(start, end).execute()
-        
-        if not response.data:
+        if not data:
             logger.warning("Nenhuma pessoa avaliada encontrada")
-            return {"data": [], "count": 0}
+            return _json_response(request, response, {"data": [], "count": 0}, formato)
         
-        logger.info(f"Pessoas avaliadas nesta página: {len(response.data)} (offset={offset}, limit={limit})")
-        if len(response.data) > 0:
-            logger.info(f"Exemplo de registro: {response.data[0]}")
-            logger.info(f"Chaves disponíveis: {list(response.data[0].keys())}")
+        logger.info(f"Pessoas avaliadas nesta página: {len(data)} (offset={offset}, limit={limit})")
+        if len(data) > 0:
+            logger.info(f"Exemplo de registro: {data[0]}")
+            logger.info(f"Chaves disponíveis: {list(data[0].keys())}")
         
-        return {
-            "data": response.data,
-            "count": len(response.data)
-        }
+        return _json_response(request, response, {"data": data, "count": len(data)}, formato)
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Erro ao buscar pessoas avaliadas: {str(e)}")
         logger.error(f"Stack trace: {traceback.format_exc()}")
         raise HTTPException(status_code=500, detail=f"Erro ao buscar pessoas avaliadas: {str(e)}")
 
+class PessoaConsulta(BaseModel):
+    nome: str | None = None
+    cpf: str | None = None
+    chapa: str | None = None
+    login: str | None = None
+
+class ResolverPessoasRequest(BaseModel):
+    pessoas: List[PessoaConsulta]
+
+@app.post("/api/pessoas/resolve")
+async def resolver_pessoas(payload: ResolverPessoasRequest, request: Request):
+    """
+    Localiza vários colaboradores de uma vez em relacao_ativos, por CPF, CHAPA, login
+    ou nome (sem acento/maiúsculas). Os resultados seguem a ordem da consulta.
+    """
+    try:
+        index = await _get_identity_index()
+        area = _area_filter(request)
+        resultados = []
+        for consulta in payload.pessoas:
+            emp, criterio = index.resolve(
+                nome=consulta.nome, cpf=consulta.cpf, chapa=consulta.chapa, login=consulta.login
+            )
+            if emp is not None and area is not None and area.hides_row(emp, "relacao_ativos"):
+                emp, criterio = None, None
+            resultados.append({
+                "consulta": consulta.dict(exclude_none=True),
+                "found": emp is not None,
+                "criterio": criterio,
+                "data": emp,
+            })
+        encontrados = sum(1 for r in resultados if r["found"])
+        logger.info(f"Resolução de pessoas: {encontrados}/{len(resultados)} encontradas")
+        return {"data": resultados, "count": len(resultados), "found": encontrados}
+    except Exception as e:
+        logger.error(f"Erro ao resolver pessoas: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Erro ao resolver pessoas: {str(e)}")
+
+# Posição de cada avaliação (por id) e notas por competência agrupadas por pessoa, por versão do snapshot
+_avaliacoes_por_id: Dict[str, Any] = {"version": None, "index": None}
+_competencias_index: Dict[str, Any] = {"index": None}
+
+
+async def _get_avaliacao(avaliacao_id: int) -> Dict[str, Any] | None:
+    snap = await table_cache.get("nota_final_colaborador")
+    if _avaliacoes_por_id["version"] != (id(snap), snap.version):
+        ids = columnar.column_values(snap.rows, "id")
+        _avaliacoes_por_id["index"] = {rid: i for i, rid in enumerate(ids) if rid is not None}
+        _avaliacoes_por_id["version"] = (id(snap), snap.version)
+    position = _avaliacoes_por_id["index"].get(avaliacao_id)
+    return snap.rows[position] if position is not None else None
+
+
+async def _get_competencias_index() -> CompetenciasIndex:
+    snap = await table_cache.get("notas_por_competencia")
+    version = (id(snap), snap.version)
+    index = _competencias_index["index"]
+    if index is None or index.version != version:
+        index = CompetenciasIndex(snap.rows, version)
+        _competencias_index["index"] = index
+        logger.info(f"Índice de competências recalculado: {len(index.by_login)} logins, {len(index.by_nome)} nomes")
+    return index
+
+
+@app.get("/api/pessoas/{avaliacao_id}/competencias")
+async def get_competencias_pessoa(
+    request: Request,
+    avaliacao_id: int,
+    login: str | None = Query(None, description="Login do avaliado, se a avaliação não estiver na tabela"),
+    nome: str | None = Query(None, description="Nome do avaliado, se a avaliação não estiver na tabela"),
+):
+    """
+    Notas por competência de uma pessoa (id da avaliação em nota_final_colaborador):
+    média auto x gestor por competência, separando desempenho e potencial.
+    A pessoa é localizada pelo login e, se não houver, pelo nome.
+    """
+    try:
+        avaliacao = await _get_avaliacao(avaliacao_id)
+        area = _area_filter(request)
+        if avaliacao is not None and area is not None and area.hides_row(avaliacao, "nota_final_colaborador"):
+            raise HTTPException(status_code=404, detail=f"Avaliação {avaliacao_id} não encontrada")
+        if avaliacao is not None:
+            login = avaliacao.get("login_do_avaliado") or login
+            nome = ninebox_engine.nome_avaliado(avaliacao) or nome
+        elif not login and not nome:
+            raise HTTPException(status_code=404, detail=f"Avaliação {avaliacao_id} não encontrada")
+        index = await _get_competencias_index()
+        result = index.para_pessoa(login=login, nome=nome)
+        if result is None:
+            return {"found": False, "performance": [], "potencial": []}
+        return {"found": True, **result}
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Erro ao buscar competências da pessoa: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Erro ao buscar competências da pessoa: {str(e)}")
+
+# Facetas (valores distintos + contagens) por snapshot de tabela, uma por conjunto de áreas escondidas
+facet_registries: Dict[Tuple[str, ...], FacetRegistry] = {}
+
 @app.get("/api/filtros")
-async def get_filtros():
+async def get_filtros(
+    request: Request,
+    response: Response,
+    area: List[str] | None = Query(None),
+    formulario: List[str] | None = Query(None),
+    diretoria: List[str] | None = Query(None),
+    gerencia: List[str] | None = Query(None),
+    cargo: List[str] | None = Query(None),
+):
     """
-    Obter todos os valores únicos para filtros
+    Obter todos os valores únicos para filtros, com a quantidade de registros de cada um.
+    Filtros informados restringem as demais dimensões da mesma tabela
+    (ex.: ?diretoria=X devolve apenas as gerências e cargos dessa diretoria).
     """
     try:
         logger.info("Buscando valores para filtros...")
-        
-        # Buscar dados de avaliações
-        avaliacoes = supabase.table("nota_final_colaborador").select("área, formulário").execute()
-        funcionarios = supabase.table("relacao_ativos").select("diretoria, gerencia, cargo").execute()
-        
-        # Extrair valores únicos
-        areas = list(set([a.get("área") for a in avaliacoes.data if a.get("área")]))
-        formularios = list(set([a.get("formulário") for a in avaliacoes.data if a.get("formulário")]))
-        diretorias = list(set([f.get("diretoria") for f in funcionarios.data if f.get("diretoria")]))
-        gerencias = list(set([f.get("gerencia") for f in funcionarios.data if f.get("gerencia")]))
-        cargos = list(set([f.get("cargo") for f in funcionarios.data if f.get("cargo")]))
-        
-        # Ordenar listas
-        areas.sort()
-        formularios.sort()
-        diretorias.sort()
-        gerencias.sort()
-        cargos.sort()
-        
-        return {
-            "areas": areas,
-            "formularios": formularios,
-            "diretorias": diretorias,
-            "gerencias": gerencias,
-            "cargos": cargos
-        }
+        selecionados = FacetRegistry.split_params({
+            "area": area, "formulario": formulario,
+            "diretoria": diretoria, "gerencia": gerencia, "cargo": cargo,
+        })
+
+        snaps = await asyncio.gather(*[table_cache.get(t) for t in FACETS])
+        area = _area_filter(request)
+        registry = facet_registries.setdefault(area.codes if area else (), FacetRegistry())
+        resultado: Dict[str, Any] = {}
+        contagens: Dict[str, Dict[str, int]] = {}
+        for table, snap in zip(FACETS, snaps):
+            index = registry.index(table, _visible_rows(request, table, snap), (id(snap), snap.version))
+            for key, counts in index.facets(selecionados.get(table)).items():
+                resultado[key] = list(counts)
+                contagens[key] = counts
+        resultado["contagens"] = contagens
+        return _json_response(request, response, resultado)
     except Exception as e:
         logger.error(f"Erro ao buscar filtros: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Erro ao buscar filtros: {str(e)}")
 
+# Tabelas entregues pelo /api/bootstrap (chave na resposta -> tabela no Supabase)
+BOOTSTRAP_TABLES: Dict[str, str] = {
+    "avaliacoes": "nota_final_colaborador",
+    "funcionarios": "relacao_ativos",
+    "notas_avaliacao": "nota_por_avaliacao",
+    "movimentacoes": "movimentacao_salario",
+    "nota_avd_2024": "nota_avd_2024",
+    "mesa_calibracao": "mesa_calibracao",
+    "pessoas_avaliadas": "pessoas_avaliadas",
+    "idiomas": "idiomas",
+    "experiencias_profissionais": "experiencias_profissionais",
+    "notas_por_competencia": "notas_por_competencia",
+}
+
+# Quantidade de linhas serializadas por vez no streaming
+_STREAM_BATCH_ROWS = 1000
+
+
+def _json_rows_chunks(rows: List[Dict[str, Any]]):
+    """Serializa uma lista de linhas como array JSON, em blocos, sem montar a string inteira."""
+    yield "["
+    for i in range(0, len(rows), _STREAM_BATCH_ROWS):
+        batch = json.dumps(rows[i:i + _STREAM_BATCH_ROWS], ensure_ascii=False, default=str)
+        yield ("," if i else "") + batch[1:-1]
+    yield "]"
+
+
+def _streaming_response(request: Request, chunks, media_type: str, headers: Dict[str, str]) -> StreamingResponse:
+    """StreamingResponse de blocos de texto (gerador assíncrono), comprimida com gzip quando aceito."""
+    headers = {"Vary": "Accept-Encoding", **headers}
+    if "gzip" in (request.headers.get("accept-encoding") or "").lower():
+        headers["Content-Encoding"] = "gzip"
+
+        async def _gzip():
+            compressor = zlib.compressobj(6, zlib.DEFLATED, 31)
+            async for chunk in chunks:
+                data = compressor.compress(chunk.encode("utf-8"))
+                if data:
+                    yield data
+            yield compressor.flush()
+
+        return StreamingResponse(_gzip(), media_type=media_type, headers=headers)
+
+    async def _encode():
+        async for chunk in chunks:
+            yield chunk.encode("utf-8")
+
+    return StreamingResponse(_encode(), media_type=media_type, headers=headers)
+
+
+@app.get("/api/bootstrap")
+async def get_bootstrap(
+    request: Request,
+    tabelas: str | None = Query(None, description="Chaves separadas por vírgula (padrão: todas)"),
+):
+    """
+    Retorna em uma única resposta todos os dados que o dashboard carrega na inicialização.
+    As tabelas são buscadas em paralelo (via cache de snapshots) e enviadas em streaming,
+    uma após a outra, à medida que ficam prontas. Resposta comprimida com gzip quando aceito.
+    Formato: {"<chave>": [linhas...], ..., "erros": {"<chave>": "mensagem"}}
+    """
+    if tabelas:
+        keys = [k.strip() for k in tabelas.split(",") if k.strip()]
+        invalid = [k for k in keys if k not in BOOTSTRAP_TABLES]
+        if invalid:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Tabelas inválidas: {', '.join(invalid)}. Disponíveis: {', '.join(BOOTSTRAP_TABLES)}",
+            )
+    else:
+        keys = list(BOOTSTRAP_TABLES)
+
+    logger.info(f"Bootstrap solicitado: {', '.join(keys)}")
+
+    async def _fetch(key: str):
+        try:
+            table = BOOTSTRAP_TABLES[key]
+            return key, _visible_rows(request, table, await table_cache.get(table)), None
+        except Exception as e:
+            logger.error(f"Erro ao carregar {key} no bootstrap: {str(e)}")
+            return key, None, str(e)
+
+    # Disparar todas as cargas de uma vez; o cache garante uma única busca por tabela
+    tasks = [asyncio.ensure_future(_fetch(k)) for k in dict.fromkeys(keys)]
+
+    async def _body():
+        erros: Dict[str, str] = {}
+        first = True
+        try:
+            yield "{"
+            for done in asyncio.as_completed(tasks):
+                key, rows, erro = await done
+                if erro is not None:
+                    erros[key] = erro
+                    rows = []
+                yield ("" if first else ",") + json.dumps(key) + ":"
+                first = False
+                for chunk in _json_rows_chunks(rows):
+                    yield chunk
+            yield ("" if first else ",") + '"erros":' + json.dumps(erros, ensure_ascii=False) + "}"
+        finally:
+            for t in tasks:
+                t.cancel()
+
+    return _streaming_response(request, _body(), "application/json", {"Cache-Control": "no-cache"})
+
+@app.get("/api/export")
+async def get_export(
+    request: Request,
+    formato: str = Query("csv", description="csv (';' com BOM) ou ndjson"),
+    area: str | None = Query(None),
+    formulario: str | None = Query(None),
+    nome: str | None = Query(None, description="Parte do nome do avaliado"),
+    avaliador: str | None = Query(None),
+):
+    """
+    Exporta as avaliações com notas calibradas, quadrante calculado e dados de
+    relacao_ativos, em streaming (blocos de linhas gerados sob demanda).
+    """
+    if formato not in exportacao.FORMATOS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Formato inválido: {formato}. Disponíveis: {', '.join(exportacao.FORMATOS)}",
+        )
+    try:
+        snap = await table_cache.get("nota_final_colaborador")
+        identity = await _get_identity_index()
+        cols = _get_ninebox_columns(snap)
+        indices = ninebox_engine.filtrar_indices(
+            cols, area=area, formulario=formulario, nome=nome, avaliador=avaliador, apenas_grid=False
+        )
+        hidden = _hidden_mask(request, "nota_final_colaborador", snap)
+        if hidden is not None:
+            indices = [i for i in indices if not hidden[i]]
+    except Exception as e:
+        logger.error(f"Erro ao preparar exportação: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Erro ao preparar exportação: {str(e)}")
+
+    logger.info(f"Exportação ({formato}): {len(indices)} avaliações")
+    blocos = exportacao.iter_export(formato, cols, indices, identity)
+
+    async def _body():
+        for bloco in blocos:
+            yield bloco
+            # Devolve o controle ao event loop entre um bloco e outro
+            await asyncio.sleep(0)
+
+    data = datetime.now().strftime("%Y-%m-%d")
+    if formato == "csv":
+        media_type = "text/csv; charset=utf-8"
+        arquivo = f"ninebox_calibrado_{data}.csv"
+    else:
+        media_type = "application/x-ndjson"
+        arquivo = f"ninebox_calibrado_{data}.ndjson"
+    headers = {"Content-Disposition": f'attachment; filename="{arquivo}"', "Cache-Control": "no-cache"}
+    return _streaming_response(request, _body(), media_type, headers)
+
+# Análise de discrepâncias calculada por versão dos snapshots (nota_por_avaliacao + relacao_ativos),
+# uma por conjunto de áreas escondidas
+_discrepancias: Dict[Tuple[str, ...], discrepancias.DiscrepanciasAnalise] = {}
+
+
+def _nomes_escondidos(area: sessions.AreaFilter, ativos: Snapshot, avaliacoes: Snapshot) -> set:
+    """Nomes normalizados das pessoas das áreas escondidas (relacao_ativos e avaliações)."""
+    nomes = set()
+    for table, snap, nome in (
+        ("relacao_ativos", ativos, lambda r: r.get("nome") or r.get("NOME")),
+        ("nota_final_colaborador", avaliacoes, ninebox_engine.nome_avaliado),
+    ):
+        mask = _areas_snapshot(area, table, snap)[0]
+        if mask is not None:
+            nomes.update(normalize_name(nome(snap.rows[i])) for i, hidden in enumerate(mask) if hidden)
+    nomes.discard("")
+    return nomes
+
+
+async def _get_discrepancias(request: Request) -> discrepancias.DiscrepanciasAnalise:
+    notas = await table_cache.get("nota_por_avaliacao")
+    identity = await _get_identity_index()
+    ativos = await table_cache.get("relacao_ativos")
+    avaliacoes = await table_cache.get("nota_final_colaborador")
+    area = _area_filter(request)
+    codes = area.codes if area is not None else ()
+    version = ((id(notas), notas.version), (id(ativos), ativos.version), (id(avaliacoes), avaliacoes.version))
+    analise = _discrepancias.get(codes)
+    if analise is None or analise.version != version:
+        pares = discrepancias.build_pares(notas.rows, identity)
+        if area is not None:
+            escondidos = _nomes_escondidos(area, ativos, avaliacoes)
+            pares = [p for p in pares if normalize_name(p["nome"]) not in escondidos]
+        analise = discrepancias.DiscrepanciasAnalise(pares, version)
+        _discrepancias[codes] = analise
+        logger.info(f"Discrepâncias recalculadas: {len(analise.pares)} pares auto x gestor")
+    return analise
+
+
+@app.get("/api/analises/discrepancias")
+async def get_discrepancias(
+    request: Request,
+    limiar: float = Query(0.0, ge=0, description="Diferença absoluta mínima entre autoavaliação e gestor"),
+    top: int | None = Query(None, ge=1, description="Máximo de pessoas listadas (maiores diferenças primeiro)"),
+    diretoria: str | None = Query(None),
+    gestor: str | None = Query(None),
+    agrupar: str = Query("diretoria", description="Distribuição por 'diretoria' ou 'gestor'"),
+    formato: str = Query("json", description="json ou csv (layout de analise_discrepancias_resultado.csv)"),
+):
+    """
+    Diferença entre a nota de autoavaliação e a do gestor por pessoa (auto - gestor),
+    ordenada pela diferença absoluta, com a distribuição por diretoria ou gestor.
+    """
+    if agrupar not in discrepancias.AGRUPAMENTOS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Agrupamento inválido: {agrupar}. Disponíveis: {', '.join(discrepancias.AGRUPAMENTOS)}",
+        )
+    if formato not in ("json", "csv"):
+        raise HTTPException(status_code=400, detail=f"Formato inválido: {formato}. Disponíveis: json, csv")
+    try:
+        analise = await _get_discrepancias(request)
+        if formato == "csv":
+            pares = analise.filtrar(limiar, diretoria=diretoria, gestor=gestor)
+            pares = pares if top is None else pares[:top]
+
+            async def _body():
+                for bloco in discrepancias.iter_csv(pares):
+                    yield bloco
+
+            headers = {"Content-Disposition": 'attachment; filename="analise_discrepancias_resultado.csv"'}
+            return _streaming_response(request, _body(), "text/csv; charset=utf-8", headers)
+        return analise.resumo(limiar=limiar, top=top, diretoria=diretoria, gestor=gestor, agrupar=agrupar)
+    except Exception as e:
+        logger.error(f"Erro ao calcular discrepâncias: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Erro ao calcular discrepâncias: {str(e)}")
+
+# Acima deste tamanho o CSV recebido é mantido em arquivo temporário, não em memória
+_IMPORT_SPOOL_BYTES = 8 * 1024 * 1024
+# Usuários que podem gravar a importação (dry_run=false); vazio: só a simulação pela API
+IMPORT_ADMIN_USERS = {u.strip() for u in os.getenv("IMPORT_ADMIN_USERS", "").split(",") if u.strip()}
+
+@app.post("/api/importacoes/relacao-ativos")
+async def importar_relacao_ativos(
+    request: Request,
+    dry_run: bool = Query(True, description="Apenas calcula as diferenças, sem gravar"),
+    encoding: str = Query("utf-8-sig", description="Codificação do CSV (ex.: latin-1)"),
+    chunk_size: int = Query(import_relacao_ativos.DEFAULT_CHUNK_SIZE, ge=1, le=5000),
+):
+    """
+    Atualiza relacao_ativos a partir do CSV exportado pelo RH (corpo da requisição, separado por ';').
+    Envia ao Supabase apenas as linhas novas/alteradas e remove as CHAPAs ausentes do arquivo.
+    Gravar (dry_run=false) é restrito aos usuários de IMPORT_ADMIN_USERS.
+    """
+    try:
+        if not dry_run:
+            session = getattr(request.state, "session", None)
+            if session is None or session.user not in IMPORT_ADMIN_USERS:
+                raise HTTPException(status_code=403, detail="Usuário sem permissão para gravar a importação")
+        validate_supabase()
+        with tempfile.SpooledTemporaryFile(max_size=_IMPORT_SPOOL_BYTES) as raw:
+            async for chunk in request.stream():
+                raw.write(chunk)
+            raw.seek(0)
+            text = io.TextIOWrapper(raw, encoding=encoding, newline="")
+            try:
+                report = await import_relacao_ativos.import_file(
+                    db, text, dry_run=dry_run, chunk_size=chunk_size
+                )
+            finally:
+                text.detach()
+        if not dry_run and (report["inseridos"] or report["alterados"] or report["removidos"]):
+            table_cache.invalidate("relacao_ativos")
+        return {"success": True, "data": report}
+    except (ValueError, UnicodeDecodeError, LookupError) as e:
+        raise HTTPException(status_code=400, detail=f"Arquivo inválido: {str(e)}")
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Erro ao importar relação de ativos: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Erro ao importar relação de ativos: {str(e)}")
+
 class FiltroGPRequest(BaseModel):
     senha: str
 
 @app.post("/api/validar-filtro-gp")
-async def validar_filtro_gp(request: FiltroGPRequest):
+async def validar_filtro_gp(
+    payload: FiltroGPRequest,
+    session: sessions.Session | None = Depends(sessions.require_session),
+):
     """
     Valida a senha do filtro GP na tabela 'filtrogp'
-    Retorna as áreas permitidas se a senha estiver correta
+    Retorna as áreas permitidas se a senha estiver correta, com um novo token de sessão
+    que carrega os códigos dessas áreas (não é preciso validar de novo nas próximas requisições)
     """
     try:
         validate_supabase()
         logger.info("Tentativa de validação do filtro GP...")
         
         # Buscar senha na tabela filtrogp (tolerante a espaços e case-insensitive)
-        resp = (
-            supabase
-            .table("filtrogp")
-            .select("senha")
-            .limit(10)
-            .execute()
-        )
+        rows = await db.select("filtrogp", "senha", limit=10)
 
         def _norm(value: str) -> str:
             return (value or "").strip().lower()
 
-        senha_req = _norm(request.senha)
+        senha_req = _norm(payload.senha)
         senha_match = False
-        if resp.data:
-            for row in resp.data:
+        if rows:
+            for row in rows:
                 if _norm(row.get("senha")) == senha_req:
                     senha_match = True
                     break
@@ -929,14 +1894,11 @@ async def validar_filtro_gp(request: FiltroGPRequest):
         if senha_match:
             logger.info("Filtro GP: Senha validada com sucesso")
             # Áreas permitidas quando a senha está correta
-            areas_permitidas = [
-                "001.03.01.1001.02 - COORDENAÇÃO DE COMUNICAÇÃO E MARKETING",
-                "001.03.01.1001.00 - DIRETORIA DE GESTÃO DE PESSOAS E COMUNICAÇÃO",
-                "001.03.01.1001.01 - COORDENAÇÃO DE GESTÃO DE PESSOAS"
-            ]
+            areas_permitidas = list(sessions.RESTRICTED_AREAS)
             return {
                 "valido": True,
-                "areas": areas_permitidas
+                "areas": areas_permitidas,
+                "token": sessions.issue(session.user if session else "", areas_permitidas),
             }
         else:
             logger.info("Filtro GP: Senha inválida")
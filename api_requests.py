@@ -1,17 +1,17 @@
 """
 API alternativa usando requests direto para contornar problemas de SSL
 """
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
 from dotenv import load_dotenv
 import os
 from typing import List, Dict, Any
 import logging
-import requests
-import urllib3
+import asyncio
 
-# Desabilitar avisos de SSL
-urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
+from data_access import SupabaseREST, SupabaseError, eq, escape_like, ilike
+import json_response
+import metrics
 
 # Configurar logging
 logging.basicConfig(level=logging.INFO)
@@ -21,7 +21,7 @@ logger = logging.getLogger(__name__)
 load_dotenv()
 
 # Inicializar FastAPI
-app = FastAPI(title="NineBox API", version="1.0.0")
+app = FastAPI(title="NineBox API", version="1.0.0", default_response_class=json_response.FastJSONResponse)
 
 # Configurar CORS
 app.add_middleware(
@@ -31,6 +31,7 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+app.add_middleware(metrics.MetricsMiddleware)
 
 # Configuração Supabase
 SUPABASE_URL = os.getenv("SUPABASE_URL")
@@ -39,59 +40,39 @@ SUPABASE_KEY = os.getenv("SUPABASE_KEY")
 if not SUPABASE_URL or not SUPABASE_KEY:
     raise ValueError("SUPABASE_URL e SUPABASE_KEY devem estar definidos no arquivo .env")
 
+# Cliente assíncrono compartilhado (sem verificação SSL, como antes, para o proxy corporativo)
+db = SupabaseREST(SUPABASE_URL, SUPABASE_KEY, verify=False, observer=metrics.record_upstream)
+
+@app.on_event("shutdown")
+async def close_supabase_client():
+    await db.aclose()
+
+# Páginas buscadas ao mesmo tempo por consulta
+QUERY_MAX_WORKERS = int(os.getenv("QUERY_MAX_WORKERS", "4"))
+
 # Função auxiliar para fazer requisições ao Supabase com paginação automática
-def query_supabase(table: str, select="*", limit_per_page=1000):
+async def query_supabase(table: str, select="*", limit_per_page=1000, max_workers=QUERY_MAX_WORKERS, ordered=True):
     """
     Busca todos os registros de uma tabela, fazendo paginação automática se necessário.
-    O Supabase limita a 1000 registros por padrão, então fazemos múltiplas requisições.
+    O Supabase limita a 1000 registros por padrão, então fazemos múltiplas requisições:
+    a primeira pede a contagem exata (Prefer: count=exact), os demais intervalos (Range)
+    são planejados a partir do total e buscados em paralelo, até max_workers por vez,
+    cada um com novas tentativas e backoff em falhas transitórias. Todas as páginas são
+    ordenadas pela chave única da tabela (page_key), para que os intervalos não se
+    sobreponham; ordered=False só para agregados (select=count), que vêm numa página.
     """
-    all_data = []
-    offset = 0
-    
-    while True:
-        url = f"{SUPABASE_URL}/rest/v1/{table}"
-        headers = {
-            "apikey": SUPABASE_KEY,
-            "Authorization": f"Bearer {SUPABASE_KEY}",
-            "Content-Type": "application/json",
-            "Prefer": "return=representation",
-            "Range": f"{offset}-{offset + limit_per_page - 1}"  # Range-based pagination
-        }
-        
-        # Parâmetros da query
-        params = {}
-        if select != "*":
-            params["select"] = select
-        
-        try:
-            logger.info(f"Consultando {table} (offset: {offset}, limit: {limit_per_page})")
-            response = requests.get(url, headers=headers, params=params, verify=False, timeout=30)
-            
-            # Log detalhado do erro
-            if response.status_code not in [200, 206]:  # 206 = Partial Content (paginação)
-                logger.error(f"Status: {response.status_code}")
-                logger.error(f"Response: {response.text}")
-                logger.error(f"Headers usados: {headers}")
-                response.raise_for_status()
-            
-            data = response.json()
-            
-            # Se não retornou dados, terminamos
-            if not data or len(data) == 0:
-                break
-            
-            all_data.extend(data)
-            
-            # Se retornou menos que o limite, é a última página
-            if len(data) < limit_per_page:
-                break
-            
-            # Próxima página
-            offset += limit_per_page
-            
-        except requests.exceptions.RequestException as e:
-            logger.error(f"Erro ao consultar {table}: {str(e)}")
-            raise HTTPException(status_code=500, detail=f"Erro ao consultar {table}: {str(e)}")
+    try:
+        logger.info(f"Consultando {table} (páginas de {limit_per_page}, até {max_workers} em paralelo)")
+        all_data = await db.fetch_all(
+            table,
+            columns=select,
+            page_size=limit_per_page,
+            max_workers=max_workers,
+            key=page_key(table) if ordered else None,
+        )
+    except SupabaseError as e:
+        logger.error(f"Erro ao consultar {table}: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Erro ao consultar {table}: {str(e)}")
     
     logger.info(f"Total de registros encontrados em {table}: {len(all_data)}")
     return all_data
@@ -108,7 +89,7 @@ async def root():
 async def health_check():
     try:
         # Tentar uma consulta simples
-        data = query_supabase("nota_final_colaborador", "count")
+        data = await query_supabase("nota_final_colaborador", "count", ordered=False)
         return {
             "status": "healthy",
             "supabase": "connected",
@@ -119,90 +100,94 @@ async def health_check():
         logger.error(f"Erro na verificação de saúde: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Erro ao conectar com Supabase: {str(e)}")
 
+@app.get("/api/metrics")
+async def get_metrics():
+    return Response(content=metrics.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
 @app.get("/api/avaliacoes")
-async def get_avaliacoes():
+async def get_avaliacoes(request: Request):
     try:
         logger.info("Buscando avaliações no Supabase...")
-        data = query_supabase("nota_final_colaborador")
+        data = await query_supabase("nota_final_colaborador")
         logger.info(f"Avaliações encontradas: {len(data)}")
-        return {"data": data, "count": len(data)}
+        return json_response.json_response({"data": data, "count": len(data)}, request.headers.get("accept-encoding"))
     except Exception as e:
         logger.error(f"Erro ao buscar avaliações: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Erro ao buscar avaliações: {str(e)}")
 
 @app.get("/api/funcionarios")
-async def get_funcionarios():
+async def get_funcionarios(request: Request):
     try:
         logger.info("Buscando funcionários ativos no Supabase...")
-        data = query_supabase("relacao_ativos")
+        data = await query_supabase("relacao_ativos")
         logger.info(f"Funcionários encontrados: {len(data)}")
-        return {"data": data, "count": len(data)}
+        return json_response.json_response({"data": data, "count": len(data)}, request.headers.get("accept-encoding"))
     except Exception as e:
         logger.error(f"Erro ao buscar funcionários: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Erro ao buscar funcionários: {str(e)}")
 
 @app.get("/api/notas-avaliacao")
-async def get_notas_avaliacao():
+async def get_notas_avaliacao(request: Request):
     try:
         logger.info("Buscando notas por avaliação no Supabase...")
-        data = query_supabase("nota_por_avaliacao")
+        data = await query_supabase("nota_por_avaliacao")
         logger.info(f"Notas por avaliação encontradas: {len(data)}")
-        return {"data": data, "count": len(data)}
+        return json_response.json_response({"data": data, "count": len(data)}, request.headers.get("accept-encoding"))
     except Exception as e:
         logger.error(f"Erro ao buscar notas por avaliação: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Erro ao buscar notas por avaliação: {str(e)}")
 
 @app.get("/api/movimentacoes")
-async def get_movimentacoes():
+async def get_movimentacoes(request: Request):
     try:
         logger.info("Buscando histórico de movimentações no Supabase...")
-        data = query_supabase("movimentacao_salario")
+        data = await query_supabase("movimentacao_salario")
         logger.info(f"Movimentações encontradas: {len(data)}")
-        return {"data": data, "count": len(data)}
+        return json_response.json_response({"data": data, "count": len(data)}, request.headers.get("accept-encoding"))
     except Exception as e:
         logger.error(f"Erro ao buscar movimentações: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Erro ao buscar movimentações: {str(e)}")
 
 @app.get("/api/areas-responsaveis")
-async def get_areas_responsaveis():
+async def get_areas_responsaveis(request: Request):
     try:
         logger.info("Buscando áreas responsáveis no Supabase...")
-        data = query_supabase("colaborador_area_responsavel")
+        data = await query_supabase("colaborador_area_responsavel")
         logger.info(f"Áreas responsáveis encontradas: {len(data)}")
-        return {"data": data, "count": len(data)}
+        return json_response.json_response({"data": data, "count": len(data)}, request.headers.get("accept-encoding"))
     except Exception as e:
         logger.error(f"Erro ao buscar áreas responsáveis: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Erro ao buscar áreas responsáveis: {str(e)}")
 
 @app.get("/api/idiomas")
-async def get_idiomas():
+async def get_idiomas(request: Request):
     try:
         logger.info("Buscando idiomas no Supabase...")
-        data = query_supabase("idiomas")
+        data = await query_supabase("idiomas")
         logger.info(f"Registros de idiomas encontrados: {len(data)}")
-        return {"data": data, "count": len(data)}
+        return json_response.json_response({"data": data, "count": len(data)}, request.headers.get("accept-encoding"))
     except Exception as e:
         logger.error(f"Erro ao buscar idiomas: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Erro ao buscar idiomas: {str(e)}")
 
 @app.get("/api/interesse-mudanca")
-async def get_interesse_mudanca():
+async def get_interesse_mudanca(request: Request):
     try:
         logger.info("Buscando interesse de mudança no Supabase...")
-        data = query_supabase("interesse_mudanca_area")
+        data = await query_supabase("interesse_mudanca_area")
         logger.info(f"Registros de interesse encontrados: {len(data)}")
-        return {"data": data, "count": len(data)}
+        return json_response.json_response({"data": data, "count": len(data)}, request.headers.get("accept-encoding"))
     except Exception as e:
         logger.error(f"Erro ao buscar interesse de mudança: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Erro ao buscar interesse de mudança: {str(e)}")
 
 @app.get("/api/nota-avd-2024")
-async def get_nota_avd_2024():
+async def get_nota_avd_2024(request: Request):
     try:
         logger.info("Buscando notas AVD 2024 no Supabase...")
-        data = query_supabase("nota_avd_2024")
+        data = await query_supabase("nota_avd_2024")
         logger.info(f"Notas AVD 2024 encontradas: {len(data)}")
-        return {"data": data, "count": len(data)}
+        return json_response.json_response({"data": data, "count": len(data)}, request.headers.get("accept-encoding"))
     except Exception as e:
         logger.error(f"Erro ao buscar notas AVD 2024: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Erro ao buscar notas AVD 2024: {str(e)}")
@@ -212,8 +197,10 @@ async def get_filtros():
     try:
         logger.info("Buscando valores para filtros...")
         
-        avaliacoes = query_supabase("nota_final_colaborador", "área,formulário")
-        funcionarios = query_supabase("relacao_ativos", "diretoria,gerencia,cargo")
+        avaliacoes, funcionarios = await asyncio.gather(
+            query_supabase("nota_final_colaborador", "área,formulário"),
+            query_supabase("relacao_ativos", "diretoria,gerencia,cargo"),
+        )
         
         areas = list(set([a.get("área") for a in avaliacoes if a.get("área")]))
         formularios = list(set([a.get("formulário") for a in avaliacoes if a.get("formulário")]))
@@ -245,9 +232,12 @@ async def get_desenvolvimento(colaborador: str):
     """Buscar dados de desenvolvimento de um colaborador específico"""
     try:
         logger.info(f"Buscando desenvolvimento para: {colaborador}")
-        # Buscar por nome do colaborador
-        data = query_supabase("desenvolvimento_colaborador")
-        result = [d for d in data if d.get("colaborador", "").upper() == colaborador.upper()]
+        # Buscar por nome do colaborador (comparação sem diferenciar maiúsculas, feita no Supabase)
+        result = await db.select(
+            "desenvolvimento_colaborador",
+            filters={"colaborador": ilike(escape_like(colaborador))},
+            limit=1,
+        )
         
         if result:
             logger.info(f"Desenvolvimento encontrado para {colaborador}")
@@ -265,23 +255,13 @@ async def save_desenvolvimento(data: dict):
     try:
         logger.info(f"Salvando desenvolvimento para: {data.get('colaborador')}")
         
-        # Montar URL para insert/upsert
-        url = f"{SUPABASE_URL}/rest/v1/desenvolvimento_colaborador"
-        headers = {
-            "apikey": SUPABASE_KEY,
-            "Authorization": f"Bearer {SUPABASE_KEY}",
-            "Content-Type": "application/json",
-            "Prefer": "resolution=merge-duplicates,return=representation"
-        }
-        
         # Fazer upsert (insert ou update)
-        response = requests.post(url, json=data, headers=headers, verify=False, timeout=30)
-        
-        if response.status_code not in [200, 201]:
-            logger.error(f"Erro ao salvar: {response.status_code} - {response.text}")
-            raise HTTPException(status_code=response.status_code, detail=response.text)
-        
-        result = response.json()
+        try:
+            result = await db.insert("desenvolvimento_colaborador", data, upsert=True)
+        except SupabaseError as e:
+            logger.error(f"Erro ao salvar: {str(e)}")
+            raise HTTPException(status_code=e.status_code, detail=str(e))
+
         logger.info(f"Desenvolvimento salvo com sucesso para {data.get('colaborador')}")
         return {"success": True, "data": result}
         
@@ -299,9 +279,14 @@ async def update_desenvolvimento(colaborador: str, data: dict):
         data["colaborador"] = colaborador
         data["atualizado_em"] = "NOW()"
         
-        # Buscar ID do registro existente
-        existing = query_supabase("desenvolvimento_colaborador")
-        existing_record = next((d for d in existing if d.get("colaborador", "").upper() == colaborador.upper()), None)
+        # Buscar ID do registro existente (comparação sem diferenciar maiúsculas, feita no Supabase)
+        existing = await db.select(
+            "desenvolvimento_colaborador",
+            columns="id",
+            filters={"colaborador": ilike(escape_like(colaborador))},
+            limit=1,
+        )
+        existing_record = existing[0] if existing else None
         
         if not existing_record:
             # Se não existe, criar novo
@@ -309,19 +294,11 @@ async def update_desenvolvimento(colaborador: str, data: dict):
         
         # Se existe, fazer update
         record_id = existing_record.get("id")
-        url = f"{SUPABASE_URL}/rest/v1/desenvolvimento_colaborador?id=eq.{record_id}"
-        headers = {
-            "apikey": SUPABASE_KEY,
-            "Authorization": f"Bearer {SUPABASE_KEY}",
-            "Content-Type": "application/json",
-            "Prefer": "return=representation"
-        }
-        
-        response = requests.patch(url, json=data, headers=headers, verify=False, timeout=30)
-        
-        if response.status_code not in [200, 204]:
-            logger.error(f"Erro ao atualizar: {response.status_code} - {response.text}")
-            raise HTTPException(status_code=response.status_code, detail=response.text)
+        try:
+            await db.update("desenvolvimento_colaborador", data, filters={"id": eq(record_id)})
+        except SupabaseError as e:
+            logger.error(f"Erro ao atualizar: {str(e)}")
+            raise HTTPException(status_code=e.status_code, detail=str(e))
         
         logger.info(f"Desenvolvimento atualizado com sucesso para {colaborador}")
         return {"success": True, "message": "Atualizado com sucesso"}
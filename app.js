@@ -58,7 +58,7 @@ let mesaCalibracaoData = []; // Dados da mesa de calibração
 let pessoasAvaliadasData = []; // Dados de pessoas avaliadas (nome e gestor)
 let idiomasData = []; // Dados de idiomas por colaborador
 let experienciasData = []; // Experiências profissionais por colaborador
-let competenciasData = []; // Notas por competência (auto x gestor)
+let competenciasPorPessoa = {}; // Notas por competência (auto x gestor) por pessoa (cache)
 const STORAGE_KEY = 'ninebox_manual_overrides';
 let compactView = false; // Estado de visão compacta
 let spinnerKeyframesInjected = false; // Fallback para animação do spinner
@@ -73,6 +73,39 @@ const API_BASE_URL = (function() {
     return 'http://localhost:8000/api';
 })();
 
+// Token de sessão emitido pelo /api/login (index.html), enviado em todas as chamadas à API
+const AUTH_TOKEN_KEY = 'auth_token';
+
+function getAuthToken() {
+    try { return localStorage.getItem(AUTH_TOKEN_KEY); } catch { return null; }
+}
+
+// Dados do token (u: usuário, a: códigos de área liberados); a assinatura é conferida pela API
+function getAuthSession() {
+    const token = getAuthToken();
+    if (!token) return null;
+    try {
+        const payload = atob(token.split('.')[0].replace(/-/g, '+').replace(/_/g, '/'));
+        return JSON.parse(new TextDecoder().decode(Uint8Array.from(payload, c => c.charCodeAt(0))));
+    } catch { return null; }
+}
+
+// fetch para a API com o token de sessão; 401 (sessão ausente ou expirada) volta para o login
+async function apiFetch(url, options = {}) {
+    const headers = new Headers(options.headers || {});
+    const token = getAuthToken();
+    if (token) headers.set('Authorization', `Bearer ${token}`);
+    const resp = await fetch(url, { ...options, headers });
+    if (resp.status === 401) {
+        try {
+            localStorage.removeItem('auth_user');
+            localStorage.removeItem(AUTH_TOKEN_KEY);
+        } catch {}
+        window.location.href = 'index.html';
+    }
+    return resp;
+}
+
 // Configuração da API
 let config = {
     fatorDesempenho: 0,
@@ -266,166 +299,15 @@ async function loadDataFromSupabase() {
         console.log('🔄 Conectando ao Supabase...');
         
         // Verificar se a API está online
-        const healthResponse = await fetch(`${API_BASE_URL}/health`);
+        const healthResponse = await apiFetch(`${API_BASE_URL}/health`);
         if (!healthResponse.ok) {
             throw new Error('API não está respondendo. Certifique-se de que o servidor Python está rodando.');
         }
         
-        // Carregar avaliações
-        console.log('📊 Carregando avaliações...');
-    updateLoader('Carregando avaliações...');
-    const avaliacoesResponse = await fetch(`${API_BASE_URL}/avaliacoes`);
-        const avaliacoesData = await avaliacoesResponse.json();
-        
-        if (avaliacoesData.data && avaliacoesData.data.length > 0) {
-            parseSupabaseData(avaliacoesData.data);
-            console.log(`✓ ${allData.length} avaliações carregadas`);
-        }
-        
-        // Carregar funcionários (com paginação no frontend, caso o backend limite a 1000)
-    console.log('👥 Carregando funcionários...');
-    updateLoader('Carregando funcionários...');
-        employeeData = await fetchAllPaged(`${API_BASE_URL}/funcionarios`, 1000, {
-            uniqueKeyCandidates: ['cpf', 'CPF', 'registro', 'Registro', 'chapa', 'chapa']
-        });
-        if (employeeData.length > 0) {
-            populateEmployeeFilters();
-            console.log(`✓ ${employeeData.length} funcionários carregados (paginado)`);
-            console.log('📋 Exemplo de funcionário:', employeeData[0]);
-            console.log('🔑 Chaves disponíveis:', Object.keys(employeeData[0]));
-        } else {
-            console.warn('⚠️ Nenhum funcionário recebido.');
-        }
-        
-        // Carregar notas por avaliação
-    console.log('📝 Carregando notas por avaliação...');
-    updateLoader('Carregando notas por avaliação...');
-        const notasResponse = await fetch(`${API_BASE_URL}/notas-avaliacao`);
-        const notasData = await notasResponse.json();
-        
-        if (notasData.data && notasData.data.length > 0) {
-            notasAvaliacaoData = notasData.data;
-            console.log(`✓ ${notasAvaliacaoData.length} notas por avaliação carregadas`);
-        }
-        
-        // Carregar movimentações (também pode ser cortado em 1000)
-    console.log('📅 Carregando histórico de movimentações...');
-    updateLoader('Carregando movimentações...');
-        movementHistory = await fetchAllPaged(`${API_BASE_URL}/movimentacoes`, 1000, {
-            uniqueKeyCandidates: ['NOME','nome','CPF','cpf','DTMUDANCA_FUNCAO','DTMUDANCA_SALARIO','DTMUDANCA_SECAO']
-        });
-        console.log(`✓ ${movementHistory.length} movimentações carregadas (paginado)`);
-        
-        // Carregar notas AVD 2024
-    console.log('📊 Carregando notas de 2024...');
-    updateLoader('Carregando notas de 2024...');
-        const notas2024Response = await fetch(`${API_BASE_URL}/nota-avd-2024`);
-        const notas2024Data = await notas2024Response.json();
-        
-        if (notas2024Data.data && notas2024Data.data.length > 0) {
-            notasAVD2024 = notas2024Data.data;
-            console.log(`✓ ${notasAVD2024.length} notas de 2024 carregadas`);
-        }
-
-        // Carregar mesa de calibração
-    console.log('🪑 Carregando mesa de calibração...');
-    updateLoader('Carregando mesa de calibração...');
-        try {
-            const mesaResponse = await fetch(`${API_BASE_URL}/mesa-calibracao`);
-            if (mesaResponse.ok) {
-                const mesaData = await mesaResponse.json();
-                if (mesaData.data && mesaData.data.length > 0) {
-                    mesaCalibracaoData = mesaData.data;
-                    console.log(`✓ ${mesaCalibracaoData.length} registros de mesa de calibração carregados`);
-                    populateMesaFilter();
-                } else {
-                    console.warn('Mesa de calibração retornou vazio.');
-                }
-            } else {
-                console.warn('Endpoint mesa-calibracao não disponível.');
-            }
-        } catch (e) {
-            console.warn('Falha ao carregar mesa de calibração:', e.message);
-        }
-
-        // Carregar pessoas avaliadas
-    console.log('👤 Carregando pessoas avaliadas...');
-    updateLoader('Carregando pessoas avaliadas...');
-        try {
-            console.log('📡 Iniciando requisição para:', `${API_BASE_URL}/pessoas-avaliadas`);
-            pessoasAvaliadasData = await fetchAllPaged(`${API_BASE_URL}/pessoas-avaliadas`, 1000, {
-                uniqueKeyCandidates: ['NOME', 'nome']
-            });
-            console.log(`✓ ${pessoasAvaliadasData.length} pessoas avaliadas carregadas`);
-            if (pessoasAvaliadasData.length > 0) {
-                console.log('📋 Exemplo de pessoa avaliada:', pessoasAvaliadasData[0]);
-                console.log('🔑 Chaves disponíveis:', Object.keys(pessoasAvaliadasData[0]));
-            } else {
-                console.warn('⚠️ Array de pessoas avaliadas está vazio!');
-            }
-            // IMPORTANTE: Repopular filtros dependentes (Gestor) após carregar pessoasAvaliadasData
-            try {
-                populateEmployeeFilters();
-            } catch (e) {
-                console.warn('Falha ao repopular filtros de funcionário após pessoas avaliadas:', e?.message || e);
-            }
-        } catch (e) {
-            console.error('❌ Falha ao carregar pessoas avaliadas:', e);
-            console.error('Stack:', e.stack);
-        }
-
-        // Carregar idiomas
-        console.log('🗣️ Carregando idiomas...');
-        updateLoader('Carregando idiomas...');
-        try {
-            const idiomasResp = await fetch(`${API_BASE_URL}/idiomas`);
-            if (idiomasResp.ok) {
-                const idiomasJson = await idiomasResp.json();
-                idiomasData = Array.isArray(idiomasJson.data) ? idiomasJson.data : [];
-                console.log(`✓ ${idiomasData.length} registros de idiomas carregados`);
-            } else {
-                console.warn('Endpoint idiomas retornou status', idiomasResp.status);
-            }
-        } catch (e) {
-            console.warn('Falha ao carregar idiomas:', e?.message || e);
-        }
-
-        // Carregar experiências profissionais
-        console.log('🧳 Carregando experiências profissionais...');
-        updateLoader('Carregando experiências profissionais...');
-        try {
-            const expResp = await fetch(`${API_BASE_URL}/experiencias-profissionais`);
-            if (expResp.ok) {
-                const expJson = await expResp.json();
-                experienciasData = Array.isArray(expJson.data) ? expJson.data : [];
-                console.log(`✓ ${experienciasData.length} experiências profissionais carregadas`);
-            } else {
-                console.warn('Endpoint experiencias-profissionais retornou status', expResp.status);
-            }
-        } catch (e) {
-            console.warn('Falha ao carregar experiencias-profissionais:', e?.message || e);
-        }
-
-        // Carregar notas por competência (paginado - dataset grande)
-        console.log('🧩 Carregando notas por competência (paginado)...');
-        updateLoader('Carregando notas por competência...');
-        try {
-            const norm = (s) => (s == null ? '' : String(s)).trim().toUpperCase();
-            competenciasData = await fetchAllPaged(`${API_BASE_URL}/notas-por-competencia`, 1000, {
-                // Use uma chave composta para manter todas as competências distintas e evitar colapsar por NOME
-                customKey: (obj) => {
-                    const nome = norm(obj.NOME || obj.Nome || obj.nome || obj.Avaliado || obj['Usuário Avaliado'] || '');
-                    const tipo = norm(obj['Tipo de Avaliador'] || obj.tipo_de_avaliador || '');
-                    const comp = norm(obj.Competência || obj.competência || obj.competencia || obj.Competencia || '');
-                    const fator = norm(obj['Fator de Avaliação'] || obj.fator_de_avaliacao || '');
-                    const aval = norm(obj.Avaliador || obj.avaliador || '');
-                    const nota = String(obj.Nota ?? obj.nota ?? '');
-                    return [nome, tipo, comp, fator, aval, nota].join('|');
-                }
-            });
-            console.log(`✓ ${competenciasData.length} registros de notas por competência carregados (paginado)`);
-        } catch (e) {
-            console.warn('Falha ao carregar notas-por-competencia:', e?.message || e);
+        // Carregar todos os dados em uma única requisição (/bootstrap); se indisponível, usar o fluxo sequencial
+        const bootstrapped = await loadDataFromBootstrap();
+        if (!bootstrapped) {
+            await loadDataSequential();
         }
         
         // Preencher filtros
@@ -459,9 +341,273 @@ async function loadDataFromSupabase() {
     }
 }
 
+// Tabelas carregadas na inicialização (notas por competência são buscadas por pessoa)
+const BOOTSTRAP_TABELAS = [
+    'avaliacoes', 'funcionarios', 'notas_avaliacao', 'movimentacoes', 'nota_avd_2024',
+    'mesa_calibracao', 'pessoas_avaliadas', 'idiomas', 'experiencias_profissionais'
+];
+
+// Carregar todas as tabelas em uma única resposta do backend (/bootstrap).
+// Retorna false se o endpoint não estiver disponível, para que o chamador use o fluxo sequencial.
+async function loadDataFromBootstrap() {
+    try {
+        console.log('📦 Carregando dados via /bootstrap...');
+        updateLoader('Carregando dados...');
+        const resp = await apiFetch(`${API_BASE_URL}/bootstrap?tabelas=${BOOTSTRAP_TABELAS.join(',')}`);
+        if (!resp.ok) {
+            console.warn('Endpoint bootstrap retornou status', resp.status);
+            return false;
+        }
+        const json = await resp.json();
+        const arr = (v) => (Array.isArray(v) ? v : []);
+        if (json.erros && Object.keys(json.erros).length > 0) {
+            console.warn('⚠️ Tabelas com erro no bootstrap:', json.erros);
+        }
+
+        updateLoader('Processando dados...');
+        if (arr(json.avaliacoes).length > 0) {
+            parseSupabaseData(json.avaliacoes);
+            console.log(`✓ ${allData.length} avaliações carregadas`);
+        }
+        employeeData = arr(json.funcionarios);
+        notasAvaliacaoData = arr(json.notas_avaliacao);
+        movementHistory = arr(json.movimentacoes);
+        notasAVD2024 = arr(json.nota_avd_2024);
+        mesaCalibracaoData = arr(json.mesa_calibracao);
+        pessoasAvaliadasData = arr(json.pessoas_avaliadas);
+        idiomasData = arr(json.idiomas);
+        experienciasData = arr(json.experiencias_profissionais);
+
+        if (mesaCalibracaoData.length > 0) {
+            populateMesaFilter();
+        }
+        if (employeeData.length > 0 || pessoasAvaliadasData.length > 0) {
+            populateEmployeeFilters();
+        }
+        console.log(`✓ Bootstrap: ${employeeData.length} funcionários | ${notasAvaliacaoData.length} notas | ${movementHistory.length} movimentações | ${pessoasAvaliadasData.length} pessoas avaliadas`);
+        return true;
+    } catch (e) {
+        console.warn('Falha ao carregar via bootstrap, usando carregamento sequencial:', e?.message || e);
+        return false;
+    }
+}
+
+// Carregamento sequencial (um endpoint por tabela) - usado quando /bootstrap não está disponível
+async function loadDataSequential() {
+    // Carregar avaliações
+    console.log('📊 Carregando avaliações...');
+    updateLoader('Carregando avaliações...');
+    const avaliacoesResponse = await apiFetch(`${API_BASE_URL}/avaliacoes?formato=colunas`);
+    const avaliacoesData = rowsFromResponse(await avaliacoesResponse.json()) || [];
+    
+    if (avaliacoesData.length > 0) {
+        parseSupabaseData(avaliacoesData);
+        console.log(`✓ ${allData.length} avaliações carregadas`);
+    }
+    
+    // Carregar funcionários (com paginação no frontend, caso o backend limite a 1000)
+    console.log('👥 Carregando funcionários...');
+    updateLoader('Carregando funcionários...');
+    employeeData = await fetchAllPaged(`${API_BASE_URL}/funcionarios`, 1000, {
+        uniqueKeyCandidates: ['cpf', 'CPF', 'registro', 'Registro', 'chapa', 'chapa']
+    });
+    if (employeeData.length > 0) {
+        populateEmployeeFilters();
+        console.log(`✓ ${employeeData.length} funcionários carregados (paginado)`);
+        console.log('📋 Exemplo de funcionário:', employeeData[0]);
+        console.log('🔑 Chaves disponíveis:', Object.keys(employeeData[0]));
+    } else {
+        console.warn('⚠️ Nenhum funcionário recebido.');
+    }
+    
+    // Carregar notas por avaliação
+    console.log('📝 Carregando notas por avaliação...');
+    updateLoader('Carregando notas por avaliação...');
+    const notasResponse = await apiFetch(`${API_BASE_URL}/notas-avaliacao?formato=colunas`);
+    const notasData = rowsFromResponse(await notasResponse.json()) || [];
+    
+    if (notasData.length > 0) {
+        notasAvaliacaoData = notasData;
+        console.log(`✓ ${notasAvaliacaoData.length} notas por avaliação carregadas`);
+    }
+    
+    // Carregar movimentações (também pode ser cortado em 1000)
+    console.log('📅 Carregando histórico de movimentações...');
+    updateLoader('Carregando movimentações...');
+    movementHistory = await fetchAllPaged(`${API_BASE_URL}/movimentacoes`, 1000, {
+        cursor: true,
+        uniqueKeyCandidates: ['NOME','nome','CPF','cpf','DTMUDANCA_FUNCAO','DTMUDANCA_SALARIO','DTMUDANCA_SECAO']
+    });
+    console.log(`✓ ${movementHistory.length} movimentações carregadas (paginado)`);
+    
+    // Carregar notas AVD 2024
+    console.log('📊 Carregando notas de 2024...');
+    updateLoader('Carregando notas de 2024...');
+    const notas2024Response = await apiFetch(`${API_BASE_URL}/nota-avd-2024?formato=colunas`);
+    const notas2024Data = rowsFromResponse(await notas2024Response.json()) || [];
+    
+    if (notas2024Data.length > 0) {
+        notasAVD2024 = notas2024Data;
+        console.log(`✓ ${notasAVD2024.length} notas de 2024 carregadas`);
+    }
+
+    // Carregar mesa de calibração
+    console.log('🪑 Carregando mesa de calibração...');
+    updateLoader('Carregando mesa de calibração...');
+    try {
+        const mesaResponse = await apiFetch(`${API_BASE_URL}/mesa-calibracao?formato=colunas`);
+        if (mesaResponse.ok) {
+            const mesaData = rowsFromResponse(await mesaResponse.json()) || [];
+            if (mesaData.length > 0) {
+                mesaCalibracaoData = mesaData;
+                console.log(`✓ ${mesaCalibracaoData.length} registros de mesa de calibração carregados`);
+                populateMesaFilter();
+            } else {
+                console.warn('Mesa de calibração retornou vazio.');
+            }
+        } else {
+            console.warn('Endpoint mesa-calibracao não disponível.');
+        }
+    } catch (e) {
+        console.warn('Falha ao carregar mesa de calibração:', e.message);
+    }
+
+    // Carregar pessoas avaliadas
+    console.log('👤 Carregando pessoas avaliadas...');
+    updateLoader('Carregando pessoas avaliadas...');
+    try {
+        console.log('📡 Iniciando requisição para:', `${API_BASE_URL}/pessoas-avaliadas`);
+        pessoasAvaliadasData = await fetchAllPaged(`${API_BASE_URL}/pessoas-avaliadas`, 1000, {
+            cursor: true,
+            uniqueKeyCandidates: ['NOME', 'nome']
+        });
+        console.log(`✓ ${pessoasAvaliadasData.length} pessoas avaliadas carregadas`);
+        if (pessoasAvaliadasData.length > 0) {
+            console.log('📋 Exemplo de pessoa avaliada:', pessoasAvaliadasData[0]);
+            console.log('🔑 Chaves disponíveis:', Object.keys(pessoasAvaliadasData[0]));
+        } else {
+            console.warn('⚠️ Array de pessoas avaliadas está vazio!');
+        }
+        // IMPORTANTE: Repopular filtros dependentes (Gestor) após carregar pessoasAvaliadasData
+        try {
+            populateEmployeeFilters();
+        } catch (e) {
+            console.warn('Falha ao repopular filtros de funcionário após pessoas avaliadas:', e?.message || e);
+        }
+    } catch (e) {
+        console.error('❌ Falha ao carregar pessoas avaliadas:', e);
+        console.error('Stack:', e.stack);
+    }
+
+    // Carregar idiomas
+    console.log('🗣️ Carregando idiomas...');
+    updateLoader('Carregando idiomas...');
+    try {
+        const idiomasResp = await apiFetch(`${API_BASE_URL}/idiomas?formato=colunas`);
+        if (idiomasResp.ok) {
+            idiomasData = rowsFromResponse(await idiomasResp.json()) || [];
+            console.log(`✓ ${idiomasData.length} registros de idiomas carregados`);
+        } else {
+            console.warn('Endpoint idiomas retornou status', idiomasResp.status);
+        }
+    } catch (e) {
+        console.warn('Falha ao carregar idiomas:', e?.message || e);
+    }
+
+    // Carregar experiências profissionais
+    console.log('🧳 Carregando experiências profissionais...');
+    updateLoader('Carregando experiências profissionais...');
+    try {
+        const expResp = await apiFetch(`${API_BASE_URL}/experiencias-profissionais?formato=colunas`);
+        if (expResp.ok) {
+            experienciasData = rowsFromResponse(await expResp.json()) || [];
+            console.log(`✓ ${experienciasData.length} experiências profissionais carregadas`);
+        } else {
+            console.warn('Endpoint experiencias-profissionais retornou status', expResp.status);
+        }
+    } catch (e) {
+        console.warn('Falha ao carregar experiencias-profissionais:', e?.message || e);
+    }
+}
+
+// Listagens pedidas com formato=colunas chegam como {columns, values, dictionaries}: nomes das
+// colunas uma única vez, uma lista por coluna e textos repetidos como índices num dicionário.
+// Remonta a lista de objetos; respostas no formato antigo ({data: [...]}) passam direto.
+// Retorna null se a resposta não tiver nenhum dos dois formatos.
+function rowsFromResponse(json) {
+    if (!json || !Array.isArray(json.columns)) {
+        return Array.isArray(json?.data) ? json.data : null;
+    }
+    const { columns, values = [], dictionaries = {} } = json;
+    const decoded = columns.map((name, i) => {
+        const col = values[i] || [];
+        const dict = dictionaries[name];
+        return dict ? col.map(code => (code === null ? null : dict[code])) : col;
+    });
+    const total = decoded.length > 0 ? decoded[0].length : 0;
+    const rows = new Array(total);
+    for (let r = 0; r < total; r++) {
+        const row = {};
+        for (let c = 0; c < columns.length; c++) {
+            row[columns[c]] = decoded[c][r];
+        }
+        rows[r] = row;
+    }
+    return rows;
+}
+
 // Helper: busca paginada no endpoint adicionando limit/offset; de-duplica por chaves candidatas
+// Paginação por cursor (id > cursor): sem duplicar/pular linhas e sem deduplicação no cliente.
+// Retorna null se o backend não suportar o modo cursor, para cair na paginação por offset.
+async function fetchAllByCursor(baseUrl, pageSize = 1000) {
+    let cursor = '';
+    let page = 0;
+    const all = [];
+
+    while (true) {
+        const joiner = baseUrl.includes('?') ? '&' : '?';
+        const url = `${baseUrl}${joiner}limit=${pageSize}&cursor=${encodeURIComponent(cursor)}&formato=colunas`;
+        const resp = await apiFetch(url);
+        if (!resp.ok) {
+            if (page === 0) return null;
+            throw new Error(`Falha ao buscar página ${page + 1} (cursor=${cursor}): ${resp.status}`);
+        }
+        const json = await resp.json();
+        if (page === 0 && (!json || !('next_cursor' in json))) {
+            return null;
+        }
+
+        const dataPage = rowsFromResponse(json) || [];
+        for (const row of dataPage) {
+            all.push(row);
+        }
+        console.log(`⬇️ Página ${page + 1} (cursor): recebidos ${dataPage.length}, acumulado ${all.length}`);
+
+        if (json.next_cursor === null || json.next_cursor === undefined || dataPage.length === 0) {
+            break;
+        }
+        cursor = String(json.next_cursor);
+        page += 1;
+    }
+
+    return all;
+}
+
 async function fetchAllPaged(baseUrl, pageSize = 1000, options = {}) {
-    const { uniqueKeyCandidates = [], disableDedupe = false, customKey = null } = options;
+    const { uniqueKeyCandidates = [], disableDedupe = false, customKey = null, cursor = false } = options;
+
+    if (cursor) {
+        try {
+            const viaCursor = await fetchAllByCursor(baseUrl, pageSize);
+            if (viaCursor) {
+                return viaCursor;
+            }
+            console.warn(`⚠️ ${baseUrl} não suporta cursor; usando limit/offset.`);
+        } catch (e) {
+            console.warn('⚠️ Falha na paginação por cursor; usando limit/offset.', e);
+        }
+    }
+
     let offset = 0;
     let page = 0;
     let all = [];
@@ -490,13 +636,13 @@ async function fetchAllPaged(baseUrl, pageSize = 1000, options = {}) {
 
     while (true) {
         const joiner = baseUrl.includes('?') ? '&' : '?';
-        const url = `${baseUrl}${joiner}limit=${pageSize}&offset=${offset}`;
+        const url = `${baseUrl}${joiner}limit=${pageSize}&offset=${offset}&formato=colunas`;
         if (page === 0) {
             console.log(`↗️ Solicitando página ${page + 1} (${offset}-${offset + pageSize - 1}) de ${baseUrl}`);
         } else {
             console.log(`↗️ Página ${page + 1} (${offset}-${offset + pageSize - 1})`);
         }
-        const resp = await fetch(url);
+        const resp = await apiFetch(url);
         if (!resp.ok) {
             console.warn(`⚠️ Falha ao buscar página ${page + 1}: ${resp.status}`);
             break;
@@ -509,7 +655,7 @@ async function fetchAllPaged(baseUrl, pageSize = 1000, options = {}) {
             break;
         }
 
-        const dataPage = json?.data || [];
+        const dataPage = rowsFromResponse(json);
         if (!Array.isArray(dataPage)) {
             console.warn('⚠️ Formato inesperado (sem data array). Encerrando paginação.');
             break;
@@ -1000,100 +1146,40 @@ function escapeAttr(str) {
     } catch { return ''; }
 }
 
-// Agregar notas por competência para uma pessoa (Auto vs Gestor)
-function getCompetenciasForPerson(person) {
+// Notas por competência de uma pessoa (Auto vs Gestor), agregadas no backend
+// (/pessoas/{id}/competencias); a tabela notas_por_competencia não é baixada pelo navegador.
+async function getCompetenciasForPerson(person) {
     try {
-        if (!competenciasData || competenciasData.length === 0 || !person) return null;
+        if (!person) return null;
         const login = (person['Login do Avaliado'] || '').toString().trim();
         const nome = (person['Usuário Avaliado'] || person['Avaliado'] || '').toString().trim();
-        const nomeNorm = normalizeText(nome);
-
-        // Potencial: 3 competências avaliadas apenas pelo gestor
-        const potencialSet = new Set([
-            normalizeText('Ambição e Motivação para Crescer'),
-            normalizeText('Aprendizado'),
-            normalizeText('Prontidão')
-        ]);
-
-        // Filtrar registros da pessoa
-        let items = [];
-        // Tentar por login se disponível
-        if (login) {
-            const loginUpper = login.toUpperCase();
-            items = competenciasData.filter(r => {
-                const u = (r.USER_LOGIN || r.user_login || r.Login || r.login || '').toString().trim().toUpperCase();
-                return u && u === loginUpper;
-            });
-        }
-        // Fallback por nome
-        if ((!items || items.length === 0) && nomeNorm) {
-            items = competenciasData.filter(r => normalizeText(r.NOME || r.Nome || r.nome || r.Avaliado || r['Usuário Avaliado'] || '') === nomeNorm);
+        const cacheKey = person._id != null ? `id:${person._id}` : `${login}|${nome}`;
+        if (cacheKey in competenciasPorPessoa) {
+            return competenciasPorPessoa[cacheKey];
         }
-        if (!items || items.length === 0) return null;
-
-        // Agregadores por competência
-    const perfMap = new Map();
-    const potMap = new Map();
-
-        const get = (obj, keys) => {
-            for (const k of keys) {
-                if (obj[k] !== undefined && obj[k] !== null) return obj[k];
-            }
-            return undefined;
-        };
-
-        items.forEach(r => {
-            const compRaw = get(r, ['Competência','competência','competencia','Competencia']);
-            const tipo = (get(r, ['Tipo de Avaliador','tipo_de_avaliador','tipoAvaliador']) || '').toString().trim();
-            const nota = parseFloat(get(r, ['Nota','nota']));
-            if (!compRaw || !isFinite(nota)) return;
-
-            const compNorm = normalizeText(compRaw);
-            const isPot = potencialSet.has(compNorm);
-            const display = compRaw.toString();
-            const target = isPot ? potMap : perfMap;
-
-            if (!target.has(compNorm)) {
-                target.set(compNorm, { display, autoSum: 0, autoCount: 0, gestorSum: 0, gestorCount: 0, autoComments: [], gestorComments: [] });
-            }
-            const agg = target.get(compNorm);
-            if (tipo.toUpperCase() === 'AUTO AVALIAÇÃO' || tipo.toUpperCase() === 'AUTOAVALIAÇÃO' || tipo.toUpperCase() === 'AUTO') {
-                agg.autoSum += nota; agg.autoCount += 1;
-                const cmt = (get(r, ['Comentário','Comentario','comentario','comentário']) || '').toString().trim();
-                if (cmt) agg.autoComments.push(cmt);
-            } else if (tipo.toUpperCase() === 'GESTOR') {
-                agg.gestorSum += nota; agg.gestorCount += 1;
-                const cmt = (get(r, ['Comentário','Comentario','comentario','comentário']) || '').toString().trim();
-                if (cmt) agg.gestorComments.push(cmt);
-            }
-        });
 
-        const uniqJoin = (arr) => {
-            try {
-                const seen = new Set();
-                const uniq = [];
-                for (const s of arr) {
-                    const t = s.trim();
-                    if (t && !seen.has(t)) { seen.add(t); uniq.push(t); }
-                    if (uniq.length >= 6) break; // limitar a 6 comentários para o tooltip
-                }
-                return uniq.join(' • ');
-            } catch { return ''; }
-        };
+        const params = new URLSearchParams();
+        if (login) params.set('login', login);
+        if (nome) params.set('nome', nome);
+        const response = await apiFetch(`${API_BASE_URL}/pessoas/${encodeURIComponent(person._id ?? 0)}/competencias?${params}`);
+        if (!response.ok) {
+            console.warn('Endpoint de competências retornou status', response.status);
+            return null;
+        }
+        const result = await response.json();
 
-        const toArray = (map) => Array.from(map.values()).map(x => ({
-            competencia: x.display,
-            auto: x.autoCount > 0 ? (x.autoSum / x.autoCount) : null,
-            gestor: x.gestorCount > 0 ? (x.gestorSum / x.gestorCount) : null,
-            autoComments: uniqJoin(x.autoComments),
-            gestorComments: uniqJoin(x.gestorComments)
-        }))
-        // Ordenar alfabeticamente por competência
-        .sort((a,b) => (''+a.competencia).localeCompare((''+b.competencia), 'pt-BR'));
-
-        return { performance: toArray(perfMap), potencial: toArray(potMap) };
+        const toArray = (items) => (Array.isArray(items) ? items : []).map(x => ({
+            competencia: x.competencia,
+            auto: x.auto,
+            gestor: x.gestor,
+            autoComments: x.comentarios_auto || '',
+            gestorComments: x.comentarios_gestor || ''
+        }));
+        const comps = result.found ? { performance: toArray(result.performance), potencial: toArray(result.potencial) } : null;
+        competenciasPorPessoa[cacheKey] = comps;
+        return comps;
     } catch (e) {
-        console.warn('Erro ao agregar competências:', e?.message || e);
+        console.warn('Erro ao buscar competências:', e?.message || e);
         return null;
     }
 }
@@ -1368,45 +1454,79 @@ function populateMesaFilter() {
 
 // Buscar dados do funcionário por nome - Adaptado para Supabase
 // Schema: registro, diretoria, gerencia, localidade, c. custo, chapa, codsecao, unidade, empresa, codcoligada, nome, cargo, admissao, cpf, corraca, sexo, naturalidade, dtnascimento, idade, escolaridade
+// Índices de busca de funcionários (nome normalizado / CPF), reconstruídos quando
+// employeeData ou allData mudam. Evitam varrer as listas a cada getEmployeeByName.
+let employeeLookup = null;
+
+function getNomeEmp(emp) {
+    return normalizeText(emp.nome || emp.NOME || emp['Nome'] || '');
+}
+
+function getCpfEmp(emp) {
+    return ((emp.cpf || emp.CPF || '') + '').replace(/\D/g, '');
+}
+
+function getEmployeeLookup() {
+    if (employeeLookup &&
+        employeeLookup.employees === employeeData && employeeLookup.employeesLength === employeeData.length &&
+        employeeLookup.avaliacoes === allData && employeeLookup.avaliacoesLength === allData.length) {
+        return employeeLookup;
+    }
+
+    const byCpf = new Map();
+    const byNome = new Map();
+    employeeData.forEach(emp => {
+        const cpf = getCpfEmp(emp);
+        const nomeEmp = getNomeEmp(emp);
+        if (cpf && !byCpf.has(cpf)) byCpf.set(cpf, emp);
+        if (!byNome.has(nomeEmp)) byNome.set(nomeEmp, emp);
+    });
+
+    // CPF do primeiro registro de avaliação com cada nome (Usuário Avaliado ou Avaliado)
+    const cpfAvaliacao = new Map();
+    allData.forEach(p => {
+        const doc = p['Documento de Identificação'] || p['documento_de_identificação'] || '';
+        const cpf = doc ? (doc + '').replace(/\D/g, '') : '';
+        [normalizeText(p['Usuário Avaliado'] || ''), normalizeText(p['Avaliado'] || '')].forEach(n => {
+            if (!cpfAvaliacao.has(n)) cpfAvaliacao.set(n, cpf);
+        });
+    });
+
+    employeeLookup = {
+        employees: employeeData,
+        employeesLength: employeeData.length,
+        avaliacoes: allData,
+        avaliacoesLength: allData.length,
+        byCpf,
+        byNome,
+        cpfAvaliacao
+    };
+    return employeeLookup;
+}
+
 function getEmployeeByName(nome) {
     if (!nome) return null;
-    // Normalizar nome para comparação (case/acento/espaços)
+    // Normalizar nome para comparação (case/acento/espaços)
     const nomeNormalizado = normalizeText(nome);
+    const lookup = getEmployeeLookup();
 
     // 0. Se possível, buscar o CPF diretamente do registro de avaliação correspondente a este nome
-    let cpfAlvo = '';
-    try {
-        const personRow = allData.find(p => {
-            const n1 = normalizeText(p['Usuário Avaliado'] || '');
-            const n2 = normalizeText(p['Avaliado'] || '');
-            return n1 === nomeNormalizado || n2 === nomeNormalizado;
-        });
-        if (personRow) {
-            const doc = personRow['Documento de Identificação'] || personRow['documento_de_identificação'] || '';
-            if (doc) {
-                cpfAlvo = (doc + '').replace(/\D/g, '');
-            }
-        }
-    } catch {}
-    
-    // Funções auxiliares
-    const getNomeEmp = (emp) => normalizeText(emp.nome || emp.NOME || emp['Nome'] || '');
-    const getCpfEmp = (emp) => ((emp.cpf || emp.CPF || '') + '').replace(/\D/g, '');
+    const cpfAlvo = lookup.cpfAvaliacao.get(nomeNormalizado) || '';
     
     // 1. Tentar encontrar por CPF (mais confiável)
     let employee = null;
     if (cpfAlvo && cpfAlvo.length >= 9) {
-        employee = employeeData.find(emp => getCpfEmp(emp) === cpfAlvo);
+        employee = lookup.byCpf.get(cpfAlvo) || null;
     }
     
     // 2. Tentar correspondência exata por nome
     if (!employee) {
-        employee = employeeData.find(emp => getNomeEmp(emp) === nomeNormalizado);
+        employee = lookup.byNome.get(nomeNormalizado) || null;
     }
     
     // 3. Se não encontrar, tentar por CPF vindo do próprio parâmetro (caso nome seja CPF)
     if (!employee && nome.length === 11 && /^\d+$/.test(nome)) {
-        employee = employeeData.find(emp => getCpfEmp(emp) === nome);
+        employee = lookup.byCpf.get(nome) || null;
     }
     
     // 4. Se não encontrar, tentar correspondência parcial (contém)
@@ -1732,7 +1852,7 @@ async function getDesenvolvimento(nome) {
     }
     
     try {
-        const response = await fetch(`${API_BASE_URL}/desenvolvimento/${encodeURIComponent(nome)}`);
+        const response = await apiFetch(`${API_BASE_URL}/desenvolvimento/${encodeURIComponent(nome)}`);
         const result = await response.json();
         
         if (result.found && result.data) {
@@ -1760,7 +1880,7 @@ async function saveDesenvolvimento(nome, dados) {
             ...dados
         };
         
-        const response = await fetch(`${API_BASE_URL}/desenvolvimento`, {
+        const response = await apiFetch(`${API_BASE_URL}/desenvolvimento`, {
             method: 'POST',
             headers: {
                 'Content-Type': 'application/json'
@@ -2573,7 +2693,7 @@ async function showPersonDetail(person) {
     // 2.3 Notas por Competência — Sessão 2
     let competenciasCard = '';
     try {
-        const comps = getCompetenciasForPerson(person);
+        const comps = await getCompetenciasForPerson(person);
         if (comps && ((comps.performance && comps.performance.length) || (comps.potencial && comps.potencial.length))) {
             const renderRow = (c) => {
                 const autoVal = (c.auto ?? '') !== '' ? Number(c.auto) : null;
@@ -3270,7 +3390,7 @@ async function salvarCalibracao(avaliacaoId, nome) {
 
         // Persistir no backend se tivermos o id
         if (avaliacaoId) {
-            const resp = await fetch(`${API_BASE_URL}/avaliacoes/${avaliacaoId}/calibracao`, {
+            const resp = await apiFetch(`${API_BASE_URL}/avaliacoes/${avaliacaoId}/calibracao`, {
                 method: 'PATCH',
                 headers: { 'Content-Type': 'application/json' },
                 body: JSON.stringify({
@@ -3821,6 +3941,17 @@ function loadRestrictedFilterState() {
             console.log('🔒 Filtro restrito restaurado da sessão:', RESTRICTED_AREAS.length, 'áreas');
             return true;
         }
+        if (active === null) {
+            // Nova aba: o token já traz as áreas liberadas pelo filtro GP, sem validar a senha de novo
+            const codes = (getAuthSession() || {}).a || [];
+            const liberadas = KNOWN_RESTRICTED_AREAS.filter(a => codes.includes(extractAreaCode(a)));
+            if (liberadas.length) {
+                restrictedFilterActive = true;
+                RESTRICTED_AREAS = liberadas;
+                console.log('🔒 Filtro restrito restaurado do token:', RESTRICTED_AREAS.length, 'áreas');
+                return true;
+            }
+        }
     } catch (e) {
         console.warn('Não foi possível carregar estado do filtro restrito:', e);
     }
@@ -3927,7 +4058,7 @@ async function applyRestrictedFilter() {
     
     try {
         // Validar senha via API
-        const response = await fetch(`${API_BASE_URL}/validar-filtro-gp`, {
+        const response = await apiFetch(`${API_BASE_URL}/validar-filtro-gp`, {
             method: 'POST',
             headers: {
                 'Content-Type': 'application/json'
@@ -3942,6 +4073,8 @@ async function applyRestrictedFilter() {
         const result = await response.json();
         
         if (result.valido) {
+            // Novo token com os códigos das áreas liberadas
+            if (result.token) localStorage.setItem(AUTH_TOKEN_KEY, result.token);
             restrictedFilterActive = true;
             RESTRICTED_AREAS = result.areas || [];
             saveRestrictedFilterState(); // Persistir estado
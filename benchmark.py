@@ -0,0 +1,268 @@
+"""
+Benchmark da API com dados sintéticos, sem rede nem Supabase real.
+
+Gera as tabelas com dados_sinteticos (5k, 50k ou 500k colaboradores) ou as lê de CSVs,
+serve-as pelo PostgREST local em memória (postgrest_local) e executa a aplicação FastAPI
+do api.py no mesmo processo (httpx.ASGITransport). Para cada endpoint mede a primeira requisição
+(cache frio), depois N requisições com C em paralelo, e informa p50/p95, máximo,
+requisições por segundo e chamadas ao PostgREST.
+
+Uso:
+    python benchmark.py 50k --requisicoes 200 --concorrencia 8
+    python benchmark.py 5k --salvar bench_5k.json
+    python benchmark.py 5k --comparar bench_5k.json --tolerancia 0.25   # sai com 1 se p95 piorar
+    python benchmark.py --seeds .cache/dados_50k                         # tabelas de CSVs
+
+O 500k precisa de alguns GB de memória (as tabelas ficam no PostgREST local e nos
+snapshots da API ao mesmo tempo).
+"""
+import argparse
+import asyncio
+import json
+import logging
+import math
+import os
+import random
+import sys
+import tempfile
+import time
+from typing import Any, Callable, Dict, List, Optional
+from urllib.parse import quote
+
+import httpx
+
+import dados_sinteticos
+from postgrest_local import PostgRESTLocal, load_seeds
+
+logger = logging.getLogger("benchmark")
+
+BASE_URL = "http://postgrest.local"
+
+# Nome -> caminho; {campo} é preenchido a cada requisição com um valor sorteado dos dados
+ENDPOINTS: Dict[str, str] = {
+    "ninebox": "/api/ninebox",
+    "ninebox_area": "/api/ninebox?area={area}",
+    "avaliacoes": "/api/avaliacoes?limit=1000&offset={offset}",
+    "funcionarios": "/api/funcionarios?limit=1000&diretoria={diretoria}",
+    "filtros": "/api/filtros?diretoria={diretoria}",
+    "competencias": "/api/pessoas/{id}/competencias",
+    "mesa_calibracao": "/api/mesa-calibracao?nome={nome}",
+    "pessoas_avaliadas": "/api/pessoas-avaliadas?gestor={gestor}",
+    "discrepancias": "/api/analises/discrepancias?top=50",
+    "export": "/api/export?formato=ndjson",
+    "bootstrap": "/api/bootstrap?tabelas=avaliacoes,funcionarios",
+}
+
+# Endpoints que devolvem a tabela inteira: fora da lista padrão no 500k
+ENDPOINTS_PESADOS = {"export", "bootstrap"}
+
+
+def percentil(valores: List[float], p: float) -> float:
+    """Percentil pelo método nearest-rank (valores já ordenados)."""
+    if not valores:
+        return 0.0
+    return valores[max(0, math.ceil(p / 100 * len(valores)) - 1)]
+
+
+class Amostrador:
+    """Sorteia valores reais dos dados para preencher os caminhos dos endpoints."""
+
+    def __init__(self, tabelas: Dict[str, List[Dict[str, Any]]], seed: int):
+        self.rng = random.Random(seed)
+        avaliacoes = tabelas["nota_final_colaborador"]
+        self._valores: Dict[str, Callable[[], Any]] = {
+            "id": lambda: self.rng.choice(avaliacoes)["id"],
+            "nome": lambda: self.rng.choice(avaliacoes)["avaliado"],
+            "gestor": lambda: self.rng.choice(avaliacoes)["avaliador"],
+            "area": lambda: self.rng.choice(dados_sinteticos.GERENCIAS),
+            "diretoria": lambda: self.rng.choice(dados_sinteticos.DIRETORIAS),
+            "offset": lambda: self.rng.randrange(0, max(1, len(avaliacoes)), 1000),
+        }
+
+    def caminho(self, modelo: str) -> str:
+        campos = {k: quote(str(v()), safe="") for k, v in self._valores.items() if "{" + k + "}" in modelo}
+        return modelo.format(**campos)
+
+
+async def _medir(client: httpx.AsyncClient, caminho: str) -> tuple:
+    start = time.perf_counter()
+    status = 0
+    try:
+        async with client.stream("GET", caminho) as resp:
+            status = resp.status_code
+            async for _ in resp.aiter_raw():
+                pass
+    except httpx.HTTPError:
+        pass
+    return time.perf_counter() - start, status
+
+
+async def medir_endpoint(
+    client: httpx.AsyncClient,
+    rest: PostgRESTLocal,
+    amostrador: Amostrador,
+    modelo: str,
+    requisicoes: int,
+    concorrencia: int,
+) -> Dict[str, Any]:
+    chamadas_antes = rest.requests
+    fria, status_fria = await _medir(client, amostrador.caminho(modelo))
+    caminhos = [amostrador.caminho(modelo) for _ in range(requisicoes)]
+    latencias: List[float] = []
+    erros = 0 if status_fria < 400 else 1
+    fila = iter(caminhos)
+
+    async def _worker():
+        nonlocal erros
+        for caminho in fila:
+            segundos, status = await _medir(client, caminho)
+            latencias.append(segundos)
+            if status == 0 or status >= 400:
+                erros += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*[_worker() for _ in range(max(1, concorrencia))])
+    total = time.perf_counter() - start
+    latencias.sort()
+    return {
+        "requisicoes": len(latencias),
+        "erros": erros,
+        "fria_ms": round(fria * 1000, 2),
+        "p50_ms": round(percentil(latencias, 50) * 1000, 2),
+        "p95_ms": round(percentil(latencias, 95) * 1000, 2),
+        "max_ms": round((latencias[-1] if latencias else 0.0) * 1000, 2),
+        "req_s": round(len(latencias) / total, 1) if total > 0 else None,
+        "chamadas_postgrest": rest.requests - chamadas_antes,
+    }
+
+
+async def executar(
+    tabelas: Dict[str, List[Dict[str, Any]]],
+    endpoints: List[str],
+    requisicoes: int,
+    concorrencia: int,
+    seed: int = 42,
+) -> Dict[str, Any]:
+    """Sobe a API sobre o PostgREST local com estas tabelas e mede cada endpoint."""
+    rest = PostgRESTLocal(tabelas)
+
+    # api.py lê a configuração na importação: apontar para o PostgREST local e arquivos temporários
+    pasta = tempfile.mkdtemp(prefix="ninebox_bench_")
+    os.environ.update({
+        "SUPABASE_URL": BASE_URL,
+        "SUPABASE_KEY": "benchmark",
+        "SNAPSHOT_STORE_PATH": os.path.join(pasta, "snapshots.sqlite3"),
+        "REPLICA_PATH": os.path.join(pasta, "replica.sqlite3"),
+    })
+    import api
+    import metrics
+    import sessions
+    from data_access import SupabaseREST
+
+    logging.getLogger().setLevel(logging.WARNING)
+    api.db = SupabaseREST(BASE_URL, "benchmark", observer=metrics.record_upstream, transport=rest.transport())
+    await api.app.router.startup()
+    resultados: Dict[str, Any] = {}
+    try:
+        amostrador = Amostrador(tabelas, seed)
+        async with httpx.AsyncClient(
+            transport=httpx.ASGITransport(app=api.app),
+            base_url="http://benchmark",
+            headers={"Authorization": f"Bearer {sessions.issue('benchmark')}"},
+            timeout=None,
+        ) as client:
+            for nome in endpoints:
+                resultados[nome] = await medir_endpoint(
+                    client, rest, amostrador, ENDPOINTS[nome], requisicoes, concorrencia
+                )
+                logger.warning(f"{nome}: p50 {resultados[nome]['p50_ms']} ms, p95 {resultados[nome]['p95_ms']} ms")
+    finally:
+        await api.app.router.shutdown()
+    return {
+        "colaboradores": len(tabelas.get("nota_final_colaborador", [])),
+        "requisicoes": requisicoes,
+        "concorrencia": concorrencia,
+        "python": sys.version.split()[0],
+        "endpoints": resultados,
+    }
+
+
+def imprimir(resultado: Dict[str, Any]) -> None:
+    colunas = ["requisicoes", "erros", "fria_ms", "p50_ms", "p95_ms", "max_ms", "req_s", "chamadas_postgrest"]
+    largura = max([len("endpoint")] + [len(n) for n in resultado["endpoints"]])
+    print(
+        f"\n{resultado['colaboradores']} colaboradores, {resultado['requisicoes']} requisições por endpoint, "
+        f"concorrência {resultado['concorrencia']}\n"
+    )
+    print("endpoint".ljust(largura) + "".join(c.rjust(20 if c == "chamadas_postgrest" else 12) for c in colunas))
+    for nome, r in resultado["endpoints"].items():
+        print(nome.ljust(largura) + "".join(
+            str(r[c]).rjust(20 if c == "chamadas_postgrest" else 12) for c in colunas
+        ))
+
+
+def comparar(resultado: Dict[str, Any], base: Dict[str, Any], tolerancia: float) -> List[str]:
+    """Endpoints cujo p95 piorou mais que a tolerância (fração) em relação à base."""
+    regressoes = []
+    for nome, r in resultado["endpoints"].items():
+        anterior = base.get("endpoints", {}).get(nome)
+        if not anterior or not anterior.get("p95_ms"):
+            continue
+        limite = anterior["p95_ms"] * (1 + tolerancia)
+        # Diferenças abaixo de 1 ms são ruído de medição
+        if r["p95_ms"] > limite and r["p95_ms"] - anterior["p95_ms"] > 1.0:
+            regressoes.append(f"{nome}: p95 {anterior['p95_ms']} -> {r['p95_ms']} ms")
+        if r["erros"] and not anterior.get("erros"):
+            regressoes.append(f"{nome}: {r['erros']} erros")
+    return regressoes
+
+
+def main() -> None:
+    logging.basicConfig(level=logging.WARNING, format="%(message)s")
+    parser = argparse.ArgumentParser(description="Benchmark da API com dados sintéticos e PostgREST local")
+    parser.add_argument("tamanho", nargs="?", default="5k", help=f"Colaboradores: {', '.join(dados_sinteticos.TAMANHOS)} ou um número")
+    parser.add_argument("--requisicoes", type=int, default=100, help="Requisições por endpoint (após a primeira)")
+    parser.add_argument("--concorrencia", type=int, default=8)
+    parser.add_argument("--endpoints", help=f"Separados por vírgula. Disponíveis: {', '.join(ENDPOINTS)}")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--seeds", help="Pasta com um <tabela>.csv por tabela (em vez de gerar os dados)")
+    parser.add_argument("--salvar", help="Grava o resultado em JSON")
+    parser.add_argument("--comparar", help="JSON de uma execução anterior; sai com código 1 se houver regressão")
+    parser.add_argument("--tolerancia", type=float, default=0.25, help="Piora aceitável do p95 (fração)")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    if args.seeds:
+        tabelas = load_seeds(args.seeds)
+    else:
+        tabelas = dados_sinteticos.gerar(dados_sinteticos.TAMANHOS.get(args.tamanho) or int(args.tamanho), seed=args.seed)
+    logger.warning(
+        f"Dados prontos em {time.perf_counter() - start:.1f}s: "
+        + ", ".join(f"{t}={len(r)}" for t, r in tabelas.items() if r)
+    )
+    colaboradores = len(tabelas.get("nota_final_colaborador", []))
+    if args.endpoints:
+        endpoints = [e.strip() for e in args.endpoints.split(",") if e.strip()]
+        invalidos = [e for e in endpoints if e not in ENDPOINTS]
+        if invalidos:
+            parser.error(f"Endpoints inválidos: {', '.join(invalidos)}. Disponíveis: {', '.join(ENDPOINTS)}")
+    else:
+        endpoints = [e for e in ENDPOINTS if colaboradores < 500_000 or e not in ENDPOINTS_PESADOS]
+
+    resultado = asyncio.run(executar(tabelas, endpoints, args.requisicoes, args.concorrencia, args.seed))
+    imprimir(resultado)
+    if args.salvar:
+        with open(args.salvar, "w", encoding="utf-8") as f:
+            json.dump(resultado, f, ensure_ascii=False, indent=2)
+    if args.comparar:
+        with open(args.comparar, encoding="utf-8") as f:
+            base = json.load(f)
+        regressoes = comparar(resultado, base, args.tolerancia)
+        if regressoes:
+            print("\nRegressões:\n  " + "\n  ".join(regressoes))
+            sys.exit(1)
+        print("\nSem regressões em relação a " + args.comparar)
+
+
+if __name__ == "__main__":
+    main()
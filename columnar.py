@@ -0,0 +1,465 @@
+"""
+Tabela colunar compacta para os snapshots em memória.
+
+Uma lista de dicts repete em cada linha o dicionário de chaves e um objeto por valor
+(cada "DIRETORIA DE OPERAÇÕES" lido do JSON é uma string nova). Aqui cada coluna é
+guardada uma única vez:
+
+- inteiros e decimais em array('q') / array('d'), com máscara de nulos;
+- datas 'DD/MM/AAAA' ou 'AAAA-MM-DD' como ordinal em array('i');
+- textos quase todos distintos (nomes, CPFs) concatenados numa única string, com offsets;
+- demais valores (textos repetidos, booleanos, números misturados) codificados por
+  dicionário: cada valor distinto guardado uma vez e um código por linha (1, 2 ou 4 bytes);
+- valores não hasheáveis (listas, objetos) numa lista comum.
+
+A tabela se comporta como uma sequência de linhas (len, índice, fatia, iteração): cada
+acesso monta um dict novo, só para as linhas pedidas (ex.: a página a serializar).
+Filtros e ordenações podem ser feitos nas colunas e devolvem visões (take) sem copiar
+os dados. Linhas montadas são idênticas às originais (mesmas chaves, na mesma ordem).
+
+to_columns() e to_arrow() montam o formato colunar das respostas das listagens
+(formato=colunas em JSON, formato=arrow em Arrow IPC).
+"""
+import math
+import re
+import sys
+from array import array
+from datetime import date
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple, Union
+
+_INT64 = (-(2 ** 63), 2 ** 63 - 1)
+
+_DATE_FORMATS: List[Tuple["re.Pattern[str]", Tuple[int, int, int], Callable[[date], str]]] = [
+    # (padrão, posição de dia/mês/ano nos grupos, formatação de volta)
+    (re.compile(r"^(\d{2})/(\d{2})/(\d{4})$"), (0, 1, 2), lambda d: f"{d.day:02d}/{d.month:02d}/{d.year:04d}"),
+    (re.compile(r"^(\d{4})-(\d{2})-(\d{2})$"), (2, 1, 0), lambda d: f"{d.year:04d}-{d.month:02d}-{d.day:02d}"),
+]
+
+
+def _code_typecode(size: int) -> str:
+    return "B" if size < 2 ** 8 else "H" if size < 2 ** 16 else "I"
+
+
+class _Column:
+    nbytes = 0
+
+    def get(self, pos: int) -> Any:
+        raise NotImplementedError
+
+    def take(self, positions: Sequence[int]) -> List[Any]:
+        get = self.get
+        return [get(p) for p in positions]
+
+
+class _DictColumn(_Column):
+    """Valores distintos guardados uma vez; código 0 = nulo."""
+
+    def __init__(self, values: Sequence[Any]):
+        lookup: Dict[Any, int] = {}
+        dictionary: List[Any] = [None]
+        codes = []
+        for v in values:
+            if v is None:
+                codes.append(0)
+                continue
+            # Chave com o tipo: 1, 1.0 e True são iguais num dict, mas não devem se misturar;
+            # nos decimais também o sinal, senão -0.0 voltaria como 0.0 (ou o contrário)
+            key = (float, v, math.copysign(1.0, v)) if type(v) is float else (type(v), v)
+            code = lookup.get(key)
+            if code is None:
+                code = lookup[key] = len(dictionary)
+                dictionary.append(v)
+            codes.append(code)
+        self.dictionary = dictionary
+        self.codes = array(_code_typecode(len(dictionary)), codes)
+        self.nbytes = self.codes.itemsize * len(self.codes) + sum(sys.getsizeof(v) for v in dictionary) + sys.getsizeof(dictionary)
+
+    def get(self, pos: int) -> Any:
+        return self.dictionary[self.codes[pos]]
+
+    def take(self, positions: Sequence[int]) -> List[Any]:
+        dictionary, codes = self.dictionary, self.codes
+        return [dictionary[codes[p]] for p in positions]
+
+    def slice(self, start: int, stop: int) -> List[Any]:
+        dictionary = self.dictionary
+        return [dictionary[c] for c in self.codes[start:stop]]
+
+    def matching(self, accept: Callable[[Any], bool]) -> List[int]:
+        """Posições cujo valor (não nulo) é aceito; o teste roda uma vez por valor distinto."""
+        wanted = {i for i, v in enumerate(self.dictionary) if i and accept(v)}
+        if not wanted:
+            return []
+        return [p for p, c in enumerate(self.codes) if c in wanted]
+
+
+class _NumericColumn(_Column):
+    """array('q') ou array('d') com máscara de nulos (None se não houver nulos)."""
+
+    def __init__(self, values: Sequence[Any], typecode: str):
+        fill = 0 if typecode == "q" else 0.0
+        self.data = array(typecode, (fill if v is None else v for v in values))
+        self.nulls: Optional[bytearray] = None
+        if any(v is None for v in values):
+            self.nulls = bytearray(1 if v is None else 0 for v in values)
+        self.nbytes = self.data.itemsize * len(self.data) + (len(self.nulls) if self.nulls is not None else 0)
+
+    def get(self, pos: int) -> Any:
+        if self.nulls is not None and self.nulls[pos]:
+            return None
+        return self.data[pos]
+
+    def take(self, positions: Sequence[int]) -> List[Any]:
+        data, nulls = self.data, self.nulls
+        if nulls is None:
+            return [data[p] for p in positions]
+        return [None if nulls[p] else data[p] for p in positions]
+
+    def slice(self, start: int, stop: int) -> List[Any]:
+        values = self.data[start:stop].tolist()
+        if self.nulls is not None:
+            for i, null in enumerate(self.nulls[start:stop]):
+                if null:
+                    values[i] = None
+        return values
+
+
+class _DateColumn(_Column):
+    """Datas em texto guardadas como ordinal (array('i')), com o formato original."""
+
+    def __init__(self, ordinals: Sequence[Optional[int]], fmt: Callable[[date], str]):
+        self.data = array("i", (0 if v is None else v for v in ordinals))
+        self.fmt = fmt
+        self.nulls: Optional[bytearray] = None
+        if any(v is None for v in ordinals):
+            self.nulls = bytearray(1 if v is None else 0 for v in ordinals)
+        self.nbytes = self.data.itemsize * len(self.data) + (len(self.nulls) if self.nulls is not None else 0)
+        self._text: Dict[int, str] = {}
+
+    def _format(self, ordinal: int) -> str:
+        text = self._text.get(ordinal)
+        if text is None:
+            text = self._text[ordinal] = self.fmt(date.fromordinal(ordinal))
+        return text
+
+    def get(self, pos: int) -> Any:
+        if self.nulls is not None and self.nulls[pos]:
+            return None
+        return self._format(self.data[pos])
+
+    def take(self, positions: Sequence[int]) -> List[Any]:
+        data, nulls, text, fmt = self.data, self.nulls, self._text, self._format
+        values = [text.get(data[p]) or fmt(data[p]) for p in positions]
+        if nulls is not None:
+            for i, p in enumerate(positions):
+                if nulls[p]:
+                    values[i] = None
+        return values
+
+    def slice(self, start: int, stop: int) -> List[Any]:
+        return self.take(range(start, stop))
+
+
+class _StringColumn(_Column):
+    """
+    Textos quase todos distintos (nomes, CPFs, logins): uma única string concatenada e
+    offsets. Textos em português cabem em latin-1, então a string ocupa 1 byte por caractere.
+    """
+
+    def __init__(self, values: Sequence[Optional[str]]):
+        offsets = array("I", [0])
+        size = 0
+        for v in values:
+            if v is not None:
+                size += len(v)
+            offsets.append(size)
+        if size >= 2 ** 32:
+            raise OverflowError("coluna de texto grande demais")
+        self.data = "".join(v for v in values if v is not None)
+        self.offsets = offsets
+        self.nulls: Optional[bytearray] = None
+        if any(v is None for v in values):
+            self.nulls = bytearray(1 if v is None else 0 for v in values)
+        self.nbytes = sys.getsizeof(self.data) + offsets.itemsize * len(offsets) + (len(self.nulls) if self.nulls is not None else 0)
+
+    def get(self, pos: int) -> Any:
+        if self.nulls is not None and self.nulls[pos]:
+            return None
+        return self.data[self.offsets[pos]:self.offsets[pos + 1]]
+
+    def take(self, positions: Sequence[int]) -> List[Any]:
+        data, offsets, nulls = self.data, self.offsets, self.nulls
+        if nulls is None:
+            return [data[offsets[p]:offsets[p + 1]] for p in positions]
+        return [None if nulls[p] else data[offsets[p]:offsets[p + 1]] for p in positions]
+
+    def slice(self, start: int, stop: int) -> List[Any]:
+        data = self.data
+        values = [data[a:b] for a, b in zip(self.offsets[start:stop], self.offsets[start + 1:stop + 1])]
+        if self.nulls is not None:
+            for i, null in enumerate(self.nulls[start:stop]):
+                if null:
+                    values[i] = None
+        return values
+
+
+class _ObjectColumn(_Column):
+    """Valores não hasheáveis (listas, objetos JSON): lista comum."""
+
+    def __init__(self, values: Sequence[Any]):
+        self.values = list(values)
+        self.nbytes = sys.getsizeof(self.values)
+
+    def get(self, pos: int) -> Any:
+        return self.values[pos]
+
+    def slice(self, start: int, stop: int) -> List[Any]:
+        return self.values[start:stop]
+
+
+def _date_ordinals(values: Sequence[Any]) -> Optional[Tuple[List[Optional[int]], Callable[[date], str]]]:
+    """Ordinais das datas se todos os valores não nulos forem datas em um mesmo formato reversível."""
+    sample = next((v for v in values if v is not None), None)
+    if not isinstance(sample, str):
+        return None
+    for pattern, (d_i, m_i, y_i), fmt in _DATE_FORMATS:
+        if not pattern.match(sample):
+            continue
+        ordinals: List[Optional[int]] = []
+        cache: Dict[str, int] = {}
+        for v in values:
+            if v is None:
+                ordinals.append(None)
+                continue
+            ordinal = cache.get(v) if isinstance(v, str) else None
+            if ordinal is None:
+                match = pattern.match(v) if isinstance(v, str) else None
+                if match is None:
+                    return None
+                parts = match.groups()
+                try:
+                    d = date(int(parts[y_i]), int(parts[m_i]), int(parts[d_i]))
+                except ValueError:
+                    return None
+                if fmt(d) != v:
+                    return None
+                ordinal = cache[v] = d.toordinal()
+            ordinals.append(ordinal)
+        return ordinals, fmt
+    return None
+
+
+def encode_column(values: Sequence[Any]) -> _Column:
+    """Escolhe a codificação mais compacta que devolve exatamente os mesmos valores."""
+    kinds = {type(v) for v in values if v is not None}
+    if kinds == {int} and all(_INT64[0] <= v <= _INT64[1] for v in values if v is not None):
+        # Poucos valores distintos (ex.: códigos) ocupam menos no dicionário
+        if len(set(values)) * 8 < len(values):
+            return _DictColumn(values)
+        return _NumericColumn(values, "q")
+    if kinds == {float}:
+        if len(set(values)) * 8 < len(values):
+            return _DictColumn(values)
+        return _NumericColumn(values, "d")
+    if kinds == {str}:
+        dates = _date_ordinals(values)
+        if dates is not None:
+            return _DateColumn(*dates)
+        if len(set(values)) * 2 > len(values):
+            try:
+                return _StringColumn(values)
+            except OverflowError:
+                pass
+    try:
+        return _DictColumn(values)
+    except TypeError:
+        return _ObjectColumn(values)
+
+
+class ColumnarTable(Sequence):
+    """Linhas de mesmo formato guardadas por coluna; visões (take) compartilham as colunas."""
+
+    def __init__(self, columns: Sequence[str], data: Dict[str, _Column], size: int, index: Optional[array] = None):
+        self.columns = tuple(columns)
+        self._data = data
+        self._getters = [data[c].get for c in self.columns]
+        self._size = size
+        self._index = index
+
+    @classmethod
+    def from_rows(cls, rows: Sequence[Dict[str, Any]]) -> Optional["ColumnarTable"]:
+        """Tabela colunar das linhas; None se as linhas não tiverem todas as mesmas chaves na mesma ordem."""
+        if not rows:
+            return None
+        columns = tuple(rows[0])
+        if any(tuple(r) != columns for r in rows):
+            return None
+        data = {name: encode_column([r[name] for r in rows]) for name in columns}
+        return cls(columns, data, len(rows))
+
+    def __len__(self) -> int:
+        return len(self._index) if self._index is not None else self._size
+
+    def _positions(self, start: int, stop: int) -> Union[range, Sequence[int]]:
+        return self._index[start:stop] if self._index is not None else range(start, stop)
+
+    def _materialize(self, start: int, stop: int) -> List[Dict[str, Any]]:
+        if stop <= start:
+            return []
+        if self._index is None:
+            values = [self._data[c].slice(start, stop) for c in self.columns]
+        else:
+            positions = self._index[start:stop]
+            values = [self._data[c].take(positions) for c in self.columns]
+        columns = self.columns
+        return [dict(zip(columns, row)) for row in zip(*values)]
+
+    def __getitem__(self, item: Union[int, slice]) -> Any:
+        if isinstance(item, slice):
+            start, stop, step = item.indices(len(self))
+            if step == 1:
+                return self._materialize(start, stop)
+            return [self[i] for i in range(start, stop, step)]
+        n = len(self)
+        pos = item + n if item < 0 else item
+        if not 0 <= pos < n:
+            raise IndexError("índice fora da tabela")
+        if self._index is not None:
+            pos = self._index[pos]
+        return dict(zip(self.columns, [get(pos) for get in self._getters]))
+
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        # Em blocos: decodifica coluna a coluna sem montar todas as linhas de uma vez
+        n = len(self)
+        for start in range(0, n, 1024):
+            yield from self._materialize(start, min(start + 1024, n))
+
+    def column(self, name: str) -> List[Any]:
+        """Valores de uma coluna (None para coluna inexistente), na ordem das linhas."""
+        col = self._data.get(name)
+        if col is None:
+            return [None] * len(self)
+        if self._index is not None:
+            return col.take(self._index)
+        return col.slice(0, self._size) if hasattr(col, "slice") else col.take(range(self._size))
+
+    def take(self, positions: Iterable[int]) -> "ColumnarTable":
+        """Visão com as linhas nas posições dadas (relativas a esta tabela), sem copiar colunas."""
+        positions = list(positions)
+        if self._index is not None:
+            positions = [self._index[p] for p in positions]
+        return ColumnarTable(self.columns, self._data, self._size, array(_code_typecode(self._size), positions))
+
+    def where_in(self, name: str, accepted: Iterable[str]) -> "ColumnarTable":
+        """Linhas cujo valor da coluna, como texto, está em accepted (mesma regra de table_query.filter_rows)."""
+        accepted = set(accepted)
+        col = self._data.get(name)
+        if col is None:
+            return self.take([])
+        if isinstance(col, _DictColumn) and self._index is None:
+            return self.take(col.matching(lambda v: str(v) in accepted))
+        values = self.column(name)
+        return self.take([i for i, v in enumerate(values) if v is not None and str(v) in accepted])
+
+    def nbytes(self) -> int:
+        """Memória aproximada das colunas (compartilhada entre visões) e do índice da visão."""
+        total = sum(col.nbytes for col in self._data.values())
+        if self._index is not None:
+            total += self._index.itemsize * len(self._index)
+        return total
+
+    def encodings(self) -> Dict[str, str]:
+        return {name: type(col).__name__.strip("_") for name, col in self._data.items()}
+
+
+def compact(rows: Sequence[Dict[str, Any]]) -> Sequence[Dict[str, Any]]:
+    """ColumnarTable das linhas, ou as próprias linhas se não puderem ser codificadas."""
+    if isinstance(rows, ColumnarTable):
+        return rows
+    table = ColumnarTable.from_rows(rows)
+    return rows if table is None else table
+
+
+def column_values(rows: Sequence[Dict[str, Any]], name: str) -> List[Any]:
+    """Valores de uma coluna de uma lista de dicts ou de uma ColumnarTable (sem montar linhas)."""
+    if isinstance(rows, ColumnarTable):
+        return rows.column(name)
+    return [r.get(name) for r in rows]
+
+
+# ===== Formato colunar nas respostas (formato=colunas / formato=arrow) =====
+FORMATOS_RESPOSTA = ("linhas", "colunas", "arrow")
+
+ARROW_MEDIA_TYPE = "application/vnd.apache.arrow.stream"
+
+
+def _column_names(rows: Sequence[Dict[str, Any]]) -> List[str]:
+    """Chaves de todas as linhas, na ordem em que aparecem."""
+    return list(dict.fromkeys(k for r in rows for k in r))
+
+
+def _dictionary(values: List[Any]) -> Optional[Tuple[List[str], List[Optional[int]]]]:
+    """(valores distintos, códigos) se a coluna for de textos repetidos; None caso contrário."""
+    present = [v for v in values if v is not None]
+    if len(present) < 2 or any(type(v) is not str for v in present):
+        return None
+    lookup: Dict[str, int] = {}
+    codes: List[Optional[int]] = []
+    for v in values:
+        if v is None:
+            codes.append(None)
+            continue
+        code = lookup.get(v)
+        if code is None:
+            code = lookup[v] = len(lookup)
+        codes.append(code)
+    # Só compensa quando cada valor se repete, em média, ao menos duas vezes
+    if len(lookup) * 2 > len(present):
+        return None
+    return list(lookup), codes
+
+
+def to_columns(rows: Sequence[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Linhas no formato colunar da API: {"columns": [nomes], "values": [uma lista por coluna],
+    "dictionaries": {coluna: [textos]}}. Nas colunas com dicionário, "values" traz o índice
+    de cada texto no dicionário (null continua null). Chave ausente numa linha vira null.
+    """
+    columns = _column_names(rows)
+    values: List[List[Any]] = []
+    dictionaries: Dict[str, List[str]] = {}
+    for name in columns:
+        col = column_values(rows, name)
+        encoded = _dictionary(col)
+        if encoded is not None:
+            dictionaries[name], col = encoded
+        values.append(col)
+    return {"columns": columns, "values": values, "dictionaries": dictionaries}
+
+
+def to_arrow(rows: Sequence[Dict[str, Any]], metadata: Optional[Dict[str, str]] = None) -> bytes:
+    """
+    Linhas em Arrow IPC (stream), com textos repetidos como colunas de dicionário.
+    Requer o pacote opcional pyarrow (ImportError se não estiver instalado).
+    """
+    import pyarrow as pa
+
+    arrays = []
+    columns = _column_names(rows)
+    for name in columns:
+        col = column_values(rows, name)
+        try:
+            arr = pa.array(col)
+        except (pa.ArrowInvalid, pa.ArrowTypeError):
+            # Tipos misturados na mesma coluna: envia como texto
+            arr = pa.array([None if v is None else str(v) for v in col], type=pa.string())
+        if pa.types.is_string(arr.type) and _dictionary(col) is not None:
+            arr = arr.dictionary_encode()
+        arrays.append(arr)
+    table = pa.Table.from_arrays(arrays, names=columns)
+    if metadata:
+        table = table.replace_schema_metadata(metadata)
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return sink.getvalue().to_pybytes()
@@ -0,0 +1,144 @@
+"""
+Índice de notas_por_competencia agrupado por pessoa (equivalente ao
+getCompetenciasForPerson do app.js).
+
+As linhas do snapshot são agrupadas uma única vez por login (USER_LOGIN) e por nome
+normalizado; a agregação auto x gestor de cada pessoa é calculada na primeira consulta
+e reaproveitada enquanto o snapshot não mudar. Assim o navegador pede só as
+competências da pessoa aberta, sem baixar a tabela inteira.
+"""
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, List, Optional, Tuple
+
+from identity_index import normalize_name
+from ninebox_engine import to_float
+
+# Competências de potencial (avaliadas apenas pelo gestor)
+COMPETENCIAS_POTENCIAL = {
+    normalize_name("Ambição e Motivação para Crescer"),
+    normalize_name("Aprendizado"),
+    normalize_name("Prontidão"),
+}
+
+TIPOS_AUTO = {"AUTO AVALIACAO", "AUTOAVALIACAO", "AUTO"}
+TIPO_GESTOR = "GESTOR"
+
+# Comentários distintos mantidos por competência (tooltip do card)
+MAX_COMENTARIOS = 6
+
+# Pessoas com agregação guardada por índice
+MAX_CACHED_PESSOAS = 2048
+
+
+def _get(row: Dict[str, Any], *keys: str) -> Any:
+    for k in keys:
+        v = row.get(k)
+        if v is not None:
+            return v
+    return None
+
+
+def _login(row: Dict[str, Any]) -> str:
+    return str(_get(row, "USER_LOGIN", "user_login", "Login", "login") or "").strip().upper()
+
+
+def _nome(row: Dict[str, Any]) -> str:
+    return normalize_name(_get(row, "NOME", "Nome", "nome", "Avaliado", "Usuário Avaliado") or "")
+
+
+def _comentarios(textos: List[str]) -> str:
+    vistos: List[str] = []
+    for t in textos:
+        if t not in vistos:
+            vistos.append(t)
+            if len(vistos) >= MAX_COMENTARIOS:
+                break
+    return " • ".join(vistos)
+
+
+def agregar(rows: List[Dict[str, Any]]) -> Dict[str, List[Dict[str, Any]]]:
+    """Média auto e gestor por competência, separando desempenho e potencial."""
+    grupos: Dict[str, Dict[str, Dict[str, Any]]] = {"performance": {}, "potencial": {}}
+    for r in rows:
+        competencia = _get(r, "Competência", "competência", "competencia", "Competencia")
+        nota = to_float(_get(r, "Nota", "nota"))
+        if not competencia or nota is None:
+            continue
+        chave = normalize_name(competencia)
+        tipo = normalize_name(_get(r, "Tipo de Avaliador", "tipo_de_avaliador", "tipoAvaliador"))
+        if tipo in TIPOS_AUTO:
+            lado = "auto"
+        elif tipo == TIPO_GESTOR:
+            lado = "gestor"
+        else:
+            # Outros avaliadores não entram: a competência só aparece com nota auto ou gestor
+            continue
+        destino = grupos["potencial" if chave in COMPETENCIAS_POTENCIAL else "performance"]
+        agg = destino.setdefault(chave, {
+            "competencia": str(competencia),
+            "auto": [], "gestor": [], "comentarios_auto": [], "comentarios_gestor": [],
+        })
+        agg[lado].append(nota)
+        comentario = str(_get(r, "Comentário", "Comentario", "comentario", "comentário") or "").strip()
+        if comentario:
+            agg[f"comentarios_{lado}"].append(comentario)
+
+    resultado: Dict[str, List[Dict[str, Any]]] = {}
+    for grupo, por_competencia in grupos.items():
+        itens = [
+            {
+                "competencia": agg["competencia"],
+                "auto": sum(agg["auto"]) / len(agg["auto"]) if agg["auto"] else None,
+                "gestor": sum(agg["gestor"]) / len(agg["gestor"]) if agg["gestor"] else None,
+                "comentarios_auto": _comentarios(agg["comentarios_auto"]),
+                "comentarios_gestor": _comentarios(agg["comentarios_gestor"]),
+            }
+            for agg in por_competencia.values()
+        ]
+        itens.sort(key=lambda c: (normalize_name(c["competencia"]), c["competencia"]))
+        resultado[grupo] = itens
+    return resultado
+
+
+class CompetenciasIndex:
+    """Linhas de notas_por_competencia agrupadas por login e por nome de um snapshot."""
+
+    def __init__(self, rows: List[Dict[str, Any]], version: Hashable = None):
+        self.version = version
+        self.rows = rows
+        self.by_login: Dict[str, List[int]] = {}
+        self.by_nome: Dict[str, List[int]] = {}
+        for i, r in enumerate(rows):
+            login = _login(r)
+            if login:
+                self.by_login.setdefault(login, []).append(i)
+            nome = _nome(r)
+            if nome:
+                self.by_nome.setdefault(nome, []).append(i)
+        self._cache: "OrderedDict[Tuple[str, str], Optional[Dict[str, Any]]]" = OrderedDict()
+
+    def linhas(self, login: Any = None, nome: Any = None) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        """Linhas da pessoa: por login e, se não houver, por nome normalizado."""
+        chave_login = str(login or "").strip().upper()
+        ids = self.by_login.get(chave_login) if chave_login else None
+        if ids:
+            return [self.rows[i] for i in ids], "login"
+        ids = self.by_nome.get(normalize_name(nome)) if nome else None
+        if ids:
+            return [self.rows[i] for i in ids], "nome"
+        return [], None
+
+    def para_pessoa(self, login: Any = None, nome: Any = None) -> Optional[Dict[str, Any]]:
+        """Agregação auto x gestor da pessoa; None se ela não tiver notas por competência."""
+        cache_key = (str(login or "").strip().upper(), normalize_name(nome))
+        if cache_key in self._cache:
+            self._cache.move_to_end(cache_key)
+            return self._cache[cache_key]
+        linhas, criterio = self.linhas(login, nome)
+        result = None
+        if linhas:
+            result = {"criterio": criterio, "registros": len(linhas), **agregar(linhas)}
+        self._cache[cache_key] = result
+        if len(self._cache) > MAX_CACHED_PESSOAS:
+            self._cache.popitem(last=False)
+        return result
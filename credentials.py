@@ -0,0 +1,209 @@
+"""
+Login sem consulta ao Supabase a cada tentativa.
+
+CredentialIndex mantém em memória as credenciais da tabela usuarios, com a senha guardada
+apenas como HMAC-SHA256 com sal próprio por usuário e chave aleatória do processo (nada é
+gravado em disco nem nos snapshots). A verificação compara os hashes em tempo constante,
+inclusive para nomes inexistentes.
+
+O índice é recarregado quando fica mais velho que LOGIN_CREDENTIALS_TTL e, para que usuários
+novos e senhas trocadas valham logo, também após uma falha, no máximo uma vez a cada
+LOGIN_REFRESH_MIN_INTERVAL segundos. A recarga é única mesmo com vários logins simultâneos
+e só reconstrói os hashes se o conteúdo da tabela mudou. Nomes inexistentes ficam num cache
+negativo por LOGIN_NEGATIVE_TTL segundos e não provocam novas recargas.
+
+LoginThrottle conta as falhas numa janela deslizante (LOGIN_FAILURE_WINDOW) por usuário
+e por IP; acima de LOGIN_MAX_FAILURES_USER / LOGIN_MAX_FAILURES_IP as tentativas são
+recusadas sem verificar a senha até a janela liberar.
+"""
+import asyncio
+import hashlib
+import hmac
+import logging
+import os
+import secrets
+import time
+from collections import OrderedDict, deque
+from typing import Any, Awaitable, Callable, Deque, Dict, Iterable, List, Mapping, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+CREDENTIALS_TTL = float(os.getenv("LOGIN_CREDENTIALS_TTL", "300"))
+REFRESH_MIN_INTERVAL = float(os.getenv("LOGIN_REFRESH_MIN_INTERVAL", "30"))
+NEGATIVE_TTL = float(os.getenv("LOGIN_NEGATIVE_TTL", "60"))
+FAILURE_WINDOW = float(os.getenv("LOGIN_FAILURE_WINDOW", "300"))
+MAX_FAILURES_USER = int(os.getenv("LOGIN_MAX_FAILURES_USER", "5"))
+MAX_FAILURES_IP = int(os.getenv("LOGIN_MAX_FAILURES_IP", "20"))
+# Proxies confiáveis na frente da API (o Render acrescenta o IP do cliente ao X-Forwarded-For)
+PROXY_HOPS = int(os.getenv("LOGIN_PROXY_HOPS", "1"))
+
+# Chaves acompanhadas pelo cache negativo e pelos contadores (as mais antigas saem primeiro)
+MAX_TRACKED_KEYS = 10000
+
+Loader = Callable[[], Awaitable[List[Dict[str, Any]]]]
+
+
+def client_ip(headers: Mapping[str, str], peer: Optional[str]) -> str:
+    """IP do cliente: entrada do X-Forwarded-For gravada pelo proxy confiável, senão o par TCP."""
+    forwarded = headers.get("x-forwarded-for") if PROXY_HOPS > 0 else None
+    if forwarded:
+        hops = [h.strip() for h in forwarded.split(",") if h.strip()]
+        if hops:
+            return hops[-min(PROXY_HOPS, len(hops))]
+    return peer or "desconhecido"
+
+
+class CredentialIndex:
+    """Hashes com sal das senhas de usuarios, por nome exato."""
+
+    def __init__(self, loader: Loader):
+        self._loader = loader
+        self._key = secrets.token_bytes(32)
+        self._entries: Dict[str, Tuple[bytes, bytes]] = {}
+        self._content_hash: Optional[str] = None
+        self._loaded_at: Optional[float] = None
+        self._lock = asyncio.Lock()
+        self._negative: "OrderedDict[str, float]" = OrderedDict()
+        # Verificação de nomes inexistentes: mesmo custo de um usuário real
+        self._dummy = (secrets.token_bytes(16), secrets.token_bytes(32))
+        self.loads = 0
+        self.rebuilds = 0
+
+    def _digest(self, salt: bytes, senha: str) -> bytes:
+        return hmac.new(self._key, salt + senha.encode("utf-8"), hashlib.sha256).digest()
+
+    def _build(self, rows: Iterable[Dict[str, Any]]) -> None:
+        entries: Dict[str, Tuple[bytes, bytes]] = {}
+        for r in rows:
+            nome, senha = r.get("nome"), r.get("senha")
+            if nome is None or senha is None:
+                continue
+            salt = secrets.token_bytes(16)
+            entries[str(nome)] = (salt, self._digest(salt, str(senha)))
+        self._entries = entries
+
+    async def _refresh(self, since: Optional[float]) -> None:
+        """Recarrega a tabela; com vários logins ao mesmo tempo só o primeiro busca."""
+        async with self._lock:
+            if self._loaded_at is not None and self._loaded_at != since:
+                # Outra tarefa recarregou enquanto esta esperava
+                return
+            rows = await self._loader()
+            pairs = sorted((str(r.get("nome")), str(r.get("senha"))) for r in rows)
+            content_hash = hashlib.sha256(repr(pairs).encode("utf-8")).hexdigest()
+            self.loads += 1
+            if content_hash != self._content_hash:
+                await asyncio.to_thread(self._build, rows)
+                self._content_hash = content_hash
+                self._negative.clear()
+                self.rebuilds += 1
+                logger.info(f"Índice de credenciais recarregado: {len(self._entries)} usuários")
+            self._loaded_at = time.monotonic()
+
+    def _check(self, nome: str, senha: str) -> Optional[bool]:
+        """True/False para um nome conhecido; None se o nome não existe."""
+        entry = self._entries.get(nome)
+        salt, expected = entry if entry is not None else self._dummy
+        ok = hmac.compare_digest(self._digest(salt, senha), expected)
+        return ok if entry is not None else None
+
+    def _negative_hit(self, nome: str, now: float) -> bool:
+        until = self._negative.get(nome)
+        if until is None:
+            return False
+        if until <= now:
+            del self._negative[nome]
+            return False
+        return True
+
+    async def verify(self, nome: str, senha: str) -> bool:
+        now = time.monotonic()
+        loaded_at = self._loaded_at
+        if loaded_at is None or now - loaded_at > CREDENTIALS_TTL:
+            await self._refresh(loaded_at)
+        elif self._negative_hit(nome, now):
+            self._check(nome, senha)
+            return False
+
+        result = self._check(nome, senha)
+        if not result and time.monotonic() - self._loaded_at >= REFRESH_MIN_INTERVAL:
+            # Usuário recém-criado ou senha trocada desde a última carga
+            await self._refresh(self._loaded_at)
+            result = self._check(nome, senha)
+        if result is None:
+            self._negative[nome] = time.monotonic() + NEGATIVE_TTL
+            self._negative.move_to_end(nome)
+            while len(self._negative) > MAX_TRACKED_KEYS:
+                self._negative.popitem(last=False)
+        return bool(result)
+
+    def invalidate(self) -> None:
+        """Força nova leitura de usuarios no próximo login."""
+        self._loaded_at = None
+        self._negative.clear()
+
+    def info(self) -> Dict[str, Any]:
+        return {
+            "users": len(self._entries),
+            "age_s": round(time.monotonic() - self._loaded_at, 1) if self._loaded_at is not None else None,
+            "loads": self.loads,
+            "rebuilds": self.rebuilds,
+            "negative_cached": len(self._negative),
+        }
+
+
+class LoginThrottle:
+    """Falhas de login por usuário e por IP numa janela deslizante."""
+
+    def __init__(
+        self,
+        max_user: int = MAX_FAILURES_USER,
+        max_ip: int = MAX_FAILURES_IP,
+        window: float = FAILURE_WINDOW,
+    ):
+        self._limits = {"user": max_user, "ip": max_ip}
+        self._window = window
+        self._failures: "OrderedDict[Tuple[str, str], Deque[float]]" = OrderedDict()
+        self.throttled = 0
+
+    def _recent(self, key: Tuple[str, str], now: float) -> Optional[Deque[float]]:
+        times = self._failures.get(key)
+        if times is None:
+            return None
+        while times and times[0] <= now - self._window:
+            times.popleft()
+        if not times:
+            del self._failures[key]
+            return None
+        return times
+
+    def retry_after(self, nome: str, ip: str) -> int:
+        """Segundos até a próxima tentativa ser aceita (0 = liberada)."""
+        now = time.monotonic()
+        wait = 0.0
+        for key in (("user", nome), ("ip", ip)):
+            limit = self._limits[key[0]]
+            times = self._recent(key, now)
+            if limit > 0 and times is not None and len(times) >= limit:
+                # Libera quando a falha que completou o limite sair da janela
+                wait = max(wait, times[-limit] + self._window - now)
+        if wait > 0:
+            self.throttled += 1
+        return int(wait) + 1 if wait > 0 else 0
+
+    def failure(self, nome: str, ip: str) -> None:
+        now = time.monotonic()
+        for key in (("user", nome), ("ip", ip)):
+            times = self._failures.get(key)
+            if times is None:
+                times = self._failures[key] = deque(maxlen=max(self._limits.values()))
+            times.append(now)
+            self._failures.move_to_end(key)
+        while len(self._failures) > MAX_TRACKED_KEYS:
+            self._failures.popitem(last=False)
+
+    def success(self, nome: str) -> None:
+        self._failures.pop(("user", nome), None)
+
+    def info(self) -> Dict[str, Any]:
+        return {"tracked": len(self._failures), "throttled": self.throttled}
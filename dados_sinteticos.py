@@ -0,0 +1,278 @@
+"""
+Gerador de dados sintéticos com o formato das tabelas do Supabase, para benchmarks e
+testes de carga sem acesso à base real.
+
+As colunas seguem o schema usado pela API (relacao_ativos, nota_final_colaborador,
+notas_por_competencia, nota_por_avaliacao, pessoas_avaliadas, mesa_calibracao...). Os
+nomes são únicos, com acentos, e se repetem entre as tabelas como na base real, para
+exercitar a normalização e os índices de identidade. A geração é determinística
+(mesma semente, mesmos dados).
+
+Uso:
+    python dados_sinteticos.py 50k --saida .cache/dados_50k
+"""
+import argparse
+import csv
+import logging
+import os
+import random
+from typing import Any, Dict, List
+
+from ninebox_engine import classificar_nota
+
+logger = logging.getLogger(__name__)
+
+# Tamanhos pré-definidos (quantidade de colaboradores)
+TAMANHOS = {"5k": 5_000, "50k": 50_000, "500k": 500_000}
+
+PRIMEIROS_NOMES = [
+    "ANA", "JOÃO", "MARIA", "JOSÉ", "ANTÔNIO", "FRANCISCO", "CARLOS", "PAULO", "LUCAS", "LUÍS",
+    "MARCOS", "GABRIEL", "RAFAEL", "DANIEL", "MÁRCIA", "FERNANDA", "PATRÍCIA", "JULIANA", "ADRIANA", "CLÁUDIA",
+    "VINÍCIUS", "ANDRÉ", "FÁBIO", "SÉRGIO", "BEATRIZ", "LETÍCIA", "CONCEIÇÃO", "INÊS", "CAIO", "RENATA",
+]
+SOBRENOMES = [
+    "SILVA", "SANTOS", "OLIVEIRA", "SOUZA", "RODRIGUES", "FERREIRA", "ALVES", "PEREIRA", "LIMA", "GOMES",
+    "COSTA", "RIBEIRO", "MARTINS", "CARVALHO", "ARAÚJO", "MELO", "BARBOSA", "ROCHA", "DIAS", "NASCIMENTO",
+    "ANDRADE", "MOREIRA", "NUNES", "MARQUES", "MACHADO", "MENDES", "FREITAS", "CARDOSO", "GONÇALVES", "CONCEIÇÃO",
+]
+
+DIRETORIAS = [
+    "DIRETORIA DE OPERAÇÕES", "DIRETORIA FINANCEIRA", "DIRETORIA COMERCIAL",
+    "DIRETORIA DE GESTÃO DE PESSOAS E COMUNICAÇÃO", "DIRETORIA DE ENGENHARIA",
+]
+GERENCIAS = ["OBRAS", "MANUTENCAO", "SUPRIMENTOS", "CONTROLADORIA", "PLANEJAMENTO", "QUALIDADE", "SEGURANÇA", "RH"]
+LOCALIDADES = ["SERRA", "IPATINGA", "OURO PRETO", "SÃO PAULO", "BELO HORIZONTE", "VITÓRIA"]
+CARGOS = ["AJUDANTE", "AUXILIAR DE OPERADOR", "ANALISTA", "TÉCNICO", "ENGENHEIRO", "SUPERVISOR", "COORDENADOR", "GERENTE"]
+ESCOLARIDADES = ["Ensino fundamental", "Ensino médio completo", "Superior completo", "Pós-graduação"]
+FORMULARIOS = ["Avaliação Administrativa", "Avaliação Operacional", "Avaliação de Liderança"]
+COMPETENCIAS_DESEMPENHO = ["Comunicação", "Trabalho em Equipe", "Foco em Resultados", "Segurança", "Qualidade"]
+COMPETENCIAS_POTENCIAL = ["Ambição e Motivação para Crescer", "Aprendizado", "Prontidão"]
+IDIOMAS = ["Inglês", "Espanhol", "Francês", "Alemão"]
+
+# Colaboradores por gestor
+PESSOAS_POR_GESTOR = 12
+
+
+def nome_sintetico(i: int) -> str:
+    """Nome único para o índice i (base 30 sobre primeiro nome e três sobrenomes)."""
+    partes = [PRIMEIROS_NOMES[i % 30]]
+    i //= 30
+    for _ in range(3):
+        partes.append(SOBRENOMES[i % 30])
+        i //= 30
+    if i:
+        partes.append(f"NETO {i}")
+    return " ".join(partes)
+
+
+def _nota(rng: random.Random) -> str:
+    # Notas gravadas como texto, concentradas na faixa intermediária
+    return f"{min(4.0, max(1.0, rng.gauss(3.0, 0.55))):.2f}"
+
+
+def _data(rng: random.Random, ano_min: int, ano_max: int) -> str:
+    return f"{rng.randint(1, 28):02d}/{rng.randint(1, 12):02d}/{rng.randint(ano_min, ano_max)}"
+
+
+def gerar(colaboradores: int, seed: int = 42, competencias_por_pessoa: int = 2) -> Dict[str, List[Dict[str, Any]]]:
+    """
+    Tabelas sintéticas para `colaboradores` pessoas. Cada pessoa recebe
+    `competencias_por_pessoa` competências de desempenho (auto + gestor) e uma de
+    potencial (só gestor) em notas_por_competencia.
+    """
+    rng = random.Random(seed)
+    n = colaboradores
+    gestores = max(1, n // PESSOAS_POR_GESTOR)
+    nomes = [nome_sintetico(i) for i in range(n)]
+
+    tabelas: Dict[str, List[Dict[str, Any]]] = {
+        "relacao_ativos": [],
+        "nota_final_colaborador": [],
+        "notas_por_competencia": [],
+        "nota_por_avaliacao": [],
+        "pessoas_avaliadas": [],
+        "mesa_calibracao": [],
+        "idiomas": [],
+        "colaborador_area_responsavel": [],
+        "movimentacao_salario": [],
+        "nota_avd_2024": [],
+        # Tabelas que a API consulta, sem linhas no conjunto sintético
+        "experiencias_profissionais": [],
+        "interesse_mudanca_area": [],
+        "desenvolvimento_colaborador": [],
+        "filtrogp": [],
+        "usuarios": [{"id": 1, "nome": "admin", "senha": "admin"}],
+    }
+    for i, nome in enumerate(nomes):
+        chapa = f"{100000 + i:09d}"
+        cpf = f"{10000000000 + i:011d}"
+        login = f"user{i:07d}"
+        diretoria = DIRETORIAS[i % len(DIRETORIAS)]
+        gerencia = GERENCIAS[(i // 3) % len(GERENCIAS)]
+        gestor_idx = (i // PESSOAS_POR_GESTOR) % gestores
+        gestor = nomes[gestor_idx]
+        formulario = FORMULARIOS[rng.randrange(len(FORMULARIOS))]
+
+        tabelas["relacao_ativos"].append({
+            "id": i + 1,
+            "registro": str(100000 + i),
+            "diretoria": diretoria,
+            "gerencia": gerencia,
+            "localidade": LOCALIDADES[i % len(LOCALIDADES)],
+            "c. custo": str(1000 + i % 400),
+            "chapa": chapa,
+            "codsecao": f"001.{i % 9:02d}.01.{1000 + i % 400}.00",
+            "unidade": f"UNIDADE {i % 25}",
+            "empresa": "REFRAMAX ENGENHARIA S.A",
+            "codcoligada": 2,
+            "nome": nome,
+            "cargo": CARGOS[rng.randrange(len(CARGOS))],
+            "admissao": _data(rng, 2005, 2024),
+            "cpf": cpf,
+            "corraca": rng.choice(["Branca", "Parda", "Preta", "Amarela"]),
+            "sexo": rng.choice(["Masculino", "Feminino"]),
+            "naturalidade": LOCALIDADES[rng.randrange(len(LOCALIDADES))].title(),
+            "dtnascimento": _data(rng, 1960, 2005),
+            "idade": rng.randint(19, 64),
+            "escolaridade": ESCOLARIDADES[rng.randrange(len(ESCOLARIDADES))],
+        })
+
+        nota_d, nota_p = _nota(rng), _nota(rng)
+        calibrado = rng.random() < 0.1
+        cal_d = _nota(rng) if calibrado else None
+        cal_p = _nota(rng) if calibrado else None
+        tabelas["nota_final_colaborador"].append({
+            "id": i + 1,
+            "área": gerencia,
+            "formulário": formulario,
+            "usuário_avaliado": nome,
+            "avaliado": nome,
+            "documento_de_identificação": cpf,
+            "login_do_avaliado": login,
+            "nota_final_desempenho": nota_d,
+            "classificação_final_desempenho": classificar_nota(nota_d),
+            "nota_final_potencial": nota_p,
+            "classificação_final_potencial": classificar_nota(nota_p),
+            "nota_calibrada_desempenho": cal_d,
+            "classificação_calibrada_desempenho": classificar_nota(cal_d),
+            "nota_calibrada_potencial": cal_p,
+            "classificação_calibrada_potencial": classificar_nota(cal_p),
+            "comentarios": "Calibração sintética" if calibrado else None,
+            "login_do_avaliador": f"user{gestor_idx:07d}",
+            "avaliador": gestor,
+        })
+
+        nota_auto = _nota(rng)
+        for tipo, avaliador, nota in (("Auto Avaliação", nome, nota_auto), ("Gestor", gestor, nota_d)):
+            tabelas["nota_por_avaliacao"].append({
+                "id": len(tabelas["nota_por_avaliacao"]) + 1,
+                "NOME": nome,
+                "Avaliador": avaliador,
+                "Tipo de Avaliador": tipo,
+                "Nota": float(nota),
+                "Classificação": classificar_nota(nota),
+            })
+
+        competencias = rng.sample(COMPETENCIAS_DESEMPENHO, min(competencias_por_pessoa, len(COMPETENCIAS_DESEMPENHO)))
+        avaliacoes = [(c, t) for c in competencias for t in ("Auto Avaliação", "Gestor")]
+        avaliacoes.append((COMPETENCIAS_POTENCIAL[i % len(COMPETENCIAS_POTENCIAL)], "Gestor"))
+        for competencia, tipo in avaliacoes:
+            tabelas["notas_por_competencia"].append({
+                "id": len(tabelas["notas_por_competencia"]) + 1,
+                "USER_LOGIN": login.upper(),
+                "NOME": nome,
+                "Tipo de Avaliador": tipo,
+                "Competência": competencia,
+                "Nota": rng.randint(1, 4),
+                "Comentário": "Comentário sintético" if rng.random() < 0.2 else None,
+            })
+
+        tabelas["pessoas_avaliadas"].append({
+            "id": i + 1,
+            "Usuário Avaliado": nome,
+            "Login": login,
+            "NOME": nome,
+            "Área": gerencia,
+            "Código do Formulário": f"F{FORMULARIOS.index(formulario) + 1}",
+            "Formulário": formulario,
+            "GESTOR Login": f"user{gestor_idx:07d}",
+            "GESTOR": gestor,
+            "Status do Avaliado": "Concluído",
+            "Avaliações Recebidas": 2,
+        })
+        tabelas["mesa_calibracao"].append({
+            "id": i + 1,
+            "NOME": nome,
+            "Líder": gestor,
+            "DIRETORIA": diretoria,
+            "Mesa": f"MESA {i % 40 + 1}",
+        })
+        if i % 5 == 0:
+            tabelas["idiomas"].append({
+                "id": len(tabelas["idiomas"]) + 1,
+                "USER_LOGIN": login.upper(),
+                "Nome": nome,
+                "Nome_Idioma": IDIOMAS[i % len(IDIOMAS)],
+                "Nível": rng.choice(["Básico", "Intermediário", "Avançado"]),
+            })
+        if i % 3 == 0:
+            tabelas["movimentacao_salario"].append({
+                "id": len(tabelas["movimentacao_salario"]) + 1,
+                "NOME": nome,
+                "DATAADMISSAO": tabelas["relacao_ativos"][-1]["admissao"],
+                "DTMUDANCA_SALARIO": _data(rng, 2020, 2025),
+                "MOTIVO_MUDANCA_SALARIO": rng.choice(["Mérito", "Promoção", "Dissídio"]),
+            })
+        if i % 2 == 0:
+            nota_2024 = _nota(rng)
+            tabelas["nota_avd_2024"].append({
+                "id": len(tabelas["nota_avd_2024"]) + 1,
+                "Avaliado": nome,
+                "Avaliador": gestor,
+                "Nota": float(nota_2024),
+                "Classificação": classificar_nota(nota_2024),
+            })
+        if i < gestores:
+            tabelas["colaborador_area_responsavel"].append({
+                "id": i + 1,
+                "USER_LOGIN": login.upper(),
+                "Nome": nome,
+                "Área": gerencia,
+            })
+    return tabelas
+
+
+def salvar_csv(tabelas: Dict[str, List[Dict[str, Any]]], pasta: str) -> List[str]:
+    """Grava uma <tabela>.csv (UTF-8, vírgula) por tabela; retorna os caminhos gravados."""
+    os.makedirs(pasta, exist_ok=True)
+    caminhos = []
+    for tabela, rows in tabelas.items():
+        colunas: Dict[str, None] = {}
+        for r in rows:
+            colunas.update(dict.fromkeys(r))
+        caminho = os.path.join(pasta, f"{tabela}.csv")
+        with open(caminho, "w", encoding="utf-8", newline="") as f:
+            writer = csv.DictWriter(f, fieldnames=list(colunas))
+            writer.writeheader()
+            writer.writerows(rows)
+        caminhos.append(caminho)
+    return caminhos
+
+
+def main() -> None:
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser(description="Gera tabelas sintéticas em CSV (uma por tabela)")
+    parser.add_argument("tamanho", help=f"Colaboradores: {', '.join(TAMANHOS)} ou um número")
+    parser.add_argument("--saida", required=True, help="Pasta de destino dos CSVs")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--competencias", type=int, default=2, help="Competências de desempenho por pessoa")
+    args = parser.parse_args()
+
+    colaboradores = TAMANHOS.get(args.tamanho) or int(args.tamanho)
+    tabelas = gerar(colaboradores, seed=args.seed, competencias_por_pessoa=args.competencias)
+    for caminho in salvar_csv(tabelas, args.saida):
+        logger.info(f"Gravado {caminho}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,392 @@
+"""
+Camada de acesso assíncrono ao Supabase (API REST do PostgREST).
+
+Substitui as chamadas síncronas (supabase-py / requests) feitas dentro dos handlers
+async, que bloqueavam o event loop do uvicorn. Um único httpx.AsyncClient com pool
+de conexões é compartilhado pela aplicação; cada chamada tem timeout próprio e o
+número de chamadas simultâneas ao Supabase é limitado por um semáforo.
+"""
+import asyncio
+import logging
+import os
+import random
+import re
+import time
+from typing import Any, Callable, Dict, Iterable, List, Mapping, Optional, Sequence, Tuple, Union
+
+import httpx
+
+logger = logging.getLogger(__name__)
+
+# Limite de linhas por requisição imposto pelo PostgREST do Supabase
+PAGE_SIZE = 1000
+
+# Chave única que ordena a leitura paginada de cada tabela (ver fetch_all): sem ORDER BY o
+# Postgres não garante a mesma ordem entre requisições e páginas paralelas repetiriam ou
+# pulariam linhas. relacao_ativos não tem id; a importação usa a CHAPA (restrição UNIQUE).
+DEFAULT_PAGE_KEY = "id"
+PAGE_KEYS: Dict[str, str] = {"relacao_ativos": "chapa"}
+
+DEFAULT_TIMEOUT = float(os.getenv("SUPABASE_TIMEOUT", "30"))
+DEFAULT_MAX_CONCURRENCY = int(os.getenv("SUPABASE_MAX_CONCURRENCY", "8"))
+# Novas tentativas para leituras (GET/HEAD) que falham por timeout, 429 ou erro 5xx
+DEFAULT_RETRIES = int(os.getenv("SUPABASE_RETRIES", "3"))
+DEFAULT_BACKOFF = float(os.getenv("SUPABASE_BACKOFF", "0.5"))
+
+_IDEMPOTENT_METHODS = {"GET", "HEAD"}
+
+Filters = Union[Mapping[str, str], Sequence[Tuple[str, str]], None]
+
+# Observador de cada chamada: (método, tabela, status, segundos, bytes, linhas)
+Observer = Callable[[str, str, int, float, int, Optional[int]], None]
+
+
+class SupabaseError(Exception):
+    """Erro retornado pelo Supabase (status HTTP >= 400) ou falha de comunicação."""
+
+    def __init__(self, message: str, status_code: int = 500):
+        super().__init__(message)
+        self.status_code = status_code
+
+    @property
+    def retryable(self) -> bool:
+        return self.status_code == 429 or self.status_code >= 500
+
+
+# ===== Helpers de filtro (sintaxe PostgREST) =====
+def _quote(value: Any) -> str:
+    text = str(value)
+    if any(c in text for c in ',()"\\ ') or text == "":
+        return '"' + text.replace("\\", "\\\\").replace('"', '\\"') + '"'
+    return text
+
+
+def eq(value: Any) -> str:
+    return f"eq.{value}"
+
+
+def ilike(value: Any) -> str:
+    return f"ilike.{value}"
+
+
+def escape_like(value: Any) -> str:
+    """Escapa curingas de LIKE (%, _) para comparar o texto literalmente com ilike."""
+    return re.sub(r"([\\%_])", r"\\\1", str(value))
+
+
+def in_(values: Iterable[Any]) -> str:
+    return "in.(" + ",".join(_quote(v) for v in values) + ")"
+
+
+def _params(filters: Filters) -> List[Tuple[str, str]]:
+    if not filters:
+        return []
+    if isinstance(filters, Mapping):
+        return list(filters.items())
+    return list(filters)
+
+
+def parse_content_range(value: Optional[str]) -> Optional[int]:
+    """Extrai o total de um cabeçalho Content-Range ('0-999/5384' ou '*/0')."""
+    if not value or "/" not in value:
+        return None
+    total = value.rsplit("/", 1)[1]
+    return int(total) if total.isdigit() else None
+
+
+def range_rows(value: Optional[str]) -> Optional[int]:
+    """Quantidade de linhas do intervalo de um Content-Range ('0-999/5384' -> 1000; '*/0' -> 0)."""
+    if not value:
+        return None
+    interval = value.split("/", 1)[0].strip()
+    if interval == "*":
+        return 0
+    start, _, end = interval.partition("-")
+    if not (start.isdigit() and end.isdigit()):
+        return None
+    return int(end) - int(start) + 1
+
+
+def page_key(table: str) -> str:
+    """Coluna única usada para ordenar a leitura paginada da tabela."""
+    return PAGE_KEYS.get(table, DEFAULT_PAGE_KEY)
+
+
+def plan_ranges(start: int, total: int, page_size: int) -> List[Tuple[int, int]]:
+    """Divide [start, total) em intervalos inclusivos de até page_size linhas."""
+    return [(s, min(s + page_size, total) - 1) for s in range(start, total, page_size)]
+
+
+class SupabaseREST:
+    """Cliente assíncrono compartilhado para as tabelas do Supabase."""
+
+    def __init__(
+        self,
+        url: str,
+        key: str,
+        verify: bool = True,
+        timeout: float = DEFAULT_TIMEOUT,
+        max_concurrency: int = DEFAULT_MAX_CONCURRENCY,
+        retries: int = DEFAULT_RETRIES,
+        backoff: float = DEFAULT_BACKOFF,
+        transport: Optional[httpx.AsyncBaseTransport] = None,
+        observer: Optional[Observer] = None,
+    ):
+        self.base_url = f"{url.rstrip('/')}/rest/v1"
+        self._key = key
+        self._verify = verify
+        self._timeout = timeout
+        self._max_concurrency = max_concurrency
+        self._retries = retries
+        self._backoff = backoff
+        self._transport = transport
+        self._observer = observer
+        self._client: Optional[httpx.AsyncClient] = None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        # Criado sob demanda para ficar ligado ao event loop em execução
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(
+                base_url=self.base_url,
+                headers={
+                    "apikey": self._key,
+                    "Authorization": f"Bearer {self._key}",
+                    "Content-Type": "application/json",
+                },
+                timeout=httpx.Timeout(self._timeout),
+                limits=httpx.Limits(
+                    max_connections=self._max_concurrency * 2,
+                    max_keepalive_connections=self._max_concurrency,
+                ),
+                verify=self._verify,
+                transport=self._transport,
+            )
+        return self._client
+
+    @property
+    def semaphore(self) -> asyncio.Semaphore:
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self._max_concurrency)
+        return self._semaphore
+
+    async def aclose(self) -> None:
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    async def request(
+        self,
+        method: str,
+        table: str,
+        params: Filters = None,
+        json: Any = None,
+        headers: Optional[Dict[str, str]] = None,
+        timeout: Optional[float] = None,
+    ) -> httpx.Response:
+        """
+        Executa uma chamada ao PostgREST respeitando o limite de concorrência.
+        Leituras são repetidas com backoff exponencial (com jitter) em falhas transitórias.
+        """
+        attempts = 1 + (self._retries if method.upper() in _IDEMPOTENT_METHODS else 0)
+        for attempt in range(1, attempts + 1):
+            try:
+                return await self._request_once(method, table, params, json, headers, timeout)
+            except SupabaseError as e:
+                if attempt >= attempts or not e.retryable:
+                    raise
+                delay = self._backoff * (2 ** (attempt - 1)) * (0.5 + random.random())
+                logger.warning(
+                    f"Falha transitória em {method} {table} (tentativa {attempt}/{attempts}): {e}. "
+                    f"Nova tentativa em {delay:.2f}s"
+                )
+                await asyncio.sleep(delay)
+        raise AssertionError("unreachable")
+
+    async def _request_once(
+        self,
+        method: str,
+        table: str,
+        params: Filters,
+        json: Any,
+        headers: Optional[Dict[str, str]],
+        timeout: Optional[float],
+    ) -> httpx.Response:
+        async with self.semaphore:
+            start = time.perf_counter()
+            try:
+                resp = await self.client.request(
+                    method,
+                    f"/{table}",
+                    params=_params(params),
+                    json=json,
+                    headers=headers,
+                    timeout=timeout if timeout is not None else httpx.USE_CLIENT_DEFAULT,
+                )
+            except httpx.TimeoutException as e:
+                self._observe(method, table, 504, start, None)
+                raise SupabaseError(f"Timeout ao consultar {table}: {e}", status_code=504) from e
+            except httpx.HTTPError as e:
+                self._observe(method, table, 502, start, None)
+                raise SupabaseError(f"Falha de comunicação com o Supabase ({table}): {e}", status_code=502) from e
+            self._observe(method, table, resp.status_code, start, resp)
+        if resp.status_code >= 400:
+            logger.error(f"Supabase {method} {table}: {resp.status_code} - {resp.text[:500]}")
+            raise SupabaseError(f"{resp.status_code}: {resp.text}", status_code=resp.status_code)
+        return resp
+
+    def _observe(self, method: str, table: str, status: int, start: float, resp: Optional[httpx.Response]) -> None:
+        if self._observer is None:
+            return
+        elapsed = time.perf_counter() - start
+        nbytes, rows = 0, None
+        if resp is not None:
+            nbytes = len(resp.content)
+            rows = range_rows(resp.headers.get("content-range"))
+        try:
+            self._observer(method.upper(), table, status, elapsed, nbytes, rows)
+        except Exception as e:
+            logger.warning(f"Falha ao registrar métricas de {method} {table}: {e}")
+
+    # ===== Leitura =====
+    async def select(
+        self,
+        table: str,
+        columns: str = "*",
+        filters: Filters = None,
+        order: Optional[str] = None,
+        limit: Optional[int] = None,
+        offset: Optional[int] = None,
+        timeout: Optional[float] = None,
+    ) -> List[Dict[str, Any]]:
+        """SELECT simples: filtros no formato PostgREST (ex.: {"id": eq(5)}), order 'coluna.desc'."""
+        params = [("select", columns)] + _params(filters)
+        if order:
+            params.append(("order", order))
+        if limit is not None:
+            params.append(("limit", str(limit)))
+        if offset:
+            params.append(("offset", str(offset)))
+        resp = await self.request("GET", table, params=params, timeout=timeout)
+        return resp.json() or []
+
+    async def count(self, table: str, filters: Filters = None) -> int:
+        """Total de linhas (Prefer: count=exact) sem transferir os dados."""
+        params = [("select", "*")] + _params(filters)
+        resp = await self.request("HEAD", table, params=params, headers={"Prefer": "count=exact"})
+        total = parse_content_range(resp.headers.get("content-range"))
+        if total is None:
+            raise SupabaseError(f"Supabase não retornou a contagem de {table}")
+        return total
+
+    async def fetch_range(
+        self,
+        table: str,
+        start: int,
+        end: int,
+        columns: str = "*",
+        filters: Filters = None,
+        order: Optional[str] = None,
+        count: bool = False,
+    ) -> Tuple[List[Dict[str, Any]], Optional[int]]:
+        """Busca o intervalo [start, end] via cabeçalho Range; devolve (linhas, total se count=True)."""
+        params = [("select", columns)] + _params(filters)
+        if order:
+            params.append(("order", order))
+        headers = {"Range-Unit": "items", "Range": f"{start}-{end}"}
+        if count:
+            headers["Prefer"] = "count=exact"
+        resp = await self.request("GET", table, params=params, headers=headers)
+        total = parse_content_range(resp.headers.get("content-range")) if count else None
+        return resp.json() or [], total
+
+    async def fetch_pages(
+        self,
+        table: str,
+        ranges: Sequence[Tuple[int, int]],
+        columns: str = "*",
+        filters: Filters = None,
+        order: Optional[str] = None,
+        max_workers: Optional[int] = None,
+    ) -> List[Dict[str, Any]]:
+        """
+        Busca vários intervalos em paralelo e concatena na ordem dos intervalos.
+        max_workers limita quantas páginas desta chamada ficam em voo ao mesmo tempo
+        (além do limite global de concorrência do cliente).
+        """
+        workers = asyncio.Semaphore(max_workers) if max_workers else None
+
+        async def _fetch(start: int, end: int):
+            if workers is None:
+                return await self.fetch_range(table, start, end, columns=columns, filters=filters, order=order)
+            async with workers:
+                return await self.fetch_range(table, start, end, columns=columns, filters=filters, order=order)
+
+        pages = await asyncio.gather(*[_fetch(start, end) for start, end in ranges])
+        rows: List[Dict[str, Any]] = []
+        for page, _ in pages:
+            rows.extend(page)
+        return rows
+
+    async def fetch_all(
+        self,
+        table: str,
+        columns: str = "*",
+        filters: Filters = None,
+        order: Optional[str] = None,
+        page_size: int = PAGE_SIZE,
+        max_workers: Optional[int] = None,
+        key: Optional[str] = None,
+    ) -> List[Dict[str, Any]]:
+        """
+        Busca a tabela inteira: a primeira página vem com a contagem exata (Prefer: count=exact),
+        todos os intervalos restantes são planejados a partir do total e solicitados em paralelo.
+        key (coluna única, ex.: page_key(table)) entra por último no order de todas as páginas,
+        para que os intervalos não se sobreponham nem deixem buracos.
+        """
+        if key:
+            order = f"{order},{key}.asc" if order else f"{key}.asc"
+        first, total = await self.fetch_range(
+            table, 0, page_size - 1, columns=columns, filters=filters, order=order, count=True
+        )
+        if total is None or total <= len(first) or not first:
+            return first
+        if not order:
+            logger.warning(f"{table}: leitura em {total} linhas sem ordem estável (informe key)")
+        # Se o servidor limitar o tamanho da página (max-rows), planejar com o tamanho efetivo
+        step = min(page_size, len(first))
+        ranges = plan_ranges(len(first), total, step)
+        rest = await self.fetch_pages(
+            table, ranges, columns=columns, filters=filters, order=order, max_workers=max_workers
+        )
+        return first + rest
+
+    # ===== Escrita =====
+    async def insert(
+        self,
+        table: str,
+        rows: Union[Dict[str, Any], List[Dict[str, Any]]],
+        upsert: bool = False,
+        on_conflict: Optional[str] = None,
+        returning: bool = True,
+    ) -> List[Dict[str, Any]]:
+        prefer = ["return=representation" if returning else "return=minimal"]
+        if upsert:
+            prefer.append("resolution=merge-duplicates")
+        params = [("on_conflict", on_conflict)] if on_conflict else None
+        resp = await self.request("POST", table, params=params, json=rows, headers={"Prefer": ",".join(prefer)})
+        return resp.json() if returning and resp.content else []
+
+    async def update(self, table: str, values: Dict[str, Any], filters: Filters) -> List[Dict[str, Any]]:
+        if not filters:
+            raise ValueError("update sem filtros alteraria a tabela inteira")
+        resp = await self.request(
+            "PATCH", table, params=filters, json=values, headers={"Prefer": "return=representation"}
+        )
+        return resp.json() if resp.content else []
+
+    async def delete(self, table: str, filters: Filters) -> None:
+        if not filters:
+            raise ValueError("delete sem filtros apagaria a tabela inteira")
+        await self.request("DELETE", table, params=filters, headers={"Prefer": "return=minimal"})
@@ -0,0 +1,208 @@
+"""
+Análise de discrepâncias entre autoavaliação e avaliação do gestor
+(mesmo resultado de analise_discrepancias_resultado.csv).
+
+nota_por_avaliacao é percorrida uma única vez: para cada pessoa ficam a primeira nota de
+autoavaliação e a primeira do gestor (como o getAvaliacoesByName do app.js). Os pares são
+calculados uma vez por versão dos snapshots e ordenados pela diferença absoluta; cada
+requisição só aplica limiar, filtros e top-N e agrega a distribuição por diretoria ou gestor.
+"""
+import csv
+import io
+from bisect import bisect_right
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Dict, Hashable, Iterator, List, Optional, Tuple
+
+from identity_index import IdentityIndex, normalize_name
+from ninebox_engine import classificar_nota, to_float
+
+TIPOS_AUTO = {"AUTO AVALIACAO", "AUTOAVALIACAO", "AUTO"}
+TIPO_GESTOR = "GESTOR"
+
+AGRUPAMENTOS = ("diretoria", "gestor")
+
+# Colunas de analise_discrepancias_resultado.csv (+ Diretoria)
+CSV_COLUMNS: List[Tuple[str, str]] = [
+    ("nome", "NOME"),
+    ("nota_auto", "Nota_AutoAvaliacao"),
+    ("classificacao_auto", "Classificacao_Auto"),
+    ("nota_gestor", "Nota_Gestor"),
+    ("gestor", "Nome_Gestor"),
+    ("classificacao_gestor", "Classificacao_Gestor"),
+    ("diferenca", "Diferenca"),
+    ("diferenca_absoluta", "Diferenca_Absoluta"),
+    ("diretoria", "Diretoria"),
+]
+
+# Combinações de filtros guardadas por análise
+MAX_CACHED_QUERIES = 128
+
+SEM_GRUPO = "(não informado)"
+
+
+@dataclass
+class _Avaliacao:
+    nota: float
+    classificacao: Optional[str]
+    avaliador: str
+
+
+def _avaliacao(row: Dict[str, Any]) -> Optional[_Avaliacao]:
+    nota = to_float(row.get("Nota"))
+    if nota is None:
+        return None
+    classificacao = row.get("Classificação") or classificar_nota(nota)
+    return _Avaliacao(nota, classificacao, str(row.get("Avaliador") or "").strip())
+
+
+def build_pares(rows: List[Dict[str, Any]], identity: Optional[IdentityIndex] = None) -> List[Dict[str, Any]]:
+    """
+    Pares autoavaliação x gestor por pessoa (uma passada em nota_por_avaliacao),
+    ordenados pela diferença absoluta decrescente. Diferença = auto - gestor.
+    """
+    nomes: Dict[str, str] = {}
+    auto: Dict[str, _Avaliacao] = {}
+    gestor: Dict[str, _Avaliacao] = {}
+    for row in rows:
+        nome = str(row.get("NOME") or "").strip()
+        chave = normalize_name(nome)
+        if not chave:
+            continue
+        tipo = normalize_name(row.get("Tipo de Avaliador"))
+        if tipo in TIPOS_AUTO:
+            destino = auto
+        elif tipo == TIPO_GESTOR:
+            destino = gestor
+        else:
+            continue
+        if chave in destino:
+            continue
+        avaliacao = _avaliacao(row)
+        if avaliacao is None:
+            continue
+        destino[chave] = avaliacao
+        nomes.setdefault(chave, nome)
+
+    pares: List[Dict[str, Any]] = []
+    for chave, a in auto.items():
+        g = gestor.get(chave)
+        if g is None:
+            continue
+        diretoria = None
+        if identity is not None:
+            ativo, _ = identity.resolve(nome=nomes[chave], fuzzy=False)
+            if ativo is not None:
+                diretoria = ativo.get("diretoria") or ativo.get("DIRETORIA")
+        diferenca = round(a.nota - g.nota, 2)
+        pares.append({
+            "nome": nomes[chave],
+            "nota_auto": a.nota,
+            "classificacao_auto": a.classificacao,
+            "nota_gestor": g.nota,
+            "gestor": g.avaliador,
+            "classificacao_gestor": g.classificacao,
+            "diferenca": diferenca,
+            "diferenca_absoluta": abs(diferenca),
+            "diretoria": diretoria,
+        })
+    pares.sort(key=lambda p: p["diferenca_absoluta"], reverse=True)
+    return pares
+
+
+def _distribuicao(pares: List[Dict[str, Any]], limiar: float) -> Dict[str, Any]:
+    n = len(pares)
+    if not n:
+        return {"count": 0}
+    difs = [p["diferenca"] for p in pares]
+    absolutas = [p["diferenca_absoluta"] for p in pares]
+    return {
+        "count": n,
+        "media_diferenca": round(sum(difs) / n, 4),
+        "media_absoluta": round(sum(absolutas) / n, 4),
+        "max_absoluta": max(absolutas),
+        "auto_acima": sum(1 for d in difs if d > 0),
+        "gestor_acima": sum(1 for d in difs if d < 0),
+        "iguais": sum(1 for d in difs if d == 0),
+        "acima_limiar": sum(1 for d in absolutas if d >= limiar),
+    }
+
+
+class DiscrepanciasAnalise:
+    """Pares de um snapshot de nota_por_avaliacao, com consultas guardadas por filtros."""
+
+    def __init__(self, pares: List[Dict[str, Any]], version: Hashable = None):
+        self.version = version
+        self.pares = pares
+        # Diferenças absolutas negadas (crescentes) para achar o limiar por busca binária
+        self._chaves = [-p["diferenca_absoluta"] for p in pares]
+        self._cache: "OrderedDict[Tuple, Dict[str, Any]]" = OrderedDict()
+
+    def filtrar(
+        self,
+        limiar: float = 0.0,
+        diretoria: Optional[str] = None,
+        gestor: Optional[str] = None,
+    ) -> List[Dict[str, Any]]:
+        """Pares com |diferença| >= limiar (já em ordem decrescente), filtrados por diretoria/gestor."""
+        pares = self.pares[:bisect_right(self._chaves, -limiar)] if limiar > 0 else self.pares
+        if diretoria:
+            pares = [p for p in pares if p["diretoria"] == diretoria]
+        if gestor:
+            alvo = normalize_name(gestor)
+            pares = [p for p in pares if normalize_name(p["gestor"]) == alvo]
+        return pares
+
+    def resumo(
+        self,
+        limiar: float = 0.0,
+        top: Optional[int] = None,
+        diretoria: Optional[str] = None,
+        gestor: Optional[str] = None,
+        agrupar: str = "diretoria",
+    ) -> Dict[str, Any]:
+        if agrupar not in AGRUPAMENTOS:
+            raise ValueError(f"Agrupamento inválido: {agrupar}. Disponíveis: {', '.join(AGRUPAMENTOS)}")
+        cache_key = (limiar, top, diretoria, gestor, agrupar)
+        cached = self._cache.get(cache_key)
+        if cached is not None:
+            self._cache.move_to_end(cache_key)
+            return cached
+
+        # Distribuição sobre todos os pares dos filtros; o limiar só restringe a lista
+        base = self.filtrar(0.0, diretoria=diretoria, gestor=gestor)
+        grupos: Dict[str, List[Dict[str, Any]]] = {}
+        for p in base:
+            grupos.setdefault(p[agrupar] or SEM_GRUPO, []).append(p)
+        selecionados = self.filtrar(limiar, diretoria=diretoria, gestor=gestor)
+        result = {
+            "total": len(selecionados),
+            "total_pares": len(base),
+            "limiar": limiar,
+            "geral": _distribuicao(base, limiar),
+            "agrupamento": agrupar,
+            "distribuicao": {
+                grupo: _distribuicao(pares, limiar)
+                for grupo, pares in sorted(grupos.items(), key=lambda kv: (-len(kv[1]), kv[0]))
+            },
+            "data": selecionados if top is None else selecionados[:top],
+        }
+        self._cache[cache_key] = result
+        if len(self._cache) > MAX_CACHED_QUERIES:
+            self._cache.popitem(last=False)
+        return result
+
+
+def iter_csv(pares: List[Dict[str, Any]], batch_rows: int = 500) -> Iterator[str]:
+    """Pares no layout de analise_discrepancias_resultado.csv (';' com BOM)."""
+    buffer = io.StringIO()
+    buffer.write("\ufeff")
+    writer = csv.writer(buffer, delimiter=";", lineterminator="\r\n")
+    writer.writerow([h for _, h in CSV_COLUMNS])
+    for i, par in enumerate(pares, 1):
+        writer.writerow(["" if par.get(k) is None else par.get(k) for k, _ in CSV_COLUMNS])
+        if i % batch_rows == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue()
@@ -0,0 +1,157 @@
+"""
+Exportação do resultado calibrado (equivalente ao exportModifiedCSV do app.js).
+
+Cada linha de nota_final_colaborador é combinada com as notas efetivas e o quadrante
+calculados pelo ninebox_engine e com os dados do colaborador em relacao_ativos
+(via IdentityIndex, só por chaves exatas: CPF, login ou nome normalizado; sem
+correspondência as colunas ficam vazias). As linhas são geradas uma a uma e serializadas em blocos, em CSV
+(';' com BOM, como analise_discrepancias_resultado.csv) ou NDJSON, sem montar o arquivo
+inteiro em memória.
+"""
+import csv
+import io
+import json
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+from identity_index import IdentityIndex
+from ninebox_engine import NineBoxColumns
+
+FORMATOS = ("csv", "ndjson")
+
+# Linhas serializadas por bloco enviado
+EXPORT_BATCH_ROWS = 500
+
+# (chave no NDJSON, cabeçalho no CSV)
+EXPORT_COLUMNS: List[Tuple[str, str]] = [
+    ("id", "ID"),
+    ("area", "Área"),
+    ("formulario", "Formulário"),
+    ("usuario_avaliado", "Usuário Avaliado"),
+    ("login_do_avaliado", "Login do Avaliado"),
+    ("avaliador", "Avaliador"),
+    ("nota_final_desempenho", "Nota Final Desempenho"),
+    ("classificacao_final_desempenho", "Classificação Final Desempenho"),
+    ("nota_final_potencial", "Nota Final Potencial"),
+    ("classificacao_final_potencial", "Classificação Final Potencial"),
+    ("nota_calibrada_desempenho", "Nota Calibrada Desempenho"),
+    ("nota_calibrada_potencial", "Nota Calibrada Potencial"),
+    ("comentarios", "Comentários"),
+    ("calibrado", "Calibrado"),
+    ("nota_desempenho", "Nota Efetiva Desempenho"),
+    ("classificacao_desempenho", "Classificação Efetiva Desempenho"),
+    ("nota_potencial", "Nota Efetiva Potencial"),
+    ("classificacao_potencial", "Classificação Efetiva Potencial"),
+    ("quadrante", "Quadrante"),
+    ("chapa", "Chapa"),
+    ("cpf", "CPF"),
+    ("cargo", "Cargo"),
+    ("diretoria", "Diretoria"),
+    ("gerencia", "Gerência"),
+    ("localidade", "Localidade"),
+]
+
+# Colunas copiadas de relacao_ativos (minúsculas no Supabase, maiúsculas no CSV do RH)
+_ATIVOS_COLUMNS = ("chapa", "cpf", "cargo", "diretoria", "gerencia", "localidade")
+
+
+def _ativo(row: Optional[Dict[str, Any]], col: str) -> Any:
+    if row is None:
+        return None
+    v = row.get(col)
+    return v if v is not None else row.get(col.upper())
+
+
+def iter_registros(
+    cols: NineBoxColumns,
+    indices: Iterable[int],
+    identity: IdentityIndex,
+) -> Iterator[Dict[str, Any]]:
+    """Uma linha exportada por avaliação, na ordem dos índices."""
+    for i in indices:
+        row = cols.rows[i]
+        ativo, _ = identity.resolve(
+            nome=cols.nome[i],
+            cpf=row.get("documento_de_identificação"),
+            login=row.get("login_do_avaliado"),
+            # Sem correspondência exata as colunas de relacao_ativos ficam vazias
+            fuzzy=False,
+        )
+        registro = {
+            "id": row.get("id"),
+            "area": cols.area[i],
+            "formulario": cols.formulario[i],
+            "usuario_avaliado": cols.nome[i],
+            "login_do_avaliado": row.get("login_do_avaliado"),
+            "avaliador": cols.avaliador[i],
+            "nota_final_desempenho": row.get("nota_final_desempenho"),
+            "classificacao_final_desempenho": row.get("classificação_final_desempenho"),
+            "nota_final_potencial": row.get("nota_final_potencial"),
+            "classificacao_final_potencial": row.get("classificação_final_potencial"),
+            "nota_calibrada_desempenho": row.get("nota_calibrada_desempenho"),
+            "nota_calibrada_potencial": row.get("nota_calibrada_potencial"),
+            "comentarios": row.get("comentarios"),
+            "calibrado": cols.calibrado[i],
+            "nota_desempenho": cols.desempenho[i],
+            "classificacao_desempenho": cols.classif_desempenho[i],
+            "nota_potencial": cols.potencial[i],
+            "classificacao_potencial": cols.classif_potencial[i],
+            "quadrante": cols.posicao[i],
+        }
+        for col in _ATIVOS_COLUMNS:
+            registro[col] = _ativo(ativo, col)
+        yield registro
+
+
+def _csv_value(value: Any) -> Any:
+    if value is None:
+        return ""
+    if isinstance(value, bool):
+        return "Sim" if value else "Não"
+    return value
+
+
+def iter_csv(registros: Iterable[Dict[str, Any]], batch_rows: int = EXPORT_BATCH_ROWS) -> Iterator[str]:
+    """CSV separado por ';' com BOM; cada bloco traz até batch_rows linhas."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, delimiter=";", lineterminator="\r\n")
+    keys = [k for k, _ in EXPORT_COLUMNS]
+    writer.writerow([h for _, h in EXPORT_COLUMNS])
+    pendentes = 0
+    first = True
+    for registro in registros:
+        writer.writerow([_csv_value(registro.get(k)) for k in keys])
+        pendentes += 1
+        if pendentes >= batch_rows:
+            yield ("\ufeff" if first else "") + buffer.getvalue()
+            first = False
+            buffer.seek(0)
+            buffer.truncate()
+            pendentes = 0
+    yield ("\ufeff" if first else "") + buffer.getvalue()
+
+
+def iter_ndjson(registros: Iterable[Dict[str, Any]], batch_rows: int = EXPORT_BATCH_ROWS) -> Iterator[str]:
+    """Um objeto JSON por linha; cada bloco traz até batch_rows linhas."""
+    linhas: List[str] = []
+    for registro in registros:
+        linhas.append(json.dumps(registro, ensure_ascii=False, default=str))
+        if len(linhas) >= batch_rows:
+            yield "\n".join(linhas) + "\n"
+            linhas.clear()
+    if linhas:
+        yield "\n".join(linhas) + "\n"
+
+
+def iter_export(
+    formato: str,
+    cols: NineBoxColumns,
+    indices: Sequence[int],
+    identity: IdentityIndex,
+    batch_rows: int = EXPORT_BATCH_ROWS,
+) -> Iterator[str]:
+    if formato not in FORMATOS:
+        raise ValueError(f"Formato inválido: {formato}. Disponíveis: {', '.join(FORMATOS)}")
+    registros = iter_registros(cols, indices, identity)
+    if formato == "csv":
+        return iter_csv(registros, batch_rows)
+    return iter_ndjson(registros, batch_rows)
@@ -0,0 +1,136 @@
+"""
+Índice de facetas para /api/filtros.
+
+Para cada snapshot de tabela, os valores distintos de cada dimensão de filtro e suas
+contagens são calculados uma única vez, junto com listas invertidas (valor -> linhas).
+Sem filtros a resposta já está pronta; com filtros (facetas dependentes, ex.: gerências
+de uma diretoria) as contagens de cada dimensão consideram os filtros das demais
+dimensões, e o resultado fica guardado para as próximas chamadas iguais.
+"""
+import logging
+from collections import Counter, OrderedDict
+from typing import Any, Dict, Hashable, Iterable, List, Optional, Set, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Tabela -> {chave na resposta: coluna}
+FACETS: Dict[str, Dict[str, str]] = {
+    "nota_final_colaborador": {"areas": "área", "formularios": "formulário"},
+    "relacao_ativos": {"diretorias": "diretoria", "gerencias": "gerencia", "cargos": "cargo"},
+}
+
+# Parâmetro da requisição -> (tabela, chave da faceta)
+FACET_PARAMS: Dict[str, Tuple[str, str]] = {
+    "area": ("nota_final_colaborador", "areas"),
+    "formulario": ("nota_final_colaborador", "formularios"),
+    "diretoria": ("relacao_ativos", "diretorias"),
+    "gerencia": ("relacao_ativos", "gerencias"),
+    "cargo": ("relacao_ativos", "cargos"),
+}
+
+# Combinações de filtros guardadas por índice
+MAX_CACHED_SELECTIONS = 256
+
+Counts = Dict[str, int]
+
+
+def _sorted_counts(counter: Dict[str, int]) -> Counts:
+    return {value: counter[value] for value in sorted(counter)}
+
+
+class FacetIndex:
+    """Valores distintos e contagens das dimensões de uma tabela em um snapshot."""
+
+    def __init__(self, dims: Dict[str, str], rows: List[Dict[str, Any]], version: Hashable = None):
+        self.version = version
+        self.dims = dims
+        self.size = len(rows)
+        # Valor de cada dimensão por linha e listas invertidas valor -> índices das linhas
+        self.columns: Dict[str, List[Optional[str]]] = {}
+        self.postings: Dict[str, Dict[str, List[int]]] = {}
+        for key, col in dims.items():
+            values: List[Optional[str]] = []
+            postings: Dict[str, List[int]] = {}
+            for i, row in enumerate(rows):
+                v = row.get(col)
+                v = str(v) if v is not None and v != "" else None
+                values.append(v)
+                if v is not None:
+                    postings.setdefault(v, []).append(i)
+            self.columns[key] = values
+            self.postings[key] = postings
+        self.base: Dict[str, Counts] = {
+            key: _sorted_counts({v: len(ids) for v, ids in postings.items()})
+            for key, postings in self.postings.items()
+        }
+        self._cache: "OrderedDict[Tuple, Dict[str, Counts]]" = OrderedDict()
+
+    def _matching(self, selected: Dict[str, List[str]]) -> Set[int]:
+        rows: Optional[Set[int]] = None
+        # Dimensão mais seletiva primeiro
+        for key, values in sorted(selected.items(), key=lambda kv: sum(len(self.postings[kv[0]].get(v, ())) for v in kv[1])):
+            ids: Set[int] = set()
+            for v in values:
+                ids.update(self.postings[key].get(v, ()))
+            rows = ids if rows is None else rows & ids
+            if not rows:
+                return set()
+        return rows if rows is not None else set(range(self.size))
+
+    def facets(self, selected: Optional[Dict[str, List[str]]] = None) -> Dict[str, Counts]:
+        """
+        Contagens por dimensão. Cada dimensão é contada com os filtros das outras dimensões
+        (a própria seleção não esconde as alternativas da mesma dimensão).
+        """
+        selected = {k: sorted(set(v)) for k, v in (selected or {}).items() if k in self.dims and v}
+        if not selected:
+            return self.base
+        cache_key = tuple(sorted((k, tuple(v)) for k, v in selected.items()))
+        cached = self._cache.get(cache_key)
+        if cached is not None:
+            self._cache.move_to_end(cache_key)
+            return cached
+
+        result: Dict[str, Counts] = {}
+        for key in self.dims:
+            others = {k: v for k, v in selected.items() if k != key}
+            if not others:
+                result[key] = self.base[key]
+                continue
+            column = self.columns[key]
+            counter = Counter(column[i] for i in self._matching(others))
+            counter.pop(None, None)
+            result[key] = _sorted_counts(counter)
+
+        self._cache[cache_key] = result
+        if len(self._cache) > MAX_CACHED_SELECTIONS:
+            self._cache.popitem(last=False)
+        return result
+
+
+class FacetRegistry:
+    """Mantém um FacetIndex por tabela, reconstruído quando o snapshot muda de versão."""
+
+    def __init__(self, facets: Optional[Dict[str, Dict[str, str]]] = None):
+        self._facets = FACETS if facets is None else facets
+        self._indexes: Dict[str, FacetIndex] = {}
+
+    def index(self, table: str, rows: List[Dict[str, Any]], version: Hashable) -> FacetIndex:
+        current = self._indexes.get(table)
+        if current is None or current.version != version:
+            current = FacetIndex(self._facets[table], rows, version)
+            self._indexes[table] = current
+            logger.info(f"Facetas de {table} recalculadas: {current.size} linhas")
+        return current
+
+    @staticmethod
+    def split_params(params: Dict[str, Optional[Iterable[str]]]) -> Dict[str, Dict[str, List[str]]]:
+        """{parametro: valores} -> {tabela: {chave da faceta: valores}}."""
+        por_tabela: Dict[str, Dict[str, List[str]]] = {}
+        for param, values in params.items():
+            values = [v for v in (values or []) if v]
+            if not values or param not in FACET_PARAMS:
+                continue
+            table, key = FACET_PARAMS[param]
+            por_tabela.setdefault(table, {})[key] = values
+        return por_tabela
@@ -0,0 +1,291 @@
+"""
+Índice de identificação de colaboradores (relacao_ativos).
+
+Substitui as buscas lineares por nome/CPF (ilike no Supabase, filtros em Python e o
+getEmployeeByName do app.js) por dicionários com chaves normalizadas: nome sem acento
+e em maiúsculas, dígitos do CPF, CHAPA e login. As avaliações (nota_final_colaborador)
+entram como apelidos nome/login -> CPF, como o passo 0 do getEmployeeByName.
+
+A atualização é incremental: cada linha tem uma impressão digital calculada só com os
+campos usados nas chaves, e apenas linhas novas, alteradas ou removidas mexem no índice.
+"""
+import hashlib
+import logging
+import re
+import unicodedata
+from typing import Any, Dict, Hashable, Iterable, List, Optional, Sequence, Set, Tuple
+
+logger = logging.getLogger(__name__)
+
+_NON_ALNUM = re.compile(r"[^A-Za-z0-9\s]")
+_SPACES = re.compile(r"\s+")
+
+# Fontes de linhas do índice
+FONTE_ATIVOS = "relacao_ativos"
+FONTE_AVALIACOES = "nota_final_colaborador"
+
+
+def normalize_name(value: Any) -> str:
+    """Mesma normalização do normalizeText do app.js: sem acentos, pontuação vira espaço, maiúsculas."""
+    if value is None:
+        return ""
+    text = unicodedata.normalize("NFD", str(value))
+    text = "".join(c for c in text if not unicodedata.combining(c))
+    text = _NON_ALNUM.sub(" ", text).strip()
+    return _SPACES.sub(" ", text).upper()
+
+
+def cpf_digits(value: Any) -> str:
+    """Somente os dígitos do CPF, completando zeros à esquerda perdidos em planilhas."""
+    digits = re.sub(r"\D", "", "" if value is None else str(value))
+    if 9 <= len(digits) < 11:
+        digits = digits.zfill(11)
+    return digits
+
+
+def _field(row: Dict[str, Any], *names: str) -> Any:
+    # As colunas de relacao_ativos podem vir em minúsculas (Supabase) ou maiúsculas (CSV)
+    for name in names:
+        v = row.get(name)
+        if v is not None and v != "":
+            return v
+    return None
+
+
+def _text(value: Any) -> str:
+    return "" if value is None else str(value).strip()
+
+
+def _tokens(nome_norm: str) -> Set[str]:
+    return {p for p in nome_norm.split(" ") if len(p) > 2}
+
+
+def ativos_keys(row: Dict[str, Any]) -> List[Tuple[str, str]]:
+    nome = normalize_name(_field(row, "nome", "NOME", "Nome"))
+    cpf = cpf_digits(_field(row, "cpf", "CPF"))
+    chapa = _text(_field(row, "chapa", "CHAPA", "Chapa")).upper()
+    login = _text(_field(row, "login", "LOGIN", "usuario", "USER_LOGIN")).lower()
+    keys: List[Tuple[str, str]] = []
+    if nome:
+        keys.append(("nome", nome))
+        keys.extend(("token", t) for t in _tokens(nome))
+    if cpf:
+        keys.append(("cpf", cpf))
+    if chapa:
+        keys.append(("chapa", chapa))
+    if login:
+        keys.append(("login", login))
+    return keys
+
+
+def avaliacoes_keys(row: Dict[str, Any]) -> List[Tuple[str, str]]:
+    # Apelidos que levam ao CPF do avaliado (documento_de_identificação)
+    if not cpf_digits(row.get("documento_de_identificação")):
+        return []
+    keys: List[Tuple[str, str]] = []
+    for nome in {normalize_name(row.get("usuário_avaliado")), normalize_name(row.get("avaliado"))}:
+        if nome:
+            keys.append(("apelido_nome", nome))
+    login = _text(row.get("login_do_avaliado")).lower()
+    if login:
+        keys.append(("apelido_login", login))
+    return keys
+
+
+_KEY_BUILDERS = {FONTE_ATIVOS: ativos_keys, FONTE_AVALIACOES: avaliacoes_keys}
+
+
+def _row_id(fonte: str, row: Dict[str, Any], position: int) -> Hashable:
+    # relacao_ativos não tem id: a CHAPA (ou o CPF) mantém a identidade da linha quando
+    # inserções e remoções deslocam as posições, e só as linhas afetadas são reindexadas
+    if fonte == FONTE_ATIVOS:
+        chapa = _text(_field(row, "chapa", "CHAPA", "Chapa")).upper()
+        if chapa:
+            return ("chapa", chapa)
+        cpf = cpf_digits(_field(row, "cpf", "CPF"))
+        if cpf:
+            return ("cpf", cpf)
+    rid = row.get("id")
+    return rid if rid is not None else f"#{position}"
+
+
+def _fingerprint(keys: Sequence[Tuple[str, str]], extra: str = "") -> str:
+    h = hashlib.blake2b(digest_size=12)
+    for kind, key in keys:
+        h.update(kind.encode())
+        h.update(b"\x1f")
+        h.update(key.encode())
+        h.update(b"\x1e")
+    h.update(extra.encode())
+    return h.hexdigest()
+
+
+class IdentityIndex:
+    """Índice nome/CPF/CHAPA/login -> linha de relacao_ativos, com atualização incremental."""
+
+    def __init__(self):
+        # (fonte, id da linha) -> (impressão digital, chaves, posição da linha)
+        self._entries: Dict[Tuple[str, Hashable], Tuple[str, List[Tuple[str, str]], int]] = {}
+        # Linhas atuais de cada fonte: o índice guarda só posições (as linhas podem ser uma
+        # tabela colunar, montadas apenas quando devolvidas)
+        self._rows: Dict[str, Sequence[Dict[str, Any]]] = {}
+        # tipo de chave -> chave -> ids das linhas (dict como conjunto ordenado: remoção O(1)
+        # e desempate pela ordem de inserção)
+        self._keys: Dict[str, Dict[str, Dict[Tuple[str, Hashable], None]]] = {}
+        self._versions: Dict[str, Hashable] = {}
+
+    @property
+    def size(self) -> int:
+        return sum(1 for fonte, _ in self._entries if fonte == FONTE_ATIVOS)
+
+    def refresh(self, fonte: str, rows: Iterable[Dict[str, Any]], version: Hashable = None) -> Dict[str, int]:
+        """
+        Sincroniza o índice com as linhas atuais de uma fonte. Se a versão do snapshot não
+        mudou, nada é feito; caso contrário só as linhas alteradas são reindexadas.
+        """
+        if version is not None and self._versions.get(fonte) == version:
+            return {"added": 0, "changed": 0, "removed": 0}
+        if not isinstance(rows, Sequence):
+            rows = list(rows)
+        build_keys = _KEY_BUILDERS[fonte]
+        seen: Set[Tuple[str, Hashable]] = set()
+        added = changed = 0
+        for position, row in enumerate(rows):
+            entry_id = (fonte, _row_id(fonte, row, position))
+            if entry_id in seen:
+                # CHAPA/CPF repetido no arquivo: a linha repetida fica identificada pela posição
+                entry_id = (fonte, f"#{position}")
+            seen.add(entry_id)
+            keys = build_keys(row)
+            extra = cpf_digits(row.get("documento_de_identificação")) if fonte == FONTE_AVALIACOES else ""
+            fp = _fingerprint(keys, extra)
+            current = self._entries.get(entry_id)
+            if current is not None and current[0] == fp:
+                # Mesmas chaves: apenas atualiza a posição da linha devolvida nas consultas
+                self._entries[entry_id] = (fp, current[1], position)
+                continue
+            if current is not None:
+                self._unlink(entry_id, current[1])
+                changed += 1
+            else:
+                added += 1
+            self._entries[entry_id] = (fp, keys, position)
+            self._link(entry_id, keys)
+        stale = [eid for eid in self._entries if eid[0] == fonte and eid not in seen]
+        for entry_id in stale:
+            self._unlink(entry_id, self._entries.pop(entry_id)[1])
+        self._rows[fonte] = rows
+        self._versions[fonte] = version
+        stats = {"added": added, "changed": changed, "removed": len(stale)}
+        if added or changed or stale:
+            logger.info(f"Índice de identificação ({fonte}) atualizado: {stats}")
+        return stats
+
+    def _link(self, entry_id: Tuple[str, Hashable], keys: Sequence[Tuple[str, str]]) -> None:
+        for kind, key in keys:
+            self._keys.setdefault(kind, {}).setdefault(key, {})[entry_id] = None
+
+    def _unlink(self, entry_id: Tuple[str, Hashable], keys: Sequence[Tuple[str, str]]) -> None:
+        for kind, key in keys:
+            ids = self._keys.get(kind, {}).get(key)
+            if not ids:
+                continue
+            ids.pop(entry_id, None)
+            if not ids:
+                del self._keys[kind][key]
+
+    def _row(self, entry_id: Tuple[str, Hashable]) -> Dict[str, Any]:
+        return self._rows[entry_id[0]][self._entries[entry_id][2]]
+
+    def _first(self, kind: str, key: str) -> Optional[Dict[str, Any]]:
+        ids = self._keys.get(kind, {}).get(key) if key else None
+        return self._row(next(iter(ids))) if ids else None
+
+    def by_cpf(self, cpf: Any) -> Optional[Dict[str, Any]]:
+        return self._first("cpf", cpf_digits(cpf))
+
+    def by_nome(self, nome: Any) -> Optional[Dict[str, Any]]:
+        return self._first("nome", normalize_name(nome))
+
+    def cpf_por_apelido(self, nome: Any = None, login: Any = None) -> str:
+        """CPF do avaliado a partir do nome/login usados nas avaliações."""
+        row = None
+        if login:
+            row = self._first("apelido_login", _text(login).lower())
+        if row is None and nome:
+            row = self._first("apelido_nome", normalize_name(nome))
+        return cpf_digits(row.get("documento_de_identificação")) if row else ""
+
+    def _by_tokens(self, nome_norm: str) -> Optional[Dict[str, Any]]:
+        # Todas as palavras principais do nome presentes (passo 5 do getEmployeeByName)
+        tokens = _tokens(nome_norm)
+        if not tokens:
+            return None
+        index = self._keys.get("token", {})
+        candidates: Optional[Set[Tuple[str, Hashable]]] = None
+        for token in sorted(tokens, key=lambda t: len(index.get(t, ()))):
+            ids = index.get(token)
+            if not ids:
+                return None
+            candidates = set(ids) if candidates is None else candidates & ids.keys()
+            if not candidates:
+                return None
+        # Desempate determinístico: primeira linha na ordem de inserção do token mais raro
+        first_token = min(tokens, key=lambda t: len(index[t]))
+        for entry_id in index[first_token]:
+            if entry_id in candidates:
+                return self._row(entry_id)
+        return None
+
+    def resolve(
+        self,
+        nome: Any = None,
+        cpf: Any = None,
+        chapa: Any = None,
+        login: Any = None,
+        fuzzy: bool = True,
+    ) -> Tuple[Optional[Dict[str, Any]], Optional[str]]:
+        """
+        Localiza o colaborador; devolve (linha de relacao_ativos, critério usado).
+        Ordem: CPF, CHAPA, login, CPF da avaliação do nome, nome exato, nome como CPF, palavras do nome.
+        fuzzy=False dispensa o último passo (palavras do nome), que pode achar outra pessoa:
+        só chaves exatas, para juntar dados de pessoas diferentes sem risco de troca.
+        """
+        if cpf:
+            row = self.by_cpf(cpf)
+            if row is not None:
+                return row, "cpf"
+        if chapa:
+            row = self._first("chapa", _text(chapa).upper())
+            if row is not None:
+                return row, "chapa"
+        if login:
+            row = self._first("login", _text(login).lower())
+            if row is not None:
+                return row, "login"
+        if nome or login:
+            cpf_alvo = self.cpf_por_apelido(nome=nome, login=login)
+            if len(cpf_alvo) >= 9:
+                row = self.by_cpf(cpf_alvo)
+                if row is not None:
+                    return row, "cpf_avaliacao"
+        if nome:
+            nome_norm = normalize_name(nome)
+            row = self._first("nome", nome_norm)
+            if row is not None:
+                return row, "nome"
+            if nome_norm.isdigit() and len(nome_norm) == 11:
+                row = self.by_cpf(nome_norm)
+                if row is not None:
+                    return row, "cpf"
+            row = self._by_tokens(nome_norm) if fuzzy else None
+            if row is not None:
+                return row, "palavras_nome"
+        return None, None
+
+    def info(self) -> Dict[str, Any]:
+        return {
+            "rows": self.size,
+            "keys": {kind: len(keys) for kind, keys in self._keys.items()},
+            "versions": {fonte: str(v) for fonte, v in self._versions.items()},
+        }
@@ -0,0 +1,240 @@
+"""
+Importação da relação de ativos (exportação mensal do RH) para a tabela relacao_ativos.
+
+O CSV (separado por ';', com BOM e colunas DIRETORIA/GERENCIA repetidas no final) é lido
+linha a linha, normalizado (CPF com 11 dígitos, datas em DD/MM/AAAA, '#N/D' vira vazio)
+e comparado com a tabela atual por hash de cada linha, usando a CHAPA como chave.
+O arquivo inteiro é lido e validado antes de qualquer gravação: um erro no meio do CSV
+(codificação, cabeçalho) não deixa a tabela pela metade. Só então as linhas novas ou
+alteradas são enviadas (upserts em lotes) e as CHAPAs ausentes do arquivo são removidas.
+
+O upsert exige uma restrição UNIQUE em relacao_ativos.chapa
+(ver supabase_relacao_ativos_import.sql).
+
+Uso:
+    python import_relacao_ativos.py 2025_09_30_relação_ativos.csv --dry-run
+    python import_relacao_ativos.py 2025_09_30_relação_ativos.csv
+"""
+import argparse
+import asyncio
+import csv
+import hashlib
+import json
+import logging
+import os
+import re
+from datetime import date, timedelta
+from typing import Any, Dict, Iterable, Iterator, List, TextIO
+
+from data_access import SupabaseREST, in_
+from identity_index import cpf_digits
+
+logger = logging.getLogger(__name__)
+
+TABLE = "relacao_ativos"
+KEY = "chapa"
+
+# Colunas de public.relacao_ativos (demais colunas do CSV, como endereço e telefones, não são importadas)
+IMPORT_COLUMNS = [
+    "registro", "diretoria", "gerencia", "localidade", "c. custo", "chapa", "codsecao",
+    "unidade", "empresa", "codcoligada", "nome", "cargo", "admissao", "cpf", "corraca",
+    "sexo", "naturalidade", "dtnascimento", "idade", "escolaridade",
+]
+DATE_COLUMNS = {"admissao", "dtnascimento"}
+INT_COLUMNS = {"codcoligada"}
+
+# Valores de erro do Excel exportados como texto
+NULL_MARKERS = {"", "#N/D", "#N/A", "#REF!", "#VALOR!", "#VALUE!"}
+
+DEFAULT_CHUNK_SIZE = int(os.getenv("IMPORT_CHUNK_SIZE", "500"))
+
+_DMY = re.compile(r"^(\d{1,2})[/.-](\d{1,2})[/.-](\d{2}|\d{4})$")
+_ISO = re.compile(r"^(\d{4})-(\d{1,2})-(\d{1,2})(?:[T ].*)?$")
+
+
+def normalize_date(value: str) -> str:
+    """Converte dd/mm/aa(aa), aaaa-mm-dd ou número serial do Excel para DD/MM/AAAA."""
+    m = _DMY.match(value)
+    iso = _ISO.match(value) if not m else None
+    try:
+        if m:
+            d, mo, y = int(m.group(1)), int(m.group(2)), int(m.group(3))
+            if y < 100:
+                y += 2000 if y <= date.today().year % 100 else 1900
+            parsed = date(y, mo, d)
+        elif iso:
+            parsed = date(int(iso.group(1)), int(iso.group(2)), int(iso.group(3)))
+        elif value.isdigit() and 1 <= int(value) <= 80000:
+            parsed = date(1899, 12, 30) + timedelta(days=int(value))
+        else:
+            return value
+    except ValueError:
+        return value
+    return parsed.strftime("%d/%m/%Y")
+
+
+def normalize_record(record: Dict[str, Any]) -> Dict[str, Any]:
+    """Linha com todas as IMPORT_COLUMNS normalizadas (mesma regra para o CSV e para a tabela)."""
+    out: Dict[str, Any] = {}
+    for col in IMPORT_COLUMNS:
+        value = record.get(col)
+        text = "" if value is None else str(value).strip()
+        if text.upper() in NULL_MARKERS:
+            out[col] = None
+        elif col == "cpf":
+            out[col] = cpf_digits(text) or None
+        elif col in DATE_COLUMNS:
+            out[col] = normalize_date(text)
+        elif col in INT_COLUMNS:
+            out[col] = int(text) if re.fullmatch(r"-?\d+", text) else None
+        else:
+            out[col] = text
+    return out
+
+
+def row_hash(row: Dict[str, Any]) -> str:
+    payload = json.dumps([row.get(c) for c in IMPORT_COLUMNS], ensure_ascii=False, separators=(",", ":"))
+    return hashlib.blake2b(payload.encode("utf-8"), digest_size=16).hexdigest()
+
+
+def iter_csv_rows(stream: TextIO, delimiter: str = ";") -> Iterator[Dict[str, Any]]:
+    """
+    Lê o CSV linha a linha (sem carregar o arquivo inteiro) e devolve registros normalizados.
+    Cabeçalhos repetidos (DIRETORIA, GERENCIA, ... no final do arquivo) são ignorados:
+    vale a primeira ocorrência.
+    """
+    reader = csv.reader(stream, delimiter=delimiter)
+    header = next(reader, None)
+    if not header:
+        return
+    positions: Dict[str, int] = {}
+    for i, name in enumerate(header):
+        col = name.strip().lstrip("\ufeff").lower()
+        if col in IMPORT_COLUMNS and col not in positions:
+            positions[col] = i
+    if KEY not in positions:
+        raise ValueError(f"Coluna {KEY.upper()} não encontrada no cabeçalho do arquivo")
+    for values in reader:
+        if not any(v.strip() for v in values):
+            continue
+        raw = {col: values[i] if i < len(values) else None for col, i in positions.items()}
+        yield normalize_record(raw)
+
+
+def _chunks(items: List[Any], size: int) -> Iterable[List[Any]]:
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
+
+
+async def import_rows(
+    db: SupabaseREST,
+    rows: Iterable[Dict[str, Any]],
+    dry_run: bool = False,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+) -> Dict[str, Any]:
+    """
+    Compara as linhas do arquivo com relacao_ativos e aplica apenas as diferenças.
+    As diferenças são calculadas com o arquivo inteiro; upserts e remoções só são enviados
+    depois disso, e nada é gravado se a leitura falhar ou o arquivo não tiver CHAPAs.
+    """
+    atuais = await db.fetch_all(TABLE, key=KEY)
+    hashes: Dict[str, str] = {}
+    for r in atuais:
+        norm = normalize_record(r)
+        if norm[KEY]:
+            hashes.setdefault(norm[KEY], row_hash(norm))
+
+    report = {
+        "dry_run": dry_run,
+        "linhas_tabela": len(atuais),
+        "linhas_arquivo": 0,
+        "inseridos": 0,
+        "alterados": 0,
+        "inalterados": 0,
+        "removidos": 0,
+        "sem_chapa": 0,
+        "duplicados": 0,
+        "lotes": 0,
+    }
+    vistos = set()
+    pendentes: List[Dict[str, Any]] = []
+
+    for row in rows:
+        report["linhas_arquivo"] += 1
+        chapa = row[KEY]
+        if not chapa:
+            report["sem_chapa"] += 1
+            continue
+        if chapa in vistos:
+            report["duplicados"] += 1
+            continue
+        vistos.add(chapa)
+        atual = hashes.get(chapa)
+        if atual == row_hash(row):
+            report["inalterados"] += 1
+            continue
+        report["alterados" if atual is not None else "inseridos"] += 1
+        pendentes.append(row)
+
+    if not vistos:
+        # Arquivo vazio ou sem CHAPAs: aplicar removeria a tabela inteira
+        raise ValueError(f"Nenhuma linha com {KEY.upper()} no arquivo")
+    removidos = [chapa for chapa in hashes if chapa not in vistos]
+    report["removidos"] = len(removidos)
+    if not dry_run:
+        for lote in _chunks(pendentes, chunk_size):
+            await db.insert(TABLE, lote, upsert=True, on_conflict=KEY, returning=False)
+            report["lotes"] += 1
+        for lote in _chunks(removidos, chunk_size):
+            await db.delete(TABLE, filters={KEY: in_(lote)})
+            report["lotes"] += 1
+
+    logger.info(f"Importação de {TABLE}: {report}")
+    return report
+
+
+async def import_file(
+    db: SupabaseREST,
+    stream: TextIO,
+    dry_run: bool = False,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    delimiter: str = ";",
+) -> Dict[str, Any]:
+    return await import_rows(db, iter_csv_rows(stream, delimiter=delimiter), dry_run=dry_run, chunk_size=chunk_size)
+
+
+def main() -> None:
+    from dotenv import load_dotenv
+
+    parser = argparse.ArgumentParser(description="Importa o CSV da relação de ativos para o Supabase")
+    parser.add_argument("arquivo", help="CSV exportado pelo RH (separado por ';')")
+    parser.add_argument("--dry-run", action="store_true", help="Apenas mostra o que seria alterado")
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE, help="Linhas por requisição")
+    parser.add_argument("--encoding", default="utf-8-sig", help="Codificação do arquivo (ex.: latin-1)")
+    parser.add_argument("--delimiter", default=";")
+    args = parser.parse_args()
+
+    load_dotenv()
+    logging.basicConfig(level=logging.INFO)
+    url, key = os.getenv("SUPABASE_URL"), os.getenv("SUPABASE_KEY")
+    if not url or not key:
+        raise SystemExit("❌ SUPABASE_URL e SUPABASE_KEY devem estar definidos no .env")
+    # Mesmo critério do api.py: fora do Render, verificação SSL desativada (proxy corporativo)
+    is_local = os.getenv("RENDER") is None
+
+    async def _run() -> Dict[str, Any]:
+        db = SupabaseREST(url, key, verify=not is_local)
+        try:
+            with open(args.arquivo, encoding=args.encoding, newline="") as f:
+                return await import_file(
+                    db, f, dry_run=args.dry_run, chunk_size=args.chunk_size, delimiter=args.delimiter
+                )
+        finally:
+            await db.aclose()
+
+    report = asyncio.run(_run())
+    print(json.dumps(report, ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,196 @@
+"""
+Respostas JSON das listagens: serialização rápida, compressão negociada e cache das
+respostas já comprimidas.
+
+- dumps(): orjson quando instalado (várias vezes mais rápido), senão json.dumps compacto;
+  o resultado é o mesmo JSON (UTF-8, sem espaços).
+- A compressão segue o Accept-Encoding do cliente: brotli (se o pacote brotli estiver
+  instalado) ou gzip, só para corpos a partir de RESPONSE_COMPRESS_MIN_BYTES.
+- ResponseCache guarda, por chave (rota + ETag do snapshot) e codificação, o corpo pronto:
+  a mesma página pedida de novo enquanto o snapshot não muda não é serializada nem
+  comprimida outra vez.
+
+Os endpoints devolvem a Response pronta, o que também evita o jsonable_encoder do FastAPI.
+"""
+import gzip
+import json
+import os
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional, Tuple
+
+from fastapi import Response
+
+try:
+    import orjson
+except ImportError:  # opcional
+    orjson = None
+
+try:
+    import brotli
+except ImportError:  # opcional
+    brotli = None
+
+# Corpos menores que isto são enviados sem compressão
+MIN_COMPRESS_BYTES = int(os.getenv("RESPONSE_COMPRESS_MIN_BYTES", "1024"))
+GZIP_LEVEL = int(os.getenv("RESPONSE_GZIP_LEVEL", "6"))
+BROTLI_QUALITY = int(os.getenv("RESPONSE_BROTLI_QUALITY", "5"))
+# Limite de memória das respostas guardadas (bytes); 0 desativa o cache
+CACHE_MAX_BYTES = int(os.getenv("RESPONSE_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+
+# Codificações suportadas, em ordem de preferência
+ENCODINGS = (("br",) if brotli is not None else ()) + ("gzip",)
+
+
+def dumps(content: Any) -> bytes:
+    """JSON compacto em UTF-8; tipos desconhecidos viram texto (como default=str)."""
+    if orjson is not None:
+        try:
+            return orjson.dumps(content, default=str, option=orjson.OPT_NON_STR_KEYS)
+        except TypeError:
+            # Ex.: inteiros acima de 64 bits
+            pass
+    return json.dumps(content, ensure_ascii=False, separators=(",", ":"), default=str).encode("utf-8")
+
+
+def negotiate(accept_encoding: Optional[str]) -> Optional[str]:
+    """Melhor codificação aceita pelo cliente (respeita q=0), ou None para enviar sem compressão."""
+    if not accept_encoding:
+        return None
+    accepted: Dict[str, float] = {}
+    for part in accept_encoding.lower().split(","):
+        name, _, params = part.strip().partition(";")
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        accepted[name.strip()] = q
+    best = None
+    for encoding in ENCODINGS:
+        q = accepted.get(encoding, accepted.get("*", 0.0))
+        if q > 0 and (best is None or q > best[1]):
+            best = (encoding, q)
+    return best[0] if best else None
+
+
+def compress(body: bytes, encoding: Optional[str]) -> Tuple[bytes, Optional[str]]:
+    """(corpo, Content-Encoding); corpos pequenos ou sem codificação voltam como estão."""
+    if encoding is None or len(body) < MIN_COMPRESS_BYTES:
+        return body, None
+    if encoding == "br":
+        return brotli.compress(body, quality=BROTLI_QUALITY), "br"
+    return gzip.compress(body, compresslevel=GZIP_LEVEL, mtime=0), "gzip"
+
+
+class FastJSONResponse(Response):
+    """JSONResponse serializada com dumps() (orjson quando disponível)."""
+
+    media_type = "application/json"
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+
+class ResponseCache:
+    """Corpos prontos por (chave, codificação), com descarte LRU por total de bytes."""
+
+    def __init__(self, max_bytes: int = CACHE_MAX_BYTES):
+        self._max_bytes = max_bytes
+        # (chave, codificação) -> (corpo, Content-Encoding, media type)
+        self._entries: "OrderedDict[Tuple[Hashable, Optional[str]], Tuple[bytes, Optional[str], str]]" = OrderedDict()
+        self._bytes = 0
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self._max_bytes > 0
+
+    def get(self, key: Hashable, encoding: Optional[str]) -> Optional[Tuple[bytes, Optional[str], str]]:
+        entry = self._entries.get((key, encoding))
+        if entry is None:
+            self.misses += 1
+            return None
+        self._entries.move_to_end((key, encoding))
+        self.hits += 1
+        return entry
+
+    def put(
+        self,
+        key: Hashable,
+        encoding: Optional[str],
+        body: bytes,
+        content_encoding: Optional[str],
+        media_type: str = "application/json",
+    ) -> None:
+        if len(body) > self._max_bytes // 4:
+            # Uma resposta só não pode ocupar o cache inteiro
+            return
+        previous = self._entries.pop((key, encoding), None)
+        if previous is not None:
+            self._bytes -= len(previous[0])
+        self._entries[(key, encoding)] = (body, content_encoding, media_type)
+        self._bytes += len(body)
+        while self._bytes > self._max_bytes and self._entries:
+            _, (old, _, _) = self._entries.popitem(last=False)
+            self._bytes -= len(old)
+
+    def info(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "bytes": self._bytes,
+            "max_bytes": self._max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else None,
+        }
+
+
+def _response(body: bytes, content_encoding: Optional[str], media_type: str, headers: Optional[Dict[str, str]]) -> Response:
+    headers = {"Vary": "Accept-Encoding", **(headers or {})}
+    if content_encoding is not None:
+        headers["Content-Encoding"] = content_encoding
+    return Response(content=body, media_type=media_type, headers=headers)
+
+
+def cached_response(
+    cache: Optional[ResponseCache],
+    key: Optional[Hashable],
+    accept_encoding: Optional[str],
+    headers: Optional[Dict[str, str]] = None,
+) -> Optional[Response]:
+    """Resposta guardada para a chave na codificação negociada, se houver."""
+    if cache is None or key is None or not cache.enabled:
+        return None
+    entry = cache.get(key, negotiate(accept_encoding))
+    return _response(*entry, headers) if entry is not None else None
+
+
+def encoded_response(
+    body: bytes,
+    media_type: str,
+    accept_encoding: Optional[str],
+    headers: Optional[Dict[str, str]] = None,
+    cache: Optional[ResponseCache] = None,
+    key: Optional[Hashable] = None,
+) -> Response:
+    """Comprime o corpo conforme o Accept-Encoding e, com chave, guarda o resultado no cache."""
+    encoding = negotiate(accept_encoding)
+    body, content_encoding = compress(body, encoding)
+    if cache is not None and key is not None and cache.enabled:
+        cache.put(key, encoding, body, content_encoding, media_type)
+    return _response(body, content_encoding, media_type, headers)
+
+
+def json_response(
+    content: Any,
+    accept_encoding: Optional[str],
+    headers: Optional[Dict[str, str]] = None,
+    cache: Optional[ResponseCache] = None,
+    key: Optional[Hashable] = None,
+) -> Response:
+    """Serializa (dumps), comprime e, com chave, guarda o corpo pronto no cache."""
+    return encoded_response(dumps(content), "application/json", accept_encoding, headers, cache, key)
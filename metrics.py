@@ -0,0 +1,226 @@
+"""
+Métricas da API no formato texto do Prometheus (/api/metrics).
+
+- Latência por rota (template do FastAPI, ex.: /api/pessoas/{avaliacao_id}/competencias),
+  medida por um middleware ASGI do início da requisição até o último byte enviado.
+- Chamadas ao Supabase (SupabaseREST): latência, linhas e bytes por tabela e método.
+- Atraso do event loop, amostrado por uma task em segundo plano.
+- Contadores do cache de snapshots, lidos no momento da coleta.
+
+Sem dependências externas: os histogramas são mantidos em memória no próprio processo.
+"""
+import asyncio
+import logging
+import os
+import time
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Limites (segundos) dos buckets de latência
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+LOOP_LAG_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0)
+
+# Intervalo (segundos) entre as amostras de atraso do event loop
+LOOP_LAG_INTERVAL = float(os.getenv("METRICS_LOOP_LAG_INTERVAL", "0.5"))
+
+# Rótulo das requisições que não casaram com nenhuma rota (evita um rótulo por URL)
+UNMATCHED_ROUTE = "(sem rota)"
+
+
+def _escape(value: Any) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(names: Sequence[str], values: Sequence[Any], extra: str = "") -> str:
+    parts = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _number(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return repr(value) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    def __init__(self, name: str, help: str, labels: Sequence[str] = ()):
+        self.name, self.help, self.label_names = name, help, tuple(labels)
+        self._values: Dict[Tuple, float] = {}
+
+    def inc(self, amount: float = 1.0, *labels: Any) -> None:
+        self._values[labels] = self._values.get(labels, 0.0) + amount
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        for labels, value in sorted(self._values.items()):
+            lines.append(f"{self.name}{_labels(self.label_names, labels)} {_number(value)}")
+        return lines
+
+
+class Gauge(Counter):
+    def set(self, value: float, *labels: Any) -> None:
+        self._values[labels] = value
+
+    def render(self) -> List[str]:
+        lines = super().render()
+        lines[1] = f"# TYPE {self.name} gauge"
+        return lines
+
+
+class Histogram:
+    def __init__(self, name: str, help: str, labels: Sequence[str] = (), buckets: Sequence[float] = LATENCY_BUCKETS):
+        self.name, self.help, self.label_names = name, help, tuple(labels)
+        self.buckets = tuple(sorted(buckets))
+        # rótulos -> [contagem por bucket..., soma, total]
+        self._series: Dict[Tuple, List[float]] = {}
+
+    def observe(self, value: float, *labels: Any) -> None:
+        series = self._series.get(labels)
+        if series is None:
+            series = self._series[labels] = [0] * len(self.buckets) + [0.0, 0]
+        for i, limit in enumerate(self.buckets):
+            if value <= limit:
+                series[i] += 1
+                break
+        series[-2] += value
+        series[-1] += 1
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        for labels, series in sorted(self._series.items()):
+            acumulado = 0
+            for limit, count in zip(self.buckets, series):
+                acumulado += count
+                le = 'le="' + _number(limit) + '"'
+                lines.append(f"{self.name}_bucket{_labels(self.label_names, labels, le)} {acumulado}")
+            inf = 'le="+Inf"'
+            lines.append(f"{self.name}_bucket{_labels(self.label_names, labels, inf)} {series[-1]}")
+            lines.append(f"{self.name}_sum{_labels(self.label_names, labels)} {_number(series[-2])}")
+            lines.append(f"{self.name}_count{_labels(self.label_names, labels)} {series[-1]}")
+        return lines
+
+
+HTTP_DURATION = Histogram(
+    "ninebox_http_request_duration_seconds",
+    "Tempo de resposta por rota (até o último byte)",
+    ("method", "route", "status"),
+)
+HTTP_IN_FLIGHT = Gauge("ninebox_http_requests_in_flight", "Requisições em andamento")
+UPSTREAM_DURATION = Histogram(
+    "ninebox_upstream_request_duration_seconds",
+    "Tempo das chamadas ao Supabase (PostgREST)",
+    ("method", "table", "status"),
+)
+UPSTREAM_ROWS = Counter("ninebox_upstream_rows_total", "Linhas recebidas do Supabase", ("method", "table"))
+UPSTREAM_BYTES = Counter("ninebox_upstream_bytes_total", "Bytes recebidos do Supabase", ("method", "table"))
+LOOP_LAG = Histogram(
+    "ninebox_event_loop_lag_seconds",
+    "Atraso do event loop em relação ao agendado",
+    buckets=LOOP_LAG_BUCKETS,
+)
+LOOP_LAG_MAX = Gauge("ninebox_event_loop_lag_max_seconds", "Maior atraso do event loop observado")
+
+_METRICS = [HTTP_DURATION, HTTP_IN_FLIGHT, UPSTREAM_DURATION, UPSTREAM_ROWS, UPSTREAM_BYTES, LOOP_LAG, LOOP_LAG_MAX]
+
+
+def record_upstream(method: str, table: str, status: int, seconds: float, nbytes: int, rows: Optional[int]) -> None:
+    """Observador passado ao SupabaseREST: uma chamada concluída (falhas de rede entram como 502/504)."""
+    UPSTREAM_DURATION.observe(seconds, method, table, status)
+    UPSTREAM_BYTES.inc(nbytes, method, table)
+    if rows:
+        UPSTREAM_ROWS.inc(rows, method, table)
+
+
+class MetricsMiddleware:
+    """Middleware ASGI que mede cada requisição HTTP até o envio do último bloco da resposta."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        start = time.perf_counter()
+        status = {"code": 500}
+        done = {"value": False}
+
+        def _observe() -> None:
+            if done["value"]:
+                return
+            done["value"] = True
+            route = scope.get("route")
+            path = getattr(route, "path", None) or UNMATCHED_ROUTE
+            HTTP_DURATION.observe(time.perf_counter() - start, scope.get("method", ""), path, status["code"])
+
+        async def _send(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+            await send(message)
+            if message["type"] == "http.response.body" and not message.get("more_body", False):
+                _observe()
+
+        HTTP_IN_FLIGHT.inc(1)
+        try:
+            await self.app(scope, receive, _send)
+        finally:
+            HTTP_IN_FLIGHT.inc(-1)
+            _observe()
+
+
+async def monitor_event_loop(interval: float = LOOP_LAG_INTERVAL) -> None:
+    """Mede quanto cada asyncio.sleep(interval) atrasa: tempo em que o loop ficou bloqueado."""
+    maior = 0.0
+    while True:
+        start = time.perf_counter()
+        await asyncio.sleep(interval)
+        lag = max(0.0, time.perf_counter() - start - interval)
+        LOOP_LAG.observe(lag)
+        if lag > maior:
+            maior = lag
+            LOOP_LAG_MAX.set(lag)
+        if lag > 0.5:
+            logger.warning(f"Event loop bloqueado por {lag:.2f}s")
+
+
+def _cache_lines(cache_info: Dict[str, Any]) -> List[str]:
+    lines: List[str] = []
+    for name, key, kind, help in (
+        ("ninebox_cache_hits_total", "hits", "counter", "Snapshots servidos do cache dentro do TTL"),
+        ("ninebox_cache_stale_hits_total", "stale_hits", "counter", "Snapshots expirados servidos durante a revalidação"),
+        ("ninebox_cache_misses_total", "misses", "counter", "Consultas ao cache sem snapshot disponível"),
+        ("ninebox_cache_loads_total", "loads", "counter", "Cargas de tabelas do Supabase"),
+    ):
+        lines += [f"# HELP {name} {help}", f"# TYPE {name} {kind}"]
+        lines.append(f"{name} {cache_info.get(key, 0)}")
+        for table, stats in sorted(cache_info.get("tables", {}).items()):
+            lines.append(f'{name}{{table="{_escape(table)}"}} {stats.get(key, 0)}')
+    lines += [
+        "# HELP ninebox_cache_hit_ratio Fração das consultas ao cache atendidas sem carga",
+        "# TYPE ninebox_cache_hit_ratio gauge",
+    ]
+    lookups = cache_info.get("hits", 0) + cache_info.get("stale_hits", 0) + cache_info.get("misses", 0)
+    ratio = (cache_info.get("hits", 0) + cache_info.get("stale_hits", 0)) / lookups if lookups else 0.0
+    lines.append(f"ninebox_cache_hit_ratio {_number(round(ratio, 6))}")
+    lines += [
+        "# HELP ninebox_cache_rows Linhas mantidas em memória por tabela",
+        "# TYPE ninebox_cache_rows gauge",
+    ]
+    for table, stats in sorted(cache_info.get("tables", {}).items()):
+        lines.append(f'ninebox_cache_rows{{table="{_escape(table)}"}} {stats.get("rows", 0)}')
+    return lines
+
+
+def render(cache_info: Optional[Dict[str, Any]] = None) -> str:
+    """Todas as métricas no formato texto do Prometheus (versão 0.0.4)."""
+    lines: List[str] = []
+    for metric in _METRICS:
+        lines += metric.render()
+    if cache_info is not None:
+        lines += _cache_lines(cache_info)
+    return "\n".join(lines) + "\n"
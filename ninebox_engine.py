@@ -0,0 +1,230 @@
+"""
+Cálculo do NineBox no servidor (equivalente a getGridPositionByClassification,
+getEffectiveScores, calculateRanking e updateNineBox do app.js).
+
+As notas efetivas, classificações e quadrantes de todo o snapshot de
+nota_final_colaborador são calculados uma única vez, coluna a coluna, e reaproveitados
+enquanto o snapshot não mudar. Cada requisição apenas filtra os índices, calcula o
+ranking e agrupa/ordena por quadrante.
+"""
+import math
+from array import array
+from bisect import bisect_left
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Sequence
+
+from columnar import column_values
+
+# Faixas de classificação por nota (limite superior inclusivo de cada faixa)
+#   0 a 2,49  => 'Atende parcialmente'
+#   2,5 a 3,29 => 'Atende dentro da expectativa'
+#   3,3 a 4   => 'Supera a expectativa'
+LIMITES_FAIXAS = (2.49, 3.29)
+CLASSIFICACOES = ("Atende parcialmente", "Atende dentro da expectativa", "Supera a expectativa")
+
+# Nível de cada classificação (1..3), como o classificacaoMap do app.js
+NIVEL_CLASSIFICACAO = {c: i + 1 for i, c in enumerate(CLASSIFICACOES)}
+
+QUADRANTES = [f"{linha}-{coluna}" for linha in (1, 2, 3) for coluna in (1, 2, 3)]
+
+
+def to_float(value: Any) -> Optional[float]:
+    """Converte notas gravadas como texto ('3.50', '3,5') ou número; None se inválida."""
+    if value is None:
+        return None
+    if isinstance(value, (int, float)):
+        n = float(value)
+    else:
+        text = str(value).strip().replace(",", ".")
+        if not text:
+            return None
+        try:
+            n = float(text)
+        except ValueError:
+            return None
+    return None if math.isnan(n) else n
+
+
+def classificar_nota(nota: Any) -> Optional[str]:
+    """Classificação de uma nota segundo LIMITES_FAIXAS; None se nota inválida."""
+    n = to_float(nota)
+    if n is None:
+        return None
+    return CLASSIFICACOES[bisect_left(LIMITES_FAIXAS, max(n, 0.0))]
+
+
+def classificar_notas(notas: Sequence[Optional[float]]) -> List[Optional[str]]:
+    """Classifica uma coluna inteira de notas de uma vez (busca binária nas faixas)."""
+    limites = LIMITES_FAIXAS
+    rotulos = CLASSIFICACOES
+    return [None if n is None or n != n else rotulos[bisect_left(limites, n)] for n in notas]
+
+
+def posicao_grid(classif_desempenho: Optional[str], classif_potencial: Optional[str]) -> str:
+    """Quadrante 'linha-coluna': potencial define a linha (invertida) e desempenho a coluna."""
+    nivel_d = NIVEL_CLASSIFICACAO.get(classif_desempenho or "", 2)
+    nivel_p = NIVEL_CLASSIFICACAO.get(classif_potencial or "", 2)
+    return f"{4 - nivel_p}-{nivel_d}"
+
+
+def _first(row: Dict[str, Any], *keys: str) -> Any:
+    for k in keys:
+        v = row.get(k)
+        if v is not None and v != "":
+            return v
+    return None
+
+
+def nome_avaliado(row: Dict[str, Any]) -> str:
+    return str(_first(row, "usuário_avaliado", "avaliado") or "")
+
+
+@dataclass
+class NineBoxColumns:
+    """Colunas pré-calculadas de um snapshot de nota_final_colaborador."""
+    rows: Sequence[Dict[str, Any]]
+    ids: List[Any]
+    desempenho: array
+    potencial: array
+    classif_desempenho: List[Optional[str]]
+    classif_potencial: List[Optional[str]]
+    posicao: List[Optional[str]]
+    calibrado: List[bool]
+    area: List[str]
+    formulario: List[str]
+    nome: List[str]
+    nome_lower: List[str]
+    avaliador: List[str]
+
+
+def build_columns(rows: Sequence[Dict[str, Any]]) -> NineBoxColumns:
+    """
+    Calcula notas efetivas (calibrada quando existir, senão final), classificações e
+    quadrante de todas as linhas. Sem classificação de desempenho ou potencial, a pessoa
+    não entra no grid (posicao None), como no front-end.
+
+    Lê coluna a coluna (column_values): com um snapshot colunar nenhuma linha é montada.
+    """
+    def col(name: str) -> List[Any]:
+        return column_values(rows, name)
+
+    cal_d = [to_float(v) for v in col("nota_calibrada_desempenho")]
+    cal_p = [to_float(v) for v in col("nota_calibrada_potencial")]
+    fin_d = [to_float(v) for v in col("nota_final_desempenho")]
+    fin_p = [to_float(v) for v in col("nota_final_potencial")]
+
+    eff_d = [c if c is not None else (f if f is not None else 0.0) for c, f in zip(cal_d, fin_d)]
+    eff_p = [c if c is not None else (f if f is not None else 0.0) for c, f in zip(cal_p, fin_p)]
+
+    # Classificação pela nota calibrada apenas onde há calibração; nas demais vale a classificação final gravada
+    por_nota_d = classificar_notas([max(n, 0.0) for n in eff_d])
+    por_nota_p = classificar_notas([max(n, 0.0) for n in eff_p])
+    classif_d = [
+        por_nota_d[i] if cal_d[i] is not None else (v or None)
+        for i, v in enumerate(col("classificação_final_desempenho"))
+    ]
+    classif_p = [
+        por_nota_p[i] if cal_p[i] is not None else (v or None)
+        for i, v in enumerate(col("classificação_final_potencial"))
+    ]
+    posicao = [
+        posicao_grid(d, p) if d and p else None
+        for d, p in zip(classif_d, classif_p)
+    ]
+    # Mesma regra de nome_avaliado: usuário_avaliado, senão avaliado
+    nomes = [
+        str(next((v for v in (u, a) if v is not None and v != ""), ""))
+        for u, a in zip(col("usuário_avaliado"), col("avaliado"))
+    ]
+    return NineBoxColumns(
+        rows=rows,
+        ids=col("id"),
+        desempenho=array("d", eff_d),
+        potencial=array("d", eff_p),
+        classif_desempenho=classif_d,
+        classif_potencial=classif_p,
+        posicao=posicao,
+        calibrado=[d is not None or p is not None for d, p in zip(cal_d, cal_p)],
+        area=[str(v or "") for v in col("área")],
+        formulario=[str(v or "") for v in col("formulário")],
+        nome=nomes,
+        nome_lower=[n.lower() for n in nomes],
+        avaliador=[str(v or "") for v in col("avaliador")],
+    )
+
+
+def filtrar_indices(
+    cols: NineBoxColumns,
+    area: Optional[str] = None,
+    formulario: Optional[str] = None,
+    nome: Optional[str] = None,
+    avaliador: Optional[str] = None,
+    apenas_grid: bool = True,
+) -> List[int]:
+    """
+    Índices das linhas que atendem aos filtros (igualdade exata, nome por 'contém').
+    Com apenas_grid=False inclui também quem não tem quadrante (sem classificação).
+    """
+    if apenas_grid:
+        idx = [i for i, p in enumerate(cols.posicao) if p is not None]
+    else:
+        idx = list(range(len(cols.posicao)))
+    if area:
+        idx = [i for i in idx if cols.area[i] == area]
+    if formulario:
+        idx = [i for i in idx if cols.formulario[i] == formulario]
+    if avaliador:
+        idx = [i for i in idx if cols.avaliador[i] == avaliador]
+    if nome:
+        termo = nome.lower()
+        idx = [i for i in idx if termo in cols.nome_lower[i]]
+    return idx
+
+
+def compute_ninebox(
+    cols: NineBoxColumns,
+    indices: Sequence[int],
+    fator_desempenho: float = 0.0,
+    fator_potencial: float = 0.0,
+    limite: Optional[int] = None,
+) -> Dict[str, Any]:
+    """
+    Agrupa as pessoas por quadrante, ordenadas por ranking decrescente
+    (fator_desempenho * desempenho + fator_potencial * potencial).
+    """
+    d, p = cols.desempenho, cols.potencial
+    ranking = {i: fator_desempenho * d[i] + fator_potencial * p[i] for i in indices}
+
+    grupos: Dict[str, List[int]] = {q: [] for q in QUADRANTES}
+    for i in indices:
+        grupos[cols.posicao[i]].append(i)
+
+    quadrantes: Dict[str, Any] = {}
+    for q, membros in grupos.items():
+        # sort estável: em empate mantém a ordem original, como o Array.sort do navegador
+        membros.sort(key=lambda i: ranking[i], reverse=True)
+        visiveis = membros if limite is None else membros[:limite]
+        quadrantes[q] = {
+            "count": len(membros),
+            "pessoas": [
+                {
+                    "id": cols.ids[i],
+                    "nome": cols.nome[i],
+                    "area": cols.area[i],
+                    "formulario": cols.formulario[i],
+                    "avaliador": cols.avaliador[i],
+                    "nota_desempenho": d[i],
+                    "nota_potencial": p[i],
+                    "classificacao_desempenho": cols.classif_desempenho[i],
+                    "classificacao_potencial": cols.classif_potencial[i],
+                    "calibrado": cols.calibrado[i],
+                    "ranking": ranking[i],
+                }
+                for i in visiveis
+            ],
+        }
+    return {
+        "total": len(indices),
+        "counts": {q: v["count"] for q, v in quadrantes.items()},
+        "quadrantes": quadrantes,
+    }
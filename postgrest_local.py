@@ -0,0 +1,457 @@
+"""
+Substituto local do PostgREST do Supabase, em memória, para desenvolvimento, benchmarks
+e testes de carga sem rede.
+
+Implementa o subconjunto da API REST usado por data_access.SupabaseREST:
+- leitura: select=, filtros coluna=op.valor (eq, neq, gt, gte, lt, lte, like, ilike,
+  in, is, com not.), order=, limit=/offset=, cabeçalho Range com Content-Range na
+  resposta e Prefer: count=exact. Como o Supabase, limita cada resposta a MAX_ROWS linhas;
+- escrita: POST (insert, upsert com Prefer: resolution=merge-duplicates e on_conflict=),
+  PATCH (update) e DELETE com filtros, respeitando Prefer: return=representation|minimal.
+
+As tabelas são carregadas de CSVs (um <tabela>.csv por tabela, ex.: os gravados por
+dados_sinteticos.py) ou passadas como listas de dicionários. Pode ser usado no mesmo
+processo, como transporte do httpx:
+
+    rest = PostgRESTLocal(dados_sinteticos.gerar(5000))
+    db = SupabaseREST("http://postgrest.local", "chave", transport=rest.transport())
+
+ou como servidor HTTP, para rodar a API sem alterações:
+
+    python postgrest_local.py --seeds .cache/dados_50k --porta 54321
+    SUPABASE_URL=http://127.0.0.1:54321 SUPABASE_KEY=local uvicorn api:app
+"""
+import argparse
+import csv
+import json
+import logging
+import os
+import re
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+from urllib.parse import unquote
+
+import httpx
+
+logger = logging.getLogger(__name__)
+
+# max-rows do PostgREST no Supabase
+MAX_ROWS = 1000
+
+_RANGE = re.compile(r"^\s*(\d+)-(\d*)\s*$")
+
+
+class PostgRESTError(Exception):
+    def __init__(self, status: int, code: str, message: str):
+        super().__init__(message)
+        self.status = status
+        self.code = code
+
+
+def _number(value: Any) -> Optional[float]:
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _compare(op: str) -> Callable[[Any, str], bool]:
+    def check(cell: Any, value: str) -> bool:
+        if cell is None:
+            return False
+        a, b = _number(cell), _number(value)
+        if a is None or b is None:
+            a, b = str(cell), value
+        return {"gt": a > b, "gte": a >= b, "lt": a < b, "lte": a <= b}[op]
+    return check
+
+
+def _in_values(value: str) -> List[str]:
+    inner = value.strip()
+    if not (inner.startswith("(") and inner.endswith(")")):
+        raise PostgRESTError(400, "PGRST100", f"Lista inválida em in.: {value}")
+    values = []
+    for item in re.findall(r'"((?:[^"\\]|\\.)*)"|([^,]+)', inner[1:-1]):
+        quoted, plain = item
+        values.append(quoted.replace('\\"', '"').replace("\\\\", "\\") if quoted else plain.strip())
+    return values
+
+
+def _unquote_value(value: str) -> str:
+    if len(value) >= 2 and value.startswith('"') and value.endswith('"'):
+        return value[1:-1].replace('\\"', '"').replace("\\\\", "\\")
+    return value
+
+
+_NULLS = {"null": None, "true": True, "false": False}
+
+
+def like_regex(pattern: str, ignore_case: bool) -> "re.Pattern[str]":
+    """Padrão LIKE do PostgREST (% ou * = qualquer texto, _ = um caractere, \\ escapa) como regex."""
+    parts: List[str] = []
+    i = 0
+    while i < len(pattern):
+        c = pattern[i]
+        if c == "\\" and i + 1 < len(pattern):
+            parts.append(re.escape(pattern[i + 1]))
+            i += 2
+            continue
+        parts.append(".*" if c in "%*" else "." if c == "_" else re.escape(c))
+        i += 1
+    return re.compile("".join(parts), re.DOTALL | (re.IGNORECASE if ignore_case else 0))
+
+
+def build_filter(column: str, expression: str) -> Callable[[Dict[str, Any]], bool]:
+    """Predicado de uma linha para o filtro PostgREST `coluna=op.valor` (com not. opcional)."""
+    negate = expression.startswith("not.")
+    if negate:
+        expression = expression[4:]
+    op, sep, value = expression.partition(".")
+    if not sep:
+        raise PostgRESTError(400, "PGRST100", f"Filtro inválido: {column}={expression}")
+
+    if op == "eq":
+        target = _unquote_value(value)
+        test = lambda row: row.get(column) is not None and str(row.get(column)) == target  # noqa: E731
+    elif op == "neq":
+        target = _unquote_value(value)
+        test = lambda row: row.get(column) is not None and str(row.get(column)) != target  # noqa: E731
+    elif op in ("gt", "gte", "lt", "lte"):
+        compare, target = _compare(op), _unquote_value(value)
+        test = lambda row: compare(row.get(column), target)  # noqa: E731
+    elif op in ("like", "ilike"):
+        regex = like_regex(_unquote_value(value), ignore_case=op == "ilike")
+        test = lambda row: row.get(column) is not None and regex.fullmatch(str(row.get(column))) is not None  # noqa: E731
+    elif op == "in":
+        targets = set(_in_values(value))
+        test = lambda row: row.get(column) is not None and str(row.get(column)) in targets  # noqa: E731
+    elif op == "is":
+        if value.lower() not in _NULLS:
+            raise PostgRESTError(400, "PGRST100", f"Valor inválido para is.: {value}")
+        expected = _NULLS[value.lower()]
+        test = lambda row: row.get(column) is expected  # noqa: E731
+    else:
+        raise PostgRESTError(400, "PGRST100", f"Operador não suportado: {op}")
+    return (lambda row: not test(row)) if negate else test
+
+
+def _parse_select(value: str) -> Optional[List[str]]:
+    # Como o PostgREST, espaço em volta de um nome sem aspas faz parte do nome: é rejeitado
+    # aqui para que "select=nome, senha" falhe também nos testes e benchmarks
+    if any(c != c.strip() for c in value.split(",") if not c.strip().startswith('"')):
+        raise PostgRESTError(400, "PGRST100", f"select inválido (espaço em volta de coluna): {value}")
+    columns = [c.strip().strip('"') for c in value.split(",") if c.strip()]
+    return None if not columns or "*" in columns else columns
+
+
+def _parse_order(value: str) -> List[Tuple[str, bool, Optional[bool]]]:
+    """[(coluna, desc, nulls_first)] de 'a.desc,b.asc.nullsfirst'."""
+    result = []
+    for term in value.split(","):
+        parts = term.strip().split(".")
+        column, desc, nulls_first = parts[0].strip('"'), False, None
+        for mod in parts[1:]:
+            if mod == "desc":
+                desc = True
+            elif mod == "asc":
+                desc = False
+            elif mod == "nullsfirst":
+                nulls_first = True
+            elif mod == "nullslast":
+                nulls_first = False
+            else:
+                raise PostgRESTError(400, "PGRST100", f"Ordenação inválida: {term}")
+        result.append((column, desc, nulls_first))
+    return result
+
+
+def _sort(rows: List[Dict[str, Any]], order: Sequence[Tuple[str, bool, Optional[bool]]]) -> List[Dict[str, Any]]:
+    # Ordenação estável, do último critério para o primeiro (nulos por último no asc, primeiro no desc)
+    rows = list(rows)
+    for column, desc, nulls_first in reversed(order):
+        if nulls_first is None:
+            nulls_first = desc
+        present = [r for r in rows if r.get(column) is not None]
+        missing = [r for r in rows if r.get(column) is None]
+        present.sort(key=lambda r: (isinstance(r[column], str), r[column]), reverse=desc)
+        rows = missing + present if nulls_first else present + missing
+    return rows
+
+
+def _typed(value: str) -> Any:
+    """Valor de uma célula de CSV: vazio -> None; inteiros e decimais sem zeros à esquerda viram número."""
+    if value == "":
+        return None
+    if re.fullmatch(r"-?(0|[1-9]\d*)", value):
+        return int(value)
+    if re.fullmatch(r"-?(0|[1-9]\d*)\.\d+", value):
+        return float(value)
+    return value
+
+
+def load_csv(path: str) -> List[Dict[str, Any]]:
+    """Linhas de um CSV (UTF-8 com ou sem BOM; ',' ou ';'), com números e vazios convertidos."""
+    with open(path, encoding="utf-8-sig", newline="") as f:
+        header = f.readline()
+        f.seek(0)
+        delimiter = ";" if header.count(";") > header.count(",") else ","
+        return [{k: _typed(v) for k, v in row.items() if k} for row in csv.DictReader(f, delimiter=delimiter)]
+
+
+def load_seeds(folder: str) -> Dict[str, List[Dict[str, Any]]]:
+    """Uma tabela por <tabela>.csv da pasta (arquivo só com cabeçalho = tabela vazia)."""
+    tables: Dict[str, List[Dict[str, Any]]] = {}
+    for name in sorted(os.listdir(folder)):
+        if name.lower().endswith(".csv"):
+            tables[name[:-4]] = load_csv(os.path.join(folder, name))
+            logger.info(f"Tabela {name[:-4]} carregada: {len(tables[name[:-4]])} linhas")
+    return tables
+
+
+def _prefer(request: httpx.Request) -> Dict[str, str]:
+    result = {}
+    for item in (request.headers.get("prefer") or "").split(","):
+        key, _, value = item.strip().partition("=")
+        if key:
+            result[key] = value
+    return result
+
+
+def _error(e: PostgRESTError) -> httpx.Response:
+    return httpx.Response(e.status, json={"code": e.code, "message": str(e), "details": None, "hint": None})
+
+
+class PostgRESTLocal:
+    """Tabelas em memória servidas com a semântica do PostgREST (leitura e escrita)."""
+
+    def __init__(
+        self,
+        tables: Optional[Dict[str, List[Dict[str, Any]]]] = None,
+        max_rows: int = MAX_ROWS,
+        primary_key: str = "id",
+    ):
+        self.tables: Dict[str, List[Dict[str, Any]]] = dict(tables or {})
+        self.max_rows = max_rows
+        self.primary_key = primary_key
+        self.requests = 0
+
+    @classmethod
+    def from_seeds(cls, folder: str, **kwargs: Any) -> "PostgRESTLocal":
+        return cls(load_seeds(folder), **kwargs)
+
+    def _table(self, name: str) -> List[Dict[str, Any]]:
+        rows = self.tables.get(name)
+        if rows is None:
+            raise PostgRESTError(404, "42P01", f'relation "public.{name}" does not exist')
+        return rows
+
+    @staticmethod
+    def _filters(params: Sequence[Tuple[str, str]], reserved: Sequence[str]) -> List[Callable[[Dict[str, Any]], bool]]:
+        return [build_filter(key, value) for key, value in params if key not in reserved]
+
+    def select(
+        self,
+        table: str,
+        params: Sequence[Tuple[str, str]],
+        range_header: Optional[str] = None,
+    ) -> Tuple[List[Dict[str, Any]], int, int]:
+        """(linhas da página, posição inicial, total após filtros) de um GET."""
+        rows = self._table(table)
+        columns: Optional[List[str]] = None
+        order: List[Tuple[str, bool, Optional[bool]]] = []
+        limit: Optional[int] = None
+        offset = 0
+        for key, value in params:
+            if key == "select":
+                columns = _parse_select(value)
+            elif key == "order":
+                order = _parse_order(value)
+            elif key == "limit":
+                limit = int(value)
+            elif key == "offset":
+                offset = int(value)
+        filters = self._filters(params, ("select", "order", "limit", "offset"))
+        if filters:
+            rows = [r for r in rows if all(f(r) for f in filters)]
+        if order:
+            rows = _sort(rows, order)
+
+        if range_header:
+            match = _RANGE.match(range_header)
+            if not match:
+                raise PostgRESTError(416, "PGRST103", f"Range inválido: {range_header}")
+            offset = int(match.group(1))
+            if match.group(2):
+                limit = int(match.group(2)) - offset + 1
+        size = self.max_rows if limit is None else min(limit, self.max_rows)
+        page = rows[offset:offset + size]
+        if columns is not None:
+            page = [{c: r.get(c) for c in columns} for r in page]
+        return page, offset, len(rows)
+
+    def insert(
+        self,
+        table: str,
+        payload: Any,
+        upsert: bool = False,
+        on_conflict: Optional[str] = None,
+    ) -> List[Dict[str, Any]]:
+        """
+        Insere uma linha ou lista de linhas. Com upsert, linhas cuja coluna on_conflict
+        (padrão: chave primária) já existe são atualizadas só nas colunas enviadas.
+        """
+        rows = self._table(table)
+        items = payload if isinstance(payload, list) else [payload]
+        if not all(isinstance(item, dict) for item in items):
+            raise PostgRESTError(400, "PGRST102", "Corpo deve ser um objeto ou uma lista de objetos")
+        key = on_conflict or self.primary_key
+        existing = {str(r.get(key)): r for r in rows if r.get(key) is not None}
+        columns: Dict[str, None] = {}
+        for item in items:
+            columns.update(dict.fromkeys(item))
+        next_id = max((r.get(self.primary_key) for r in rows if isinstance(r.get(self.primary_key), int)), default=0) + 1
+
+        result: List[Dict[str, Any]] = []
+        for item in items:
+            current = existing.get(str(item.get(key))) if item.get(key) is not None else None
+            if current is not None:
+                if not upsert:
+                    raise PostgRESTError(
+                        409, "23505", f'duplicate key value violates unique constraint "{table}_{key}_key"'
+                    )
+                current.update(item)
+                result.append(current)
+                continue
+            # Colunas ausentes em uma linha do lote ficam nulas, como no insert em lote do PostgREST
+            row = {c: item.get(c) for c in columns}
+            if row.get(self.primary_key) is None and (not rows or self.primary_key in rows[0]):
+                row[self.primary_key] = next_id
+                next_id += 1
+            rows.append(row)
+            if row.get(key) is not None:
+                existing[str(row.get(key))] = row
+            result.append(row)
+        return result
+
+    def update(self, table: str, params: Sequence[Tuple[str, str]], values: Any) -> List[Dict[str, Any]]:
+        if not isinstance(values, dict):
+            raise PostgRESTError(400, "PGRST102", "Corpo do PATCH deve ser um objeto")
+        filters = self._filters(params, ("select", "columns"))
+        changed = [r for r in self._table(table) if all(f(r) for f in filters)]
+        for row in changed:
+            row.update(values)
+        return changed
+
+    def delete(self, table: str, params: Sequence[Tuple[str, str]]) -> List[Dict[str, Any]]:
+        rows = self._table(table)
+        filters = self._filters(params, ("select",))
+        removed = [r for r in rows if all(f(r) for f in filters)]
+        if removed:
+            ids = {id(r) for r in removed}
+            rows[:] = [r for r in rows if id(r) not in ids]
+        return removed
+
+    def _read(self, request: httpx.Request, table: str, params: List[Tuple[str, str]]) -> httpx.Response:
+        page, offset, total = self.select(table, params, request.headers.get("range"))
+        exact = _prefer(request).get("count") == "exact"
+        if exact and offset > total:
+            raise PostgRESTError(416, "PGRST103", f"Intervalo além do total de {total} linhas")
+        interval = f"{offset}-{offset + len(page) - 1}" if page else "*"
+        headers = {
+            "Content-Type": "application/json; charset=utf-8",
+            "Content-Range": f"{interval}/{total if exact else '*'}",
+        }
+        partial = exact and len(page) < total
+        body = b"" if request.method == "HEAD" else json.dumps(page, ensure_ascii=False, default=str).encode("utf-8")
+        return httpx.Response(206 if partial else 200, headers=headers, content=body)
+
+    def _write(self, request: httpx.Request, table: str, params: List[Tuple[str, str]]) -> httpx.Response:
+        try:
+            payload = json.loads(request.content or b"null")
+        except ValueError as e:
+            raise PostgRESTError(400, "PGRST102", f"JSON inválido: {e}")
+        prefer = _prefer(request)
+        if request.method == "POST":
+            on_conflict = next((v for k, v in params if k == "on_conflict"), None)
+            upsert = prefer.get("resolution") == "merge-duplicates"
+            rows, status = self.insert(table, payload, upsert=upsert, on_conflict=on_conflict), 201
+        elif request.method == "PATCH":
+            rows, status = self.update(table, params, payload), 200
+        else:
+            rows, status = self.delete(table, params), 200
+        if prefer.get("return") != "representation":
+            return httpx.Response(201 if request.method == "POST" else 204)
+        return httpx.Response(status, json=rows)
+
+    def handle(self, request: httpx.Request) -> httpx.Response:
+        self.requests += 1
+        table = unquote(request.url.path.rstrip("/").rsplit("/", 1)[-1])
+        params = [(k, v) for k, v in request.url.params.multi_items()]
+        try:
+            if request.method in ("GET", "HEAD"):
+                return self._read(request, table, params)
+            if request.method in ("POST", "PATCH"):
+                return self._write(request, table, [(k, v) for k, v in params if k != "columns"])
+            if request.method == "DELETE":
+                return self._write(request, table, params)
+            raise PostgRESTError(405, "PGRST105", f"Método não suportado: {request.method}")
+        except PostgRESTError as e:
+            return _error(e)
+        except ValueError as e:
+            return _error(PostgRESTError(400, "PGRST100", str(e)))
+
+    def transport(self) -> httpx.MockTransport:
+        """Transporte do httpx que responde às chamadas com estas tabelas (sem rede)."""
+        return httpx.MockTransport(self.handle)
+
+    async def __call__(self, scope, receive, send):
+        """Aplicação ASGI: serve as tabelas em /rest/v1/<tabela> (ex.: com uvicorn)."""
+        if scope["type"] != "http":
+            return
+        body = b""
+        while True:
+            message = await receive()
+            body += message.get("body", b"")
+            if not message.get("more_body"):
+                break
+        query = scope.get("query_string", b"").decode("latin-1")
+        url = f"http://local{scope['path']}" + (f"?{query}" if query else "")
+        headers = [(k.decode("latin-1"), v.decode("latin-1")) for k, v in scope["headers"]]
+        response = self.handle(httpx.Request(scope["method"], url, headers=headers, content=body))
+        await send({
+            "type": "http.response.start",
+            "status": response.status_code,
+            "headers": [
+                (k.encode("latin-1"), v.encode("latin-1"))
+                for k, v in response.headers.items()
+                if k.lower() != "content-length"
+            ] + [(b"content-length", str(len(response.content)).encode())],
+        })
+        await send({"type": "http.response.body", "body": response.content})
+
+
+def main() -> None:
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser(description="PostgREST local em memória, carregado de CSVs")
+    parser.add_argument("--seeds", help="Pasta com um <tabela>.csv por tabela")
+    parser.add_argument("--sintetico", help="Gera os dados em memória (5k, 50k, 500k ou um número)")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--porta", type=int, default=54321)
+    args = parser.parse_args()
+    if bool(args.seeds) == bool(args.sintetico):
+        parser.error("Informe --seeds ou --sintetico")
+
+    if args.seeds:
+        rest = PostgRESTLocal.from_seeds(args.seeds)
+    else:
+        import dados_sinteticos
+        rest = PostgRESTLocal(dados_sinteticos.gerar(
+            dados_sinteticos.TAMANHOS.get(args.sintetico) or int(args.sintetico)
+        ))
+
+    import uvicorn
+    logger.info(f"PostgREST local em http://{args.host}:{args.porta} ({len(rest.tables)} tabelas)")
+    uvicorn.run(rest, host=args.host, port=args.porta, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,265 @@
+"""
+Réplica local (SQLite) das tabelas de referência pequenas e pouco alteradas.
+
+Cada tabela é espelhada a partir do snapshot do cache: a linha original fica em JSON e
+colunas auxiliares normalizadas (nome sem acento/maiúsculas, dígitos do CPF, gestor e
+login) são indexadas. Os endpoints filtram, ordenam e paginam com SQL, sem ida ao
+Supabase. A sincronização só reescreve a tabela quando o hash do conteúdo muda, em uma
+única transação (leitores continuam vendo a versão anterior até o commit).
+
+As operações são síncronas; a API as executa fora do event loop (asyncio.to_thread).
+
+A réplica só é criada com REPLICA_PATH. O arquivo não é criptografado e guarda dados
+pessoais: interesse_mudanca_area (com CPF e login) e pessoas_avaliadas (nome, login e
+gestor); o caminho deve ficar num disco restrito à API.
+"""
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from identity_index import cpf_digits, normalize_name
+
+logger = logging.getLogger(__name__)
+
+# Caminho do arquivo; vazio (padrão) desativa a réplica e os endpoints consultam o snapshot
+DEFAULT_PATH = os.getenv("REPLICA_PATH", "").strip()
+
+# Tabela -> colunas de origem de cada chave indexada (primeira preenchida vale)
+REPLICA_TABLES: Dict[str, Dict[str, Tuple[str, ...]]] = {
+    "mesa_calibracao": {"nome": ("NOME",), "gestor": ("Líder",)},
+    "idiomas": {"nome": ("Nome",), "login": ("USER_LOGIN",)},
+    "interesse_mudanca_area": {
+        "nome": ("Usuário Avaliado", "Avaliado"),
+        "cpf": ("Documento de Identificação",),
+        "login": ("Login do Avaliado",),
+    },
+    "nota_avd_2024": {"nome": ("Avaliado",), "gestor": ("Avaliador",)},
+    "colaborador_area_responsavel": {"nome": ("Nome",), "login": ("USER_LOGIN",)},
+    "pessoas_avaliadas": {"nome": ("NOME", "Usuário Avaliado"), "gestor": ("GESTOR",), "login": ("Login",)},
+}
+
+# Chaves indexadas e normalização de cada uma
+KEYS = ("nome", "cpf", "gestor", "login")
+_NORMALIZE = {
+    "nome": normalize_name,
+    "cpf": cpf_digits,
+    "gestor": normalize_name,
+    "login": lambda v: str(v).strip().lower(),
+}
+
+
+class ReplicaError(ValueError):
+    """Parâmetro de consulta inválido para a réplica."""
+
+
+def _sql_table(table: str) -> str:
+    return f'"r_{table}"'
+
+
+def _json_path(column: str) -> str:
+    return '$."' + column.replace('"', '\\"') + '"'
+
+
+def _key_values(row: Dict[str, Any], sources: Dict[str, Tuple[str, ...]]) -> List[Optional[str]]:
+    values: List[Optional[str]] = []
+    for key in KEYS:
+        value = None
+        for col in sources.get(key, ()):
+            v = row.get(col)
+            if v is not None and v != "":
+                value = _NORMALIZE[key](v) or None
+                break
+        values.append(value)
+    return values
+
+
+def _normalized_keys(keys: Optional[Dict[str, Sequence[str]]]) -> Dict[str, List[str]]:
+    result: Dict[str, List[str]] = {}
+    for key, values in (keys or {}).items():
+        if key not in _NORMALIZE:
+            raise ReplicaError(f"Chave de busca inválida: {key}")
+        normalized = [_NORMALIZE[key](v) for v in (values or []) if v]
+        if normalized:
+            result[key] = normalized
+    return result
+
+
+def query_rows(
+    table: str,
+    rows: List[Dict[str, Any]],
+    keys: Optional[Dict[str, Sequence[str]]] = None,
+    filters: Sequence[Tuple[str, List[str]]] = (),
+    ordem: Optional[str] = None,
+    limit: int = 1000,
+    offset: int = 0,
+    tables: Optional[Dict[str, Dict[str, Tuple[str, ...]]]] = None,
+) -> List[Dict[str, Any]]:
+    """Mesma consulta de ReadReplica.query feita em memória (réplica desativada)."""
+    sources = (REPLICA_TABLES if tables is None else tables)[table]
+    wanted = {KEYS.index(k): set(v) for k, v in _normalized_keys(keys).items()}
+    accepted = [(col, set(values)) for col, values in filters]
+    selected = [
+        r for r in rows
+        if all(_key_values(r, sources)[i] in values for i, values in wanted.items())
+        and all(r.get(col) is not None and str(r.get(col)) in values for col, values in accepted)
+    ]
+    if ordem:
+        col = ordem.lstrip("-")
+        if not any(col in r for r in rows):
+            raise ReplicaError(f"Ordenação por coluna inexistente em {table}: {col}")
+        present = [r for r in selected if r.get(col) is not None]
+        missing = [r for r in selected if r.get(col) is None]
+        present.sort(key=lambda r: (isinstance(r[col], str), r[col]), reverse=ordem.startswith("-"))
+        selected = present + missing
+    return selected[offset:offset + limit]
+
+
+class ReadReplica:
+    """Tabelas de referência espelhadas em SQLite, com consultas indexadas."""
+
+    def __init__(self, path: str = DEFAULT_PATH, tables: Optional[Dict[str, Dict[str, Tuple[str, ...]]]] = None):
+        self.path = path
+        self.tables = REPLICA_TABLES if tables is None else tables
+        self._local = threading.local()
+        self._write_lock = threading.Lock()
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        conn = self._conn()
+        with conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS replica_meta ("
+                " table_name TEXT PRIMARY KEY, content_hash TEXT, changed_at REAL,"
+                " synced_at REAL, row_count INTEGER, columns TEXT)"
+            )
+            for table in self.tables:
+                name = _sql_table(table)
+                conn.execute(
+                    f"CREATE TABLE IF NOT EXISTS {name} ("
+                    " pos INTEGER PRIMARY KEY, nome TEXT, cpf TEXT, gestor TEXT, login TEXT, data TEXT NOT NULL)"
+                )
+                for key in KEYS:
+                    conn.execute(f'CREATE INDEX IF NOT EXISTS "ix_r_{table}_{key}" ON {name} ({key})')
+        self._meta: Dict[str, Dict[str, Any]] = {}
+        for table, content_hash, changed_at, synced_at, row_count, columns in conn.execute(
+            "SELECT table_name, content_hash, changed_at, synced_at, row_count, columns FROM replica_meta"
+        ):
+            self._meta[table] = {
+                "content_hash": content_hash,
+                "changed_at": changed_at,
+                "synced_at": synced_at,
+                "rows": row_count,
+                "columns": json.loads(columns or "[]"),
+            }
+
+    def _conn(self) -> sqlite3.Connection:
+        # Uma conexão por thread (as consultas rodam no pool de threads do asyncio)
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=10)
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn = conn
+        return conn
+
+    def meta(self, table: str) -> Optional[Dict[str, Any]]:
+        """Hash, data de alteração e colunas da versão espelhada; None se nunca sincronizada."""
+        return self._meta.get(table)
+
+    def sync(self, table: str, rows: List[Dict[str, Any]], content_hash: str, changed_at: float) -> bool:
+        """Reescreve a tabela se o conteúdo mudou. Retorna True se houve escrita."""
+        sources = self.tables[table]
+        current = self._meta.get(table)
+        if current is not None and current["content_hash"] == content_hash:
+            return False
+        columns: Dict[str, None] = {}
+        params = []
+        for pos, row in enumerate(rows):
+            columns.update(dict.fromkeys(row))
+            params.append((pos, *_key_values(row, sources), json.dumps(row, ensure_ascii=False, default=str)))
+        now = time.time()
+        name = _sql_table(table)
+        with self._write_lock:
+            conn = self._conn()
+            with conn:
+                conn.execute(f"DELETE FROM {name}")
+                conn.executemany(f"INSERT INTO {name} (pos, nome, cpf, gestor, login, data) VALUES (?, ?, ?, ?, ?, ?)", params)
+                conn.execute(
+                    "INSERT OR REPLACE INTO replica_meta (table_name, content_hash, changed_at, synced_at, row_count, columns)"
+                    " VALUES (?, ?, ?, ?, ?, ?)",
+                    (table, content_hash, changed_at, now, len(rows), json.dumps(list(columns), ensure_ascii=False)),
+                )
+        self._meta[table] = {
+            "content_hash": content_hash,
+            "changed_at": changed_at,
+            "synced_at": now,
+            "rows": len(rows),
+            "columns": list(columns),
+        }
+        logger.info(f"Réplica local de {table} sincronizada: {len(rows)} linhas")
+        return True
+
+    def query(
+        self,
+        table: str,
+        keys: Optional[Dict[str, Sequence[str]]] = None,
+        filters: Sequence[Tuple[str, List[str]]] = (),
+        ordem: Optional[str] = None,
+        limit: int = 1000,
+        offset: int = 0,
+    ) -> List[Dict[str, Any]]:
+        """
+        Linhas da tabela filtradas pelas chaves normalizadas (nome/cpf/gestor/login, com
+        índice) e por igualdade em colunas originais, ordenadas por `ordem` (coluna;
+        prefixo '-' = decrescente) e paginadas.
+        """
+        meta = self._meta.get(table)
+        if meta is None:
+            raise ReplicaError(f"Réplica de {table} ainda não sincronizada")
+        where: List[str] = []
+        args: List[Any] = []
+        for key, values in _normalized_keys(keys).items():
+            where.append(f"{key} IN ({', '.join('?' * len(values))})")
+            args.extend(values)
+        for col, values in filters:
+            where.append(f"json_extract(data, ?) IN ({', '.join('?' * len(values))})")
+            args.append(_json_path(col))
+            args.extend(values)
+        order_by = "pos"
+        if ordem:
+            desc = ordem.startswith("-")
+            col = ordem.lstrip("-")
+            if col not in meta["columns"]:
+                raise ReplicaError(f"Ordenação por coluna inexistente em {table}: {col}")
+            # Valores vazios por último, empate pela ordem original
+            order_by = f"json_extract(data, ?) IS NULL, json_extract(data, ?) {'DESC' if desc else 'ASC'}, pos"
+            args_order = [_json_path(col), _json_path(col)]
+        else:
+            args_order = []
+        sql = f"SELECT data FROM {_sql_table(table)}"
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        sql += f" ORDER BY {order_by} LIMIT ? OFFSET ?"
+        cur = self._conn().execute(sql, [*args, *args_order, limit, offset])
+        return [json.loads(data) for (data,) in cur]
+
+    def info(self) -> Dict[str, Any]:
+        return {
+            "path": self.path,
+            "tables": {
+                table: {k: v for k, v in meta.items() if k != "columns"}
+                for table, meta in self._meta.items()
+            },
+        }
+
+
+def open_replica(path: str = DEFAULT_PATH) -> Optional[ReadReplica]:
+    """ReadReplica no caminho configurado; None se desativada ou se o arquivo não puder ser aberto."""
+    if not path:
+        return None
+    try:
+        return ReadReplica(path)
+    except Exception as e:
+        logger.warning(f"Réplica local desativada ({path}): {e}")
+        return None
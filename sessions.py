@@ -0,0 +1,199 @@
+"""
+Tokens de sessão assinados, sem estado no servidor.
+
+/api/login emite `<dados>.<assinatura>`: os dados são um JSON em base64url com o usuário
+(u), os códigos das áreas restritas liberadas pelo filtro GP (a) e a expiração (exp, epoch);
+a assinatura é HMAC-SHA256 com SESSION_SECRET. require_session, dependência de todas as
+rotas /api/*, confere a assinatura e a validade em memória (alguns microssegundos, sem
+consultar o Supabase) e deixa a sessão em request.state.session.
+
+As linhas das áreas restritas (RESTRICTED_AREAS) que o token não libera são retiradas das
+respostas pelo AreaFilter, a partir das colunas de área de cada tabela (AREA_COLUMNS).
+
+Sem SESSION_SECRET a chave é gerada ao iniciar o processo: os tokens deixam de valer
+quando a API reinicia (e não são aceitos por outros processos).
+"""
+import base64
+import hashlib
+import hmac
+import json
+import logging
+import os
+import re
+import secrets
+import time
+from dataclasses import dataclass
+from typing import Any, Dict, Iterable, Optional, Sequence, Tuple
+
+from fastapi import HTTPException, Request
+
+from identity_index import normalize_name
+
+logger = logging.getLogger(__name__)
+
+_secret = os.getenv("SESSION_SECRET", "").strip()
+if not _secret:
+    logger.warning("SESSION_SECRET não definido: tokens de sessão valem só até a API reiniciar")
+SECRET = _secret.encode("utf-8") if _secret else secrets.token_bytes(32)
+
+# Validade dos tokens (segundos)
+SESSION_TTL = int(os.getenv("SESSION_TTL", str(12 * 3600)))
+# false desliga a exigência de token (ambiente local / scripts de teste)
+AUTH_REQUIRED = os.getenv("SESSION_AUTH_REQUIRED", "true").strip().lower() == "true"
+
+# Rotas /api abertas sem sessão
+PUBLIC_PATHS = {"/api", "/api/health", "/api/_cors_debug", "/api/login"}
+# Rotas lidas pelo Prometheus: aceitam também o token fixo METRICS_TOKEN (Authorization: Bearer)
+METRICS_PATHS = {"/api/metrics"}
+METRICS_TOKEN = os.getenv("METRICS_TOKEN", "").strip()
+
+# Código numérico de uma área (ex.: "001.03.01.1001.02"), como o extractAreaCode do app.js
+_AREA_CODE = re.compile(r"\d{3}(?:\.\d{2}){2,}\.\d+(?:\.\d+)?")
+
+# Áreas liberadas só pela senha do filtro GP (/api/validar-filtro-gp)
+RESTRICTED_AREAS = (
+    "001.03.01.1001.02 - COORDENAÇÃO DE COMUNICAÇÃO E MARKETING",
+    "001.03.01.1001.00 - DIRETORIA DE GESTÃO DE PESSOAS E COMUNICAÇÃO",
+    "001.03.01.1001.01 - COORDENAÇÃO DE GESTÃO DE PESSOAS",
+)
+
+# Colunas com a área (código ou nome) de cada tabela; as ausentes numa linha são ignoradas
+AREA_COLUMNS: Dict[str, Tuple[str, ...]] = {
+    "nota_final_colaborador": ("área", "Área"),
+    "relacao_ativos": ("codsecao", "gerencia"),
+    "pessoas_avaliadas": ("Área",),
+    "colaborador_area_responsavel": ("Área",),
+    "notas_por_competencia": ("Área",),
+}
+
+
+@dataclass(frozen=True)
+class Session:
+    """Dados de um token válido."""
+    user: str
+    areas: Tuple[str, ...]
+    expires_at: int
+
+
+def area_codes(areas: Iterable[str]) -> Tuple[str, ...]:
+    """Códigos numéricos das áreas (o texto inteiro quando não há código)."""
+    codes = []
+    for area in areas:
+        match = _AREA_CODE.search(area or "")
+        code = match.group(0) if match else (area or "").strip()
+        if code and code not in codes:
+            codes.append(code)
+    return tuple(codes)
+
+
+def hidden_areas(session: Optional["Session"]) -> Tuple[str, ...]:
+    """Códigos das áreas restritas que a sessão não liberou (todas sem sessão)."""
+    allowed = set(session.areas) if session is not None else set()
+    return tuple(c for c in area_codes(RESTRICTED_AREAS) if c not in allowed)
+
+
+class AreaFilter:
+    """Identifica as linhas das áreas restritas escondidas de uma sessão (por código ou nome)."""
+
+    def __init__(self, codes: Iterable[str]):
+        self.codes = tuple(codes)
+        self._names = set()
+        for area in RESTRICTED_AREAS:
+            code = area_codes([area])[0]
+            if code in self.codes:
+                self._names.add(normalize_name(area))
+                self._names.add(normalize_name(area.split(" - ", 1)[-1]))
+
+    def hides(self, value: Any) -> bool:
+        if value is None or value == "":
+            return False
+        text = str(value)
+        match = _AREA_CODE.search(text)
+        if match:
+            code = match.group(0)
+            if any(code == c or code.startswith(c + ".") for c in self.codes):
+                return True
+        return normalize_name(text) in self._names
+
+    def hides_row(self, row: Dict[str, Any], table: Optional[str] = None) -> bool:
+        """A linha é de uma área escondida (sem tabela, vale qualquer coluna de área conhecida)."""
+        columns = AREA_COLUMNS.get(table, ()) if table else {c for cs in AREA_COLUMNS.values() for c in cs}
+        return any(self.hides(row.get(c)) for c in columns)
+
+    def mask(self, table: str, columns: Dict[str, Sequence[Any]]) -> Optional[bytearray]:
+        """1 nas posições escondidas, dadas as colunas de área da tabela; None se nada é escondido."""
+        mask: Optional[bytearray] = None
+        for values in columns.values():
+            # Cada valor distinto é avaliado uma vez (as colunas de área repetem muito)
+            hidden = {v for v in set(values) if self.hides(v)}
+            if not hidden:
+                continue
+            if mask is None:
+                mask = bytearray(len(values))
+            for i, v in enumerate(values):
+                if v in hidden:
+                    mask[i] = 1
+        return mask
+
+
+def _b64encode(data: bytes) -> str:
+    return base64.urlsafe_b64encode(data).rstrip(b"=").decode("ascii")
+
+
+def _b64decode(data: str) -> bytes:
+    return base64.urlsafe_b64decode(data + "=" * (-len(data) % 4))
+
+
+def _sign(payload: str) -> str:
+    return _b64encode(hmac.new(SECRET, payload.encode("ascii"), hashlib.sha256).digest())
+
+
+def issue(user: str, areas: Iterable[str] = (), ttl: int = SESSION_TTL) -> str:
+    """Token assinado para o usuário, com os códigos de área liberados."""
+    data = {"u": user, "a": list(area_codes(areas)), "exp": int(time.time()) + ttl}
+    payload = _b64encode(json.dumps(data, ensure_ascii=False, separators=(",", ":")).encode("utf-8"))
+    return f"{payload}.{_sign(payload)}"
+
+
+def verify(token: Optional[str]) -> Optional[Session]:
+    """Sessão do token, ou None se a assinatura não confere, o formato é inválido ou expirou."""
+    if not token:
+        return None
+    payload, _, signature = token.partition(".")
+    try:
+        if not hmac.compare_digest(_sign(payload), signature):
+            return None
+        data = json.loads(_b64decode(payload))
+        session = Session(str(data["u"]), tuple(data.get("a") or ()), int(data["exp"]))
+    except (ValueError, KeyError, TypeError):
+        return None
+    return session if session.expires_at > time.time() else None
+
+
+def bearer(authorization: Optional[str]) -> Optional[str]:
+    scheme, _, token = (authorization or "").partition(" ")
+    return token.strip() if scheme.lower() == "bearer" else None
+
+
+def is_metrics_token(token: Optional[str]) -> bool:
+    """Token de coleta das métricas (desligado sem METRICS_TOKEN)."""
+    return bool(METRICS_TOKEN and token) and hmac.compare_digest(
+        token.encode("utf-8"), METRICS_TOKEN.encode("utf-8")
+    )
+
+
+async def require_session(request: Request) -> Optional[Session]:
+    """Dependência das rotas /api/*: 401 sem um token válido (exceto PUBLIC_PATHS e METRICS_TOKEN)."""
+    path = request.url.path.rstrip("/") or "/"
+    token = bearer(request.headers.get("authorization"))
+    session = verify(token)
+    request.state.session = session
+    if session is None and path in METRICS_PATHS and is_metrics_token(token):
+        return None
+    if session is None and AUTH_REQUIRED and path.startswith("/api/") and path not in PUBLIC_PATHS:
+        raise HTTPException(
+            status_code=401,
+            detail="Sessão inválida ou expirada. Faça login novamente.",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    return session
@@ -0,0 +1,397 @@
+"""
+Cache em memória de snapshots das tabelas somente-leitura do Supabase.
+
+Cada tabela é carregada inteira (todas as páginas) e mantida em memória por um
+TTL próprio. Vários pedidos simultâneos para a mesma tabela fria compartilham
+uma única carga (single-flight), e o total de linhas em cache é limitado, com
+descarte da tabela usada há mais tempo (LRU).
+
+Snapshot expirado continua sendo servido enquanto a nova carga roda em segundo plano
+(stale-while-revalidate). Com um SnapshotStore, cada carga também é gravada em disco e,
+na inicialização, restore() devolve ao cache os snapshots da execução anterior.
+
+Com CACHE_COLUMNAR (padrão), as linhas de cada carga são convertidas, fora do event loop,
+em uma columnar.ColumnarTable: mesma interface de sequência de linhas, ~10x menos memória.
+"""
+import asyncio
+import logging
+import os
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Sequence, Tuple
+
+import columnar
+from snapshot_store import SnapshotStore, encode_rows
+
+logger = logging.getLogger(__name__)
+
+# TTL padrão (segundos) e TTLs específicos por tabela
+DEFAULT_TTL = float(os.getenv("CACHE_TTL_DEFAULT", "300"))
+TABLE_TTLS: Dict[str, float] = {
+    # Tabelas alteradas pela própria aplicação: TTL curto (também são invalidadas nas escritas)
+    "nota_final_colaborador": 120,
+    "desenvolvimento_colaborador": 60,
+    # Tabelas de referência, atualizadas poucas vezes ao dia
+    "relacao_ativos": 900,
+    "movimentacao_salario": 900,
+    "nota_por_avaliacao": 900,
+    "notas_por_competencia": 900,
+    "nota_avd_2024": 3600,
+    "mesa_calibracao": 900,
+    "pessoas_avaliadas": 900,
+    "colaborador_area_responsavel": 900,
+    "idiomas": 1800,
+    "interesse_mudanca_area": 1800,
+    "experiencias_profissionais": 1800,
+}
+
+# Guardar os snapshots em formato colunar (columnar.py)
+COLUMNAR = os.getenv("CACHE_COLUMNAR", "true").strip().lower() == "true"
+
+# Limite total de linhas mantidas em memória (somando todas as tabelas); no formato
+# colunar cada linha ocupa ~10x menos, então o limite padrão é maior
+MAX_ROWS = int(os.getenv("CACHE_MAX_ROWS", "1000000" if COLUMNAR else "250000"))
+
+# Servir snapshot expirado enquanto a nova carga roda em segundo plano
+STALE_WHILE_REVALIDATE = os.getenv("CACHE_STALE_WHILE_REVALIDATE", "true").strip().lower() == "true"
+# Espera (segundos) antes de tentar revalidar de novo uma tabela cuja carga falhou
+REVALIDATE_RETRY = float(os.getenv("CACHE_REVALIDATE_RETRY", "30"))
+
+
+@dataclass
+class Snapshot:
+    """Conteúdo de uma tabela em um instante."""
+    table: str
+    rows: Sequence[Dict[str, Any]]
+    loaded_at: float
+    expires_at: float
+    version: int = 0
+    _content_hash: Optional[str] = field(default=None, repr=False, compare=False)
+
+    @property
+    def size(self) -> int:
+        return len(self.rows)
+
+    @property
+    def content_hash(self) -> str:
+        """
+        Hash do conteúdo; igual entre cargas com os mesmos dados. O SnapshotCache já o calcula
+        numa thread ao carregar ou restaurar; o cálculo aqui é só o caso de snapshots avulsos.
+        """
+        if self._content_hash is None:
+            self._content_hash = encode_rows(self.rows)[1]
+        return self._content_hash
+
+    def is_fresh(self, now: Optional[float] = None) -> bool:
+        return (now if now is not None else time.monotonic()) < self.expires_at
+
+    @property
+    def nbytes(self) -> Optional[int]:
+        """Memória aproximada das linhas (só para snapshots colunares)."""
+        return self.rows.nbytes() if isinstance(self.rows, columnar.ColumnarTable) else None
+
+
+def _prepare(rows: List[Dict[str, Any]], columnar_rows: bool) -> Tuple[Sequence[Dict[str, Any]], str]:
+    """Calcula o hash do conteúdo e converte as linhas para o formato colunar (em uma thread)."""
+    content_hash = encode_rows(rows)[1]
+    return (columnar.compact(rows) if columnar_rows else rows), content_hash
+
+
+@dataclass
+class CacheStats:
+    hits: int = 0
+    misses: int = 0
+    loads: int = 0
+    stale_hits: int = 0
+    restored: int = 0
+    load_errors: int = 0
+    evictions: int = 0
+    invalidations: int = 0
+    per_table: Dict[str, Dict[str, int]] = field(default_factory=dict)
+
+    def _table(self, table: str) -> Dict[str, int]:
+        return self.per_table.setdefault(table, {"hits": 0, "misses": 0, "stale_hits": 0, "loads": 0})
+
+    def hit(self, table: str) -> None:
+        self.hits += 1
+        self._table(table)["hits"] += 1
+
+    def miss(self, table: str) -> None:
+        self.misses += 1
+        self._table(table)["misses"] += 1
+
+    def stale(self, table: str) -> None:
+        self.stale_hits += 1
+        self._table(table)["stale_hits"] += 1
+
+    def load(self, table: str) -> None:
+        self.loads += 1
+        self._table(table)["loads"] += 1
+
+
+class SnapshotCache:
+    """Cache de snapshots por tabela com TTL, limite de tamanho e carga single-flight."""
+
+    def __init__(
+        self,
+        loader: Callable[[str], Awaitable[List[Dict[str, Any]]]],
+        ttls: Optional[Dict[str, float]] = None,
+        default_ttl: float = DEFAULT_TTL,
+        max_rows: int = MAX_ROWS,
+        store: Optional[SnapshotStore] = None,
+        stale_while_revalidate: bool = STALE_WHILE_REVALIDATE,
+        columnar_rows: bool = COLUMNAR,
+    ):
+        self._loader = loader
+        self._columnar = columnar_rows
+        self._disk = store
+        self._stale_while_revalidate = stale_while_revalidate
+        self._ttls = dict(TABLE_TTLS if ttls is None else ttls)
+        self._default_ttl = default_ttl
+        self._max_rows = max_rows
+        self._entries: "OrderedDict[str, Snapshot]" = OrderedDict()
+        self._inflight: Dict[str, "asyncio.Task[Snapshot]"] = {}
+        self._versions: Dict[str, int] = {}
+        self._generations: Dict[str, int] = {}
+        # Último hash de conteúdo visto por tabela e quando esse conteúdo apareceu (Last-Modified)
+        self._content: Dict[str, Tuple[str, float]] = {}
+        self.stats = CacheStats()
+
+    def ttl_for(self, table: str) -> float:
+        return float(self._ttls.get(table, self._default_ttl))
+
+    def peek(self, table: str) -> Optional[Snapshot]:
+        """Retorna o snapshot em cache se ainda estiver válido, sem disparar carga."""
+        snap = self._entries.get(table)
+        if snap is not None and snap.is_fresh():
+            return snap
+        return None
+
+    async def get(self, table: str) -> Snapshot:
+        """
+        Obtém o snapshot da tabela, carregando do Supabase se ausente. Se estiver expirado,
+        devolve o snapshot atual e revalida em segundo plano (stale-while-revalidate).
+        """
+        snap = self._entries.get(table)
+        if snap is not None and (snap.is_fresh() or self._stale_while_revalidate):
+            self._entries.move_to_end(table)
+            if snap.is_fresh():
+                self.stats.hit(table)
+            else:
+                self.stats.stale(table)
+                self._revalidate(table)
+            return snap
+
+        self.stats.miss(table)
+        task = self._inflight.get(table)
+        if task is None:
+            # Primeira requisição a encontrar o cache frio dispara a carga; as demais aguardam a mesma task.
+            # A carga roda em uma task própria para não ser cancelada se o cliente que a iniciou desconectar.
+            task = asyncio.ensure_future(self._load(table))
+            self._inflight[table] = task
+        return await asyncio.shield(task)
+
+    def _revalidate(self, table: str) -> None:
+        """Dispara a recarga da tabela em segundo plano (uma por vez por tabela)."""
+        if table in self._inflight:
+            return
+        task = asyncio.ensure_future(self._load(table))
+        self._inflight[table] = task
+        task.add_done_callback(lambda t, table=table: self._revalidated(table, t))
+
+    def _revalidated(self, table: str, task: "asyncio.Task[Snapshot]") -> None:
+        if task.cancelled():
+            return
+        error = task.exception()
+        if error is None:
+            return
+        # Mantém o snapshot antigo e adia a próxima tentativa
+        logger.warning(f"Falha ao revalidar {table}; servindo snapshot anterior: {error}")
+        snap = self._entries.get(table)
+        if snap is not None and not snap.is_fresh():
+            snap.expires_at = time.monotonic() + REVALIDATE_RETRY
+
+    async def _load(self, table: str) -> Snapshot:
+        generation = self._generations.get(table, 0)
+        try:
+            rows = await self._loader(table)
+            # Hash do conteúdo (ETag, revalidação, réplica) fora do event loop: encode_rows serializa
+            # a tabela inteira e bloquearia as outras requisições
+            rows, content_hash = await asyncio.to_thread(_prepare, rows, self._columnar)
+            # Se a tabela foi invalidada durante a carga, os dados podem estar desatualizados:
+            # entregamos aos que aguardavam, mas não guardamos no cache.
+            return self._store(
+                table, rows, keep=self._generations.get(table, 0) == generation, content_hash=content_hash
+            )
+        except Exception:
+            self.stats.load_errors += 1
+            raise
+        finally:
+            if self._generations.get(table, 0) == generation:
+                self._inflight.pop(table, None)
+
+    def changed_at(self, snap: Snapshot) -> float:
+        """Instante (epoch) em que o conteúdo atual da tabela foi carregado pela primeira vez."""
+        current = self._content.get(snap.table)
+        if current is not None and current[0] == snap.content_hash:
+            return current[1]
+        if current is not None and current[1] > snap.loaded_at:
+            # Snapshot antigo ainda em uso por uma requisição: não retroceder a data
+            return snap.loaded_at
+        self._content[snap.table] = (snap.content_hash, snap.loaded_at)
+        return snap.loaded_at
+
+    async def rows(self, table: str) -> Sequence[Dict[str, Any]]:
+        return (await self.get(table)).rows
+
+    def invalidate(self, table: Optional[str] = None) -> None:
+        """Descarta o snapshot de uma tabela (ou de todas, se table for None)."""
+        tables = list(set(self._entries) | set(self._inflight)) if table is None else [table]
+        for name in tables:
+            self._entries.pop(name, None)
+            self._inflight.pop(name, None)
+            self._generations[name] = self._generations.get(name, 0) + 1
+        if self._disk is not None:
+            # A cópia em disco também está desatualizada: não deve ser restaurada
+            try:
+                self._disk.delete(table)
+            except Exception as e:
+                logger.warning(f"Falha ao remover snapshot em disco de {table or 'todas as tabelas'}: {e}")
+        self.stats.invalidations += 1
+        logger.info(f"Cache invalidado: {table or 'todas as tabelas'}")
+
+    def _store(
+        self,
+        table: str,
+        rows: Sequence[Dict[str, Any]],
+        keep: bool = True,
+        content_hash: Optional[str] = None,
+    ) -> Snapshot:
+        now = time.monotonic()
+        snap = Snapshot(
+            table=table,
+            rows=rows,
+            loaded_at=time.time(),
+            expires_at=now + self.ttl_for(table),
+            version=self._versions.get(table, 0) + 1,
+            _content_hash=content_hash,
+        )
+        self.stats.load(table)
+        if not keep:
+            return snap
+        current = self._entries.get(table)
+        if current is not None and current.content_hash == snap.content_hash:
+            # Revalidação sem mudanças: mantém o snapshot (e os índices calculados a partir dele)
+            current.expires_at = snap.expires_at
+            self._entries.move_to_end(table)
+            logger.info(f"Snapshot de {table} revalidado sem alterações: {len(rows)} linhas (v{current.version})")
+            return current
+        self._versions[table] = snap.version
+        self._entries.pop(table, None)
+        self._entries[table] = snap
+        self._evict(keep=table)
+        logger.info(f"Snapshot de {table} carregado: {len(rows)} linhas (v{snap.version})")
+        self._persist(snap)
+        return snap
+
+    def _persist(self, snap: Snapshot) -> None:
+        """Grava o snapshot em disco em segundo plano (fora do event loop)."""
+        if self._disk is None or not self._disk.persists(snap.table):
+            return
+
+        async def _save() -> None:
+            try:
+                content_hash = await asyncio.to_thread(self._disk.save, snap.table, snap.rows, snap.loaded_at)
+                if snap._content_hash is None:
+                    snap._content_hash = content_hash
+            except Exception as e:
+                logger.warning(f"Falha ao gravar snapshot de {snap.table} em disco: {e}")
+
+        asyncio.ensure_future(_save())
+
+    async def restore(self) -> int:
+        """
+        Carrega os snapshots gravados em disco como expirados: são servidos imediatamente
+        e revalidados no Supabase no primeiro acesso. Retorna quantas tabelas foram restauradas.
+        """
+        if self._disk is None or not self._stale_while_revalidate:
+            return 0
+        tables = await asyncio.to_thread(self._disk.tables)
+        restored = 0
+        # Mais antigas primeiro: se o limite de linhas estourar, as mais recentes ficam
+        for table in reversed(tables):
+            if table in self._entries or table in self._inflight:
+                continue
+            try:
+                stored = await asyncio.to_thread(self._disk.load, table)
+                if stored is not None and self._columnar:
+                    rows, loaded_at, content_hash = stored
+                    stored = await asyncio.to_thread(columnar.compact, rows), loaded_at, content_hash
+            except Exception as e:
+                logger.warning(f"Falha ao restaurar snapshot de {table} do disco: {e}")
+                continue
+            if stored is None or table in self._entries:
+                continue
+            rows, loaded_at, content_hash = stored
+            version = self._versions.get(table, 0) + 1
+            self._versions[table] = version
+            self._entries[table] = Snapshot(
+                table=table,
+                rows=rows,
+                loaded_at=loaded_at,
+                expires_at=time.monotonic(),
+                version=version,
+                _content_hash=content_hash,
+            )
+            self._content.setdefault(table, (content_hash, loaded_at))
+            self._evict(keep=table)
+            restored += 1
+            self.stats.restored += 1
+        if restored:
+            logger.info(f"{restored} snapshots restaurados do disco ({self._disk.path})")
+        return restored
+
+    def _evict(self, keep: str) -> None:
+        total = sum(s.size for s in self._entries.values())
+        for name in list(self._entries.keys()):
+            if total <= self._max_rows:
+                break
+            if name == keep:
+                continue
+            total -= self._entries.pop(name).size
+            self.stats.evictions += 1
+            logger.info(f"Snapshot de {name} descartado do cache (limite de {self._max_rows} linhas)")
+
+    def info(self) -> Dict[str, Any]:
+        """Resumo do cache para diagnóstico (/api/cache/stats)."""
+        now = time.monotonic()
+        lookups = self.stats.hits + self.stats.misses
+        return {
+            "hits": self.stats.hits,
+            "misses": self.stats.misses,
+            "hit_ratio": round(self.stats.hits / lookups, 4) if lookups else None,
+            "stale_hits": self.stats.stale_hits,
+            "restored": self.stats.restored,
+            "loads": self.stats.loads,
+            "load_errors": self.stats.load_errors,
+            "evictions": self.stats.evictions,
+            "invalidations": self.stats.invalidations,
+            "max_rows": self._max_rows,
+            "stale_while_revalidate": self._stale_while_revalidate,
+            "store": self._disk.path if self._disk is not None else None,
+            "rows": sum(s.size for s in self._entries.values()),
+            "columnar": self._columnar,
+            "bytes": sum(s.nbytes or 0 for s in self._entries.values()),
+            "tables": {
+                name: {
+                    "rows": snap.size,
+                    "bytes": snap.nbytes,
+                    "version": snap.version,
+                    "ttl": self.ttl_for(name),
+                    "expires_in": round(max(0.0, snap.expires_at - now), 1),
+                    **self.stats.per_table.get(name, {}),
+                }
+                for name, snap in self._entries.items()
+            },
+        }
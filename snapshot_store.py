@@ -0,0 +1,145 @@
+"""
+Cópia em disco (SQLite) dos snapshots do cache, para que um processo recém-iniciado
+(ex.: serviço acordando no plano gratuito do Render) responda na hora com os dados da
+última execução, enquanto o cache revalida cada tabela no Supabase em segundo plano.
+
+Cada tabela é gravada como um único registro: JSON das linhas comprimido com zlib, hash
+do conteúdo (o mesmo de Snapshot.content_hash) e instante da carga. As operações são
+síncronas e curtas; o SnapshotCache as executa fora do event loop (asyncio.to_thread).
+
+O arquivo não é criptografado: a persistência só é ligada com SNAPSHOT_STORE_PATH, as
+tabelas de credenciais nunca são gravadas e as que têm dados pessoais (CPF, salário)
+ficam de fora por padrão (SNAPSHOT_STORE_EXCLUDE).
+"""
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import zlib
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Caminho do arquivo; vazio (padrão) desativa a persistência
+DEFAULT_PATH = os.getenv("SNAPSHOT_STORE_PATH", "").strip()
+
+# Credenciais: nunca vão para o disco
+CREDENTIAL_TABLES = frozenset({"usuarios", "filtrogp"})
+# Tabelas com dados pessoais, também fora do disco (lista separada por vírgulas; vazio grava todas)
+EXCLUDED_TABLES = frozenset(
+    t.strip()
+    for t in os.getenv(
+        "SNAPSHOT_STORE_EXCLUDE",
+        "relacao_ativos,nota_final_colaborador,interesse_mudanca_area,movimentacao_salario",
+    ).split(",")
+    if t.strip()
+)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS snapshots (
+    table_name   TEXT PRIMARY KEY,
+    content_hash TEXT NOT NULL,
+    loaded_at    REAL NOT NULL,
+    row_count    INTEGER NOT NULL,
+    data         BLOB NOT NULL
+)
+"""
+
+
+def encode_rows(rows: Sequence[Dict[str, Any]]) -> Tuple[bytes, str]:
+    """JSON das linhas e hash do conteúdo (mesma serialização de Snapshot.content_hash)."""
+    if isinstance(rows, list):
+        payload = json.dumps(rows, ensure_ascii=False, separators=(",", ":"), default=str).encode("utf-8")
+    else:
+        # Tabela colunar: linha a linha (mesmos bytes de json.dumps da lista), sem montar todas de uma vez
+        encoder = json.JSONEncoder(ensure_ascii=False, separators=(",", ":"), default=str)
+        payload = ("[" + ",".join(encoder.encode(r) for r in rows) + "]").encode("utf-8")
+    return payload, hashlib.blake2b(payload, digest_size=12).hexdigest()
+
+
+class SnapshotStore:
+    """Snapshots persistidos em um arquivo SQLite (uma linha por tabela)."""
+
+    def __init__(self, path: str = DEFAULT_PATH, excluded: Iterable[str] = EXCLUDED_TABLES):
+        self.path = path
+        self.excluded = CREDENTIAL_TABLES | frozenset(excluded)
+        self._lock = threading.Lock()
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute(_SCHEMA)
+            # Cópias de tabelas excluídas gravadas antes da configuração atual
+            conn.executemany("DELETE FROM snapshots WHERE table_name = ?", [(t,) for t in self.excluded])
+
+    def persists(self, table: str) -> bool:
+        """A tabela pode ser gravada em disco."""
+        return table not in self.excluded
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, timeout=10)
+        conn.execute("PRAGMA journal_mode=WAL")
+        return conn
+
+    def save(self, table: str, rows: Sequence[Dict[str, Any]], loaded_at: float) -> str:
+        """Grava (substitui) o snapshot da tabela; retorna o hash do conteúdo."""
+        if not self.persists(table):
+            raise ValueError(f"Tabela {table} não é gravada em disco")
+        payload, content_hash = encode_rows(rows)
+        data = zlib.compress(payload, 6)
+        with self._lock, self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO snapshots (table_name, content_hash, loaded_at, row_count, data) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (table, content_hash, loaded_at, len(rows), data),
+            )
+        logger.info(f"Snapshot de {table} gravado em disco: {len(rows)} linhas, {len(data) // 1024} KB")
+        return content_hash
+
+    def load(self, table: str) -> Optional[Tuple[List[Dict[str, Any]], float, str]]:
+        """(linhas, loaded_at, content_hash) da tabela, ou None se não houver cópia em disco."""
+        if not self.persists(table):
+            return None
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT data, loaded_at, content_hash FROM snapshots WHERE table_name = ?", (table,)
+            ).fetchone()
+        if row is None:
+            return None
+        data, loaded_at, content_hash = row
+        return json.loads(zlib.decompress(data)), loaded_at, content_hash
+
+    def tables(self) -> List[str]:
+        with self._connect() as conn:
+            names = [r[0] for r in conn.execute("SELECT table_name FROM snapshots ORDER BY loaded_at DESC")]
+        return [t for t in names if self.persists(t)]
+
+    def delete(self, table: Optional[str] = None) -> None:
+        """Remove a cópia de uma tabela (ou de todas)."""
+        with self._lock, self._connect() as conn:
+            if table is None:
+                conn.execute("DELETE FROM snapshots")
+            else:
+                conn.execute("DELETE FROM snapshots WHERE table_name = ?", (table,))
+
+    def info(self) -> Dict[str, Any]:
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT table_name, row_count, loaded_at, length(data) FROM snapshots ORDER BY table_name"
+            ).fetchall()
+        return {
+            "path": self.path,
+            "tables": {name: {"rows": n, "loaded_at": loaded_at, "bytes": size} for name, n, loaded_at, size in rows},
+        }
+
+
+def open_store(path: str = DEFAULT_PATH) -> Optional[SnapshotStore]:
+    """SnapshotStore no caminho configurado; None se desativado ou se o arquivo não puder ser aberto."""
+    if not path:
+        return None
+    try:
+        return SnapshotStore(path)
+    except Exception as e:
+        logger.warning(f"Persistência de snapshots desativada ({path}): {e}")
+        return None
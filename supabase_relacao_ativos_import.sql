@@ -0,0 +1,8 @@
+-- Chave usada pela importação da relação de ativos (import_relacao_ativos.py)
+-- O upsert em lotes (on_conflict=chapa) exige uma restrição UNIQUE na coluna.
+
+-- Verificar CHAPAs duplicadas antes de criar a restrição
+SELECT chapa, COUNT(*) FROM public.relacao_ativos GROUP BY chapa HAVING COUNT(*) > 1;
+
+ALTER TABLE public.relacao_ativos
+  ADD CONSTRAINT relacao_ativos_chapa_key UNIQUE (chapa);
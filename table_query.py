@@ -0,0 +1,175 @@
+"""
+Projeção de colunas (fields=) e filtros por igualdade/lista nos endpoints de listagem.
+
+Os parâmetros aceitos são definidos por tabela (lista branca), com base no schema das
+tabelas do Supabase. Quando o snapshot da tabela está em memória a consulta é feita
+nele; caso contrário é enviada ao PostgREST (select=, coluna=eq./in.), trazendo só as
+linhas e colunas pedidas.
+
+Também oferece paginação por cursor (id > cursor, ordenado pela chave primária) sobre o
+snapshot, estável mesmo que a tabela seja recarregada entre uma página e outra.
+"""
+from bisect import bisect_right
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import columnar
+from data_access import eq, in_
+
+# Colunas que podem ser pedidas em fields= (por tabela)
+TABLE_FIELDS: Dict[str, List[str]] = {
+    "relacao_ativos": [
+        "registro", "diretoria", "gerencia", "localidade", "chapa", "codsecao", "unidade",
+        "empresa", "codcoligada", "nome", "cargo", "admissao", "cpf", "corraca", "sexo",
+        "naturalidade", "dtnascimento", "idade", "escolaridade",
+    ],
+    "nota_final_colaborador": [
+        "id", "área", "formulário", "usuário_avaliado", "avaliado", "documento_de_identificação",
+        "login_do_avaliado", "nota_calculada_desempenho", "classificação_calculada_desempenho",
+        "nota_calculada_potencial", "classificação_calculada_potencial",
+        "nota_calibrada_desempenho", "classificação_calibrada_desempenho",
+        "nota_calibrada_potencial", "classificação_calibrada_potencial", "comentarios",
+        "nota_final_desempenho", "classificação_final_desempenho", "nota_final_potencial",
+        "classificação_final_potencial", "login_do_avaliador", "avaliador",
+    ],
+    "nota_por_avaliacao": ["id", "NOME", "Avaliador", "Tipo de Avaliador", "Nota", "Classificação"],
+    "movimentacao_salario": [
+        "id", "NOME", "DATAADMISSAO", "DATADEMISSAO", "DTMUDANCA_FUNCAO", "FUNCAO",
+        "DTMUDANCA_SECAO", "SECAO", "DTMUDANCA_SALARIO", "MOTIVO_MUDANCA_SALARIO",
+    ],
+    "pessoas_avaliadas": [
+        "id", "Usuário Avaliado", "Login", "NOME", "Área", "Código do Formulário", "Formulário",
+        "GESTOR Login", "GESTOR", "Status do Avaliado", "Avaliações Recebidas",
+    ],
+}
+
+# Parâmetro da API -> coluna da tabela (por tabela)
+TABLE_FILTERS: Dict[str, Dict[str, str]] = {
+    "relacao_ativos": {"diretoria": "diretoria", "gerencia": "gerencia"},
+    "nota_final_colaborador": {"area": "área", "formulario": "formulário"},
+    "nota_por_avaliacao": {},
+    "movimentacao_salario": {},
+    "pessoas_avaliadas": {"area": "Área", "formulario": "Formulário", "gestor": "GESTOR"},
+}
+
+
+class QueryError(ValueError):
+    """Parâmetro de projeção/filtro não permitido para a tabela."""
+
+
+def parse_fields(table: str, fields: Optional[str]) -> Optional[List[str]]:
+    """Valida 'fields=a,b,c' contra a lista branca da tabela; None = todas as colunas."""
+    if not fields:
+        return None
+    requested = [f.strip() for f in fields.split(",") if f.strip()]
+    allowed = TABLE_FIELDS.get(table, [])
+    invalid = [f for f in requested if f not in allowed]
+    if invalid:
+        raise QueryError(f"Campos não permitidos para {table}: {', '.join(invalid)}. Permitidos: {', '.join(allowed)}")
+    # Remove repetidos mantendo a ordem
+    return list(dict.fromkeys(requested))
+
+
+def parse_filters(table: str, params: Dict[str, Optional[Sequence[str]]]) -> List[Tuple[str, List[str]]]:
+    """Converte {parametro: [valores]} em [(coluna, valores)], só para filtros permitidos na tabela."""
+    allowed = TABLE_FILTERS.get(table, {})
+    result: List[Tuple[str, List[str]]] = []
+    for param, values in params.items():
+        values = [v for v in (values or []) if v is not None and v != ""]
+        if not values:
+            continue
+        if param not in allowed:
+            raise QueryError(f"Filtro '{param}' não disponível para {table}")
+        result.append((allowed[param], values))
+    return result
+
+
+def postgrest_select(fields: Optional[List[str]]) -> str:
+    if not fields:
+        return "*"
+    # Colunas com espaço ou pontuação precisam de aspas na sintaxe do PostgREST
+    return ",".join(f'"{f}"' if not f.replace("_", "").isalnum() else f for f in fields)
+
+
+def postgrest_filters(filters: List[Tuple[str, List[str]]]) -> List[Tuple[str, str]]:
+    """Um valor vira eq., vários viram in.(...)."""
+    return [(col, eq(values[0]) if len(values) == 1 else in_(values)) for col, values in filters]
+
+
+def filter_rows(rows: Sequence[Dict[str, Any]], filters: List[Tuple[str, List[str]]]) -> Sequence[Dict[str, Any]]:
+    for col, values in filters:
+        if isinstance(rows, columnar.ColumnarTable):
+            # Filtro na coluna, sem montar as linhas; o resultado é uma visão da tabela
+            rows = rows.where_in(col, values)
+            continue
+        accepted = set(values)
+        rows = [r for r in rows if r.get(col) is not None and str(r.get(col)) in accepted]
+    return rows
+
+
+def project_rows(rows: List[Dict[str, Any]], fields: Optional[List[str]]) -> List[Dict[str, Any]]:
+    if not fields:
+        return rows
+    return [{f: r.get(f) for f in fields} for r in rows]
+
+
+# ===== Paginação por cursor (keyset) =====
+KEYSET_KEY = "id"
+
+# tabela -> (versão do snapshot, chaves ordenadas, linhas ordenadas)
+_keyset_cache: Dict[str, Tuple[Any, List[Any], Sequence[Dict[str, Any]]]] = {}
+
+
+def keyset_index(table: str, version: Any, rows: Sequence[Dict[str, Any]], key: str = KEYSET_KEY) -> Tuple[List[Any], Sequence[Dict[str, Any]]]:
+    """Linhas do snapshot ordenadas pela chave primária (calculado uma vez por versão do snapshot)."""
+    cached = _keyset_cache.get(table)
+    if cached is not None and cached[0] == version:
+        return cached[1], cached[2]
+    values = columnar.column_values(rows, key)
+    if any(v is None for v in values):
+        raise QueryError(f"{table} não tem a coluna '{key}' em todas as linhas; use offset/limit")
+    order = sorted(range(len(values)), key=values.__getitem__)
+    keys = [values[i] for i in order]
+    # Tabela colunar: visão ordenada sobre as mesmas colunas, sem copiar as linhas
+    ordered = rows.take(order) if isinstance(rows, columnar.ColumnarTable) else [rows[i] for i in order]
+    _keyset_cache[table] = (version, keys, ordered)
+    return keys, ordered
+
+
+def parse_cursor(cursor: str, keys: List[Any]) -> Any:
+    """Cursor vazio = início da tabela; senão é convertido para o tipo da chave."""
+    if cursor == "":
+        return None
+    if keys and isinstance(keys[0], int):
+        try:
+            return int(cursor)
+        except ValueError:
+            raise QueryError(f"Cursor inválido: {cursor}")
+    return cursor
+
+
+def keyset_page(
+    keys: List[Any],
+    ordered: Sequence[Dict[str, Any]],
+    cursor: Any,
+    limit: int,
+    filters: Sequence[Tuple[str, List[str]]] = (),
+    key: str = KEYSET_KEY,
+) -> Tuple[List[Dict[str, Any]], Any]:
+    """
+    Próximas `limit` linhas com chave > cursor (busca binária, custo igual em qualquer
+    profundidade). Retorna (linhas, next_cursor); next_cursor é None na última página.
+    """
+    start = 0 if cursor is None else bisect_right(keys, cursor)
+    accepted = [(col, set(values)) for col, values in filters]
+    page: List[Dict[str, Any]] = []
+    if not accepted:
+        page = list(ordered[start:start + limit])
+    else:
+        for i in range(start, len(ordered)):
+            row = ordered[i]
+            if all(row.get(col) is not None and str(row.get(col)) in values for col, values in accepted):
+                page.append(row)
+                if len(page) >= limit:
+                    break
+    next_cursor = page[-1][key] if len(page) >= limit else None
+    return page, next_cursor
@@ -0,0 +1,64 @@
+"""
+Testes unitários dos módulos puros (sem Supabase nem servidor no ar):
+
+    python -m pytest tests
+
+Os test_*.py da raiz são scripts que consultam uma API/Supabase de verdade.
+"""
+import asyncio
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+class LocalAPI:
+    """api.app sobre o PostgREST em memória (postgrest_local), chamado sem rede."""
+
+    def __init__(self, api, rest):
+        self.api = api
+        self.rest = rest
+
+    def call(self, method, path, user="teste", **kwargs):
+        import httpx
+        import sessions
+
+        async def run():
+            transport = httpx.ASGITransport(app=self.api.app)
+            headers = {"Authorization": f"Bearer {sessions.issue(user)}"} if user else {}
+            async with httpx.AsyncClient(transport=transport, base_url="http://api", headers=headers) as client:
+                return await client.request(method, path, **kwargs)
+
+        return asyncio.run(run())
+
+    def get(self, path, **kwargs):
+        return self.call("GET", path, **kwargs)
+
+    def post(self, path, **kwargs):
+        return self.call("POST", path, **kwargs)
+
+    def patch(self, path, **kwargs):
+        return self.call("PATCH", path, **kwargs)
+
+
+@pytest.fixture
+def local_api(monkeypatch):
+    """Fábrica: local_api(tabelas) devolve um LocalAPI com essas tabelas e caches vazios."""
+    os.environ.setdefault("SUPABASE_URL", "http://postgrest.local")
+    os.environ.setdefault("SUPABASE_KEY", "teste")
+    import api
+    from data_access import SupabaseREST
+    from postgrest_local import PostgRESTLocal
+
+    def make(tables):
+        rest = PostgRESTLocal(tables)
+        monkeypatch.setattr(api, "db", SupabaseREST("http://postgrest.local", "teste", transport=rest.transport()))
+        api.table_cache.invalidate()
+        api.credential_index.invalidate()
+        return LocalAPI(api, rest)
+
+    yield make
+    api.table_cache.invalidate()
+    api.credential_index.invalidate()
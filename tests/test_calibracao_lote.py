@@ -0,0 +1,78 @@
+import pytest
+
+from data_access import SupabaseError
+
+ROTA = "/api/avaliacoes/calibracao:batch"
+
+
+@pytest.fixture
+def client(local_api):
+    return local_api({
+        "nota_final_colaborador": [
+            {"id": i, "usuário_avaliado": f"P{i}", "nota_calibrada_desempenho": None,
+             "nota_calibrada_potencial": None, "comentarios": None}
+            for i in (1, 2, 3)
+        ],
+    })
+
+
+def _linha(client, id):
+    return next(r for r in client.rest.tables["nota_final_colaborador"] if r["id"] == id)
+
+
+def test_resultado_por_item_na_ordem_recebida(client):
+    r = client.patch(ROTA, json={"itens": [
+        {"id": 2, "nota_calibrada_desempenho": 3.456, "comentarios": " comitê "},
+        {"id": 99, "nota_calibrada_desempenho": 3, "comentarios": "x"},
+        {"id": 1, "nota_calibrada_potencial": 2, "comentarios": "  "},
+        {"id": 3, "comentarios": "sem notas"},
+    ]})
+    assert r.status_code == 200
+    body = r.json()
+    assert body["success"] is False
+    assert (body["count"], body["updated"]) == (4, 1)
+    assert [(i["id"], i["status"]) for i in body["data"]] == [(2, 200), (99, 404), (1, 400), (3, 400)]
+    assert body["data"][3]["reason"] == "no-fields"
+    linha = _linha(client, 2)
+    assert linha["nota_calibrada_desempenho"] == "3.46"
+    assert linha["classificação_calibrada_desempenho"] == "Supera a expectativa"
+    assert linha["comentarios"] == "comitê"
+    # Itens recusados não gravam nada
+    assert _linha(client, 1)["comentarios"] is None
+
+
+def test_id_repetido_acumula_na_mesma_linha(client):
+    r = client.patch(ROTA, json={"itens": [
+        {"id": 1, "nota_calibrada_desempenho": 2, "comentarios": "a"},
+        {"id": 1, "nota_calibrada_potencial": 4, "comentarios": "b"},
+    ]})
+    assert r.json()["updated"] == 1
+    linha = _linha(client, 1)
+    assert (linha["nota_calibrada_desempenho"], linha["nota_calibrada_potencial"], linha["comentarios"]) == ("2.00", "4.00", "b")
+
+
+def test_lote_vazio_e_lote_grande(client, monkeypatch):
+    assert client.patch(ROTA, json={"itens": []}).json() == {"success": True, "data": [], "count": 0, "updated": 0}
+    monkeypatch.setattr(client.api, "CALIBRACAO_LOTE_MAX", 2)
+    r = client.patch(ROTA, json={"itens": [{"id": i, "comentarios": "x"} for i in (1, 2, 3)]})
+    assert r.status_code == 400
+
+
+def test_payload_invalido(client):
+    r = client.patch(ROTA, json={"itens": [{"id": "um", "comentarios": "x"}]})
+    assert r.status_code == 422
+
+
+def test_falha_na_gravacao_nao_invalida_o_cache(client, monkeypatch):
+    invalidadas = []
+    monkeypatch.setattr(client.api.table_cache, "invalidate", lambda table=None: invalidadas.append(table))
+
+    async def falha(*args, **kwargs):
+        raise SupabaseError("indisponível", 503)
+
+    monkeypatch.setattr(client.api.db, "insert", falha)
+    r = client.patch(ROTA, json={"itens": [{"id": 1, "nota_calibrada_desempenho": 3, "comentarios": "x"}]})
+    assert r.status_code == 500
+    assert "Erro ao atualizar calibração em lote" in r.json()["detail"]
+    assert invalidadas == []
+    assert _linha(client, 1)["nota_calibrada_desempenho"] is None
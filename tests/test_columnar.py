@@ -0,0 +1,75 @@
+import json
+import math
+
+import columnar
+from columnar import ColumnarTable, _DictColumn, encode_column
+
+
+def _roundtrip(rows):
+    table = ColumnarTable.from_rows(rows)
+    assert table is not None
+    return table
+
+
+def test_linhas_montadas_iguais_as_originais():
+    rows = [
+        {"id": i, "nome": f"PESSOA {i}", "area": ["OBRAS", "RH", None][i % 3], "nota": i / 4,
+         "admissao": f"{i % 28 + 1:02d}/03/2020", "ativo": i % 2 == 0, "tags": [i]}
+        for i in range(200)
+    ]
+    table = _roundtrip(rows)
+    assert list(table) == rows
+    assert table[5] == rows[5]
+    assert table[-1] == rows[-1]
+    assert table[10:20] == rows[10:20]
+    assert [list(r) for r in table[:3]] == [list(r) for r in rows[:3]]
+
+
+def test_tipos_nao_se_misturam_no_dicionario():
+    values = [1, 1.0, True, "1", None] * 4
+    col = _DictColumn(values)
+    restored = col.slice(0, len(values))
+    assert restored == values
+    assert [type(v) for v in restored] == [type(v) for v in values]
+
+
+def test_zero_negativo_preservado():
+    values = [0.0, -0.0, 0.0, -0.0, None]
+    col = _DictColumn(values)
+    restored = col.slice(0, len(values))
+    assert [math.copysign(1.0, v) for v in restored[:4]] == [1.0, -1.0, 1.0, -1.0]
+    assert restored[4] is None
+
+
+def test_zero_negativo_na_tabela_compactada():
+    # Poucos valores distintos: a coluna de decimais é codificada por dicionário
+    rows = [{"id": i, "delta": -0.0 if i % 2 else 0.0} for i in range(64)]
+    assert type(encode_column([r["delta"] for r in rows])).__name__ == "_DictColumn"
+    table = _roundtrip(rows)
+    assert json.dumps(list(table)) == json.dumps(rows)
+
+
+def test_nan_e_inteiros_grandes():
+    rows = [{"v": float("nan") if i % 5 == 0 else float(i), "big": 2 ** 70 if i == 3 else i} for i in range(40)]
+    table = _roundtrip(rows)
+    for original, restored in zip(rows, table):
+        assert restored["big"] == original["big"]
+        assert (math.isnan(restored["v"]) and math.isnan(original["v"])) or restored["v"] == original["v"]
+
+
+def test_linhas_com_chaves_diferentes_nao_viram_tabela():
+    assert ColumnarTable.from_rows([{"a": 1}, {"b": 2}]) is None
+    assert ColumnarTable.from_rows([{"a": 1, "b": 2}, {"b": 2, "a": 1}]) is None
+    assert ColumnarTable.from_rows([]) is None
+    rows = [{"a": 1}, {"b": 2}]
+    assert columnar.compact(rows) is rows
+
+
+def test_take_e_where_in_sao_visoes():
+    rows = [{"id": i, "area": "RH" if i % 3 == 0 else "OBRAS"} for i in range(30)]
+    table = _roundtrip(rows)
+    view = table.take([5, 1, 3])
+    assert list(view) == [rows[5], rows[1], rows[3]]
+    rh = table.where_in("area", ["RH"])
+    assert list(rh) == [r for r in rows if r["area"] == "RH"]
+    assert table.column("id") == list(range(30))
@@ -0,0 +1,73 @@
+import competencias
+from competencias import CompetenciasIndex, agregar
+
+
+def _nota(competencia, tipo, nota, comentario=None, login="MSANTOS", nome="Maria Santos"):
+    return {
+        "USER_LOGIN": login, "NOME": nome, "Competência": competencia,
+        "Tipo de Avaliador": tipo, "Nota": nota, "Comentário": comentario,
+    }
+
+
+ROWS = [
+    _nota("Trabalho em Equipe", "Auto Avaliação", 4, "Colaborativa"),
+    _nota("Trabalho em Equipe", "Gestor", 3),
+    _nota("Trabalho em Equipe", "Gestor", "2,0", "Precisa delegar"),
+    _nota("Comunicação", "Autoavaliação", 3.5),
+    _nota("Aprendizado", "Gestor", 4, "Aprende rápido"),
+    # Outros avaliadores e notas inválidas não entram
+    _nota("Comunicação", "Par", 1),
+    _nota("Liderança", "Par", 1),
+    _nota("Comunicação", "Gestor", "abc"),
+    _nota("", "Gestor", 3),
+]
+
+
+def _por_nome(itens):
+    return {c["competencia"]: c for c in itens}
+
+
+def test_medias_auto_e_gestor():
+    res = agregar(ROWS)
+    equipe = _por_nome(res["performance"])["Trabalho em Equipe"]
+    assert (equipe["auto"], equipe["gestor"]) == (4.0, 2.5)
+    comunicacao = _por_nome(res["performance"])["Comunicação"]
+    assert (comunicacao["auto"], comunicacao["gestor"]) == (3.5, None)
+
+
+def test_potencial_separado_de_desempenho():
+    res = agregar(ROWS)
+    assert [c["competencia"] for c in res["potencial"]] == ["Aprendizado"]
+    # Ordem pelo nome normalizado; Liderança só tem nota de par
+    assert [c["competencia"] for c in res["performance"]] == ["Comunicação", "Trabalho em Equipe"]
+
+
+def test_comentarios_distintos_por_lado(monkeypatch):
+    equipe = _por_nome(agregar(ROWS)["performance"])["Trabalho em Equipe"]
+    assert equipe["comentarios_auto"] == "Colaborativa"
+    assert equipe["comentarios_gestor"] == "Precisa delegar"
+    monkeypatch.setattr(competencias, "MAX_COMENTARIOS", 2)
+    rows = [_nota("Comunicação", "Gestor", 3, t) for t in ("a", "b", "a", "c")]
+    assert agregar(rows)["performance"][0]["comentarios_gestor"] == "a • b"
+
+
+def test_agregar_sem_linhas():
+    assert agregar([]) == {"performance": [], "potencial": []}
+
+
+def test_indice_por_login_e_por_nome():
+    outra = _nota("Comunicação", "Gestor", 2, login="", nome="José Pereira")
+    idx = CompetenciasIndex(ROWS + [outra], version=1)
+    linhas, criterio = idx.linhas(login="msantos", nome="José Pereira")
+    assert criterio == "login" and len(linhas) == len(ROWS)
+    linhas, criterio = idx.linhas(login="OUTRO", nome="jose  pereira")
+    assert (criterio, linhas) == ("nome", [outra])
+    assert idx.linhas(login="OUTRO") == ([], None)
+
+
+def test_para_pessoa_guardada():
+    idx = CompetenciasIndex(ROWS, version=1)
+    res = idx.para_pessoa(login="MSANTOS")
+    assert (res["criterio"], res["registros"]) == ("login", len(ROWS))
+    assert idx.para_pessoa(login="msantos") is res
+    assert idx.para_pessoa(nome="Ninguém") is None
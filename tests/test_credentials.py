@@ -0,0 +1,150 @@
+import asyncio
+
+import pytest
+
+import credentials
+from credentials import CredentialIndex, LoginThrottle, client_ip
+
+
+class _Clock:
+    def __init__(self, now=1000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    c = _Clock()
+    monkeypatch.setattr(credentials.time, "monotonic", c)
+    return c
+
+
+def _index(rows):
+    calls = []
+
+    async def loader():
+        calls.append(1)
+        return [dict(r) for r in rows]
+
+    return CredentialIndex(loader), calls
+
+
+def test_verifica_senha_sem_guardar_texto():
+    index, calls = _index([{"nome": "ana", "senha": "s3nha"}])
+    assert asyncio.run(index.verify("ana", "s3nha")) is True
+    assert len(calls) == 1
+    salt, digest = index._entries["ana"]
+    assert b"s3nha" not in salt + digest
+
+
+def test_compara_em_tempo_constante(monkeypatch):
+    index, _ = _index([{"nome": "ana", "senha": "s3nha"}])
+    asyncio.run(index.verify("ana", "s3nha"))
+    compared = []
+    real = credentials.hmac.compare_digest
+
+    def spy(a, b):
+        compared.append((a, b))
+        return real(a, b)
+
+    monkeypatch.setattr(credentials.hmac, "compare_digest", spy)
+    assert index._check("ana", "errada") is False
+    assert index._check("ana", "s3nha") is True
+    # Nome inexistente: compara com a entrada fictícia, com o mesmo custo
+    assert index._check("ninguem", "s3nha") is None
+    assert len(compared) == 3
+    assert compared[2][1] == index._dummy[1]
+
+
+def test_cargas_simultaneas_consultam_uma_vez():
+    index, calls = _index([{"nome": f"u{i}", "senha": str(i)} for i in range(50)])
+
+    async def run():
+        return await asyncio.gather(*(index.verify(f"u{i}", str(i)) for i in range(50)))
+
+    assert all(asyncio.run(run()))
+    assert len(calls) == 1
+
+
+def test_nome_inexistente_vai_para_o_cache_negativo(clock):
+    index, calls = _index([{"nome": "ana", "senha": "x"}])
+    assert asyncio.run(index.verify("bob", "x")) is False
+    clock.now += credentials.REFRESH_MIN_INTERVAL + 1
+    # Dentro do cache negativo, a falha não provoca nova leitura
+    assert asyncio.run(index.verify("bob", "x")) is False
+    assert len(calls) == 1
+
+
+def test_falha_recarrega_para_ver_senha_nova(clock):
+    rows = [{"nome": "ana", "senha": "velha"}]
+    index, calls = _index(rows)
+    assert asyncio.run(index.verify("ana", "velha")) is True
+    rows[0]["senha"] = "nova"
+    # Antes do intervalo mínimo, não recarrega
+    assert asyncio.run(index.verify("ana", "nova")) is False
+    clock.now += credentials.REFRESH_MIN_INTERVAL
+    assert asyncio.run(index.verify("ana", "nova")) is True
+    assert len(calls) == 2
+    assert index.rebuilds == 2
+
+
+def test_invalidate_forca_nova_leitura():
+    index, calls = _index([{"nome": "ana", "senha": "x"}])
+    asyncio.run(index.verify("ana", "x"))
+    index.invalidate()
+    asyncio.run(index.verify("ana", "x"))
+    assert len(calls) == 2
+    # Mesmo conteúdo: não reconstrói os hashes
+    assert index.rebuilds == 1
+
+
+def test_throttle_por_usuario_e_janela(clock):
+    throttle = LoginThrottle(max_user=3, max_ip=100, window=60)
+    for _ in range(2):
+        throttle.failure("ana", "1.1.1.1")
+    assert throttle.retry_after("ana", "1.1.1.1") == 0
+    throttle.failure("ana", "1.1.1.1")
+    assert throttle.retry_after("ana", "2.2.2.2") == 61
+    assert throttle.retry_after("bob", "1.1.1.1") == 0
+    clock.now += 30
+    assert throttle.retry_after("ana", "1.1.1.1") == 31
+    # A primeira falha do limite sai da janela: liberado
+    clock.now += 30
+    assert throttle.retry_after("ana", "1.1.1.1") == 0
+
+
+def test_throttle_janela_deslizante(clock):
+    throttle = LoginThrottle(max_user=2, max_ip=100, window=60)
+    throttle.failure("ana", "ip")
+    clock.now += 40
+    throttle.failure("ana", "ip")
+    assert throttle.retry_after("ana", "ip") == 21
+    clock.now += 21
+    # Sobrou só a segunda falha na janela
+    assert throttle.retry_after("ana", "ip") == 0
+    throttle.failure("ana", "ip")
+    assert throttle.retry_after("ana", "ip") == 40
+
+
+def test_throttle_por_ip_e_sucesso(clock):
+    throttle = LoginThrottle(max_user=100, max_ip=2, window=60)
+    throttle.failure("ana", "ip")
+    throttle.failure("bob", "ip")
+    assert throttle.retry_after("carla", "ip") > 0
+    assert throttle.retry_after("carla", "outro") == 0
+    throttle.success("ana")
+    # O sucesso zera o usuário, não o IP
+    assert throttle.retry_after("ana", "ip") > 0
+    assert throttle.throttled == 2
+
+
+def test_client_ip(monkeypatch):
+    assert client_ip({"x-forwarded-for": "9.9.9.9, 10.0.0.1"}, "127.0.0.1") == "10.0.0.1"
+    assert client_ip({}, "127.0.0.1") == "127.0.0.1"
+    assert client_ip({}, None) == "desconhecido"
+    monkeypatch.setattr(credentials, "PROXY_HOPS", 2)
+    assert client_ip({"x-forwarded-for": "9.9.9.9, 10.0.0.1"}, "127.0.0.1") == "9.9.9.9"
+    monkeypatch.setattr(credentials, "PROXY_HOPS", 0)
+    assert client_ip({"x-forwarded-for": "9.9.9.9"}, "127.0.0.1") == "127.0.0.1"
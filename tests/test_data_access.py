@@ -0,0 +1,84 @@
+import asyncio
+import json
+import random
+import re
+
+import httpx
+
+import data_access
+from data_access import SupabaseREST, page_key, plan_ranges
+
+
+class _Desordenado:
+    """PostgREST de mentira: sem order=, cada requisição devolve as linhas numa ordem diferente."""
+
+    def __init__(self, total, max_rows=100, seed=7):
+        self.rows = [{"id": i, "nome": f"P{i}"} for i in range(total)]
+        self.max_rows = max_rows
+        self.rng = random.Random(seed)
+        self.orders = []
+
+    def __call__(self, request):
+        order = request.url.params.get("order")
+        self.orders.append(order)
+        rows = list(self.rows)
+        if order:
+            column, _, direction = order.split(",")[-1].partition(".")
+            rows.sort(key=lambda r: r[column], reverse=direction == "desc")
+        else:
+            self.rng.shuffle(rows)
+        start, end = map(int, re.match(r"(\d+)-(\d+)", request.headers["Range"]).groups())
+        end = min(end, start + self.max_rows - 1, len(rows) - 1)
+        page = rows[start:end + 1]
+        headers = {"Content-Range": f"{start}-{end}/{len(rows) if 'count=exact' in request.headers.get('Prefer', '') else '*'}"}
+        return httpx.Response(200, content=json.dumps(page), headers=headers)
+
+
+def _fetch_all(backend, **kwargs):
+    async def run():
+        db = SupabaseREST("http://postgrest.local", "teste", transport=httpx.MockTransport(backend))
+        try:
+            return await db.fetch_all("tabela", **kwargs)
+        finally:
+            await db.aclose()
+
+    return asyncio.run(run())
+
+
+def test_paginas_paralelas_ordenadas_pela_chave():
+    backend = _Desordenado(1050)
+    rows = _fetch_all(backend, key="id", page_size=1000)
+    assert [r["id"] for r in rows] == list(range(1050))
+    # Primeira página (100 linhas, limite do servidor) e as demais, todas com a mesma ordem
+    assert len(backend.orders) == 11
+    assert set(backend.orders) == {"id.asc"}
+
+
+def test_chave_desempata_order_informado():
+    backend = _Desordenado(250)
+    rows = _fetch_all(backend, key="id", order="nome.asc")
+    assert sorted(r["id"] for r in rows) == list(range(250))
+    assert set(backend.orders) == {"nome.asc,id.asc"}
+
+
+def test_sem_chave_o_servidor_desordenado_repete_linhas():
+    # O problema que a chave evita: páginas de ordens diferentes se sobrepõem
+    rows = _fetch_all(_Desordenado(1050))
+    assert len(rows) == 1050
+    assert len({r["id"] for r in rows}) < 1050
+
+
+def test_tabela_em_uma_pagina():
+    backend = _Desordenado(30)
+    assert len(_fetch_all(backend, key="id")) == 30
+    assert len(backend.orders) == 1
+
+
+def test_chaves_das_tabelas():
+    assert page_key("nota_final_colaborador") == data_access.DEFAULT_PAGE_KEY == "id"
+    assert page_key("relacao_ativos") == "chapa"
+
+
+def test_plan_ranges():
+    assert plan_ranges(100, 350, 100) == [(100, 199), (200, 299), (300, 349)]
+    assert plan_ranges(100, 100, 100) == []
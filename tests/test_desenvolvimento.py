@@ -0,0 +1,32 @@
+import pytest
+
+CPF_MARIA = "11122233344"
+
+
+@pytest.fixture
+def client(local_api):
+    return local_api({
+        "relacao_ativos": [
+            {"id": 1, "nome": "MARIA SILVA SANTOS", "cpf": CPF_MARIA, "chapa": "100"},
+            {"id": 2, "nome": "JOSE PEREIRA", "cpf": "55566677788", "chapa": "200"},
+        ],
+        "nota_final_colaborador": [],
+        "desenvolvimento_colaborador": [
+            {"id": 1, "colaborador": "Maria S. Santos", "cpf": CPF_MARIA, "pdi": "Liderança",
+             "atualizado_em": "2025-01-10"},
+        ],
+    })
+
+
+def test_nome_exato_encontra_pelo_cpf(client):
+    r = client.get("/api/desenvolvimento/maria silva santos")
+    assert r.status_code == 200
+    assert r.json()["found"] is True
+    assert r.json()["data"]["pdi"] == "Liderança"
+
+
+def test_nome_parecido_nao_traz_registro_de_outra_pessoa(client):
+    # "MARIA SANTOS" tem todas as palavras de "MARIA SILVA SANTOS", mas não é a mesma pessoa
+    r = client.get("/api/desenvolvimento/Maria Santos")
+    assert r.status_code == 200
+    assert r.json() == {"found": False, "data": None}
@@ -0,0 +1,112 @@
+import csv
+import io
+
+import pytest
+
+from discrepancias import SEM_GRUPO, DiscrepanciasAnalise, build_pares, iter_csv
+from identity_index import FONTE_ATIVOS, IdentityIndex
+
+
+def _nota(nome, tipo, nota, avaliador="", classificacao=None):
+    return {"NOME": nome, "Tipo de Avaliador": tipo, "Nota": nota, "Avaliador": avaliador, "Classificação": classificacao}
+
+
+ROWS = [
+    _nota("Ana Lima", "Auto Avaliação", "3,5"),
+    _nota("Ana Lima", "Gestor", 2.0, "Gestor A"),
+    # Só a primeira nota de cada tipo vale
+    _nota("ANA LIMA", "Autoavaliação", 1.0),
+    _nota("Ana Lima", "Gestor", 4.0, "Gestor B"),
+    _nota("Bruno Souza", "Auto", 2.0),
+    _nota("Bruno Souza", "Gestor", 3.0, "gestor a"),
+    _nota("Carla Dias", "Auto", 3.0),
+    _nota("Carla Dias", "GESTOR", 3.0, "Gestor B"),
+    # Sem par, nota inválida ou tipo desconhecido ficam de fora
+    _nota("Davi Rocha", "Auto", 3.0),
+    _nota("Eva Melo", "Auto", "abc"),
+    _nota("Eva Melo", "Gestor", 3.0, "Gestor B"),
+    _nota("Fabio Reis", "Par", 3.0),
+    _nota("Fabio Reis", "Gestor", 3.0, "Gestor B"),
+    _nota("", "Auto", 3.0),
+]
+ATIVOS = [
+    {"nome": "Ana Lima", "cpf": "11122233344", "diretoria": "DIR A"},
+    {"nome": "Bruno Souza", "cpf": "55566677788", "DIRETORIA": "DIR B"},
+    # Compartilha tokens com Carla Dias, mas não é a mesma pessoa
+    {"nome": "Carla Dias Neves", "cpf": "99988877766", "diretoria": "DIR C"},
+]
+
+
+@pytest.fixture
+def analise():
+    identity = IdentityIndex()
+    identity.refresh(FONTE_ATIVOS, [dict(r) for r in ATIVOS], version=1)
+    return DiscrepanciasAnalise(build_pares(ROWS, identity), version=1)
+
+
+def test_pares_primeira_nota_de_cada_tipo(analise):
+    assert [p["nome"] for p in analise.pares] == ["Ana Lima", "Bruno Souza", "Carla Dias"]
+    ana, bruno, carla = analise.pares
+    assert (ana["nota_auto"], ana["nota_gestor"], ana["gestor"]) == (3.5, 2.0, "Gestor A")
+    assert (ana["diferenca"], ana["diferenca_absoluta"]) == (1.5, 1.5)
+    assert (bruno["diferenca"], bruno["diferenca_absoluta"]) == (-1.0, 1.0)
+    # Classificação calculada pela nota quando não informada
+    assert ana["classificacao_auto"] == "Supera a expectativa"
+
+
+def test_diretoria_so_por_nome_exato(analise):
+    ana, bruno, carla = analise.pares
+    assert ana["diretoria"] == "DIR A"
+    assert bruno["diretoria"] == "DIR B"
+    assert carla["diretoria"] is None
+
+
+def test_sem_identity_diretoria_vazia():
+    assert all(p["diretoria"] is None for p in build_pares(ROWS))
+
+
+@pytest.mark.parametrize("limiar, nomes", [
+    (0.0, ["Ana Lima", "Bruno Souza", "Carla Dias"]),
+    (1.0, ["Ana Lima", "Bruno Souza"]),
+    (1.01, ["Ana Lima"]),
+    (1.5, ["Ana Lima"]),
+    (2.0, []),
+])
+def test_limiar_por_busca_binaria(analise, limiar, nomes):
+    assert [p["nome"] for p in analise.filtrar(limiar)] == nomes
+
+
+def test_filtros_de_diretoria_e_gestor(analise):
+    assert [p["nome"] for p in analise.filtrar(diretoria="DIR B")] == ["Bruno Souza"]
+    assert [p["nome"] for p in analise.filtrar(gestor="GESTOR A")] == ["Ana Lima", "Bruno Souza"]
+    assert analise.filtrar(1.5, gestor="gestor b") == []
+
+
+def test_resumo_distribuicao_e_top(analise):
+    res = analise.resumo(limiar=1.0, top=1)
+    assert (res["total"], res["total_pares"]) == (2, 3)
+    assert [p["nome"] for p in res["data"]] == ["Ana Lima"]
+    geral = res["geral"]
+    assert (geral["count"], geral["auto_acima"], geral["gestor_acima"], geral["iguais"]) == (3, 1, 1, 1)
+    assert geral["acima_limiar"] == 2
+    assert geral["media_diferenca"] == round((1.5 - 1.0 + 0.0) / 3, 4)
+    assert geral["max_absoluta"] == 1.5
+    assert set(res["distribuicao"]) == {"DIR A", "DIR B", SEM_GRUPO}
+    assert analise.resumo(limiar=1.0, top=1) is res
+
+
+def test_resumo_agrupado_por_gestor(analise):
+    res = analise.resumo(agrupar="gestor")
+    # Empate de tamanho ordena pelo nome; o gestor é agrupado como gravado
+    assert list(res["distribuicao"]) == ["Gestor A", "Gestor B", "gestor a"]
+    with pytest.raises(ValueError):
+        analise.resumo(agrupar="cargo")
+
+
+def test_csv_no_layout_do_resultado(analise):
+    texto = "".join(iter_csv(analise.pares, batch_rows=1))
+    assert texto.startswith("\ufeff")
+    linhas = list(csv.reader(io.StringIO(texto.lstrip("\ufeff")), delimiter=";"))
+    assert linhas[0][0] == "NOME" and linhas[0][-1] == "Diretoria"
+    assert len(linhas) == 4
+    assert linhas[3][-1] == ""
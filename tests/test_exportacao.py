@@ -0,0 +1,86 @@
+import csv
+import io
+import json
+
+import pytest
+
+from exportacao import EXPORT_COLUMNS, iter_csv, iter_export, iter_registros
+from identity_index import FONTE_ATIVOS, IdentityIndex
+from ninebox_engine import build_columns
+
+SUPERA = "Supera a expectativa"
+
+AVALIACOES = [
+    {
+        "id": 1, "área": "OBRAS", "formulário": "F1", "usuário_avaliado": "Maria Silva Santos", "avaliado": None,
+        "nota_final_desempenho": 3.5, "classificação_final_desempenho": SUPERA,
+        "nota_final_potencial": 3.4, "classificação_final_potencial": SUPERA,
+        "nota_calibrada_desempenho": None, "nota_calibrada_potencial": 2.0, "avaliador": "GESTOR A",
+        "login_do_avaliado": "msantos", "documento_de_identificação": None, "comentarios": "ok",
+    },
+    # Compartilha tokens com a Maria, mas não tem chave exata em relacao_ativos
+    {
+        "id": 2, "área": "OBRAS", "formulário": "F1", "usuário_avaliado": "Maria Santos", "avaliado": None,
+        "nota_final_desempenho": 2.0, "classificação_final_desempenho": None,
+        "nota_final_potencial": 2.0, "classificação_final_potencial": None,
+        "nota_calibrada_desempenho": None, "nota_calibrada_potencial": None, "avaliador": "GESTOR A",
+        "login_do_avaliado": None, "documento_de_identificação": None, "comentarios": None,
+    },
+]
+ATIVOS = [
+    {"NOME": "Maria Silva Santos", "CPF": "11122233344", "CHAPA": "100", "LOGIN": "MSANTOS",
+     "CARGO": "ENGENHEIRA", "DIRETORIA": "DIR A", "GERENCIA": "G1", "LOCALIDADE": "SP"},
+]
+
+
+@pytest.fixture
+def dados():
+    identity = IdentityIndex()
+    identity.refresh(FONTE_ATIVOS, [dict(r) for r in ATIVOS], version=1)
+    return build_columns(AVALIACOES), identity
+
+
+def test_registro_combina_notas_efetivas_e_ativo(dados):
+    cols, identity = dados
+    maria, _ = iter_registros(cols, [0, 1], identity)
+    assert maria["id"] == 1
+    assert maria["calibrado"] is True
+    assert maria["nota_potencial"] == 2.0
+    assert maria["classificacao_potencial"] == "Atende parcialmente"
+    assert maria["quadrante"] == "3-3"
+    # Colunas em maiúsculas do CSV do RH
+    assert (maria["chapa"], maria["diretoria"], maria["localidade"]) == ("100", "DIR A", "SP")
+
+
+def test_sem_correspondencia_exata_colunas_do_ativo_vazias(dados):
+    cols, identity = dados
+    (registro,) = iter_registros(cols, [1], identity)
+    assert registro["quadrante"] is None
+    assert all(registro[c] is None for c in ("chapa", "cpf", "cargo", "diretoria", "gerencia", "localidade"))
+
+
+def test_csv_com_bom_cabecalho_e_blocos(dados):
+    cols, identity = dados
+    blocos = list(iter_csv(iter_registros(cols, [0, 1, 0], identity), batch_rows=2))
+    assert len(blocos) == 2
+    assert blocos[0].startswith("\ufeff") and not blocos[1].startswith("\ufeff")
+    linhas = list(csv.reader(io.StringIO("".join(blocos).lstrip("\ufeff")), delimiter=";"))
+    assert linhas[0] == [h for _, h in EXPORT_COLUMNS]
+    assert len(linhas) == 4
+    registro = dict(zip(linhas[0], linhas[2]))
+    assert registro["Calibrado"] == "Não"
+    assert registro["Diretoria"] == ""
+
+
+def test_ndjson(dados):
+    cols, identity = dados
+    texto = "".join(iter_export("ndjson", cols, [0, 1], identity, batch_rows=1))
+    registros = [json.loads(linha) for linha in texto.splitlines()]
+    assert [r["id"] for r in registros] == [1, 2]
+    assert registros[0]["usuario_avaliado"] == "Maria Silva Santos"
+
+
+def test_formato_invalido(dados):
+    cols, identity = dados
+    with pytest.raises(ValueError):
+        iter_export("xlsx", cols, [0], identity)
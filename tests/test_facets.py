@@ -0,0 +1,74 @@
+import facets
+from facets import FacetIndex, FacetRegistry
+
+DIMS = {"diretorias": "diretoria", "gerencias": "gerencia"}
+ROWS = [
+    {"diretoria": "DIR A", "gerencia": "G1"},
+    {"diretoria": "DIR A", "gerencia": "G2"},
+    {"diretoria": "DIR A", "gerencia": "G2"},
+    {"diretoria": "DIR B", "gerencia": "G3"},
+    {"diretoria": "", "gerencia": "G3"},
+    {"diretoria": None, "gerencia": None},
+]
+
+
+def test_contagens_base_ignoram_vazios_e_ordenam():
+    idx = FacetIndex(DIMS, ROWS, version=1)
+    base = idx.facets()
+    assert base["diretorias"] == {"DIR A": 3, "DIR B": 1}
+    assert list(base["gerencias"]) == ["G1", "G2", "G3"]
+    assert base["gerencias"]["G3"] == 2
+
+
+def test_selecao_nao_esconde_alternativas_da_propria_dimensao():
+    idx = FacetIndex(DIMS, ROWS, version=1)
+    res = idx.facets({"diretorias": ["DIR A"]})
+    # A própria dimensão continua com todas as diretorias
+    assert res["diretorias"] == {"DIR A": 3, "DIR B": 1}
+    # As gerências são filtradas pela diretoria escolhida
+    assert res["gerencias"] == {"G1": 1, "G2": 2}
+
+
+def test_selecao_em_duas_dimensoes_e_valores_multiplos():
+    idx = FacetIndex(DIMS, ROWS, version=1)
+    res = idx.facets({"diretorias": ["DIR A", "DIR B"], "gerencias": ["G3"]})
+    assert res["diretorias"] == {"DIR B": 1}
+    assert res["gerencias"] == {"G1": 1, "G2": 2, "G3": 1}
+    assert idx.facets({"diretorias": ["NENHUMA"]})["gerencias"] == {}
+
+
+def test_selecao_desconhecida_ou_vazia_retorna_base():
+    idx = FacetIndex(DIMS, ROWS, version=1)
+    assert idx.facets({"cargos": ["X"], "diretorias": []}) is idx.base
+
+
+def test_cache_de_selecoes_limitado(monkeypatch):
+    monkeypatch.setattr(facets, "MAX_CACHED_SELECTIONS", 2)
+    idx = FacetIndex(DIMS, ROWS, version=1)
+    primeira = idx.facets({"diretorias": ["DIR A"]})
+    assert idx.facets({"diretorias": ["DIR A", "DIR A"]}) is primeira
+    idx.facets({"diretorias": ["DIR B"]})
+    idx.facets({"gerencias": ["G1"]})
+    assert len(idx._cache) == 2
+    assert idx.facets({"diretorias": ["DIR A"]}) is not primeira
+
+
+def test_registro_recalcula_apenas_com_nova_versao():
+    reg = FacetRegistry({"t": DIMS})
+    idx = reg.index("t", ROWS, version=1)
+    assert reg.index("t", [], version=1) is idx
+    novo = reg.index("t", ROWS[:1], version=2)
+    assert novo is not idx and novo.size == 1
+
+
+def test_split_params_agrupa_por_tabela():
+    por_tabela = FacetRegistry.split_params({
+        "diretoria": ["DIR A", ""],
+        "area": ["TI"],
+        "cargo": None,
+        "desconhecido": ["x"],
+    })
+    assert por_tabela == {
+        "relacao_ativos": {"diretorias": ["DIR A"]},
+        "nota_final_colaborador": {"areas": ["TI"]},
+    }
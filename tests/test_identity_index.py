@@ -0,0 +1,96 @@
+import pytest
+
+from identity_index import FONTE_ATIVOS, FONTE_AVALIACOES, IdentityIndex, cpf_digits, normalize_name
+
+ATIVOS = [
+    {"nome": "Maria Silva Santos", "cpf": "111.222.333-44", "chapa": "a100", "login": "MSANTOS"},
+    {"nome": "Maria Santos Oliveira", "cpf": "55566677788", "chapa": "200"},
+    {"nome": "José Pereira", "cpf": "1234567890", "chapa": "300"},
+]
+AVALIACOES = [
+    {"id": 1, "usuário_avaliado": "Zé Pereira", "avaliado": None, "documento_de_identificação": "01234567890",
+     "login_do_avaliado": "jpereira"},
+]
+
+
+@pytest.fixture
+def index():
+    idx = IdentityIndex()
+    idx.refresh(FONTE_ATIVOS, [dict(r) for r in ATIVOS], version=1)
+    idx.refresh(FONTE_AVALIACOES, [dict(r) for r in AVALIACOES], version=1)
+    return idx
+
+
+def test_normalizacao():
+    assert normalize_name("  José  d'Ávila-Souza ") == "JOSE D AVILA SOUZA"
+    assert normalize_name(None) == ""
+    assert cpf_digits("123.456.789-0") == "01234567890"
+    assert cpf_digits(None) == ""
+
+
+@pytest.mark.parametrize("kwargs, nome, criterio", [
+    ({"cpf": "11122233344"}, "Maria Silva Santos", "cpf"),
+    ({"chapa": "A100"}, "Maria Silva Santos", "chapa"),
+    ({"login": "msantos"}, "Maria Silva Santos", "login"),
+    ({"nome": "maria silva santos"}, "Maria Silva Santos", "nome"),
+    ({"nome": "11122233344"}, "Maria Silva Santos", "cpf"),
+    # CPF perdido o zero à esquerda, recuperado pelo apelido da avaliação
+    ({"nome": "ZE PEREIRA"}, "José Pereira", "cpf_avaliacao"),
+    ({"login": "JPEREIRA"}, "José Pereira", "cpf_avaliacao"),
+])
+def test_chaves_exatas(index, kwargs, nome, criterio):
+    for fuzzy in (True, False):
+        row, usado = index.resolve(fuzzy=fuzzy, **kwargs)
+        assert (row["nome"], usado) == (nome, criterio)
+
+
+def test_palavras_do_nome_so_com_fuzzy(index):
+    # Todas as palavras presentes em "Maria Silva Santos", mas pode ser outra pessoa
+    row, criterio = index.resolve(nome="Santos Silva Maria")
+    assert (row["nome"], criterio) == ("Maria Silva Santos", "palavras_nome")
+    assert index.resolve(nome="Santos Silva Maria", fuzzy=False) == (None, None)
+
+
+def test_palavras_compartilhadas_por_duas_pessoas(index):
+    # "Maria Santos" casa com as duas Marias; sem fuzzy não escolhe nenhuma
+    assert index.resolve(nome="Maria Santos")[1] == "palavras_nome"
+    assert index.resolve(nome="Maria Santos", fuzzy=False) == (None, None)
+
+
+def test_cpf_tem_prioridade_sobre_nome(index):
+    row, criterio = index.resolve(nome="José Pereira", cpf="55566677788")
+    assert (row["nome"], criterio) == ("Maria Santos Oliveira", "cpf")
+
+
+def test_nao_encontrado(index):
+    assert index.resolve(nome="Fulano de Tal") == (None, None)
+    assert index.resolve() == (None, None)
+    assert index.by_cpf("000") is None
+
+
+def test_atualizacao_incremental_pela_chapa():
+    idx = IdentityIndex()
+    rows = [{"nome": f"PESSOA {i}", "cpf": f"{i:011d}", "chapa": str(i)} for i in range(1, 101)]
+    assert idx.refresh(FONTE_ATIVOS, rows, version=1) == {"added": 100, "changed": 0, "removed": 0}
+    # Mesma versão: nada a fazer
+    assert idx.refresh(FONTE_ATIVOS, rows[1:], version=1) == {"added": 0, "changed": 0, "removed": 0}
+    # Inserção no início e remoção no meio deslocam as posições, mas só mexem nessas linhas
+    novas = [{"nome": "NOVA", "cpf": "99999999999", "chapa": "999"}] + rows[:49] + rows[50:]
+    assert idx.refresh(FONTE_ATIVOS, novas, version=2) == {"added": 1, "changed": 0, "removed": 1}
+    assert idx.resolve(chapa="10")[0]["nome"] == "PESSOA 10"
+    assert idx.resolve(nome="PESSOA 50", fuzzy=False) == (None, None)
+    alteradas = [dict(r) for r in novas]
+    alteradas[5]["nome"] = "OUTRO NOME"
+    assert idx.refresh(FONTE_ATIVOS, alteradas, version=3) == {"added": 0, "changed": 1, "removed": 0}
+    assert idx.resolve(nome="OUTRO NOME")[0]["chapa"] == alteradas[5]["chapa"]
+    assert idx.resolve(nome=novas[5]["nome"], fuzzy=False) == (None, None)
+    assert idx.size == 100
+
+
+def test_chapa_repetida_nao_some_do_indice():
+    idx = IdentityIndex()
+    idx.refresh(FONTE_ATIVOS, [{"nome": "PRIMEIRA", "chapa": "1"}, {"nome": "SEGUNDA", "chapa": "1"}], version=1)
+    assert idx.resolve(nome="PRIMEIRA")[1] == "nome"
+    assert idx.resolve(nome="SEGUNDA")[1] == "nome"
+    # Desempate pela ordem de inserção
+    assert idx.resolve(chapa="1")[0]["nome"] == "PRIMEIRA"
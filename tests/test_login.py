@@ -0,0 +1,30 @@
+import httpx
+import pytest
+
+import sessions
+
+
+@pytest.fixture
+def client(local_api):
+    return local_api({"usuarios": [{"id": i, "nome": f"user{i}", "senha": f"senha{i}"} for i in range(1, 4)]})
+
+
+def test_login_carrega_credenciais_do_postgrest(client):
+    r = client.post("/api/login", json={"nome": "user2", "senha": "senha2"}, user=None)
+    assert r.status_code == 200
+    body = r.json()
+    assert body["authenticated"] is True
+    assert sessions.verify(body["token"]).user == "user2"
+
+
+def test_login_com_senha_errada(client):
+    r = client.post("/api/login", json={"nome": "user2", "senha": "senha3"}, user=None)
+    assert r.status_code == 200
+    assert r.json() == {"authenticated": False}
+
+
+def test_select_com_espaco_e_rejeitado(client):
+    # O PostgREST local segue o PostgREST: "nome, senha" não é uma lista de colunas válida
+    request = httpx.Request("GET", "http://postgrest.local/rest/v1/usuarios", params={"select": "nome, senha"})
+    r = client.rest.handle(request)
+    assert r.status_code == 400
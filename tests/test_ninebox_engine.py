@@ -0,0 +1,109 @@
+import pytest
+
+import columnar
+from ninebox_engine import (
+    build_columns,
+    classificar_nota,
+    classificar_notas,
+    compute_ninebox,
+    filtrar_indices,
+    posicao_grid,
+    to_float,
+)
+
+ATENDE_PARC, ATENDE, SUPERA = "Atende parcialmente", "Atende dentro da expectativa", "Supera a expectativa"
+
+
+def _avaliacao(id, nome, d, p, cd=None, cp=None, cal_d=None, cal_p=None, area="OBRAS", formulario="F1", avaliador="GESTOR A"):
+    return {
+        "id": id, "área": area, "formulário": formulario, "usuário_avaliado": nome, "avaliado": None,
+        "nota_final_desempenho": d, "classificação_final_desempenho": cd,
+        "nota_final_potencial": p, "classificação_final_potencial": cp,
+        "nota_calibrada_desempenho": cal_d, "nota_calibrada_potencial": cal_p, "avaliador": avaliador,
+    }
+
+
+@pytest.mark.parametrize("valor, esperado", [
+    ("3.50", 3.5), ("3,5", 3.5), (4, 4.0), (" ", None), ("abc", None), (None, None), (float("nan"), None),
+])
+def test_to_float(valor, esperado):
+    assert to_float(valor) == esperado
+
+
+@pytest.mark.parametrize("nota, esperado", [
+    (0, ATENDE_PARC), (2.49, ATENDE_PARC), (2.5, ATENDE), (3.29, ATENDE), (3.3, SUPERA), (4, SUPERA),
+    (-1, ATENDE_PARC), ("x", None),
+])
+def test_faixas_de_classificacao(nota, esperado):
+    assert classificar_nota(nota) == esperado
+
+
+def test_classificar_notas_em_coluna():
+    assert classificar_notas([2.49, 2.5, None, float("nan"), 3.3]) == [ATENDE_PARC, ATENDE, None, None, SUPERA]
+
+
+def test_posicao_grid():
+    # Potencial na linha (invertida), desempenho na coluna
+    assert posicao_grid(SUPERA, SUPERA) == "1-3"
+    assert posicao_grid(ATENDE_PARC, ATENDE_PARC) == "3-1"
+    assert posicao_grid(SUPERA, ATENDE_PARC) == "3-3"
+    # Classificação desconhecida conta como nível 2
+    assert posicao_grid("Outra", None) == "2-2"
+
+
+def test_calibracao_substitui_nota_e_classificacao():
+    rows = [
+        _avaliacao(1, "ANA", "2.0", "2.0", ATENDE_PARC, ATENDE_PARC),
+        _avaliacao(2, "BIA", "2.0", "2.0", ATENDE_PARC, ATENDE_PARC, cal_d="3,5"),
+        _avaliacao(3, "CAIO", "3.0", None, ATENDE, None),
+    ]
+    cols = build_columns(rows)
+    assert list(cols.desempenho) == [2.0, 3.5, 3.0]
+    assert cols.classif_desempenho == [ATENDE_PARC, SUPERA, ATENDE]
+    # Potencial não calibrado mantém a classificação gravada
+    assert cols.classif_potencial[1] == ATENDE_PARC
+    assert cols.posicao == ["3-1", "3-3", None]
+    assert cols.calibrado == [False, True, False]
+
+
+def test_colunas_iguais_com_snapshot_colunar():
+    rows = [_avaliacao(i, f"P{i}", str(1 + i % 3), str(1 + i % 4), ATENDE, SUPERA, area=f"A{i % 2}") for i in range(40)]
+    lista, colunar = build_columns(rows), build_columns(columnar.compact(rows))
+    assert isinstance(colunar.rows, columnar.ColumnarTable)
+    for campo in ("ids", "classif_desempenho", "classif_potencial", "posicao", "area", "nome"):
+        assert getattr(lista, campo) == getattr(colunar, campo)
+    assert list(lista.desempenho) == list(colunar.desempenho)
+
+
+def test_filtros():
+    rows = [
+        _avaliacao(1, "Ana Souza", "3", "3", ATENDE, ATENDE, area="RH"),
+        _avaliacao(2, "João Souza", "3", "3", ATENDE, ATENDE, formulario="F2"),
+        _avaliacao(3, "Ana Lima", "3", None, ATENDE, None, avaliador="GESTOR B"),
+    ]
+    cols = build_columns(rows)
+    assert filtrar_indices(cols) == [0, 1]
+    assert filtrar_indices(cols, apenas_grid=False) == [0, 1, 2]
+    assert filtrar_indices(cols, area="RH") == [0]
+    assert filtrar_indices(cols, formulario="F2") == [1]
+    assert filtrar_indices(cols, nome="souza") == [0, 1]
+    assert filtrar_indices(cols, avaliador="GESTOR B", apenas_grid=False) == [2]
+
+
+def test_ranking_por_quadrante():
+    rows = [
+        _avaliacao(1, "A", "3.5", "3.4", SUPERA, SUPERA),
+        _avaliacao(2, "B", "3.9", "3.3", SUPERA, SUPERA),
+        _avaliacao(3, "C", "3.5", "3.4", SUPERA, SUPERA),
+        _avaliacao(4, "D", "1.0", "1.0", ATENDE_PARC, ATENDE_PARC),
+    ]
+    cols = build_columns(rows)
+    result = compute_ninebox(cols, filtrar_indices(cols), fator_desempenho=1.0, fator_potencial=1.0, limite=2)
+    assert result["total"] == 4
+    assert result["counts"]["1-3"] == 3 and result["counts"]["3-1"] == 1
+    assert sum(result["counts"].values()) == 4
+    topo = result["quadrantes"]["1-3"]
+    # Ranking decrescente; empate (A e C) mantém a ordem original; limite corta a lista, não a contagem
+    assert [p["id"] for p in topo["pessoas"]] == [2, 1]
+    assert topo["count"] == 3
+    assert topo["pessoas"][0]["ranking"] == pytest.approx(7.2)
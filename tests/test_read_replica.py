@@ -0,0 +1,84 @@
+import pytest
+
+from read_replica import ReadReplica, ReplicaError, open_replica, query_rows
+
+TABLES = {"pessoas": {"nome": ("NOME", "Avaliado"), "cpf": ("CPF",), "gestor": ("GESTOR",), "login": ("Login",)}}
+ROWS = [
+    {"NOME": "José Pereira", "CPF": "123.456.789-0", "GESTOR": "Ana Lima", "Login": "JPEREIRA", "Nota": 3.0},
+    {"NOME": None, "Avaliado": "Maria Santos", "CPF": "11122233344", "GESTOR": "ana  lima", "Login": "msantos", "Nota": 4.5},
+    {"NOME": "Carla Dias", "CPF": None, "GESTOR": "Bruno Souza", "Login": "", "Nota": None},
+]
+
+
+@pytest.fixture
+def replica(tmp_path):
+    r = ReadReplica(str(tmp_path / "sub" / "replica.sqlite3"), tables=TABLES)
+    r.sync("pessoas", ROWS, "h1", changed_at=10.0)
+    return r
+
+
+def _nomes(rows):
+    return [r.get("NOME") or r.get("Avaliado") for r in rows]
+
+
+def test_sync_so_reescreve_quando_o_hash_muda(replica):
+    assert replica.sync("pessoas", [], "h1", changed_at=20.0) is False
+    assert replica.meta("pessoas")["rows"] == 3
+    assert replica.sync("pessoas", ROWS[:1], "h2", changed_at=20.0) is True
+    assert (replica.meta("pessoas")["rows"], replica.meta("pessoas")["changed_at"]) == (1, 20.0)
+    assert replica.info()["tables"]["pessoas"]["content_hash"] == "h2"
+
+
+def test_meta_persistida_entre_aberturas(replica):
+    reaberta = ReadReplica(replica.path, tables=TABLES)
+    assert reaberta.meta("pessoas")["content_hash"] == "h1"
+    assert "Nota" in reaberta.meta("pessoas")["columns"]
+    assert len(reaberta.query("pessoas")) == 3
+
+
+@pytest.mark.parametrize("keys, nomes", [
+    ({"nome": ["jose pereira"]}, ["José Pereira"]),
+    ({"nome": ["MARIA SANTOS"]}, ["Maria Santos"]),
+    ({"cpf": ["01234567890"]}, ["José Pereira"]),
+    ({"gestor": ["Ana Lima"]}, ["José Pereira", "Maria Santos"]),
+    ({"login": ["MSANTOS"]}, ["Maria Santos"]),
+    ({"gestor": ["Ana Lima"], "login": ["jpereira"]}, ["José Pereira"]),
+    ({"nome": []}, ["José Pereira", "Maria Santos", "Carla Dias"]),
+])
+def test_busca_por_chaves_normalizadas(replica, keys, nomes):
+    assert _nomes(replica.query("pessoas", keys=keys)) == nomes
+    # Mesmo resultado na consulta em memória (réplica desativada)
+    assert _nomes(query_rows("pessoas", ROWS, keys=keys, tables=TABLES)) == nomes
+
+
+@pytest.mark.parametrize("ordem, nomes", [
+    ("Nota", ["José Pereira", "Maria Santos", "Carla Dias"]),
+    ("-Nota", ["Maria Santos", "José Pereira", "Carla Dias"]),
+])
+def test_ordem_com_vazios_por_ultimo(replica, ordem, nomes):
+    assert _nomes(replica.query("pessoas", ordem=ordem)) == nomes
+    assert _nomes(query_rows("pessoas", ROWS, ordem=ordem, tables=TABLES)) == nomes
+
+
+def test_filtros_e_paginacao(replica):
+    assert _nomes(replica.query("pessoas", filters=[("GESTOR", ["Bruno Souza"])])) == ["Carla Dias"]
+    assert _nomes(replica.query("pessoas", limit=1, offset=1)) == ["Maria Santos"]
+    assert _nomes(query_rows("pessoas", ROWS, limit=1, offset=1, tables=TABLES)) == ["Maria Santos"]
+
+
+def test_erros_de_consulta(replica):
+    with pytest.raises(ReplicaError):
+        replica.query("pessoas", keys={"chapa": ["1"]})
+    with pytest.raises(ReplicaError):
+        replica.query("pessoas", ordem="Inexistente")
+    with pytest.raises(ReplicaError):
+        query_rows("pessoas", ROWS, ordem="-Inexistente", tables=TABLES)
+    vazia = ReadReplica(str(replica.path) + ".2", tables=TABLES)
+    with pytest.raises(ReplicaError):
+        vazia.query("pessoas")
+
+
+def test_open_replica_desativada_sem_caminho(tmp_path):
+    assert open_replica("") is None
+    assert open_replica(str(tmp_path)) is None
+    assert isinstance(open_replica(str(tmp_path / "r.sqlite3")), ReadReplica)
@@ -0,0 +1,111 @@
+import asyncio
+import base64
+import json
+
+import pytest
+from fastapi import HTTPException
+from starlette.requests import Request
+
+import sessions
+from sessions import AreaFilter, issue, verify
+
+GP = sessions.area_codes(sessions.RESTRICTED_AREAS)
+
+
+def _request(path, token=None):
+    headers = [(b"authorization", f"Bearer {token}".encode())] if token else []
+    return Request({"type": "http", "method": "GET", "path": path, "query_string": b"", "headers": headers})
+
+
+def test_token_valido():
+    session = verify(issue("ana", areas=[sessions.RESTRICTED_AREAS[0]]))
+    assert session.user == "ana"
+    assert session.areas == (GP[0],)
+
+
+def test_token_adulterado():
+    token = issue("ana")
+    payload, signature = token.split(".")
+    data = json.loads(base64.urlsafe_b64decode(payload + "=" * (-len(payload) % 4)))
+    data["a"] = list(GP)
+    forged = base64.urlsafe_b64encode(json.dumps(data).encode()).rstrip(b"=").decode()
+    assert verify(f"{forged}.{signature}") is None
+    assert verify(payload + "." + signature[:-2] + ("AA" if signature[-2:] != "AA" else "BB")) is None
+    assert verify(payload) is None
+    assert verify(token + "x") is None
+
+
+def test_token_de_outra_chave(monkeypatch):
+    token = issue("ana")
+    monkeypatch.setattr(sessions, "SECRET", b"outra-chave")
+    assert verify(token) is None
+
+
+@pytest.mark.parametrize("token", [None, "", ".", "abc.def", "!!!.###", "a.b.c", "é.x"])
+def test_token_malformado(token):
+    assert verify(token) is None
+
+
+def test_token_assinado_com_json_invalido():
+    payload = base64.urlsafe_b64encode(b'{"u": "ana"}').rstrip(b"=").decode()
+    assert verify(f"{payload}.{sessions._sign(payload)}") is None
+    payload = base64.urlsafe_b64encode(b"[1, 2]").rstrip(b"=").decode()
+    assert verify(f"{payload}.{sessions._sign(payload)}") is None
+
+
+def test_token_expirado(monkeypatch):
+    token = issue("ana", ttl=60)
+    assert verify(token) is not None
+    now = sessions.time.time()
+    monkeypatch.setattr(sessions.time, "time", lambda: now + 61)
+    assert verify(token) is None
+    assert verify(issue("ana", ttl=-1)) is None
+
+
+def test_bearer_e_token_de_metricas(monkeypatch):
+    assert sessions.bearer("Bearer abc ") == "abc"
+    assert sessions.bearer("bearer abc") == "abc"
+    assert sessions.bearer("Basic abc") is None
+    assert sessions.bearer(None) is None
+    monkeypatch.setattr(sessions, "METRICS_TOKEN", "")
+    assert not sessions.is_metrics_token("")
+    monkeypatch.setattr(sessions, "METRICS_TOKEN", "scrape")
+    assert sessions.is_metrics_token("scrape")
+    assert not sessions.is_metrics_token("scrapes")
+    assert not sessions.is_metrics_token(None)
+
+
+def test_require_session(monkeypatch):
+    monkeypatch.setattr(sessions, "AUTH_REQUIRED", True)
+    monkeypatch.setattr(sessions, "METRICS_TOKEN", "scrape")
+    token = issue("ana")
+    assert asyncio.run(sessions.require_session(_request("/api/avaliacoes", token))).user == "ana"
+    assert asyncio.run(sessions.require_session(_request("/api/health"))) is None
+    assert asyncio.run(sessions.require_session(_request("/api/metrics", "scrape"))) is None
+    assert asyncio.run(sessions.require_session(_request("/ninebox.html"))) is None
+    for path, tok in [("/api/avaliacoes", None), ("/api/avaliacoes", "scrape"), ("/api/metrics", "errado")]:
+        with pytest.raises(HTTPException) as exc:
+            asyncio.run(sessions.require_session(_request(path, tok)))
+        assert exc.value.status_code == 401
+        assert exc.value.headers["WWW-Authenticate"] == "Bearer"
+
+
+def test_areas_escondidas():
+    assert sessions.hidden_areas(None) == GP
+    assert sessions.hidden_areas(verify(issue("ana", areas=sessions.RESTRICTED_AREAS))) == ()
+
+
+def test_area_filter():
+    area = AreaFilter([GP[0]])
+    assert area.hides(sessions.RESTRICTED_AREAS[0])
+    assert area.hides(GP[0] + ".07 - SUBÁREA")
+    assert area.hides("coordenação de comunicação e marketing")
+    assert not area.hides(GP[0] + "9 - OUTRA")
+    assert not area.hides(sessions.RESTRICTED_AREAS[1])
+    assert not area.hides(None)
+    assert area.hides_row({"codsecao": GP[0]}, "relacao_ativos")
+    assert not area.hides_row({"Área": GP[0]}, "relacao_ativos")
+    assert area.hides_row({"Área": GP[0]})
+    columns = {"área": ["OBRAS", sessions.RESTRICTED_AREAS[0], None], "Área": [None, None, GP[0]]}
+    assert area.mask("nota_final_colaborador", columns) == bytearray([0, 1, 1])
+    assert AreaFilter([]).mask("nota_final_colaborador", columns) is None
@@ -0,0 +1,104 @@
+import pytest
+
+import columnar
+import table_query
+from table_query import QueryError, keyset_index, keyset_page, parse_cursor
+
+
+@pytest.fixture(autouse=True)
+def _limpa_cache():
+    table_query._keyset_cache.clear()
+    yield
+    table_query._keyset_cache.clear()
+
+
+def _rows(ids, **extra):
+    return [dict({"id": i, "area": "RH" if i % 2 else "OBRAS"}, **extra) for i in ids]
+
+
+def _todas_as_paginas(keys, ordered, limit, filters=()):
+    cursor, pages = None, []
+    while True:
+        page, cursor = keyset_page(keys, ordered, cursor, limit, filters)
+        pages.append([r["id"] for r in page])
+        if cursor is None:
+            return pages
+
+
+def test_paginas_em_ordem_de_chave():
+    keys, ordered = keyset_index("t", 1, _rows([5, 3, 9, 1, 7]))
+    assert keys == [1, 3, 5, 7, 9]
+    assert _todas_as_paginas(keys, ordered, 2) == [[1, 3], [5, 7], [9]]
+
+
+def test_ultima_pagina_completa_devolve_pagina_vazia():
+    keys, ordered = keyset_index("t", 1, _rows(range(1, 5)))
+    assert _todas_as_paginas(keys, ordered, 2) == [[1, 2], [3, 4], []]
+
+
+def test_cursor_alem_do_fim_e_entre_chaves():
+    keys, ordered = keyset_index("t", 1, _rows([10, 20, 30]))
+    assert keyset_page(keys, ordered, 30, 5) == ([], None)
+    assert keyset_page(keys, ordered, 999, 5) == ([], None)
+    # Cursor de uma linha removida desde a página anterior: continua da próxima chave
+    page, cursor = keyset_page(keys, ordered, 15, 1)
+    assert [r["id"] for r in page] == [20] and cursor == 20
+
+
+def test_tabela_vazia():
+    keys, ordered = keyset_index("t", 1, [])
+    assert keyset_page(keys, ordered, None, 10) == ([], None)
+    assert parse_cursor("7", keys) == "7"
+
+
+def test_filtros_no_cursor():
+    keys, ordered = keyset_index("t", 1, _rows(range(1, 11)))
+    assert _todas_as_paginas(keys, ordered, 2, [("area", ["RH"])]) == [[1, 3], [5, 7], [9]]
+    assert keyset_page(keys, ordered, None, 2, [("area", ["NENHUMA"])]) == ([], None)
+
+
+def test_parse_cursor():
+    keys = [1, 2, 3]
+    assert parse_cursor("", keys) is None
+    assert parse_cursor("2", keys) == 2
+    with pytest.raises(QueryError):
+        parse_cursor("abc", keys)
+    assert parse_cursor("b", ["a", "b"]) == "b"
+
+
+def test_chaves_texto():
+    keys, ordered = keyset_index("t", 1, [{"id": k} for k in ["b", "a", "c"]])
+    page, cursor = keyset_page(keys, ordered, parse_cursor("a", keys), 1)
+    assert [r["id"] for r in page] == ["b"] and cursor == "b"
+
+
+def test_linhas_sem_chave():
+    with pytest.raises(QueryError):
+        keyset_index("t", 1, [{"id": 1}, {"id": None}])
+
+
+def test_indice_por_versao():
+    keys, _ = keyset_index("t", 1, _rows([2, 1]))
+    # Mesma versão: reaproveita o índice mesmo com outras linhas
+    assert keyset_index("t", 1, _rows([3]))[0] is keys
+    assert keyset_index("t", 2, _rows([3]))[0] == [3]
+
+
+def test_snapshot_colunar():
+    rows = _rows([4, 2, 3, 1] + list(range(5, 40)))
+    table = columnar.compact(rows)
+    assert isinstance(table, columnar.ColumnarTable)
+    keys, ordered = keyset_index("t", 1, table)
+    assert isinstance(ordered, columnar.ColumnarTable)
+    assert _todas_as_paginas(keys, ordered, 10) == [list(range(i, min(i + 10, 40))) for i in range(1, 40, 10)]
+
+
+def test_fields_e_filtros():
+    assert table_query.parse_fields("pessoas_avaliadas", "id, Área,id") == ["id", "Área"]
+    assert table_query.parse_fields("pessoas_avaliadas", "") is None
+    with pytest.raises(QueryError):
+        table_query.parse_fields("pessoas_avaliadas", "senha")
+    assert table_query.parse_filters("pessoas_avaliadas", {"area": ["RH", ""], "gestor": None}) == [("Área", ["RH"])]
+    with pytest.raises(QueryError):
+        table_query.parse_filters("nota_por_avaliacao", {"area": ["RH"]})
+    assert table_query.postgrest_select(["id", "Área", "Usuário Avaliado"]) == 'id,Área,"Usuário Avaliado"'